@@ -0,0 +1,138 @@
+import argparse
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+import torch
+
+from ase.build import bulk
+
+from nequip.data import AtomicDataDict, from_ase, compute_neighborlist_
+from nequip.data.transforms import ChemicalSpeciesToAtomTypeMapper
+from nequip.model import NequIPGNNModel
+from nequip.model.modify_utils import modify
+from nequip.utils.global_state import set_global_state
+
+
+def train_steps(args, checkpointing: bool, rep: int):
+    """Times force-training steps on a rattled bulk cell, and reports the peak memory of this process."""
+    set_global_state()
+    device = torch.device(args.device)
+    model = NequIPGNNModel(
+        seed=123,
+        model_dtype=args.model_dtype,
+        type_names=["C"],
+        r_max=args.r_max,
+        num_layers=args.num_layers,
+        l_max=args.l_max,
+        num_features=args.num_features,
+        radial_mlp_depth=2,
+        radial_mlp_width=64,
+        avg_num_neighbors=20.0,
+    ).to(device)
+    if checkpointing:
+        model = modify(model, [{"modifier": "enable_activation_checkpointing"}])
+    model.train()
+
+    atoms = bulk("C", "diamond", a=3.6, cubic=True) * rep
+    atoms.rattle(0.05, seed=rep)
+    data = compute_neighborlist_(from_ase(atoms), r_max=args.r_max)
+    data = AtomicDataDict.to_(ChemicalSpeciesToAtomTypeMapper(["C"])(data), device)
+
+    def now():
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        return time.perf_counter()
+
+    if device.type == "cuda":
+        torch.cuda.reset_peak_memory_stats(device)
+    times = []
+    try:
+        for _ in range(args.steps + 1):
+            t0 = now()
+            out = model(data.copy())
+            loss = (
+                out[AtomicDataDict.TOTAL_ENERGY_KEY].square().sum()
+                + out[AtomicDataDict.FORCE_KEY].square().sum()
+            )
+            loss.backward()
+            model.zero_grad(set_to_none=True)
+            del out, loss
+            times.append(now() - t0)
+    except torch.cuda.OutOfMemoryError:
+        return None
+    if device.type == "cuda":
+        peak_mb = torch.cuda.max_memory_allocated(device) / 1e6
+    else:
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+    return {
+        "num_atoms": len(atoms),
+        "num_edges": AtomicDataDict.num_edges(data),
+        # the first step includes warmup
+        "step_ms": 1e3 * float(np.median(times[1:])),
+        "peak_mb": peak_mb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks force-training steps of a NequIP GNN model with and without `enable_activation_checkpointing` on rattled bulk diamond cells of increasing size, reporting the step time, peak memory, and the largest cell (in atoms) that fits into a memory budget."
+    )
+    parser.add_argument(
+        "--repeats",
+        help="repeats of the cubic diamond cell, in increasing order (default: 2 3 4 5 6 8 10)",
+        nargs="+",
+        type=int,
+        default=[2, 3, 4, 5, 6, 8, 10],
+    )
+    parser.add_argument(
+        "--memory-budget-gb",
+        help="memory budget for the largest trainable cell (default: no budget, i.e. until out of memory on CUDA)",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--steps",
+        help="number of timed training steps per cell (default: 5)",
+        type=int,
+        default=5,
+    )
+    parser.add_argument("--num-layers", type=int, default=4)
+    parser.add_argument("--l-max", type=int, default=2)
+    parser.add_argument("--num-features", type=int, default=32)
+    parser.add_argument("--r-max", type=float, default=5.0)
+    parser.add_argument("--model-dtype", type=str, default="float32")
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+
+    # every measurement runs in a fresh process such that the peak memory (in particular the peak RSS on CPU) is not affected by previous measurements
+    ctx = multiprocessing.get_context("spawn")
+    largest = {}
+    for checkpointing in [False, True]:
+        name = "checkpointing" if checkpointing else "baseline"
+        largest[name] = 0
+        for rep in args.repeats:
+            with ctx.Pool(1) as pool:
+                result = pool.apply(train_steps, (args, checkpointing, rep))
+            if result is None:
+                print(f"{name:>13}: {rep}x{rep}x{rep} cells out of memory")
+                break
+            fits = (
+                args.memory_budget_gb is None
+                or result["peak_mb"] <= 1e3 * args.memory_budget_gb
+            )
+            print(
+                f"{name:>13}: {result['num_atoms']:>6} atoms {result['num_edges']:>8} edges: "
+                f"{result['step_ms']:.1f} ms/step, peak memory {result['peak_mb']:.0f} MB"
+                + ("" if fits else " (over budget)")
+            )
+            if not fits:
+                break
+            largest[name] = result["num_atoms"]
+    for name, num_atoms in largest.items():
+        print(f"largest trainable cell ({name}): {num_atoms} atoms")
+
+
+if __name__ == "__main__":
+    main()
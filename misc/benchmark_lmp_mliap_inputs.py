@@ -0,0 +1,119 @@
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from nequip.data import AtomicDataDict
+from nequip.integrations.lammps_mliap.lmp_mliap_inputs import LAMMPSMLIAPInputs
+
+
+class MockLMPData:
+    """Mimics the arrays that LAMMPS ML-IAP passes to `compute_forces` for one timestep."""
+
+    def __init__(self, nlocal: int, nghost: int, npairs: int, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.nlocal = nlocal
+        self.ntotal = nlocal + nghost
+        self.npairs = npairs
+        self.rij = rng.normal(size=(npairs, 3))
+        self.pair_i = rng.integers(0, nlocal, size=npairs, dtype=np.int32)
+        self.pair_j = rng.integers(0, self.ntotal, size=npairs, dtype=np.int32)
+        self.elems = rng.integers(0, 3, size=self.ntotal, dtype=np.int32)
+        self.eatoms = np.zeros(nlocal)
+
+
+def allocating_inputs(lmp_data, device):
+    """Builds the inputs with new tensors on every timestep."""
+    return {
+        AtomicDataDict.EDGE_VECTORS_KEY: torch.as_tensor(
+            lmp_data.rij, dtype=torch.float64
+        ).to(device),
+        AtomicDataDict.EDGE_INDEX_KEY: torch.vstack(
+            [
+                torch.as_tensor(lmp_data.pair_i, dtype=torch.int64).to(device),
+                torch.as_tensor(lmp_data.pair_j, dtype=torch.int64).to(device),
+            ],
+        ),
+        AtomicDataDict.ATOM_TYPE_KEY: torch.as_tensor(
+            lmp_data.elems, dtype=torch.int64
+        ).to(device),
+        AtomicDataDict.LMP_MLIAP_DATA_KEY: lmp_data,
+        AtomicDataDict.NUM_LOCAL_GHOST_NODES_KEY: torch.tensor(
+            [lmp_data.nlocal, lmp_data.ntotal - lmp_data.nlocal], dtype=torch.int64
+        ).to(device),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the per-timestep cost of building NequIP model inputs from (mock) LAMMPS ML-IAP data, with and without reused input buffers."
+    )
+    parser.add_argument(
+        "--sizes",
+        help="numbers of local atoms (default: 100 1000 10000)",
+        nargs="+",
+        type=int,
+        default=[100, 1000, 10000],
+    )
+    parser.add_argument(
+        "--neighbors",
+        help="number of neighbors per atom (default: 50)",
+        type=int,
+        default=50,
+    )
+    parser.add_argument(
+        "--steps",
+        help="number of timed timesteps (default: 1000)",
+        type=int,
+        default=1000,
+    )
+    parser.add_argument(
+        "--device",
+        help="device of the model inputs (default: cpu)",
+        type=str,
+        default="cpu",
+    )
+    args = parser.parse_args()
+    device = torch.device(args.device)
+
+    def now():
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        return time.perf_counter()
+
+    for nlocal in args.sizes:
+        nghost = nlocal // 2
+        # neighbor counts fluctuate between timesteps, as in MD
+        rng = np.random.default_rng(0)
+        steps = [
+            MockLMPData(
+                nlocal,
+                nghost,
+                int(nlocal * args.neighbors * rng.uniform(0.95, 1.05)),
+                seed=seed,
+            )
+            for seed in range(8)
+        ]
+        buffered = LAMMPSMLIAPInputs(device)
+        timings = {}
+        for name, fn in [
+            ("allocating", lambda lmp_data: allocating_inputs(lmp_data, device)),
+            ("buffered", buffered),
+        ]:
+            for lmp_data in steps:
+                fn(lmp_data)
+            t0 = now()
+            for step in range(args.steps):
+                fn(steps[step % len(steps)])
+            timings[name] = 1e6 * (now() - t0) / args.steps
+        print(
+            f"{nlocal:>8} local atoms {steps[0].npairs:>10} pairs: "
+            f"allocating {timings['allocating']:.1f} us/step, "
+            f"buffered {timings['buffered']:.1f} us/step "
+            f"({timings['allocating'] / timings['buffered']:.2f}x, {buffered.num_allocations} buffer allocations)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from nequip.nn.utils import scatter
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks `scatter` with atomic `scatter_add_` against the segment reduction over sorted indices (`sorted_index=True`), timing forward and backward passes on random edge features and checking whether repeated runs give bitwise identical results."
+    )
+    parser.add_argument(
+        "--num-nodes",
+        help="numbers of nodes (default: 1000 10000 100000)",
+        nargs="+",
+        type=int,
+        default=[1000, 10000, 100000],
+    )
+    parser.add_argument(
+        "--avg-num-neighbors",
+        help="average number of edges per node (default: 40)",
+        type=int,
+        default=40,
+    )
+    parser.add_argument(
+        "--num-features",
+        help="number of features per edge (default: 64)",
+        type=int,
+        default=64,
+    )
+    parser.add_argument(
+        "--steps",
+        help="number of timed (and compared) calls per size (default: 20)",
+        type=int,
+        default=20,
+    )
+    parser.add_argument("--dtype", type=str, default="float32")
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+    device = torch.device(args.device)
+    dtype = {"float32": torch.float32, "float64": torch.float64}[args.dtype]
+
+    def now():
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        return time.perf_counter()
+
+    for num_nodes in args.num_nodes:
+        num_edges = num_nodes * args.avg_num_neighbors
+        index, _ = torch.sort(torch.randint(0, num_nodes, (num_edges,), device=device))
+        src = torch.randn(
+            (num_edges, args.num_features), dtype=dtype, device=device
+        ).requires_grad_(True)
+        grad_out = torch.randn(
+            (num_nodes, args.num_features), dtype=dtype, device=device
+        )
+
+        results = {}
+        for name, sorted_index in [("scatter_add", False), ("segment", True)]:
+            times, outs = [], []
+            # the first call is a warmup
+            for _ in range(args.steps + 1):
+                t0 = now()
+                out = scatter(
+                    src, index, dim=0, dim_size=num_nodes, sorted_index=sorted_index
+                )
+                (grad,) = torch.autograd.grad(out, src, grad_out)
+                times.append(now() - t0)
+                outs.append(out.detach())
+            num_distinct = len(
+                {
+                    i
+                    for i in range(len(outs))
+                    if not any(torch.equal(outs[i], outs[j]) for j in range(i))
+                }
+            )
+            results[name] = (1e3 * np.median(times[1:]), num_distinct, outs[0])
+        max_diff = (results["segment"][2] - results["scatter_add"][2]).abs().max()
+        print(
+            f"{num_nodes:>7} nodes {num_edges:>9} edges: "
+            + ", ".join(
+                f"{name} {ms:.2f} ms ({num_distinct} distinct result(s) in {args.steps + 1} runs)"
+                for name, (ms, num_distinct, _) in results.items()
+            )
+            + f", speedup {results['scatter_add'][0] / results['segment'][0]:.2f}x, max difference {max_diff:.1e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from ase.build import bulk
+
+from nequip.data import AtomicDataDict, from_ase
+from nequip.data.transforms import (
+    ChemicalSpeciesToAtomTypeMapper,
+    NeighborListTransform,
+)
+from nequip.model.inference_models import load_aotinductor_model
+from nequip.model.inference_models.shape_buckets import ShapeBucketDispatcher
+from nequip.nn.graph_model import R_MAX_KEY, TYPE_NAMES_KEY
+from nequip.scripts._compile_utils import PAIR_NEQUIP_INPUTS, ASE_OUTPUTS
+from nequip.utils.global_state import set_global_state
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks a `.nequip.pt2` package exported with `--shape-buckets` against a generic `.nequip.pt2` package (both compiled for the `ase` target) on rattled bulk cells of increasing size."
+    )
+    parser.add_argument("generic_path", help="generic `.nequip.pt2` package")
+    parser.add_argument(
+        "bucketed_path", help="`.nequip.pt2` package with shape buckets"
+    )
+    parser.add_argument(
+        "--element",
+        help="element of the bulk cells, which must be one of the model's type names (default: first type name)",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--lattice-constant",
+        help="cubic lattice constant of the fcc bulk cells (default: 3.6)",
+        type=float,
+        default=3.6,
+    )
+    parser.add_argument(
+        "--repeats",
+        help="repeats of the cubic fcc cell (default: 2 3)",
+        nargs="+",
+        type=int,
+        default=[2, 3],
+    )
+    parser.add_argument(
+        "--steps",
+        help="number of timed model calls per cell (default: 50)",
+        type=int,
+        default=50,
+    )
+    parser.add_argument(
+        "--device",
+        help="device the packages were compiled for (default: cpu)",
+        type=str,
+        default="cpu",
+    )
+    args = parser.parse_args()
+    set_global_state()
+    device = torch.device(args.device)
+
+    models = {}
+    for name, path in [
+        ("generic", args.generic_path),
+        ("bucketed", args.bucketed_path),
+    ]:
+        models[name], metadata = load_aotinductor_model(
+            path, device, PAIR_NEQUIP_INPUTS, ASE_OUTPUTS
+        )
+    bucketed = models["bucketed"]
+    assert isinstance(bucketed, ShapeBucketDispatcher), (
+        f"`{args.bucketed_path}` was not exported with `--shape-buckets`"
+    )
+    print(f"shape buckets (max nodes, max edges): {bucketed.buckets}")
+    print(f"padding: {bucketed.padding}")
+
+    type_names = metadata[TYPE_NAMES_KEY]
+    element = type_names[0] if args.element is None else args.element
+    transforms = [
+        ChemicalSpeciesToAtomTypeMapper(type_names),
+        NeighborListTransform(r_max=metadata[R_MAX_KEY]),
+    ]
+
+    def now():
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        return time.perf_counter()
+
+    for rep in args.repeats:
+        atoms = bulk(element, "fcc", a=args.lattice_constant, cubic=True) * rep
+        atoms.rattle(0.05, seed=rep)
+        data = from_ase(atoms)
+        for transform in transforms:
+            data = transform(data)
+        data = AtomicDataDict.to_(
+            {k: data[k] for k in PAIR_NEQUIP_INPUTS},
+            device,
+        )
+
+        outputs = {name: model(data.copy()) for name, model in models.items()}
+        # the models are called alternately, such that both are equally affected by fluctuations of the machine's load
+        times = {name: [] for name in models}
+        for _ in range(args.steps):
+            for name, model in models.items():
+                t0 = now()
+                model(data.copy())
+                times[name].append(now() - t0)
+        timings = {name: 1e3 * np.median(t) for name, t in times.items()}
+        max_force_diff = (
+            (
+                outputs["generic"][AtomicDataDict.FORCE_KEY]
+                - outputs["bucketed"][AtomicDataDict.FORCE_KEY]
+            )
+            .abs()
+            .max()
+            .item()
+        )
+        print(
+            f"{len(atoms):>6} atoms {AtomicDataDict.num_edges(data):>8} edges: "
+            f"generic {timings['generic']:.2f} ms, "
+            f"bucketed {timings['bucketed']:.2f} ms "
+            f"({timings['generic'] / timings['bucketed']:.2f}x, "
+            f"max force difference {max_force_diff:.1e})"
+        )
+    print(f"calls per bucket (generic last): {bucketed.num_calls}")
+
+
+if __name__ == "__main__":
+    main()
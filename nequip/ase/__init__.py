@@ -1,5 +1,7 @@
 # This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
 from .nequip_calculator import NequIPCalculator
+from .ensemble_calculator import NequIPEnsembleCalculator
 from .nosehoover import NoseHoover
+from .replica_nosehoover import ReplicaNoseHoover
 
-__all__ = [NequIPCalculator, NoseHoover]
+__all__ = [NequIPCalculator, NequIPEnsembleCalculator, NoseHoover, ReplicaNoseHoover]
@@ -0,0 +1,125 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+from typing import Union, Optional, Dict, List
+import numpy as np
+import torch
+
+from nequip.model.utils import _SOLE_MODEL_KEY
+from nequip.nn import graph_model, EnsembleGraphModel
+from nequip.data import AtomicDataDict
+from nequip.data.transforms import ChemicalSpeciesToAtomTypeMapper
+from nequip.utils.global_state import set_global_state
+from .nequip_calculator import NequIPCalculator, _create_neighbor_transform
+
+
+class NequIPEnsembleCalculator(NequIPCalculator):
+    """NequIP framework ASE Calculator for an ensemble of models, see :class:`~nequip.nn.EnsembleGraphModel`.
+
+    The energies and forces are the ensemble means, and the ensemble variances of the energy (in eV^2) and of the force components (in (eV/Å)^2) are available as the ``energy_variance`` and ``forces_variance`` results, e.g. for uncertainty estimates in active learning.
+    The neighborlist and transforms are only computed once per structure for all members, and :meth:`calculate_batch` also returns the variances.
+    Stresses are not supported.
+
+    Args:
+        model (EnsembleGraphModel): ensemble of models in the NequIP framework
+        device (str/torch.device): device for model to evaluate on, e.g. ``cpu`` or ``cuda``
+        energy_units_to_eV (float): energy conversion factor (default ``1.0``)
+        length_units_to_A (float): length units conversion factor (default ``1.0``)
+        transforms (List[Callable]): list of data transforms
+    """
+
+    implemented_properties = [
+        "energy",
+        "energies",
+        "forces",
+        "free_energy",
+        "energy_variance",
+        "forces_variance",
+    ]
+    _graph_result_keys = [
+        AtomicDataDict.TOTAL_ENERGY_KEY,
+        AtomicDataDict.TOTAL_ENERGY_VARIANCE_KEY,
+    ]
+    _node_result_keys = [
+        AtomicDataDict.PER_ATOM_ENERGY_KEY,
+        AtomicDataDict.FORCE_KEY,
+        AtomicDataDict.FORCE_VARIANCE_KEY,
+    ]
+
+    @classmethod
+    def from_saved_models(
+        cls,
+        model_paths: List[str],
+        device: Union[str, torch.device] = "cpu",
+        chemical_species_to_atom_type_map: Optional[Union[Dict[str, str], bool]] = None,
+        allow_tf32: bool = False,
+        model_name: str = _SOLE_MODEL_KEY,
+        **kwargs,
+    ):
+        """Creates a :class:`~nequip.ase.NequIPEnsembleCalculator` from saved models.
+
+        Args:
+            model_paths (List[str]): paths to checkpoint files, package files, or nequip.net model IDs
+                (format: nequip.net:group-name/model-name:version) of the ensemble members.
+            device (str or torch.device): the device to use (e.g., ``"cpu"`` or ``"cuda"``).
+            chemical_species_to_atom_type_map (Dict[str, str] or bool or None): mapping from chemical species to model type names.
+                If ``None`` (default), uses identity mapping with warning.
+                If ``True``, uses identity mapping without warning.
+                If dict, uses the provided mapping.
+            allow_tf32 (bool): whether to allow TensorFloat32 operations (default ``False``).
+            model_name (str): key to select the model from ModuleDict (default for single model case).
+        """
+        from nequip.model.saved_models.load_utils import load_saved_model
+
+        # === set global state ===
+        set_global_state(allow_tf32=allow_tf32)
+
+        # === load models ===
+        model = EnsembleGraphModel(
+            [load_saved_model(path, model_key=model_name) for path in model_paths]
+        )
+        model.eval()
+        model.to(device)
+
+        r_max = float(model.metadata[graph_model.R_MAX_KEY])
+        type_names = model.metadata[graph_model.TYPE_NAMES_KEY].split(" ")
+
+        # create neighbor list transform with per-edge-type cutoffs if available
+        neighbor_transform = _create_neighbor_transform(
+            model.metadata, r_max, type_names
+        )
+
+        chemical_species_to_atom_type_map = cls._handle_chemical_species_map(
+            chemical_species_to_atom_type_map, type_names
+        )
+
+        # build nequip calculator
+        if "transforms" in kwargs:
+            raise KeyError("`transforms` not allowed here")
+
+        return cls(
+            model=model,
+            device=device,
+            transforms=[
+                ChemicalSpeciesToAtomTypeMapper(
+                    model_type_names=type_names,
+                    chemical_species_to_atom_type_map=chemical_species_to_atom_type_map,
+                ),
+                neighbor_transform,
+            ],
+            **kwargs,
+        )
+
+    def _extract_results(self, out: AtomicDataDict.Type) -> Dict[str, np.ndarray]:
+        results = super()._extract_results(out)
+        if AtomicDataDict.TOTAL_ENERGY_VARIANCE_KEY in out:
+            results["energy_variance"] = self.energy_units_to_eV**2 * (
+                out[AtomicDataDict.TOTAL_ENERGY_VARIANCE_KEY]
+                .detach()
+                .cpu()
+                .numpy()
+                .reshape(tuple())
+            )
+        if AtomicDataDict.FORCE_VARIANCE_KEY in out:
+            results["forces_variance"] = (
+                self.energy_units_to_eV / self.length_units_to_A
+            ) ** 2 * out[AtomicDataDict.FORCE_VARIANCE_KEY].detach().cpu().numpy()
+        return results
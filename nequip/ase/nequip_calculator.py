@@ -1,13 +1,14 @@
 # This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
 from typing import Union, Optional, Callable, Dict, List
 import warnings
+import numpy as np
 import torch
 
-from ase.calculators.calculator import Calculator, all_changes
+from ase.calculators.calculator import Calculator, all_changes, all_properties
 from ase.stress import full_3x3_to_voigt_6_stress
 
-from nequip.train.lightning import _SOLE_MODEL_KEY
-from nequip.nn import graph_model
+from nequip.model.utils import _SOLE_MODEL_KEY
+from nequip.nn import graph_model, set_force_stress_outputs
 from nequip.data import AtomicDataDict, from_ase
 from nequip.data.transforms import (
     ChemicalSpeciesToAtomTypeMapper,
@@ -15,6 +16,24 @@ from nequip.data.transforms import (
 )
 from nequip.utils.global_state import set_global_state
 
+# model outputs converted to ASE results
+_RESULT_KEYS = [
+    AtomicDataDict.TOTAL_ENERGY_KEY,
+    AtomicDataDict.PER_ATOM_ENERGY_KEY,
+    AtomicDataDict.FORCE_KEY,
+    AtomicDataDict.STRESS_KEY,
+]
+# labels that `from_ase` may extract from the structures
+_LABEL_KEYS = _RESULT_KEYS + [AtomicDataDict.VIRIAL_KEY]
+# `system_changes` for which the cached static inputs are reused, see `NequIPCalculator._prepare_cached_data`
+_POSITION_CHANGES = {"positions", "cell"}
+# inputs that only depend on the species and periodic boundary conditions, which are cached by `NequIPCalculator._prepare_cached_data`
+_STATIC_KEYS = [
+    AtomicDataDict.ATOMIC_NUMBERS_KEY,
+    AtomicDataDict.ATOM_TYPE_KEY,
+    AtomicDataDict.PBC_KEY,
+]
+
 
 class NequIPCalculator(Calculator):
     """NequIP framework ASE Calculator.
@@ -23,6 +42,12 @@ class NequIPCalculator(Calculator):
 
     The recommended way to use this Calculator is with a compiled model, i.e. ``nequip-compile`` the model and load it into the Calculator with ``NequIPCalculator.from_compiled_model(...)``. If one uses ``--mode aotinductor`` during ``nequip-compile``, it is important to use the flag ``--target ase`` for the compiled model file to work with this ASE Calculator.
 
+    The stress is only computed once it has been requested (e.g. with ``atoms.get_stress()``), such that the strain derivatives are skipped for MD or relaxations that only require forces.
+    Once requested, the stress is computed in every subsequent calculation to avoid recalculations for integrators that require both forces and stress.
+    This selection is only possible for eager and TorchScript models, since the outputs of AOTInductor models are fixed at compile time (see the ``ase_forces`` compile target).
+
+    When only the positions and/or cell changed since the previous calculation (as reported by ASE's ``system_changes``, e.g. in MD or relaxations), the static inputs (atomic numbers, atom types and periodic boundary conditions) are reused and only the neighborlist is recomputed.
+
     .. warning::
 
         If you are running MD with custom species, please make sure to set the correct masses for ASE.
@@ -33,9 +58,13 @@ class NequIPCalculator(Calculator):
         energy_units_to_eV (float): energy conversion factor (default ``1.0``)
         length_units_to_A (float): length units conversion factor (default ``1.0``)
         transforms (List[Callable]): list of data transforms
+        batch_model: model used by :meth:`calculate_batch` (default: ``model``), e.g. an AOTInductor model compiled with ``--target batch``
     """
 
     implemented_properties = ["energy", "energies", "forces", "stress", "free_energy"]
+    # per-frame and per-atom model outputs that are split into frames by `calculate_batch`
+    _graph_result_keys = [AtomicDataDict.TOTAL_ENERGY_KEY, AtomicDataDict.STRESS_KEY]
+    _node_result_keys = [AtomicDataDict.PER_ATOM_ENERGY_KEY, AtomicDataDict.FORCE_KEY]
 
     @classmethod
     def _handle_chemical_species_map(
@@ -76,6 +105,7 @@ class NequIPCalculator(Calculator):
         energy_units_to_eV: float = 1.0,
         length_units_to_A: float = 1.0,
         transforms: List[Callable] = [],
+        batch_model: Optional[torch.nn.Module] = None,
         **kwargs,
     ):
         Calculator.__init__(self, **kwargs)
@@ -86,6 +116,11 @@ class NequIPCalculator(Calculator):
             "make sure to call .eval() on model before building NequIPCalculator"
         )
         self.model = model
+        self.batch_model = model if batch_model is None else batch_model
+        # whether the stress has been requested, see `calculate`
+        self._compute_stress = None
+        # static inputs and persistent device buffers reused across calculations, see `_prepare_cached_data`
+        self._input_cache = None
 
         # === handle device ===
         self.device = device
@@ -102,6 +137,7 @@ class NequIPCalculator(Calculator):
         device: Union[str, torch.device] = "cpu",
         chemical_species_to_atom_type_map: Optional[Union[Dict[str, str], bool]] = None,
         chemical_symbols: Optional[Union[List[str], Dict[str, str]]] = None,
+        batch_compile_path: Optional[str] = None,
         **kwargs,
     ):
         """Creates a :class:`~nequip.ase.NequIPCalculator` from a compiled model file.
@@ -113,6 +149,7 @@ class NequIPCalculator(Calculator):
                 If ``None`` (default), uses identity mapping with warning.
                 If ``True``, uses identity mapping without warning.
                 If dict, uses the provided mapping.
+            batch_compile_path (str): path to the same model compiled with ``--target batch`` for :meth:`calculate_batch`, only required for AOTInductor models (``.nequip.pt2``), since TorchScript models support batches directly.
         """
         # TODO: eventually remove this check
         # check for deprecated API usage
@@ -133,12 +170,27 @@ class NequIPCalculator(Calculator):
             )
 
         from nequip.model.inference_models import load_compiled_model
-        from nequip.scripts._compile_utils import PAIR_NEQUIP_INPUTS, ASE_OUTPUTS
+        from nequip.scripts._compile_utils import (
+            PAIR_NEQUIP_INPUTS,
+            BATCH_INPUTS,
+            ASE_OUTPUTS,
+        )
 
         model, metadata = load_compiled_model(
             compile_path, device, PAIR_NEQUIP_INPUTS, ASE_OUTPUTS
         )
 
+        batch_model = None
+        if batch_compile_path is not None:
+            batch_model, batch_metadata = load_compiled_model(
+                batch_compile_path, device, BATCH_INPUTS, ASE_OUTPUTS
+            )
+            for key in (graph_model.R_MAX_KEY, graph_model.TYPE_NAMES_KEY):
+                if batch_metadata[key] != metadata[key]:
+                    raise ValueError(
+                        f"`{batch_compile_path}` and `{compile_path}` have different `{key}` ({batch_metadata[key]} vs {metadata[key]}), make sure both are compiled from the same model."
+                    )
+
         # extract r_max and type_names for transforms
         r_max = metadata[graph_model.R_MAX_KEY]
         type_names = metadata[graph_model.TYPE_NAMES_KEY]
@@ -160,6 +212,7 @@ class NequIPCalculator(Calculator):
                 ),
                 neighbor_transform,
             ],
+            batch_model=batch_model,
             **kwargs,
         )
 
@@ -237,17 +290,199 @@ class NequIPCalculator(Calculator):
         Calculator.calculate(self, atoms)
 
         # === prepare data ===
+        data = self._prepare_cached_data(self.atoms, system_changes)
+        self._select_outputs(properties)
+
+        # === predict + extract data ===
+        out = self.model(data)
+        self.results = self._extract_results(out)
+        self.save_extra_outputs(out)
+
+    def calculate_batch(
+        self,
+        atoms_list: List,
+        properties: List[str] = ["energy", "forces"],
+        max_atoms_per_batch: int = 4096,
+    ) -> List[Dict[str, np.ndarray]]:
+        """Evaluate the model on many structures with batched forward passes, e.g. for high-throughput screening.
+
+        Structures are packed (in order) into batches of at most ``max_atoms_per_batch`` atoms, such that each batch is evaluated with a single model call instead of one call per structure.
+        Structures with more atoms than ``max_atoms_per_batch`` are evaluated on their own.
+        Unlike :meth:`calculate`, the results are returned instead of being stored in the calculator, and the outputs are only selected for this call, such that the state of the calculator and its models is left unchanged.
+
+        For AOTInductor models, the model must also be compiled with ``--target batch`` and provided with ``batch_compile_path`` in :meth:`from_compiled_model`.
+
+        Args:
+            atoms_list (List[ase.Atoms]): structures to evaluate
+            properties (List[str]): properties to compute, the stress is only computed if ``"stress"`` is included (or has been requested before, see :meth:`calculate`)
+            max_atoms_per_batch (int): maximum number of atoms per batch (default ``4096``)
+
+        Returns:
+            List[Dict[str, np.ndarray]]: the ``results`` of each structure, as they would be produced by :meth:`calculate`
+        """
+        batch_input_keys = getattr(self.batch_model, "input_keys", None)
+        if (
+            batch_input_keys is not None
+            and AtomicDataDict.BATCH_KEY not in batch_input_keys
+        ):
+            raise RuntimeError(
+                "`calculate_batch` requires a model that accepts batches, for AOTInductor models compile the model with `--target batch` and pass it as `batch_compile_path` to `NequIPCalculator.from_compiled_model`."
+            )
+
+        # === pack structures into batches under the atom budget ===
+        chunks, chunk, chunk_atoms = [], [], 0
+        for atoms in atoms_list:
+            if chunk and chunk_atoms + len(atoms) > max_atoms_per_batch:
+                chunks.append(chunk)
+                chunk, chunk_atoms = [], 0
+            chunk.append(atoms)
+            chunk_atoms += len(atoms)
+        if chunk:
+            chunks.append(chunk)
+
+        # === select outputs for this call only ===
+        # the previous selection is restored afterwards, such that a later `calculate` does not inherit it
+        compute_stress = bool(self._compute_stress) or "stress" in properties
+        previous_outputs = [
+            (module, module.compute_forces, module.compute_stress)
+            for module in self.batch_model.modules()
+            if hasattr(module, "compute_forces") and hasattr(module, "compute_stress")
+        ]
+        set_force_stress_outputs(self.batch_model, forces=True, stress=compute_stress)
+        try:
+            results = []
+            for chunk in chunks:
+                results.extend(self._calculate_chunk(chunk))
+        finally:
+            for module, forces, stress in previous_outputs:
+                module.compute_forces = forces
+                module.compute_stress = stress
+        return results
+
+    def _calculate_chunk(self, chunk: List) -> List[Dict[str, np.ndarray]]:
+        """Evaluate ``batch_model`` on one batch of structures and return the results of each structure."""
+        input_keys = _model_input_keys(self.batch_model)
+        data_list = []
+        for atoms in chunk:
+            data = self._prepare_data(atoms)
+            # only model inputs are batched, since other fields (e.g. labels from attached calculators or per-atom charges) may not be present for all structures
+            if input_keys is None:
+                data = {k: v for k, v in data.items() if k not in _LABEL_KEYS}
+            else:
+                data = {k: v for k, v in data.items() if k in input_keys}
+            data_list.append(data)
+        data = AtomicDataDict.batched_from_list(data_list)
+        data = AtomicDataDict.to_(data, self.device)
+
+        # === predict + split results into frames ===
+        out = self.batch_model(data)
+        num_nodes = [len(atoms) for atoms in chunk]
+        # graph fields are indexed by frame, node fields are split into frames
+        frame_fields = {}
+        for key in self._graph_result_keys:
+            if key in out:
+                frame_fields[key] = out[key].detach().cpu()
+        for key in self._node_result_keys:
+            if key in out:
+                frame_fields[key] = torch.split(out[key].detach().cpu(), num_nodes)
+        return [
+            self._extract_results(
+                {key: value[idx] for key, value in frame_fields.items()}
+            )
+            for idx in range(len(chunk))
+        ]
+
+    def _prepare_data(self, atoms) -> AtomicDataDict.Type:
         data = from_ase(atoms)
         for t in self.transforms:
             data = t(data)
-        data = AtomicDataDict.to_(data, self.device)
+        return data
 
-        # === predict + extract data ===
-        out = self.model(data)
-        self.results = {}
+    def _prepare_cached_data(self, atoms, system_changes) -> AtomicDataDict.Type:
+        """Prepare the model input on ``self.device``, reusing the static inputs of the previous calculation if only the positions and/or cell changed.
+
+        The static inputs are the atomic numbers, atom types (from the leading ``ChemicalSpeciesToAtomTypeMapper`` transforms) and periodic boundary conditions, i.e. they only depend on the species and periodic boundary conditions.
+        They are cached on the host and ``self.device``, and positions and cell are copied into persistent device buffers, such that only the remaining transforms (e.g. the neighborlist) are rerun.
+        ASE resets ``system_changes`` to all changes when anything else (e.g. the species or number of atoms) changes, which rebuilds the cache.
+        Other fields that ``from_ase`` extracts from ``atoms.arrays`` and ``atoms.info`` (e.g. per-atom charges), which ASE does not track in ``system_changes``, are extracted anew for every calculation.
+        """
+        cache = self._input_cache
+        if (
+            cache is None
+            or not set(system_changes) <= _POSITION_CHANGES
+            or len(cache["buffers"][AtomicDataDict.POSITIONS_KEY]) != len(atoms)
+        ):
+            num_static_transforms = 0
+            for t in self.transforms:
+                if not isinstance(t, ChemicalSpeciesToAtomTypeMapper):
+                    break
+                num_static_transforms += 1
+            data = from_ase(atoms)
+            for t in self.transforms[:num_static_transforms]:
+                data = t(data)
+            static = {k: v for k, v in data.items() if k in _STATIC_KEYS}
+            cache = {
+                "num_static_transforms": num_static_transforms,
+                "static": static,
+                "static_device": AtomicDataDict.to_(static.copy(), self.device),
+                "buffers": {
+                    k: data[k].to(device=self.device, copy=True)
+                    for k in [AtomicDataDict.POSITIONS_KEY, AtomicDataDict.CELL_KEY]
+                    if k in data
+                },
+            }
+            self._input_cache = cache
+
+        buffers = cache["buffers"]
+        data = cache["static"].copy()
+        if _has_extra_fields(atoms):
+            data.update(
+                {
+                    k: v
+                    for k, v in from_ase(atoms).items()
+                    if k not in data and k not in buffers and k not in _LABEL_KEYS
+                }
+            )
+        pos_buffer = buffers[AtomicDataDict.POSITIONS_KEY]
+        data[AtomicDataDict.POSITIONS_KEY] = torch.as_tensor(
+            atoms.positions, dtype=pos_buffer.dtype
+        )
+        if AtomicDataDict.CELL_KEY in buffers:
+            data[AtomicDataDict.CELL_KEY] = torch.as_tensor(
+                atoms.cell.array, dtype=buffers[AtomicDataDict.CELL_KEY].dtype
+            ).view(1, 3, 3)
+        for t in self.transforms[cache["num_static_transforms"] :]:
+            data = t(data)
+
+        # the model may set `requires_grad` on the positions, which would prevent in-place updates
+        with torch.no_grad():
+            for k, buffer in buffers.items():
+                buffer.copy_(data[k])
+        device_data = {
+            k: v.to(device=self.device)
+            for k, v in data.items()
+            if k not in cache["static"] and k not in buffers
+        }
+        device_data.update(cache["static_device"])
+        device_data.update(buffers)
+        return device_data
+
+    def _select_outputs(self, properties: List[str]) -> None:
+        # stress stays on once requested, as integrators that need it would otherwise trigger a second calculation per step
+        compute_stress = bool(self._compute_stress) or "stress" in properties
+        if compute_stress != self._compute_stress:
+            set_force_stress_outputs(self.model, forces=True, stress=compute_stress)
+            if self.batch_model is not self.model:
+                set_force_stress_outputs(
+                    self.batch_model, forces=True, stress=compute_stress
+                )
+            self._compute_stress = compute_stress
+
+    def _extract_results(self, out: AtomicDataDict.Type) -> Dict[str, np.ndarray]:
+        results = {}
         # only store results the model actually computed to avoid KeyErrors
         if AtomicDataDict.TOTAL_ENERGY_KEY in out:
-            self.results["energy"] = self.energy_units_to_eV * (
+            results["energy"] = self.energy_units_to_eV * (
                 out[AtomicDataDict.TOTAL_ENERGY_KEY]
                 .detach()
                 .cpu()
@@ -255,9 +490,9 @@ class NequIPCalculator(Calculator):
                 .reshape(tuple())
             )
             # "force consistent" energy
-            self.results["free_energy"] = self.results["energy"]
+            results["free_energy"] = results["energy"]
         if AtomicDataDict.PER_ATOM_ENERGY_KEY in out:
-            self.results["energies"] = self.energy_units_to_eV * (
+            results["energies"] = self.energy_units_to_eV * (
                 out[AtomicDataDict.PER_ATOM_ENERGY_KEY]
                 .detach()
                 .squeeze(-1)
@@ -266,7 +501,7 @@ class NequIPCalculator(Calculator):
             )
         if AtomicDataDict.FORCE_KEY in out:
             # force has units eng / len:
-            self.results["forces"] = (
+            results["forces"] = (
                 self.energy_units_to_eV / self.length_units_to_A
             ) * out[AtomicDataDict.FORCE_KEY].detach().cpu().numpy()
         if AtomicDataDict.STRESS_KEY in out:
@@ -276,15 +511,97 @@ class NequIPCalculator(Calculator):
             )
             # ase wants voigt format
             stress_voigt = full_3x3_to_voigt_6_stress(stress)
-            self.results["stress"] = stress_voigt
+            results["stress"] = stress_voigt
+        return results
 
-        self.save_extra_outputs(out)
+    def get_hessian(
+        self,
+        atoms=None,
+        atom_indices: Optional[List[int]] = None,
+        chunk_size: int = 64,
+        vectorize: Optional[bool] = None,
+        acoustic_sum_rule: bool = False,
+    ) -> np.ndarray:
+        """Compute the Hessian of the energy w.r.t. the atomic positions, e.g. as force constants for phonon or vibrational analysis.
+
+        Instead of ``6 * n_atoms`` finite difference calculations, the Hessian is computed with Hessian-vector products from a single model forward pass, see :class:`~nequip.nn.HessianOutput`.
+        The cost is dominated by one backward pass per computed row, so for supercells of a periodic crystal, passing the ``atom_indices`` of the symmetry-inequivalent atoms (e.g. those of the primitive cell) reduces the cost by the number of primitive cells, since the remaining rows follow by lattice translations.
+        This is only available for uncompiled and TorchScript models, since AOTInductor models are compiled for fixed outputs.
+
+        Args:
+            atoms (ase.Atoms): structure (default: the atoms of the calculator)
+            atom_indices (List[int]): atoms whose rows are computed (default: all atoms)
+            chunk_size (int): number of Hessian rows per batched backward pass, trading memory for speed (default ``64``)
+            vectorize (bool): whether to batch the backward passes of each chunk (default: ``True`` on GPUs, ``False`` otherwise)
+            acoustic_sum_rule (bool): whether to impose the translational invariance sum rule (default ``False``)
+
+        Returns:
+            np.ndarray: ``(3 * n_atoms, 3 * n_atoms)`` Hessian in eV/Å^2, or ``(3 * len(atom_indices), 3 * n_atoms)`` rows if ``atom_indices`` is provided
+        """
+        from nequip.nn.grad_output import _compute_hessian
+        from nequip.nn.utils import without_segment_reduce
+
+        if atoms is None:
+            atoms = self.atoms
+        # the energy model wrapped by `ForceStressOutput` (duck-typed to also cover TorchScript models)
+        energy_model = None
+        for module in self.model.modules():
+            if hasattr(module, "compute_stress") and hasattr(module, "func"):
+                energy_model = module.func
+                break
+        if energy_model is None:
+            raise RuntimeError(
+                "`get_hessian` requires an uncompiled or TorchScript model with a `ForceStressOutput`, AOTInductor models are not supported."
+            )
+
+        data = from_ase(atoms)
+        for t in self.transforms:
+            data = t(data)
+        data = AtomicDataDict.to_(data, self.device)
+        pos = data[AtomicDataDict.POSITIONS_KEY].requires_grad_(True)
+        # segment reductions do not support the double backward of the Hessian
+        with without_segment_reduce(energy_model):
+            out = energy_model(data)
+        (energy_grad,) = torch.autograd.grad(
+            [out[AtomicDataDict.TOTAL_ENERGY_KEY].sum()], [pos], create_graph=True
+        )
+        hessian = _compute_hessian(
+            energy_grad,
+            pos,
+            chunk_size=chunk_size,
+            vectorize=vectorize,
+            acoustic_sum_rule=acoustic_sum_rule,
+            atom_indices=(
+                None
+                if atom_indices is None
+                else torch.as_tensor(atom_indices, device=pos.device)
+            ),
+        )
+        return (self.energy_units_to_eV / self.length_units_to_A**2) * (
+            hessian.detach().cpu().numpy().reshape(-1, 3 * len(atoms))
+        )
 
     def save_extra_outputs(self, out: AtomicDataDict.Type):
         # subclasses can implement this method to process extra outputs without code duplication
         pass
 
 
+def _model_input_keys(model: torch.nn.Module) -> Optional[List[str]]:
+    """Input fields of eager and TorchScript ``GraphModel`` s (``model_input_fields``) or AOTInductor models (``input_keys``), if known."""
+    for attr in ["model_input_fields", "input_keys"]:
+        input_keys = getattr(model, attr, None)
+        if input_keys is not None:
+            return list(input_keys)
+    return None
+
+
+def _has_extra_fields(atoms) -> bool:
+    """Whether ``from_ase`` extracts fields from ``atoms.arrays`` or ``atoms.info`` (e.g. per-atom charges) in addition to the species and geometry."""
+    return any(k in all_properties for k in atoms.arrays) or any(
+        k in all_properties for k in atoms.info
+    )
+
+
 def _create_neighbor_transform(
     metadata: dict, r_max: float, type_names: List[str]
 ) -> NeighborListTransform:
@@ -0,0 +1,220 @@
+"""Batched Nose-Hoover NVT molecular dynamics of multiple replicas, e.g. for replica exchange (parallel tempering) or many-seed NVT runs.
+
+The equations of motion are the same as those of :class:`~nequip.ase.NoseHoover`, vectorized over replicas with NumPy.
+"""
+
+import numpy as np
+
+from ase.md.velocitydistribution import Stationary, ZeroRotation
+from ase import units
+
+from typing import Callable, List, Optional, Sequence, Union
+
+
+class ReplicaNoseHoover:
+    """Nose-Hoover (constant N, V, T) molecular dynamics of multiple replicas advanced in lockstep.
+
+    All replicas are evaluated with a single batched model call per step through :meth:`~nequip.ase.NequIPCalculator.calculate_batch`, instead of one model call (or one process) per replica.
+    Each replica is thermostatted to its own temperature with the same Nose-Hoover equations as :class:`~nequip.ase.NoseHoover`.
+
+    If ``exchange_interval > 0``, replica exchange moves are attempted every ``exchange_interval`` steps between neighboring replicas (alternating between even and odd pairs) with the Metropolis criterion.
+    Accepted exchanges swap the configurations of the two replicas, rescaling the velocities and thermostat variables by the square root of the temperature ratio, such that the temperature of each replica (i.e. of each element of ``temperatures``) stays fixed.
+    Exchanges require all replicas to have the same species, in which case ``temperatures`` is usually a ladder of increasing temperatures.
+
+    The ``atoms_list`` are updated in-place after every step, and the potential energies and forces of the last step are available as ``energies`` and ``forces``.
+
+    Example Usage:
+
+        dyn = ReplicaNoseHoover(
+            atoms_list=[atoms.copy() for _ in range(8)],
+            calculator=calc,
+            timestep=0.5 * units.fs,
+            temperatures=np.geomspace(300.0, 600.0, 8),
+            nvt_q=334.0,
+            exchange_interval=100,
+        )
+        dyn.run(10000)
+
+    Args:
+        atoms_list (List[ase.Atoms]): replicas, which must have the same number of atoms
+        calculator (NequIPCalculator): calculator used to evaluate all replicas in batches
+        timestep (float): the time step
+        temperatures (float or Sequence[float]): target temperature of each replica in [K], or a single temperature for all replicas
+        nvt_q (float): Q in the Nose-Hoover equations
+        exchange_interval (int): number of steps between replica exchange attempts, or ``0`` to disable exchanges (default ``0``)
+        max_atoms_per_batch (int): maximum number of atoms per batched model call (default: all replicas in one call)
+        seed (int): seed of the random number generator for the exchange moves
+    """
+
+    def __init__(
+        self,
+        atoms_list: List,
+        calculator,
+        timestep: float,
+        temperatures: Union[float, Sequence[float]],
+        nvt_q: float,
+        exchange_interval: int = 0,
+        max_atoms_per_batch: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
+        num_replicas = len(atoms_list)
+        if num_replicas == 0:
+            raise ValueError("`atoms_list` must contain at least one replica")
+        self.natoms = len(atoms_list[0])
+        if any(len(atoms) != self.natoms for atoms in atoms_list):
+            raise ValueError("all replicas must have the same number of atoms")
+        if exchange_interval > 0 and any(
+            not np.array_equal(atoms.numbers, atoms_list[0].numbers)
+            for atoms in atoms_list
+        ):
+            raise ValueError(
+                "replica exchange requires all replicas to have the same species"
+            )
+
+        self.atoms_list = atoms_list
+        self.calculator = calculator
+        self.dt = timestep
+        self.dtdt = np.power(self.dt, 2)
+        self.temps = np.broadcast_to(
+            np.asarray(temperatures, dtype=np.float64), (num_replicas,)
+        ).copy()
+        self.nvt_q = nvt_q
+        self.exchange_interval = exchange_interval
+        self.max_atoms_per_batch = (
+            num_replicas * self.natoms
+            if max_atoms_per_batch is None
+            else max_atoms_per_batch
+        )
+        self.rng = np.random.default_rng(seed)
+
+        # set angular and com momentum to zero, necessary for nose-hoover dynamics.
+        for atoms in atoms_list:
+            ZeroRotation(atoms)
+            Stationary(atoms)
+
+        # per-replica state, of shape (num_replicas, ...)
+        self.masses = np.stack([atoms.get_masses() for atoms in atoms_list])[
+            :, :, np.newaxis
+        ]
+        self.positions = np.stack([atoms.get_positions() for atoms in atoms_list])
+        self.velocities = np.stack([atoms.get_velocities() for atoms in atoms_list])
+        self.nvt_bath = np.zeros(num_replicas)
+        self.energies = None
+        self.forces = None
+
+        self.nsteps = 0
+        self._num_exchange_rounds = 0
+        self.num_exchange_attempts = np.zeros(max(num_replicas - 1, 0), dtype=int)
+        self.num_exchange_accepted = np.zeros(max(num_replicas - 1, 0), dtype=int)
+        self.observers = []
+
+    @property
+    def num_replicas(self) -> int:
+        return len(self.atoms_list)
+
+    def attach(self, function: Callable, interval: int = 1, *args, **kwargs):
+        """Attach a function to be called every ``interval`` steps with ``*args`` and ``**kwargs``, as for ASE dynamics."""
+        self.observers.append((function, interval, args, kwargs))
+
+    def _compute_forces(self):
+        for atoms, positions in zip(self.atoms_list, self.positions):
+            atoms.set_positions(positions)
+        results = self.calculator.calculate_batch(
+            self.atoms_list, ["energy", "forces"], self.max_atoms_per_batch
+        )
+        self.energies = np.array([res["energy"] for res in results])
+        self.forces = np.stack([res["forces"] for res in results])
+
+    def _kinetic_energy_diff(self, velocities: np.ndarray) -> np.ndarray:
+        return 0.5 * (
+            np.sum(self.masses * velocities**2, axis=(1, 2))
+            - (3 * self.natoms + 1) * units.kB * self.temps
+        )
+
+    def step(self):
+        """Perform a MD step of all replicas."""
+        if self.forces is None:
+            self._compute_forces()
+        bath = self.nvt_bath[:, np.newaxis, np.newaxis]
+
+        modified_acc = self.forces / self.masses - bath * self.velocities
+        self.positions = (
+            self.positions + self.dt * self.velocities + 0.5 * self.dtdt * modified_acc
+        )
+        vel_halfstep = self.velocities + 0.5 * self.dt * modified_acc
+
+        nvt_bath_halfstep = (
+            self.nvt_bath
+            + 0.5 * self.dt * self._kinetic_energy_diff(self.velocities) / self.nvt_q
+        )
+        self.nvt_bath = (
+            nvt_bath_halfstep
+            + 0.5 * self.dt * self._kinetic_energy_diff(vel_halfstep) / self.nvt_q
+        )
+
+        self._compute_forces()
+        bath = self.nvt_bath[:, np.newaxis, np.newaxis]
+        self.velocities = (
+            vel_halfstep + 0.5 * self.dt * (self.forces / self.masses)
+        ) / (1 + 0.5 * self.dt * bath)
+        for atoms, velocities in zip(self.atoms_list, self.velocities):
+            atoms.set_velocities(velocities)
+
+    def attempt_exchanges(self) -> np.ndarray:
+        """Attempt replica exchanges between neighboring replicas, alternating between even and odd pairs.
+
+        Returns:
+            np.ndarray: indices ``i`` of the accepted exchanges between replicas ``i`` and ``i + 1``
+        """
+        if self.forces is None:
+            self._compute_forces()
+        # alternate between pairs (0, 1), (2, 3), ... and (1, 2), (3, 4), ...
+        offset = self._num_exchange_rounds % 2
+        self._num_exchange_rounds += 1
+        first = np.arange(offset, self.num_replicas - 1, 2)
+        second = first + 1
+        beta = 1.0 / (units.kB * self.temps)
+        log_acceptance = (beta[first] - beta[second]) * (
+            self.energies[first] - self.energies[second]
+        )
+        accepted = np.log(self.rng.random(len(first))) < log_acceptance
+        self.num_exchange_attempts[first] += 1
+        self.num_exchange_accepted[first[accepted]] += 1
+
+        i, j = first[accepted], second[accepted]
+        swap = np.arange(self.num_replicas)
+        swap[i], swap[j] = j, i
+        # velocities and thermostat variables of the swapped configurations are rescaled to the temperature of their new replica
+        scale = np.sqrt(self.temps / self.temps[swap])
+        self.positions = self.positions[swap]
+        self.velocities = self.velocities[swap] * scale[:, np.newaxis, np.newaxis]
+        self.nvt_bath = self.nvt_bath[swap] * scale
+        self.energies = self.energies[swap]
+        self.forces = self.forces[swap]
+        for atoms, positions, velocities in zip(
+            self.atoms_list, self.positions, self.velocities
+        ):
+            atoms.set_positions(positions)
+            atoms.set_velocities(velocities)
+        return i
+
+    def _call_observers(self):
+        for function, interval, args, kwargs in self.observers:
+            if self.nsteps % interval == 0:
+                function(*args, **kwargs)
+
+    def run(self, steps: int):
+        """Run ``steps`` MD steps of all replicas, attempting exchanges every ``exchange_interval`` steps."""
+        if self.nsteps == 0:
+            self._call_observers()
+        for _ in range(steps):
+            self.step()
+            self.nsteps += 1
+            if self.exchange_interval > 0 and self.nsteps % self.exchange_interval == 0:
+                self.attempt_exchanges()
+            self._call_observers()
+
+    def get_temperatures(self) -> np.ndarray:
+        """Instantaneous temperatures of the replicas in [K]."""
+        e_kin = 0.5 * np.sum(self.masses * self.velocities**2, axis=(1, 2))
+        return 2.0 * e_kin / (3 * self.natoms * units.kB)
@@ -15,22 +15,38 @@ from .dict import from_dict
 from .ase import from_ase, to_ase
 from ._nl import compute_neighborlist_
 from ._sampler import PartialSampler
-from .stats import (
-    Count,
-    Mean,
-    MeanAbsolute,
-    RootMeanSquare,
-    StandardDeviation,
-    Max,
-    Min,
-)
-from .stats_manager import (
-    DataStatisticsManager,
-    CommonDataStatisticsManager,
-    EnergyOnlyDataStatisticsManager,
-)
 from .modifier import BaseModifier, PerAtomModifier, EdgeLengths, NumNeighbors
 
+import importlib
+
+# data statistics are built on `torchmetrics`, which is slow to import and not needed for inference,
+# so they are only imported on first access
+_LAZY_ATTRS = {
+    "Count": ".stats",
+    "Mean": ".stats",
+    "MeanAbsolute": ".stats",
+    "RootMeanSquare": ".stats",
+    "StandardDeviation": ".stats",
+    "Max": ".stats",
+    "Min": ".stats",
+    "DataStatisticsManager": ".stats_manager",
+    "CommonDataStatisticsManager": ".stats_manager",
+    "EnergyOnlyDataStatisticsManager": ".stats_manager",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRS:
+        value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+        # cache such that `__getattr__` is only called once per name
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
+
 
 __all__ = [
     "register_fields",
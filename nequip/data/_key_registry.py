@@ -23,6 +23,7 @@ _DEFAULT_LONG_FIELDS: Set[str] = {
 }
 _DEFAULT_GRAPH_FIELDS: Set[str] = {
     _keys.TOTAL_ENERGY_KEY,
+    _keys.TOTAL_ENERGY_VARIANCE_KEY,
     _keys.FREE_ENERGY_KEY,
     _keys.STRESS_KEY,
     _keys.VIRIAL_KEY,
@@ -45,6 +46,7 @@ _DEFAULT_NODE_FIELDS: Set[str] = {
     _keys.PER_ATOM_ENERGY_KEY,
     _keys.CHARGE_KEY,
     _keys.FORCE_KEY,
+    _keys.FORCE_VARIANCE_KEY,
     _keys.PER_ATOM_STRESS_KEY,
     _keys.MAGMOM_KEY,
     _keys.DIPOLE_KEY,
@@ -63,6 +65,7 @@ _DEFAULT_EDGE_FIELDS: Set[str] = {
     _keys.EDGE_CUTOFF_KEY,
     _keys.EDGE_ENERGY_KEY,
     _keys.EDGE_FORCE_KEY,
+    _keys.EDGE_PARTIAL_FORCE_KEY,
 }
 _DEFAULT_CARTESIAN_TENSOR_FIELDS: Dict[str, str] = {
     _keys.STRESS_KEY: "ij=ji",
@@ -14,6 +14,8 @@ POSITIONS_KEY: Final[str] = "pos"
 EDGE_INDEX_KEY: Final[str] = "edge_index"
 # Permutation indices for transposing edges from row to column major order
 EDGE_TRANSPOSE_PERM_KEY: Final[str] = "edge_transpose_perm"
+# [n_atom + 1] CSR row pointers of the edge centers of edges sorted by their centers (see `with_edge_center_ptr_`)
+EDGE_CENTER_PTR_KEY: Final[str] = "edge_center_ptr"
 # A [n_edge, 3] tensor of how many periodic cells each edge crosses in each cell vector
 EDGE_CELL_SHIFT_KEY: Final[str] = "edge_cell_shift"
 # [n_batch, 3, 3] or [3, 3] tensor where rows are the cell vectors
@@ -53,6 +55,8 @@ EDGE_CUTOFF_KEY: Final[str] = "edge_cutoff"
 EDGE_ENERGY_KEY: Final[str] = "edge_energy"
 # edge forces (for LAMMPS MLIAP inference)
 EDGE_FORCE_KEY: Final[str] = "edge_forces"
+# [n_edge, 3] partial forces -dE/d(edge_vectors), aligned with edge_index (see `EdgePartialForceOutput`)
+EDGE_PARTIAL_FORCE_KEY: Final[str] = "edge_partial_forces"
 
 NODE_FEATURES_KEY: Final[str] = "node_features"
 NODE_ATTRS_KEY: Final[str] = "node_attrs"
@@ -63,6 +67,11 @@ PER_ATOM_ENERGY_KEY: Final[str] = "atomic_energy"
 TOTAL_ENERGY_KEY: Final[str] = "total_energy"
 FORCE_KEY: Final[str] = "forces"
 PARTIAL_FORCE_KEY: Final[str] = "partial_forces"
+# [n_atoms, 3, n_atoms, 3] second derivatives of the total energy w.r.t. positions (see `HessianOutput`)
+HESSIAN_KEY: Final[str] = "hessian"
+# ensemble variances of the total energy and of the force components (see `EnsembleGraphModel`)
+TOTAL_ENERGY_VARIANCE_KEY: Final[str] = "total_energy_variance"
+FORCE_VARIANCE_KEY: Final[str] = "forces_variance"
 STRESS_KEY: Final[str] = "stress"
 VIRIAL_KEY: Final[str] = "virial"
 
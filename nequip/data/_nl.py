@@ -6,14 +6,6 @@ import numpy as np
 
 import torch
 
-import ase.neighborlist
-from matscipy.neighbours import neighbour_list as matscipy_nl
-
-try:
-    from vesin import NeighborList as vesin_nl
-except ImportError:
-    pass
-
 from . import AtomicDataDict
 
 # use "matscipy" as default
@@ -84,9 +76,14 @@ def _nl_fn(
                 "Periodic boundary conditions requested but no cell was provided."
             )
         temp_cell = np.zeros((3, 3), dtype=temp_pos.dtype)
+    # `ase` and the neighborlist backends are only imported when used to keep `import nequip` fast
+    import ase.geometry
+
     temp_cell = ase.geometry.complete_cell(temp_cell)
 
     if NL == "vesin":
+        from vesin import NeighborList as vesin_nl
+
         # use same mixed pbc logic as
         # https://github.com/Luthaf/vesin/blob/main/python/vesin/src/vesin/_ase.py
         if pbc[0] and pbc[1] and pbc[2]:
@@ -106,6 +103,8 @@ def _nl_fn(
         second_idex = second_idex.astype(np.int64)
 
     elif NL == "matscipy":
+        from matscipy.neighbours import neighbour_list as matscipy_nl
+
         first_idex, second_idex, shifts = matscipy_nl(
             "ijS",
             pbc=pbc,
@@ -114,6 +113,8 @@ def _nl_fn(
             cutoff=float(r_max),
         )
     elif NL == "ase":
+        import ase.neighborlist
+
         first_idex, second_idex, shifts = ase.neighborlist.primitive_neighbor_list(
             "ijS",
             pbc,
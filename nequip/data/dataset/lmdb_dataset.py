@@ -4,7 +4,6 @@ import os
 
 from .. import AtomicDataDict
 from .base_datasets import AtomicDataset
-import lmdb
 import pickle
 import copy
 import numpy as np
@@ -127,6 +126,8 @@ class NequIPLMDBDataset(AtomicDataset):
         current_pid = os.getpid()
 
         if self._env is None or self._owner_pid != current_pid:
+            import lmdb
+
             if self._env is not None:
                 self._env.close()
 
@@ -145,6 +146,8 @@ class NequIPLMDBDataset(AtomicDataset):
     def _get_length(self):
         # open temporary environment to get dataset length, then close immediately
         # must close before DataLoader fork to avoid sharing file descriptors
+        import lmdb
+
         env = lmdb.open(
             self.file_path,
             readonly=True,
@@ -210,6 +213,8 @@ class NequIPLMDBDataset(AtomicDataset):
             write_frequency (int): frequency of writing (defaults to 1000). Larger is faster.
             extra_metadata (List[LMDBMetadataSpec]): optional list of extra metadata specifications - beyond _BASE_METADATA - to be written to the database. Defaults to an empty list.
         """
+        import lmdb
+
         db = lmdb.open(
             file_path,
             map_size=map_size,
@@ -1,4 +1,12 @@
 # This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
-from .torchsim import NequIPTorchSimCalc
 
-__all__ = [NequIPTorchSimCalc]
+__all__ = ["NequIPTorchSimCalc"]
+
+
+def __getattr__(name):
+    # imported lazily, such that other integrations (e.g. LAMMPS ML-IAP) do not require `torch-sim`
+    if name == "NequIPTorchSimCalc":
+        from .torchsim import NequIPTorchSimCalc
+
+        return NequIPTorchSimCalc
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
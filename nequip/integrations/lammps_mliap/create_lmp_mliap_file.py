@@ -6,7 +6,7 @@ import pathlib
 import torch
 
 from .lmp_mliap_wrapper import NequIPLAMMPSMLIAPWrapper
-from nequip.train.lightning import _SOLE_MODEL_KEY
+from nequip.model.utils import _SOLE_MODEL_KEY
 from nequip.utils.logger import RankedLogger
 from nequip.model.saved_models.load_utils import _get_model_file_path
 
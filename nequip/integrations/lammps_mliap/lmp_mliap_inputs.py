@@ -0,0 +1,78 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+
+import torch
+
+from nequip.data import AtomicDataDict
+
+from typing import Dict, Optional, Tuple, Union
+
+
+class LAMMPSMLIAPInputs:
+    """Builds model inputs from LAMMPS ML-IAP data in persistent device buffers that are reused across timesteps.
+
+    Inputs whose dtype and device already match (e.g. the ``float64`` ``rij`` on the model's device) are wrapped without copies through the buffer protocol (``__array_interface__`` or ``__cuda_array_interface__``).
+    All others (e.g. the ``int32`` ``pair_i``, ``pair_j`` and ``elems``) are converted by copying into preallocated buffers, whose capacity is doubled when exceeded, such that buffers are only reallocated a logarithmic number of times as the system (or number of neighbors) grows.
+
+    Args:
+        device (str or torch.device): device of the model inputs
+    """
+
+    def __init__(self, device: Union[str, torch.device]) -> None:
+        self.device = torch.device(device)
+        self._buffers: Dict[str, torch.Tensor] = {}
+        self._num_local_ghost: Optional[Tuple[int, int]] = None
+        self.num_allocations = 0
+
+    def _buffer(self, name: str, size: int, dtype: torch.dtype) -> torch.Tensor:
+        """Return the first ``size`` entries of the buffer ``name``, growing it to at least twice its capacity if needed."""
+        buffer = self._buffers.get(name, None)
+        if buffer is None or buffer.size(0) < size or buffer.dtype != dtype:
+            capacity = size if buffer is None else max(size, 2 * buffer.size(0))
+            buffer = torch.empty(capacity, dtype=dtype, device=self.device)
+            self._buffers[name] = buffer
+            self.num_allocations += 1
+        return buffer[:size]
+
+    def _as_tensor(self, name: str, array, dtype: torch.dtype) -> torch.Tensor:
+        # `as_tensor` shares memory with numpy (or cupy) arrays
+        tensor = torch.as_tensor(array)
+        if tensor.dtype == dtype and tensor.device == self.device:
+            return tensor
+        return (
+            self._buffer(name, tensor.numel(), dtype)
+            .view(tensor.shape)
+            .copy_(tensor, non_blocking=True)
+        )
+
+    def __call__(self, lmp_data) -> AtomicDataDict.Type:
+        """Build the model inputs for the current timestep of ``lmp_data``.
+
+        The returned tensors may share memory with ``lmp_data`` and with the inputs of the previous call, so they are only valid until the next call.
+        """
+        num_edges = lmp_data.npairs
+        # both rows are filled into one contiguous buffer, such that `edge_index` is contiguous without `vstack`
+        edge_index = self._buffer("edge_index", 2 * num_edges, torch.int64).view(
+            2, num_edges
+        )
+        edge_index[0].copy_(torch.as_tensor(lmp_data.pair_i), non_blocking=True)
+        edge_index[1].copy_(torch.as_tensor(lmp_data.pair_j), non_blocking=True)
+
+        # only updated when the number of local or ghost atoms changes
+        num_local_ghost = (lmp_data.nlocal, lmp_data.ntotal - lmp_data.nlocal)
+        if num_local_ghost != self._num_local_ghost:
+            self._buffers["num_local_ghost"] = torch.tensor(
+                num_local_ghost, dtype=torch.int64, device=self.device
+            )
+            self._num_local_ghost = num_local_ghost
+
+        return {
+            AtomicDataDict.EDGE_VECTORS_KEY: self._as_tensor(
+                "edge_vectors", lmp_data.rij, torch.float64
+            ),
+            AtomicDataDict.EDGE_INDEX_KEY: edge_index,
+            AtomicDataDict.ATOM_TYPE_KEY: self._as_tensor(
+                "atom_types", lmp_data.elems, torch.int64
+            ),
+            AtomicDataDict.LMP_MLIAP_DATA_KEY: lmp_data,
+            AtomicDataDict.NUM_LOCAL_GHOST_NODES_KEY: self._buffers["num_local_ghost"],
+        }
@@ -14,6 +14,7 @@ from nequip.model.utils import _EAGER_MODEL_KEY
 from nequip.utils.global_state import set_global_state
 from nequip.utils.compile import prepare_model_for_compile
 from nequip.utils.versions import _TORCH_GE_2_6
+from .lmp_mliap_inputs import LAMMPSMLIAPInputs
 
 try:
     from lammps.mliap.mliap_unified_abc import MLIAPUnified
@@ -61,6 +62,7 @@ class NequIPLAMMPSMLIAPWrapper(MLIAPUnified):
         self.model = None
         self.device = None
         self.nl = None
+        self.inputs = None
 
         # to placate the interface
         self.nparams = 1
@@ -130,6 +132,7 @@ class NequIPLAMMPSMLIAPWrapper(MLIAPUnified):
             "cuda" if "kokkos" in lmp_data.__class__.__module__.lower() else "cpu"
         )
         model = prepare_model_for_compile(model, self.device)
+        self.inputs = LAMMPSMLIAPInputs(self.device)
 
         # make sure that derivative computation for forces, stresses is disabled
         # such that the model is an energy model so that we can rely on AOT Autograd for inference
@@ -189,24 +192,8 @@ class NequIPLAMMPSMLIAPWrapper(MLIAPUnified):
         # - edge -> node scatter operations / nodewise operations (e.g. in `nequip/nn/interaction_block.py`)
         # - nodewise operations that involve `atom_types` (since `atom_types` is `num_local + num_ghost`), e.g. in `PerTypeScaleShift` and `ZBL`.
 
-        nequip_data_in = {
-            AtomicDataDict.EDGE_VECTORS_KEY: torch.as_tensor(
-                lmp_data.rij, dtype=torch.float64
-            ).to(self.device),
-            AtomicDataDict.EDGE_INDEX_KEY: torch.vstack(
-                [
-                    torch.as_tensor(lmp_data.pair_i, dtype=torch.int64).to(self.device),
-                    torch.as_tensor(lmp_data.pair_j, dtype=torch.int64).to(self.device),
-                ],
-            ),
-            AtomicDataDict.ATOM_TYPE_KEY: torch.as_tensor(
-                lmp_data.elems, dtype=torch.int64
-            ).to(self.device),
-            AtomicDataDict.LMP_MLIAP_DATA_KEY: lmp_data,
-            AtomicDataDict.NUM_LOCAL_GHOST_NODES_KEY: torch.tensor(
-                [lmp_data.nlocal, lmp_data.ntotal - lmp_data.nlocal], dtype=torch.int64
-            ).to(self.device),
-        }
+        # inputs are wrapped zero-copy or copied into buffers that are reused across timesteps
+        nequip_data_in = self.inputs(lmp_data)
 
         # === apply per-edge-type cutoff pruning if available ===
         if self.nl is not None:
@@ -1,5 +1,6 @@
 """Wrapper for NequIP framework models in torch-sim"""
 
+import time
 import warnings
 import torch
 
@@ -8,8 +9,9 @@ from torch_sim.models.interface import ModelInterface
 from torch_sim.typing import StateDict
 
 from nequip.data import AtomicDataDict
+from nequip.data.transforms import ChemicalSpeciesToAtomTypeMapper
 
-from nequip.nn import graph_model
+from nequip.nn import graph_model, set_force_stress_outputs
 
 from collections.abc import Callable
 from pathlib import Path
@@ -40,6 +42,9 @@ class NequIPTorchSimCalc(ModelInterface):
         system_idx (:class:`torch.Tensor` or None): batch indices with shape ``[n_atoms]``
             indicating which system each atom belongs to. If not provided
             with ``atomic_numbers``, all atoms are assumed to be in the same system
+        profile (bool): whether to record the time of each step spent on the static
+            inputs, the remaining transforms (i.e. the neighborlist) and the model,
+            see :meth:`profile_summary` (default: ``False``)
     """
 
     def __init__(
@@ -51,6 +56,7 @@ class NequIPTorchSimCalc(ModelInterface):
         neighbor_list_backend: str = "matscipy",
         atomic_numbers: torch.Tensor | None = None,
         system_idx: torch.Tensor | None = None,
+        profile: bool = False,
     ) -> None:
         """Initialize the NequIP torch-sim calculator.
 
@@ -67,6 +73,8 @@ class NequIPTorchSimCalc(ModelInterface):
         self._dtype = torch.float64  # default dtype for calculations
         self._compute_forces = True
         self._compute_stress = True
+        # outputs the model was last configured for, see `forward`
+        self._model_outputs = None
         self._memory_scales_with = "n_atoms_x_density"
 
         self.neighbor_list_backend = neighbor_list_backend
@@ -79,6 +87,17 @@ class NequIPTorchSimCalc(ModelInterface):
 
         # move transforms to device (they are torch.nn.Module's)
         self.transforms = [t.to(self._device) for t in transforms]
+        # leading type mappers only depend on the atomic numbers, so their outputs are cached with the static inputs
+        self._num_static_transforms = 0
+        for t in self.transforms:
+            if not isinstance(t, ChemicalSpeciesToAtomTypeMapper):
+                break
+            self._num_static_transforms += 1
+        # static inputs and the tensors they were computed from, see `_get_static_data`
+        self._static_cache = None
+
+        self.profile = profile
+        self.timings = {stage: [] for stage in _PROFILE_STAGES}
 
         # store flag to track if atomic numbers were provided at init
         self.atomic_numbers_in_init = atomic_numbers is not None
@@ -156,7 +175,11 @@ class NequIPTorchSimCalc(ModelInterface):
             **kwargs: additional arguments passed to :class:`~nequip.integrations.torchsim.NequIPTorchSimCalc`.
         """
         from nequip.model.inference_models import load_compiled_model
-        from nequip.scripts._compile_utils import ASE_OUTPUTS, BATCH_INPUTS
+        from nequip.scripts._compile_utils import (
+            ASE_OUTPUTS,
+            BATCH_INPUTS,
+            OUTPUT_FIELDS_METADATA_KEY,
+        )
 
         model, metadata = load_compiled_model(
             str(compile_path), device, BATCH_INPUTS, ASE_OUTPUTS
@@ -178,7 +201,7 @@ class NequIPTorchSimCalc(ModelInterface):
         # extract neighbor_list_backend from kwargs if provided
         neighbor_list_backend = kwargs.pop("neighbor_list_backend", "matscipy")
 
-        return cls(
+        calc = cls(
             model=model,
             r_max=r_max,
             device=device,
@@ -192,6 +215,12 @@ class NequIPTorchSimCalc(ModelInterface):
             neighbor_list_backend=neighbor_list_backend,
             **kwargs,
         )
+        # models compiled with a forces-only target (e.g. `batch_forces`) cannot compute stress
+        if AtomicDataDict.STRESS_KEY not in metadata.get(
+            OUTPUT_FIELDS_METADATA_KEY, ASE_OUTPUTS
+        ):
+            calc.compute_stress = False
+        return calc
 
     @classmethod
     def _from_saved_model(
@@ -217,7 +246,7 @@ class NequIPTorchSimCalc(ModelInterface):
             **kwargs: additional arguments passed to :class:`~nequip.integrations.torchsim.NequIPTorchSimCalc`.
         """
         from nequip.model.saved_models.load_utils import load_saved_model
-        from nequip.train.lightning import _SOLE_MODEL_KEY
+        from nequip.model.utils import _SOLE_MODEL_KEY
 
         # load model using unified loader
         model: graph_model.GraphModel = load_saved_model(
@@ -305,44 +334,38 @@ class NequIPTorchSimCalc(ModelInterface):
                 )
             sim_state.system_idx = self.system_idx
 
-        # update batch information if new atomic numbers are provided
-        if (
-            sim_state.atomic_numbers is not None
-            and not self.atomic_numbers_in_init
-            and not torch.equal(
-                sim_state.atomic_numbers,
-                getattr(self, "atomic_numbers", torch.zeros(0, device=self._device)),
-            )
-        ):
-            self.setup_from_system_idx(sim_state.atomic_numbers, sim_state.system_idx)
-
+        t0 = self._now()
         # === prepare raw dict ===
-        # convert PBC to tensor with shape [n_systems, 3] for batched data
-        pbc = sim_state.pbc
-        # the following logic accounts for torch-sim change:
-        # https://github.com/TorchSim/torch-sim/pull/320
-        if isinstance(pbc, bool):
-            # previously, pbc is a bool
-            pbc = torch.tensor([pbc] * 3, dtype=torch.bool, device=self._device)
-        # after PR, pbc is already a tensor with shape [3]
-        # expand to [n_systems, 3] for batched processing
-        pbc_tensor = pbc.unsqueeze(0).expand(self.n_systems, 3)
+        data = self._get_static_data(sim_state).copy()
+        data[AtomicDataDict.POSITIONS_KEY] = sim_state.positions
+        data[AtomicDataDict.CELL_KEY] = sim_state.row_vector_cell
+        t1 = self._now()
 
-        data: dict[str, torch.Tensor] = {
-            AtomicDataDict.POSITIONS_KEY: sim_state.positions,
-            AtomicDataDict.CELL_KEY: sim_state.row_vector_cell,
-            AtomicDataDict.PBC_KEY: pbc_tensor,
-            AtomicDataDict.BATCH_KEY: sim_state.system_idx,
-            AtomicDataDict.NUM_NODES_KEY: sim_state.system_idx.bincount(),
-            AtomicDataDict.ATOMIC_NUMBERS_KEY: sim_state.atomic_numbers,
-        }
-
-        # === apply transforms ===
-        for t in self.transforms:
+        # === apply remaining transforms (i.e. the neighborlist) ===
+        for t in self.transforms[self._num_static_transforms :]:
             data = t(data)
+        t2 = self._now()
+
+        # === select outputs ===
+        # stress derivatives are skipped if `compute_stress=False` (no-op for AOTInductor models, whose outputs are fixed at compile time)
+        # since the stress requires the position derivatives anyway, forces are computed whenever stress is
+        model_outputs = (
+            self.compute_forces or self.compute_stress,
+            self.compute_stress,
+        )
+        if model_outputs != self._model_outputs:
+            set_force_stress_outputs(
+                self.model, forces=model_outputs[0], stress=model_outputs[1]
+            )
+            self._model_outputs = model_outputs
 
         # === run model ===
         out = self.model(data)
+        if self.profile:
+            # outputs are materialized before stopping the clock
+            t3 = self._now()
+            for stage, dt in zip(_PROFILE_STAGES, (t1 - t0, t2 - t1, t3 - t2)):
+                self.timings[stage].append(dt)
 
         # === collect outputs ===
         results: dict[str, torch.Tensor] = {}
@@ -365,6 +388,87 @@ class NequIPTorchSimCalc(ModelInterface):
 
         return results
 
+    def _now(self) -> float:
+        if not self.profile:
+            return 0.0
+        if self._device.type == "cuda":
+            torch.cuda.synchronize(self._device)
+        return time.perf_counter()
+
+    def _get_static_data(self, sim_state: ts.SimState) -> Dict[str, torch.Tensor]:
+        """Inputs that only depend on the atomic numbers, system indices and periodic boundary conditions.
+
+        These (including the outputs of the type mapping transforms) are cached, and only recomputed if ``sim_state`` holds different atomic numbers, system indices or pbc.
+        The cache is keyed on the identity and version counter of these tensors, and falls back to comparing values if they are new tensors (e.g. after torch-sim concatenated or split states).
+        """
+        # convert PBC to tensor with shape [3]
+        pbc = sim_state.pbc
+        # the following logic accounts for torch-sim change:
+        # https://github.com/TorchSim/torch-sim/pull/320
+        if isinstance(pbc, bool):
+            # previously, pbc is a bool
+            pbc = torch.tensor([pbc] * 3, dtype=torch.bool, device=self._device)
+        # after PR, pbc is already a tensor with shape [3]
+        sources = (sim_state.atomic_numbers, sim_state.system_idx, pbc)
+
+        cache = self._static_cache
+        if cache is not None and all(
+            _unchanged(new, old, version)
+            for new, (old, version) in zip(sources, cache["sources"])
+        ):
+            return cache["data"]
+
+        # update batch information if new atomic numbers are provided
+        if sim_state.atomic_numbers is not None and not self.atomic_numbers_in_init:
+            self.setup_from_system_idx(sim_state.atomic_numbers, sim_state.system_idx)
+
+        # expand to [n_systems, 3] for batched processing
+        data: dict[str, torch.Tensor] = {
+            AtomicDataDict.PBC_KEY: pbc.unsqueeze(0).expand(self.n_systems, 3),
+            AtomicDataDict.BATCH_KEY: sim_state.system_idx,
+            AtomicDataDict.NUM_NODES_KEY: sim_state.system_idx.bincount(),
+            AtomicDataDict.ATOMIC_NUMBERS_KEY: self.atomic_numbers,
+        }
+        for t in self.transforms[: self._num_static_transforms]:
+            data = t(data)
+        self._static_cache = {
+            "sources": [(t, t._version if t is not None else None) for t in sources],
+            "data": data,
+        }
+        return data
+
+    def profile_summary(self) -> Dict[str, float]:
+        """Mean time per step in ms spent on the static inputs (``static_ms``), the remaining transforms (``transforms_ms``, i.e. the neighborlist) and the model (``model_ms``), as recorded with ``profile=True``."""
+        if not self.profile:
+            raise RuntimeError("set `profile=True` to record timings")
+        summary = {"num_steps": len(self.timings["model"])}
+        for stage, values in self.timings.items():
+            summary[f"{stage}_ms"] = (
+                1e3 * sum(values) / len(values) if len(values) > 0 else None
+            )
+        return summary
+
+
+# timed stages of each step with `profile=True`
+_PROFILE_STAGES = ["static", "transforms", "model"]
+
+
+def _unchanged(
+    new: Optional[torch.Tensor], old: Optional[torch.Tensor], version: Optional[int]
+) -> bool:
+    """Whether ``new`` holds the same values as ``old`` had at version counter ``version``."""
+    if new is None or old is None:
+        return new is old
+    if new is old:
+        # in-place modifications increment the version counter
+        return new._version == version
+    return (
+        old._version == version
+        and new.shape == old.shape
+        and new.device == old.device
+        and torch.equal(new, old)
+    )
+
 
 def _basic_transforms(
     metadata: dict,
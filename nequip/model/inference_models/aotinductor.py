@@ -6,6 +6,16 @@ from typing import Union, Tuple, List
 from nequip.nn import graph_model
 from nequip.utils.versions import check_pt2_compile_compatibility
 from nequip.nn.compile import DictInputOutputWrapper
+from nequip.scripts._compile_utils import (
+    OUTPUT_FIELDS_METADATA_KEY,
+    SHAPE_BUCKETS_METADATA_KEY,
+    SHAPE_BUCKET_PADDING_METADATA_KEY,
+)
+from .shape_buckets import (
+    ShapeBucketDispatcher,
+    bucket_model_name,
+    parse_shape_buckets,
+)
 
 
 def load_aotinductor_model(
@@ -20,7 +30,13 @@ def load_aotinductor_model(
         compile_path: path to compiled model file ending with .nequip.pt2
         device: the device to use
         input_keys: list of input field names for DictInputOutputWrapper
-        output_keys: list of output field names for DictInputOutputWrapper
+        output_keys: list of output field names for DictInputOutputWrapper;
+            models exported with a subset of these output fields (e.g. the ``ase_forces`` target) are also accepted,
+            in which case only the exported output fields are returned
+
+    Packages exported with shape buckets (``nequip-compile --shape-buckets``) are loaded as a
+    :class:`~nequip.model.inference_models.shape_buckets.ShapeBucketDispatcher`, which evaluates each input with the
+    smallest bucket variant that fits its number of atoms and edges, and with the generic variant otherwise.
 
     Returns:
         tuple of (wrapped_model, processed_metadata)
@@ -30,11 +46,23 @@ def load_aotinductor_model(
 
     # load compiled model
     compiled_model = torch._inductor.aoti_load_package(compile_path)
-    model = DictInputOutputWrapper(compiled_model, input_keys, output_keys)
 
     # get and process metadata
     metadata = compiled_model.get_metadata()
 
+    # outputs are mapped by position, so we use the exported output fields if they were recorded
+    # (models compiled before the output fields were recorded are assumed to match `output_keys`)
+    if OUTPUT_FIELDS_METADATA_KEY in metadata:
+        compiled_output_keys = metadata[OUTPUT_FIELDS_METADATA_KEY].split(" ")
+        unexpected = [k for k in compiled_output_keys if k not in output_keys]
+        if unexpected:
+            raise RuntimeError(
+                f"`{compile_path}` was compiled with output fields {compiled_output_keys}, but only {output_keys} are supported here (unexpected: {unexpected}), make sure to compile with the appropriate `--target`."
+            )
+        output_keys = compiled_output_keys
+        metadata[OUTPUT_FIELDS_METADATA_KEY] = compiled_output_keys
+    model = DictInputOutputWrapper(compiled_model, input_keys, output_keys)
+
     # check device compatibility
     compile_device = metadata["AOTI_DEVICE_KEY"]
     if torch.device(compile_device) != torch.device(device):
@@ -59,4 +87,24 @@ def load_aotinductor_model(
     else:
         metadata[graph_model.PER_EDGE_TYPE_CUTOFF_KEY] = None
 
+    # load shape bucket variants if present
+    if SHAPE_BUCKETS_METADATA_KEY in metadata:
+        from torch._inductor.package import load_package
+
+        buckets = parse_shape_buckets(metadata[SHAPE_BUCKETS_METADATA_KEY])
+        padding = bool(int(metadata[SHAPE_BUCKET_PADDING_METADATA_KEY]))
+        bucket_models = [
+            DictInputOutputWrapper(
+                load_package(compile_path, bucket_model_name(idx)),
+                input_keys,
+                output_keys,
+            )
+            for idx in range(len(buckets))
+        ]
+        model = ShapeBucketDispatcher(
+            model, bucket_models, buckets, padding, metadata[graph_model.R_MAX_KEY]
+        )
+        metadata[SHAPE_BUCKETS_METADATA_KEY] = buckets
+        metadata[SHAPE_BUCKET_PADDING_METADATA_KEY] = padding
+
     return model, metadata
@@ -0,0 +1,126 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import torch
+
+from nequip.data import AtomicDataDict
+from nequip.data._key_registry import get_field_type
+from nequip.nn._shape_padding import pad_data, strip_padding
+
+from typing import List, Tuple
+
+
+def parse_shape_buckets(buckets_str: str) -> List[Tuple[int, int]]:
+    """Parse shape buckets from the format ``"max_nodes,max_edges max_nodes,max_edges ..."``, sorted by size."""
+    buckets = []
+    for bucket in buckets_str.split():
+        max_nodes, max_edges = bucket.split(",")
+        buckets.append((int(max_nodes), int(max_edges)))
+    return sorted(buckets)
+
+
+def shape_buckets_to_str(buckets: List[Tuple[int, int]]) -> str:
+    return " ".join(f"{max_nodes},{max_edges}" for max_nodes, max_edges in buckets)
+
+
+def bucket_model_name(idx: int) -> str:
+    """Name of the ``idx``-th shape bucket variant in a multi-variant AOTInductor package (the generic variant is ``model``)."""
+    return f"bucket{idx}"
+
+
+def bucket_fits(
+    num_nodes: int, num_edges: int, max_nodes: int, max_edges: int, padding: bool
+) -> bool:
+    """Whether a graph with ``num_nodes`` and ``num_edges`` can be evaluated by a shape bucket."""
+    if not padding:
+        return num_nodes <= max_nodes and num_edges <= max_edges
+    # padding requires at least two padding nodes (to hold the padding edges), unless the shapes match exactly
+    return (num_nodes == max_nodes and num_edges == max_edges) or (
+        num_nodes + 2 <= max_nodes and num_edges <= max_edges
+    )
+
+
+def trim_data(
+    data: AtomicDataDict.Type, max_nodes: int, max_edges: int
+) -> AtomicDataDict.Type:
+    """Cut a single-frame ``data`` down to a subgraph of at most ``max_nodes`` nodes and ``max_edges`` edges.
+
+    The subgraph is only meant as example input for exporting shape buckets smaller than the available data.
+    """
+    assert AtomicDataDict.num_frames(data) == 1
+    num_nodes = AtomicDataDict.num_nodes(data)
+    num_edges = AtomicDataDict.num_edges(data)
+    if num_nodes <= max_nodes and num_edges <= max_edges:
+        return data
+
+    keep_nodes = min(num_nodes, max_nodes)
+    edge_index = data[AtomicDataDict.EDGE_INDEX_KEY]
+    keep_edges = torch.nonzero((edge_index < keep_nodes).all(dim=0)).view(-1)
+    keep_edges = keep_edges[:max_edges]
+
+    trimmed = {}
+    for k, v in data.items():
+        if k == AtomicDataDict.EDGE_INDEX_KEY:
+            trimmed[k] = v[:, keep_edges]
+        elif k == AtomicDataDict.NUM_NODES_KEY:
+            trimmed[k] = torch.full_like(v, keep_nodes)
+        else:
+            field_type = get_field_type(k, error_on_unregistered=False)
+            if field_type == "node":
+                trimmed[k] = v[:keep_nodes]
+            elif field_type == "edge":
+                trimmed[k] = v[keep_edges]
+            else:
+                trimmed[k] = v
+    return trimmed
+
+
+class ShapeBucketDispatcher(torch.nn.Module):
+    """Dispatches each input to the smallest shape bucket that fits it, and to a generic model otherwise.
+
+    Args:
+        model (torch.nn.Module): generic model for inputs that fit no bucket
+        bucket_models (List[torch.nn.Module]): one model per bucket
+        buckets (List[Tuple[int, int]]): ``(max_nodes, max_edges)`` of each bucket, in increasing order
+        padding (bool): whether the bucket models require inputs padded to exactly ``(max_nodes, max_edges)``
+        r_max (float): cutoff radius of the model, used to place the padding nodes
+    """
+
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        bucket_models: List[torch.nn.Module],
+        buckets: List[Tuple[int, int]],
+        padding: bool,
+        r_max: float,
+    ):
+        super().__init__()
+        assert len(bucket_models) == len(buckets)
+        self.model = model
+        self.bucket_models = torch.nn.ModuleList(bucket_models)
+        self.buckets = buckets
+        self.padding = padding
+        self.r_max = r_max
+        # same interface as `DictInputOutputWrapper`
+        self.input_keys = model.input_keys
+        self.output_keys = model.output_keys
+        # number of inputs evaluated by each bucket (with the generic model last)
+        self.num_calls = [0] * (len(buckets) + 1)
+
+    def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
+        num_nodes = AtomicDataDict.num_nodes(data)
+        num_edges = AtomicDataDict.num_edges(data)
+        for idx, (max_nodes, max_edges) in enumerate(self.buckets):
+            if not bucket_fits(
+                num_nodes, num_edges, max_nodes, max_edges, self.padding
+            ):
+                continue
+            self.num_calls[idx] += 1
+            bucket_model = self.bucket_models[idx]
+            if not self.padding:
+                return bucket_model(data)
+            batched = AtomicDataDict.BATCH_KEY in data
+            num_frames = AtomicDataDict.num_frames(data)
+            inputs = {k: data[k] for k in self.input_keys}
+            out = bucket_model(pad_data(inputs, max_nodes, max_edges, self.r_max))
+            return strip_padding(out, num_nodes, num_edges, num_frames, batched)
+        self.num_calls[-1] += 1
+        return self.model(data)
@@ -9,7 +9,6 @@ from nequip.nn.model_modifier_utils import (
 import inspect
 import contextvars
 import contextlib
-from hydra.utils import get_method
 from typing import Dict, List, Union, Any, Optional
 
 _ONLY_APPLY_PERSISTENT = contextvars.ContextVar("_ONLY_APPLY_PERSISTENT", default=False)
@@ -86,6 +85,8 @@ def modify(
     # build inner model if not already built
     if not isinstance(model, torch.nn.Module):
         # don't use `hydra.utils.instantiate` because it may lead to a hydra dependency during packaging
+        from hydra.utils import get_method
+
         model = model.copy()
         model_fn = get_method(model.pop("_target_"))
         model = model_fn(**model)
@@ -23,7 +23,6 @@ from nequip.nn.embedding import (
 )
 
 from .utils import model_builder
-from hydra.utils import instantiate
 import warnings
 from typing import Sequence, Optional, List, Dict, Union, Callable
 
@@ -282,6 +281,8 @@ def FullNequIPGNNModel(
     # === pair potentials ===
     prev_irreps_out = per_type_energy_scale_shift.irreps_out
     if pair_potential is not None:
+        from hydra.utils import instantiate
+
         pair_potential = instantiate(
             pair_potential, type_names=type_names, irreps_in=prev_irreps_out
         )
@@ -4,7 +4,6 @@ Functions for loading models from checkpoint files.
 """
 
 import torch
-import hydra
 import warnings
 
 from nequip.model.utils import (
@@ -70,7 +69,9 @@ def ModelFromCheckpoint(checkpoint_path: str, compile_mode: str = _EAGER_MODEL_K
                 )
 
     # === load model via lightning module ===
-    training_module = hydra.utils.get_class(
+    from hydra.utils import get_class
+
+    training_module = get_class(
         checkpoint["hyper_parameters"]["info_dict"]["training_module"]["_target_"]
     )
     # ensure that model is built with correct `compile_mode`
@@ -97,7 +98,9 @@ def data_dict_from_checkpoint(ckpt_path: str) -> AtomicDataDict.Type:
                 "_target_": "torch.utils.data.DataLoader"
             }
         data_config["train_dataloader"]["batch_size"] = 1
-        datamodule = hydra.utils.instantiate(data_config, _recursive_=False)
+        from hydra.utils import instantiate
+
+        datamodule = instantiate(data_config, _recursive_=False)
         # TODO: better way of doing this?
         # instantiate the datamodule, dataset, and get train dataloader
         try:
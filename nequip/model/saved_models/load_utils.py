@@ -2,14 +2,11 @@
 
 import contextlib
 import pathlib
-import requests
-from tqdm.auto import tqdm
 
 from nequip.model.utils import _EAGER_MODEL_KEY
 from nequip.model.saved_models import ModelFromPackage, ModelFromCheckpoint
 from nequip.model.modify_utils import only_apply_persistent_modifiers
-from nequip.train.lightning import _SOLE_MODEL_KEY
-from nequip.utils import model_repository
+from nequip.model.utils import _SOLE_MODEL_KEY
 from nequip.utils.logger import RankedLogger
 from nequip.utils.model_cache import get_cached_model, cache_model
 
@@ -34,6 +31,11 @@ def _get_model_file_path(input_path):
     is_nequip_net_download: bool = str(input_path).startswith("nequip.net:")
 
     if is_nequip_net_download:
+        # the download dependencies are only imported when needed to keep imports fast
+        import requests
+        from tqdm.auto import tqdm
+        from nequip.utils import model_repository
+
         # get model ID
         model_id = str(input_path)[len("nequip.net:") :]
         logger.info(f"Fetching {model_id} from nequip.net...")
@@ -47,6 +47,16 @@ def _get_package_metadata(imp) -> Dict[str, Any]:
     return pkg_metadata
 
 
+def _get_package_importer(package_path: str):
+    """Get a ``PackageImporter`` for a package file, loading from its unpacked directory in the model cache (with memory-mapped weights) if possible."""
+    from nequip.utils.model_cache import get_unpacked_package
+
+    unpacked_path = get_unpacked_package(package_path)
+    if unpacked_path is None:
+        return torch.package.PackageImporter(package_path)
+    return torch.package.PackageImporter(str(unpacked_path))
+
+
 # === warning management ===
 
 
@@ -117,7 +127,8 @@ def ModelFromPackage(package_path: str, compile_mode: str = _EAGER_MODEL_KEY):
             # if it's not `None`, it means we've previously loaded a model during `nequip-package` and should keep using the same importer
         else:
             # if not doing `nequip-package`, we just load a new importer every time `ModelFromPackage` is called
-            imp = torch.package.PackageImporter(package_path)
+            # (from the unpacked package in the model cache, such that repeated loads are fast)
+            imp = _get_package_importer(package_path)
 
         # do sanity checking with available models
         pkg_metadata = _get_package_metadata(imp)
@@ -142,7 +153,7 @@ def ModelFromPackage(package_path: str, compile_mode: str = _EAGER_MODEL_KEY):
 def data_dict_from_package(package_path: str) -> AtomicDataDict.Type:
     """Load example data from a .nequip.zip package file."""
     with _suppress_package_importer_exporter_warnings():
-        imp = torch.package.PackageImporter(package_path)
+        imp = _get_package_importer(package_path)
         data = imp.load_pickle(package="model", resource="example_data.pkl")
     return data
 
@@ -160,7 +171,7 @@ def ModelTypeNamesFromPackage(package_path: str):
     _check_file_exists(file_path=package_path, file_type="package")
 
     with _suppress_package_importer_exporter_warnings():
-        imp = torch.package.PackageImporter(package_path)
+        imp = _get_package_importer(package_path)
         pkg_metadata = _get_package_metadata(imp)
 
     atom_types_dict = pkg_metadata["atom_types"]
@@ -1,6 +1,5 @@
 # This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
 import torch
-from lightning.pytorch.utilities.seed import isolate_rng
 
 from nequip.nn.graph_model import GraphModel
 from nequip.nn.compile import CompileGraphModel
@@ -25,6 +24,8 @@ _IS_BUILDING_MODEL = contextvars.ContextVar("_IS_BUILDING_MODEL", default=False)
 
 # the following is the set of model build types for specific purposes
 _EAGER_MODEL_KEY = "eager"
+# key of the model of single-model training modules and saved models
+_SOLE_MODEL_KEY: Final[str] = "sole_model"
 _TRAIN_TIME_COMPILE_KEY: Final[str] = "compile"
 
 _COMPILE_MODE_OPTIONS = {
@@ -143,6 +144,9 @@ def model_builder(func):
             else:
                 graph_model_module = GraphModel
 
+            # `lightning` is only imported when building models to keep `import nequip` fast
+            from lightning.pytorch.utilities.seed import isolate_rng
+
             # never script
             with conditional_torchscript_mode(False):
                 # set dtype and seed
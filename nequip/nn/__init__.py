@@ -11,11 +11,19 @@ from .nonlinearities import ShiftedSoftplus
 from .mlp import ScalarMLP, ScalarMLPFunction
 from .interaction_block import InteractionBlock
 from .convnetlayer import ConvNetLayer
-from .grad_output import PartialForceOutput, ForceStressOutput
+from .grad_output import (
+    PartialForceOutput,
+    EdgePartialForceOutput,
+    HessianOutput,
+    ForceStressOutput,
+    edge_partial_forces_to_dense,
+    set_force_stress_outputs,
+)
 from .misc import Concat, ApplyFactor, SaveForOutput
 from .utils import scatter, tp_path_exists, with_edge_vectors_, with_edge_type_
 from .model_modifier_utils import model_modifier, replace_submodules
 from .norm import AvgNumNeighborsNorm
+from .ensemble import EnsembleGraphModel
 
 __all__ = [
     "GraphModel",
@@ -30,7 +38,11 @@ __all__ = [
     "ScalarMLPFunction",
     "InteractionBlock",
     "PartialForceOutput",
+    "EdgePartialForceOutput",
+    "HessianOutput",
     "ForceStressOutput",
+    "edge_partial_forces_to_dense",
+    "set_force_stress_outputs",
     "ConvNetLayer",
     "Concat",
     "ApplyFactor",
@@ -42,4 +54,5 @@ __all__ = [
     "model_modifier",
     "replace_submodules",
     "AvgNumNeighborsNorm",
+    "EnsembleGraphModel",
 ]
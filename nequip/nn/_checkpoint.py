@@ -0,0 +1,85 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import torch
+
+from nequip.data import AtomicDataDict
+
+from typing import List
+
+
+def checkpoint_graph_module(
+    module: torch.nn.Module, data: AtomicDataDict.Type
+) -> AtomicDataDict.Type:
+    """Run ``module._forward(data)`` without keeping its intermediates, and recompute them in the backward pass.
+
+    Only the ``torch.Tensor`` entries of ``data`` that are added or replaced by ``module`` are connected to the autograd graph, which is the case for all outputs of graph modules such as ``ConvNetLayer``.
+    """
+    keys = [k for k, v in data.items() if isinstance(v, torch.Tensor)]
+    static = {k: v for k, v in data.items() if not isinstance(v, torch.Tensor)}
+    params = [p for p in module.parameters() if p.requires_grad]
+    out_keys: List[str] = []
+    outs = _RecomputeGraphModule.apply(
+        module, keys, static, out_keys, *[data[k] for k in keys], *params
+    )
+    out = data.copy()
+    out.update(zip(out_keys, outs))
+    return out
+
+
+class _RecomputeGraphModule(torch.autograd.Function):
+    """Runs a graph module without keeping its intermediates and recomputes it in the backward pass.
+
+    This follows ``_RecomputeTensorProduct`` (see ``_tp_scatter_chunked.py``) rather than using ``torch.utils.checkpoint``, such that force training can differentiate through the recomputed backward.
+    The parameters of the module are passed as inputs such that their gradients are accumulated by autograd.
+    """
+
+    @staticmethod
+    def forward(ctx, module, keys, static, out_keys, *args):
+        ctx.module = module
+        ctx.keys = keys
+        ctx.static = static
+        inputs = args[: len(keys)]
+        ctx.save_for_backward(*inputs)
+        with torch.no_grad():
+            out = module._forward({**static, **dict(zip(keys, inputs))})
+        # the outputs are the tensors that are added or replaced by the module
+        in_data = dict(zip(keys, inputs))
+        out_keys.extend(
+            k
+            for k, v in out.items()
+            if isinstance(v, torch.Tensor) and not (k in in_data and in_data[k] is v)
+        )
+        ctx.out_keys = list(out_keys)
+        return tuple(out[k] for k in out_keys)
+
+    @staticmethod
+    def backward(ctx, *grad_outs):
+        inputs = ctx.saved_tensors
+        params = [p for p in ctx.module.parameters() if p.requires_grad]
+        needs_grad = ctx.needs_input_grad[4 : 4 + len(inputs)]
+        # if the backward is differentiated itself (`create_graph=True`), the recomputation must be connected to the original inputs
+        # the inputs are still wrapped in new views such that inputs that appear under several keys get separate gradients
+        create_graph = torch.is_grad_enabled()
+        inputs = [
+            (t.view_as(t) if create_graph else t.detach().requires_grad_(True))
+            if needs
+            else t
+            for t, needs in zip(inputs, needs_grad)
+        ]
+        with torch.enable_grad():
+            out = ctx.module._forward({**ctx.static, **dict(zip(ctx.keys, inputs))})
+        outs, grads = [], []
+        for k, grad in zip(ctx.out_keys, grad_outs):
+            if out[k].requires_grad:
+                outs.append(out[k])
+                grads.append(grad)
+        wrt = [t for t, needs in zip(inputs, needs_grad) if needs] + params
+        if len(outs) == 0:
+            return (None,) * (4 + len(inputs) + len(params))
+        wrt_grads = iter(
+            torch.autograd.grad(
+                outs, wrt, grads, create_graph=create_graph, allow_unused=True
+            )
+        )
+        input_grads = tuple(next(wrt_grads) if needs else None for needs in needs_grad)
+        param_grads = tuple(wrt_grads)
+        return (None,) * 4 + input_grads + param_grads
@@ -0,0 +1,156 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import torch
+
+from nequip.data import AtomicDataDict
+from ._graph_mixin import GraphModuleMixin
+
+from typing import Final, List, Optional, Tuple
+
+
+# field holding the radial MLP outputs of all fused `InteractionBlock`s, of shape (num_blocks, num_edges, max_out_dim)
+_FUSED_RADIAL_MLP_KEY: Final[str] = "_fused_radial_mlp_output"
+
+
+def _effective_layers(
+    mlp: torch.nn.Module,
+) -> Tuple[List[torch.Tensor], Optional[torch.nn.Module]]:
+    """Get the effective weights (with ``alpha`` folded in) and the nonlinearity of the layers of a ``ScalarMLPFunction``."""
+    from .mlp import DeepLinearMLP
+
+    if isinstance(mlp.mlp, DeepLinearMLP):
+        # deep linear nets collapse into a single linear layer
+        weight = torch.linalg.multi_dot([w for w in mlp.mlp.weights]) * mlp.mlp.alpha
+        return [weight.detach()], None
+
+    weights = []
+    nonlinearity = None
+    for module in mlp.mlp:
+        if hasattr(module, "alpha"):
+            if module.bias is not None:
+                raise RuntimeError(
+                    "`fuse_radial_mlps` does not support radial MLPs with biases"
+                )
+            weights.append((module.weight * module.alpha).detach())
+        else:
+            nonlinearity = module
+    return weights, nonlinearity
+
+
+class FusedRadialMLPs(GraphModuleMixin, torch.nn.Module):
+    """Evaluate the radial MLPs of several ``InteractionBlock`` s on their shared edge embedding in one batched pass.
+
+    The first layers of all MLPs are concatenated into a single matrix multiplication over the shared input, and the remaining layers are evaluated as batched matrix multiplications over the blocks.
+    MLPs with different hidden or output widths are zero-padded to the largest widths, which leaves their outputs unchanged.
+    The output is written to a field of shape ``(num_blocks, num_edges, max_out_dim)``, which each block reads its slice of with a :class:`FusedRadialMLPSlice`.
+
+    Args:
+        mlps (List[ScalarMLPFunction]): radial MLPs of the blocks (all with the same depth and nonlinearity, and without biases)
+        field (str): input field shared by all MLPs
+        out_field (str): output field
+    """
+
+    num_blocks: int
+    out_dim: int
+
+    def __init__(
+        self,
+        mlps: List[torch.nn.Module],
+        field: str = AtomicDataDict.EDGE_EMBEDDING_KEY,
+        out_field: str = _FUSED_RADIAL_MLP_KEY,
+        irreps_in=None,
+    ):
+        super().__init__()
+        self.field = field
+        self.out_field = out_field
+        self._init_irreps(
+            irreps_in=irreps_in,
+            required_irreps_in=[self.field],
+            irreps_out={self.out_field: None},
+        )
+
+        layers = [_effective_layers(mlp) for mlp in mlps]
+        num_layers = len(layers[0][0])
+        if any(
+            len(weights) != num_layers or type(nonlin) is not type(layers[0][1])
+            for weights, nonlin in layers
+        ):
+            raise RuntimeError(
+                "`fuse_radial_mlps` requires all radial MLPs to have the same depth and nonlinearity"
+            )
+        self.num_blocks = len(mlps)
+        # the nonlinearity modules have no parameters, so one instance can be shared by all blocks
+        self.nonlinearity = (
+            torch.nn.Identity() if layers[0][1] is None else layers[0][1]
+        )
+
+        # === stack the (zero-padded) weights ===
+        # dims[i] is the largest input width of layer i over the blocks
+        dims = [
+            max(weights[i].size(0) for weights, _ in layers) for i in range(num_layers)
+        ] + [max(weights[-1].size(1) for weights, _ in layers)]
+        self.out_dim = dims[-1]
+        stacked = []
+        for i in range(num_layers):
+            w = layers[0][0][0].new_zeros((self.num_blocks, dims[i], dims[i + 1]))
+            for block_idx, (weights, _) in enumerate(layers):
+                w[block_idx, : weights[i].size(0), : weights[i].size(1)] = weights[i]
+            stacked.append(w)
+        # the first layer acts on the shared input: (in_dim, num_blocks * dims[1])
+        # non-persistent since the weights are fully determined by the original MLP weights (which are kept in the blocks)
+        self.register_buffer(
+            "first_weight",
+            stacked[0].transpose(0, 1).reshape(dims[0], -1).contiguous(),
+            persistent=False,
+        )
+        # the hidden layers all have the same (padded) width, and are stacked as (num_hidden, num_blocks, width, width)
+        hidden = stacked[1:-1]
+        self.register_buffer(
+            "hidden_weights",
+            (
+                torch.stack(hidden, dim=0)
+                if len(hidden) > 0
+                else stacked[0].new_zeros((0, self.num_blocks, dims[1], dims[1]))
+            ),
+            persistent=False,
+        )
+        self.register_buffer(
+            "last_weight",
+            stacked[-1] if num_layers > 1 else stacked[0].new_zeros((0, 0, 0)),
+            persistent=False,
+        )
+
+    def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
+        x = data[self.field]
+        num_edges = x.size(0)
+        # (num_edges, num_blocks * width) -> (num_blocks, num_edges, width)
+        x = torch.mm(x, self.first_weight)
+        x = x.view(num_edges, self.num_blocks, -1).transpose(0, 1)
+        if self.last_weight.numel() > 0:
+            x = self.nonlinearity(x)
+            for i in range(self.hidden_weights.size(0)):
+                x = self.nonlinearity(torch.bmm(x, self.hidden_weights[i]))
+            x = torch.bmm(x, self.last_weight)
+        data[self.out_field] = x
+        return data
+
+
+class FusedRadialMLPSlice(torch.nn.Module):
+    """Read the radial MLP output of one ``InteractionBlock`` from the output of :class:`FusedRadialMLPs`.
+
+    Args:
+        mlp (ScalarMLPFunction): the original radial MLP, whose layers are kept (but unused) for state dict compatibility
+        block_idx (int): index of the block in the fused MLPs
+    """
+
+    block_idx: int
+    out_dim: int
+
+    def __init__(self, mlp: torch.nn.Module, block_idx: int) -> None:
+        super().__init__()
+        # ^ we keep the original MLP layers under the same name such that the state dict is unchanged by fusion
+        self.mlp = mlp.mlp
+        self.block_idx = block_idx
+        self.out_dim = mlp.dims[-1]
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return x[self.block_idx, :, : self.out_dim]
@@ -0,0 +1,143 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import torch
+
+from nequip.data import AtomicDataDict
+from ._graph_mixin import GraphModuleMixin
+from ._tp_scatter_base import TensorProductScatter
+from .utils import scatter
+
+from typing import Dict, Final, List, Optional
+
+
+_COMPUTE_DTYPES: Final[Dict[str, torch.dtype]] = {
+    "bfloat16": torch.bfloat16,
+    "float16": torch.float16,
+}
+
+# geometric fields are never cast to the compute dtype, since forces and stresses are derivatives w.r.t. them
+_MODEL_DTYPE_FIELDS: Final[List[str]] = [
+    AtomicDataDict.POSITIONS_KEY,
+    AtomicDataDict.CELL_KEY,
+    AtomicDataDict.EDGE_CELL_SHIFT_KEY,
+    AtomicDataDict.EDGE_VECTORS_KEY,
+    AtomicDataDict.EDGE_LENGTH_KEY,
+]
+
+
+class MixedPrecisionGraphModule(GraphModuleMixin, torch.nn.Module):
+    """Runs a graph module with its parameters, buffers and floating point input fields in ``compute_dtype``.
+
+    Geometric input fields (positions, cell, edge vectors and lengths) are left as they are, and the output fields are cast back to ``model_dtype``.
+    Input fields that are not replaced by the module keep their original (higher precision) tensors.
+
+    Args:
+        module (GraphModuleMixin): graph module to wrap
+        compute_dtype (torch.dtype): reduced precision dtype to run ``module`` in
+        model_dtype (torch.dtype): dtype of the outputs
+    """
+
+    cast_fields: List[str]
+    out_fields: List[str]
+
+    def __init__(
+        self,
+        module: GraphModuleMixin,
+        compute_dtype: torch.dtype,
+        model_dtype: torch.dtype,
+    ) -> None:
+        super().__init__()
+        self._init_irreps(irreps_in=module.irreps_in, irreps_out=module.irreps_out)
+        self.compute_dtype = compute_dtype
+        self.model_dtype = model_dtype
+        self.cast_fields = [
+            k for k in module.irreps_in.keys() if k not in _MODEL_DTYPE_FIELDS
+        ]
+        self.out_fields = list(module.irreps_out.keys())
+        self.module = module.to(compute_dtype)
+
+    def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
+        originals: Dict[str, torch.Tensor] = {}
+        for k in self.cast_fields:
+            if k in data:
+                v = data[k]
+                if v.is_floating_point():
+                    originals[k] = v
+                    data[k] = v.to(self.compute_dtype)
+        data = self.module(data)
+        for k in self.out_fields:
+            if k in data:
+                v = data[k]
+                if v.dtype == self.compute_dtype:
+                    data[k] = v.to(self.model_dtype)
+        # inputs that were not replaced by the module are restored
+        for k, v in originals.items():
+            if data[k].dtype == self.compute_dtype:
+                data[k] = v
+        return data
+
+
+class MixedPrecisionModule(torch.nn.Module):
+    """Runs a module that maps a tensor to a tensor (e.g. a ``ScalarMLPFunction`` or an ``e3nn`` ``Linear``) with its parameters, buffers and input in ``compute_dtype``, and casts the output back to the input dtype.
+
+    Args:
+        module (torch.nn.Module): module to wrap
+        compute_dtype (torch.dtype): reduced precision dtype to run ``module`` in
+    """
+
+    def __init__(self, module: torch.nn.Module, compute_dtype: torch.dtype) -> None:
+        super().__init__()
+        self.compute_dtype = compute_dtype
+        self.module = module.to(compute_dtype)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.module(x.to(self.compute_dtype)).to(x.dtype)
+
+
+class MixedPrecisionTensorProductScatter(TensorProductScatter):
+    """``TensorProductScatter`` that computes the per-edge tensor products in ``compute_dtype``, but accumulates them onto the nodes in the dtype of the node features.
+
+    Args:
+        compute_dtype (torch.dtype): reduced precision dtype for the tensor products
+    """
+
+    def __init__(
+        self,
+        feature_irreps_in,
+        irreps_edge_attr,
+        irreps_mid,
+        instructions,
+        compute_dtype: torch.dtype,
+    ) -> None:
+        super().__init__(
+            feature_irreps_in=feature_irreps_in,
+            irreps_edge_attr=irreps_edge_attr,
+            irreps_mid=irreps_mid,
+            instructions=instructions,
+        )
+        self.compute_dtype = compute_dtype
+        self.tp = self.tp.to(compute_dtype)
+
+    def forward(
+        self,
+        x,
+        edge_attr,
+        edge_weight,
+        edge_dst,
+        edge_src,
+        edge_dst_ptr: Optional[torch.Tensor] = None,
+    ):
+        # casting before gathering halves the memory traffic of the gather
+        edge_features = self.tp(
+            x.to(self.compute_dtype)[edge_src],
+            edge_attr.to(self.compute_dtype),
+            edge_weight.to(self.compute_dtype),
+        )
+        x = scatter(
+            edge_features.to(x.dtype),
+            edge_dst,
+            dim=0,
+            dim_size=x.size(0),
+            sorted_index=self.use_segment_reduce and not self.training,
+            ptr=edge_dst_ptr,
+        )
+        return x
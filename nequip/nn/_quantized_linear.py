@@ -0,0 +1,129 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import torch
+
+from e3nn.o3._linear import Linear
+
+from math import prod
+from typing import Dict, Final, Optional, Tuple
+
+
+_WEIGHT_DTYPES: Final[Dict[str, torch.dtype]] = {
+    "int8": torch.int8,
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+}
+
+
+def _quantize_weight(
+    weight: torch.Tensor, weight_dtype: torch.dtype, dim: Optional[int] = None
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Quantize ``weight`` to ``weight_dtype`` and get the scale to dequantize it with.
+
+    ``int8`` weights are quantized symmetrically with one scale per slice along ``dim`` (or a single scale if ``dim`` is ``None``), while ``float16`` and ``bfloat16`` weights are only cast (with a unit scale).
+    """
+    weight = weight.detach()
+    if weight_dtype != torch.int8:
+        return weight.to(weight_dtype), torch.ones((), dtype=weight.dtype)
+    if dim is None:
+        scale = weight.abs().max() / 127.0
+    else:
+        reduce_dims = [d for d in range(weight.dim()) if d != dim]
+        scale = weight.abs().amax(dim=reduce_dims, keepdim=True) / 127.0
+    scale = scale.clamp_min(torch.finfo(weight.dtype).tiny)
+    return torch.round(weight / scale).clamp(-127, 127).to(torch.int8), scale
+
+
+class QuantizedScalarLinear(torch.nn.Module):
+    """Scalar linear layer (e.g. of a ``ScalarMLPFunction``) with its weights stored in a lower precision ``weight_dtype``.
+
+    ``float16`` and ``bfloat16`` layers cast their inputs to ``weight_dtype`` for the matrix multiplication (which accumulates in ``float32``), and cast the outputs back.
+    ``int8`` layers store per-output-channel quantized weights, which are dequantized to the input dtype for the matrix multiplication.
+
+    Args:
+        weight (torch.Tensor): effective weight of shape ``(in_features, out_features)``, i.e. including any ``alpha`` factors
+        bias (torch.Tensor): optional bias of shape ``(out_features,)``, kept in the original precision
+        weight_dtype (str): ``int8``, ``float16`` or ``bfloat16``
+    """
+
+    in_features: int
+    out_features: int
+    low_precision_compute: bool
+
+    def __init__(
+        self, weight: torch.Tensor, bias: torch.Tensor = None, weight_dtype="int8"
+    ) -> None:
+        super().__init__()
+        self.in_features, self.out_features = weight.shape
+        dtype = _WEIGHT_DTYPES[weight_dtype]
+        self.low_precision_compute = dtype != torch.int8
+        q_weight, scale = _quantize_weight(weight, dtype, dim=1)
+        self.register_buffer("weight", q_weight)
+        self.register_buffer("scale", scale)
+        self.register_buffer(
+            "bias",
+            (
+                bias.detach()
+                if bias is not None
+                else torch.zeros((0,), dtype=weight.dtype, device=weight.device)
+            ),
+        )
+
+    def forward(self, input: torch.Tensor) -> torch.Tensor:
+        if self.low_precision_compute:
+            out = torch.mm(input.to(self.weight.dtype), self.weight).to(input.dtype)
+        else:
+            out = torch.mm(input, self.weight.to(input.dtype) * self.scale)
+        if self.bias.numel() > 0:
+            out = out + self.bias
+        return out
+
+    def extra_repr(self) -> str:
+        return f"in_features={self.in_features}, out_features={self.out_features}, weight_dtype={self.weight.dtype}"
+
+
+class QuantizedE3nnLinear(torch.nn.Module):
+    """Wraps an ``e3nn`` ``Linear`` (without biases) to use weights stored in a lower precision ``weight_dtype``.
+
+    The wrapped ``Linear`` is called with the weights passed explicitly, in ``weight_dtype`` (with the features cast to it) for ``float16`` and ``bfloat16``, or dequantized from ``int8`` (with one scale per weight path) otherwise.
+
+    Args:
+        linear (Linear): ``e3nn`` ``Linear`` with internal weights and no biases
+        weight_dtype (str): ``int8``, ``float16`` or ``bfloat16``
+    """
+
+    low_precision_compute: bool
+
+    def __init__(self, linear: Linear, weight_dtype="int8") -> None:
+        super().__init__()
+        assert linear.internal_weights and linear.bias_numel == 0
+        dtype = _WEIGHT_DTYPES[weight_dtype]
+        self.low_precision_compute = dtype != torch.int8
+        weight = linear.weight.detach()
+        path_numels = [prod(ins.path_shape) for ins in linear.instructions]
+        if dtype == torch.int8:
+            # one scale per path (i.e. instruction) of the linear layer
+            q_weights, scales = zip(
+                *[_quantize_weight(w, dtype) for w in weight.split(path_numels)]
+            )
+            q_weight, scale = torch.cat(q_weights), torch.stack(scales)
+        else:
+            q_weight, scale = _quantize_weight(weight, dtype)
+        self.register_buffer("weight", q_weight)
+        self.register_buffer("scale", scale)
+        self.register_buffer(
+            "path_numels",
+            torch.tensor(path_numels, dtype=torch.long, device=weight.device),
+        )
+        # the original weights are not used anymore, so we only keep an empty placeholder
+        linear.weight = torch.nn.Parameter(weight.new_zeros((0,)), requires_grad=False)
+        self.linear = linear
+
+    def forward(self, features: torch.Tensor) -> torch.Tensor:
+        if self.low_precision_compute:
+            return self.linear(features.to(self.weight.dtype), self.weight).to(
+                features.dtype
+            )
+        scale = torch.repeat_interleave(
+            self.scale, self.path_numels, output_size=self.weight.size(0)
+        )
+        return self.linear(features, self.weight.to(features.dtype) * scale)
@@ -0,0 +1,155 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import math
+import torch
+
+from nequip.data import AtomicDataDict
+from nequip.data._key_registry import get_field_type
+
+from typing import Optional, Tuple
+
+
+def pad_data(
+    data: AtomicDataDict.Type,
+    max_nodes: int,
+    max_edges: int,
+    r_max: float,
+    max_frames: Optional[int] = None,
+) -> AtomicDataDict.Type:
+    """Pad ``data`` with dummy entries to exactly ``max_nodes`` nodes and ``max_edges`` edges (and ``max_frames`` frames for batched data).
+
+    Padding nodes have atom type ``0`` and are placed ``2 * r_max`` apart, and padding edges only connect the first two padding nodes, such that the cutoff makes their contributions vanish exactly.
+    Since the padding edges are centered on the first padding node, edges sorted by their centers (e.g. by :class:`~nequip.data.transforms.SortedNeighborListTransform`) stay sorted.
+    For batched data (with ``batch`` and ``num_nodes``), the padding nodes form an extra frame, followed by empty frames up to ``max_frames`` (default: one more than the number of frames), which leaves the per-frame outputs of the original frames untouched.
+    Padding frames have identity cells, such that their stresses remain finite.
+    For single-frame data, the padding nodes belong to the only frame, and :func:`strip_padding` subtracts their per-atom energies from the total energy.
+
+    Args:
+        data (AtomicDataDict.Type): data with a neighborlist, which is not modified
+        max_nodes (int): number of nodes after padding, which must leave at least two padding nodes (unless no padding is needed)
+        max_edges (int): number of edges after padding
+        r_max (float): cutoff radius of the model
+        max_frames (int): number of frames after padding, only for batched data
+    """
+    batched = AtomicDataDict.BATCH_KEY in data
+    num_frames = AtomicDataDict.num_frames(data)
+    num_nodes = AtomicDataDict.num_nodes(data)
+    num_edges = AtomicDataDict.num_edges(data)
+    num_pad_nodes = max_nodes - num_nodes
+    num_pad_edges = max_edges - num_edges
+    if max_frames is None:
+        max_frames = num_frames + 1 if batched else num_frames
+    assert batched or max_frames == num_frames
+    if num_pad_nodes == 0 and num_pad_edges == 0 and max_frames == num_frames:
+        return data
+    assert num_pad_nodes >= 2 and num_pad_edges >= 0 and max_frames > num_frames
+    num_pad_frames = max_frames - num_frames
+
+    padded = {}
+    for k, v in data.items():
+        if k == AtomicDataDict.EDGE_INDEX_KEY:
+            pad = torch.tensor(
+                [[num_nodes], [num_nodes + 1]], dtype=v.dtype, device=v.device
+            ).expand(2, num_pad_edges)
+            padded[k] = torch.cat([v, pad], dim=1)
+            continue
+        if k == AtomicDataDict.EDGE_TRANSPOSE_PERM_KEY:
+            # padding edges are their own transposes, which is exact since they do not contribute
+            pad = torch.arange(num_edges, max_edges, dtype=v.dtype, device=v.device)
+            padded[k] = torch.cat([v, pad], dim=0)
+            continue
+        field_type = get_field_type(k, error_on_unregistered=False)
+        if field_type == "node":
+            pad = v.new_zeros((num_pad_nodes,) + v.shape[1:])
+            if k == AtomicDataDict.POSITIONS_KEY:
+                pad[:, 0] = (
+                    2.0
+                    * r_max
+                    * torch.arange(num_pad_nodes, dtype=v.dtype, device=v.device)
+                )
+            elif k == AtomicDataDict.BATCH_KEY:
+                pad.fill_(num_frames)
+            padded[k] = torch.cat([v, pad], dim=0)
+        elif field_type == "edge":
+            pad = v.new_zeros((num_pad_edges,) + v.shape[1:])
+            if k == AtomicDataDict.EDGE_VECTORS_KEY:
+                pad[:, 0] = 2.0 * r_max
+            elif k == AtomicDataDict.EDGE_LENGTH_KEY:
+                pad.fill_(2.0 * r_max)
+            padded[k] = torch.cat([v, pad], dim=0)
+        elif field_type == "graph" and batched:
+            if k == AtomicDataDict.NUM_NODES_KEY:
+                pad = v.new_zeros((num_pad_frames,) + v.shape[1:])
+                pad[0] = num_pad_nodes
+            elif k == AtomicDataDict.CELL_KEY:
+                pad = torch.eye(3, dtype=v.dtype, device=v.device).expand(
+                    num_pad_frames, 3, 3
+                )
+            else:
+                pad = v.new_zeros((num_pad_frames,) + v.shape[1:])
+            padded[k] = torch.cat([v, pad], dim=0)
+        else:
+            padded[k] = v
+    return padded
+
+
+def strip_padding(
+    out: AtomicDataDict.Type,
+    num_nodes: int,
+    num_edges: int,
+    num_frames: int,
+    batched: bool,
+) -> AtomicDataDict.Type:
+    """Remove the padding added by :func:`pad_data` from the model outputs ``out``."""
+    stripped = {}
+    for k, v in out.items():
+        field_type = get_field_type(k, error_on_unregistered=False)
+        if k == AtomicDataDict.TOTAL_ENERGY_KEY and not batched:
+            v = v - out[AtomicDataDict.PER_ATOM_ENERGY_KEY][num_nodes:].sum(
+                dim=0, keepdim=True
+            )
+        elif field_type == "node":
+            v = v[:num_nodes]
+        elif field_type == "edge":
+            v = v[:num_edges]
+        elif field_type == "graph" and batched:
+            v = v[:num_frames]
+        stripped[k] = v
+    return stripped
+
+
+# === shape buckets of train-time compiled models ===
+
+
+def bucket_size(size: int, growth: float, minimum: int = 2) -> int:
+    """Smallest entry of the geometric sequence of shape buckets that is at least ``size``.
+
+    The sequence starts at ``minimum`` and grows by a factor of ``growth`` (rounded up, and by at least one) per bucket, such that the number of distinct bucket sizes grows logarithmically with the range of ``size``.
+    """
+    bucket = minimum
+    while bucket < size:
+        bucket = max(bucket + 1, math.ceil(bucket * growth))
+    return bucket
+
+
+def pad_to_buckets(
+    data: AtomicDataDict.Type, growth: float, r_max: float
+) -> Tuple[AtomicDataDict.Type, Tuple[int, int, int]]:
+    """Pad the frames, nodes and edges of ``data`` with :func:`pad_data` up to their shape buckets (see ``bucket_size``).
+
+    There are always at least one padding frame, two padding nodes and one padding edge, such that the padded batch dims are never ``1``.
+
+    Returns:
+        the padded (batched) data and the number of real ``(nodes, edges, frames)`` for :func:`strip_padding`
+    """
+    data = AtomicDataDict.with_batch_(data.copy())
+    num_frames = AtomicDataDict.num_frames(data)
+    num_nodes = AtomicDataDict.num_nodes(data)
+    num_edges = AtomicDataDict.num_edges(data)
+    padded = pad_data(
+        data,
+        max_nodes=bucket_size(num_nodes + 2, growth),
+        max_edges=bucket_size(num_edges + 1, growth),
+        r_max=r_max,
+        max_frames=bucket_size(num_frames + 1, growth),
+    )
+    return padded, (num_nodes, num_edges, num_frames)
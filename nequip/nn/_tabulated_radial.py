@@ -0,0 +1,81 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import torch
+
+from nequip.utils.global_dtype import _GLOBAL_DTYPE
+
+from typing import Callable
+
+
+class TabulatedRadialMLP(torch.nn.Module):
+    """Cubic Hermite spline lookup table replacing the radial MLP of an ``InteractionBlock``.
+
+    The table is built from ``radial_fn``, which maps normalized edge lengths of shape ``(num_points, 1)`` to the radial MLP outputs (i.e. the composition of the edge length encoding and the radial MLP).
+    Function values and exact derivatives are tabulated on a uniform grid over ``[0, 1]``, so the interpolant and its derivative (i.e. forces) are continuous.
+    The output vanishes for normalized lengths beyond ``1`` as for the smooth cutoff.
+
+    Args:
+        mlp (ScalarMLPFunction): the original radial MLP, whose layers are kept (but unused) for state dict compatibility
+        radial_fn (Callable): function of the normalized edge lengths to tabulate
+        num_points (int): number of grid points
+    """
+
+    num_intervals: int
+
+    def __init__(
+        self,
+        mlp: torch.nn.Module,
+        radial_fn: Callable[[torch.Tensor], torch.Tensor],
+        num_points: int,
+    ) -> None:
+        super().__init__()
+        assert num_points >= 2
+        # ^ we keep the original MLP layers under the same name such that the state dict is unchanged by tabulation
+        self.mlp = mlp.mlp
+        self.num_intervals = num_points - 1
+
+        # normalized edge lengths are in the global dtype
+        x = torch.linspace(
+            0.0,
+            1.0,
+            num_points,
+            dtype=_GLOBAL_DTYPE,
+            device=next(self.mlp.parameters()).device,
+        ).unsqueeze(-1)
+        # values and derivatives w.r.t. the normalized length, both (num_points, out_dim)
+        y, dy = torch.func.jvp(radial_fn, (x,), (torch.ones_like(x),))
+        y, dy = y.detach(), dy.detach()
+        h = 1.0 / self.num_intervals
+        y0, y1 = y[:-1], y[1:]
+        d0, d1 = h * dy[:-1], h * dy[1:]
+        # coefficients of p(t) = c0 + c1 t + c2 t^2 + c3 t^3 for t in [0, 1] on each interval
+        coeffs = torch.stack(
+            [y0, d0, 3 * (y1 - y0) - 2 * d0 - d1, 2 * (y0 - y1) + d0 + d1], dim=1
+        )  # (num_intervals, 4, out_dim)
+        # stored as (num_intervals * 4, out_dim) rows for the lookup with `embedding_bag`
+        # non-persistent since the table is fully determined by the MLP weights
+        self.register_buffer(
+            "coeffs", coeffs.reshape(-1, coeffs.size(-1)), persistent=False
+        )
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        # x: (num_edges, 1) normalized edge lengths
+        x = x.view(-1)
+        s = x.clamp(min=0.0, max=1.0) * self.num_intervals
+        idx = s.detach().floor().clamp(max=self.num_intervals - 1).to(torch.long)
+        t = (s - idx).to(self.coeffs.dtype)
+        # powers of t as weights of the four coefficient rows of each edge's interval, masked beyond the cutoff
+        weights = torch.stack([torch.ones_like(t), t, t * t, t * t * t], dim=-1)
+        weights = weights * (x < 1.0).unsqueeze(-1).to(weights.dtype)
+        rows = 4 * idx.unsqueeze(-1) + torch.arange(
+            4, dtype=idx.dtype, device=idx.device
+        )
+        # `embedding_bag` accumulates the weighted rows without materializing the gathered coefficients
+        return torch.nn.functional.embedding_bag(
+            rows.view(-1),
+            self.coeffs,
+            offsets=torch.arange(
+                0, rows.numel(), 4, dtype=idx.dtype, device=idx.device
+            ),
+            mode="sum",
+            per_sample_weights=weights.view(-1),
+        )
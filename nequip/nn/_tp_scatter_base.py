@@ -5,8 +5,12 @@ from e3nn.o3._tensor_product._tensor_product import TensorProduct
 from .utils import scatter
 from .model_modifier_utils import replace_submodules, model_modifier
 
+from typing import Optional
+
 
 class TensorProductScatter(torch.nn.Module):
+    use_segment_reduce: bool
+
     def __init__(
         self,
         feature_irreps_in,
@@ -31,12 +35,57 @@ class TensorProductScatter(torch.nn.Module):
         )
 
         self.model_dtype = torch.get_default_dtype()
+        # whether to use a segment reduction over sorted edges for inference, which is set by `enable_segment_reduce`
+        self.use_segment_reduce = False
 
-    def forward(self, x, edge_attr, edge_weight, edge_dst, edge_src):
+    def forward(
+        self,
+        x,
+        edge_attr,
+        edge_weight,
+        edge_dst,
+        edge_src,
+        edge_dst_ptr: Optional[torch.Tensor] = None,
+    ):
         edge_features = self.tp(x[edge_src], edge_attr, edge_weight)
-        x = scatter(edge_features, edge_dst, dim=0, dim_size=x.size(0))
+        x = scatter(
+            edge_features,
+            edge_dst,
+            dim=0,
+            dim_size=x.size(0),
+            sorted_index=self.use_segment_reduce and not self.training,
+            ptr=edge_dst_ptr,
+        )
         return x
 
+    @model_modifier(
+        persistent=False,
+        private=False,
+        supported_compile_modes=["torchscript"],
+    )
+    @classmethod
+    def enable_segment_reduce(cls, model):
+        """Sum per-edge contributions onto atoms with a deterministic segment reduction over sorted edges instead of ``scatter_add_`` for inference.
+
+        This applies to ``TensorProductScatter`` s and the ``ZBL``, ``LennardJones`` and ``SimpleLennardJones`` pair potentials.
+        The edges must be sorted by their center atoms, e.g. with :class:`~nequip.data.transforms.SortedNeighborListTransform`, which is checked once per graph.
+        CSR row pointers of the sorted edges are computed with a binary search once per graph and shared by all segment reductions of the model, and the edge contributions of each atom are summed with ``torch.segment_reduce``, which avoids atomic additions and gives run-to-run reproducible results.
+
+        Since segment reductions do not support double backward, models in training mode (e.g. for force training) and Hessian computations (:class:`~nequip.nn.HessianOutput` and :meth:`~nequip.ase.NequIPCalculator.get_hessian`) keep using ``scatter_add_``.
+        """
+        from .pair_potential import ZBL, LennardJones, SimpleLennardJones
+
+        for module in model.modules():
+            if isinstance(module, (ZBL, LennardJones, SimpleLennardJones)):
+                module.use_segment_reduce = True
+            elif isinstance(module, cls):
+                if type(module) is not cls:
+                    raise RuntimeError(
+                        f"`enable_segment_reduce` cannot be combined with `{type(module).__name__}`"
+                    )
+                module.use_segment_reduce = True
+        return model
+
     @model_modifier(
         persistent=False,
         private=False,
@@ -99,3 +148,69 @@ class TensorProductScatter(torch.nn.Module):
             return new
 
         return replace_submodules(model, cls, factory)
+
+    @model_modifier(
+        persistent=False,
+        private=False,
+        supported_compile_modes=["torchscript"],
+    )
+    @classmethod
+    def enable_edge_chunking(
+        cls,
+        model,
+        memory_budget_mb: float = 1024.0,
+        chunk_size: Optional[int] = None,
+        recompute: bool = True,
+    ):
+        """Process edges in chunks in ``TensorProductScatter`` s to cap the peak memory of per-edge intermediates for very large systems.
+
+        The number of edges per chunk is chosen for each ``TensorProductScatter`` such that the gathered node features, per-edge weights and tensor product outputs of a chunk (with a factor of two for intermediates of the tensor product and the backward pass) fit into ``memory_budget_mb``.
+        This estimate is approximate, and ``chunk_size`` can be provided instead to set the number of edges per chunk directly.
+        Results are unchanged up to floating point summation order, at the cost of some throughput for small chunks.
+
+        Since the number of chunks depends on the number of edges, this modifier does not support train-time compilation or AOT Inductor compilation.
+
+        Args:
+            memory_budget_mb (float): memory budget for per-edge intermediates of a chunk in MB
+            chunk_size (int): number of edges per chunk (overrides ``memory_budget_mb`` if provided)
+            recompute (bool): whether to recompute the tensor product of each chunk in the backward pass to avoid keeping intermediates of all chunks alive (only for eager models)
+        """
+        from ._tp_scatter_chunked import ChunkedTensorProductScatter
+        from nequip.utils.dtype import torch_default_dtype
+
+        if model.is_compile_graph_model:
+            raise RuntimeError(
+                "`enable_edge_chunking` is incompatible with train-time compilation"
+            )
+
+        def factory(old):
+            if type(old) not in (cls, ChunkedTensorProductScatter):
+                raise RuntimeError(
+                    f"`enable_edge_chunking` cannot be combined with `{type(old).__name__}`"
+                )
+            if chunk_size is not None:
+                num_edges = chunk_size
+            else:
+                itemsize = torch.empty((), dtype=old.model_dtype).element_size()
+                bytes_per_edge = (
+                    2
+                    * itemsize
+                    * (
+                        old.feature_irreps_in.dim
+                        + old.tp.weight_numel
+                        + old.irreps_mid.dim
+                    )
+                )
+                num_edges = max(1, int(memory_budget_mb * 1e6 // bytes_per_edge))
+            with torch_default_dtype(old.model_dtype):
+                new = ChunkedTensorProductScatter(
+                    feature_irreps_in=old.feature_irreps_in,
+                    irreps_edge_attr=old.irreps_edge_attr,
+                    irreps_mid=old.irreps_mid,
+                    instructions=old.instructions,
+                    chunk_size=num_edges,
+                    recompute=recompute,
+                )
+            return new
+
+        return replace_submodules(model, cls, factory)
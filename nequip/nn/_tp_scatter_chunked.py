@@ -0,0 +1,135 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import torch
+
+from ._tp_scatter_base import TensorProductScatter
+from .utils import scatter
+
+from typing import Optional
+
+
+class ChunkedTensorProductScatter(TensorProductScatter):
+    """``TensorProductScatter`` that processes the edges in chunks of ``chunk_size`` to cap the peak memory of per-edge intermediates.
+
+    For each chunk, the source node features are gathered, the tensor product is computed, and the result is accumulated into the output node features, such that only per-edge intermediates of a single chunk are alive at once.
+    If ``recompute`` is ``True``, the tensor product of each chunk is recomputed in the backward pass (e.g. for forces) instead of keeping its intermediates for all chunks alive until then.
+    Recomputation is only available for eager models, and is skipped in TorchScript.
+
+    Args:
+        chunk_size (int): maximum number of edges per chunk
+        recompute (bool): whether to recompute chunks in the backward pass
+    """
+
+    chunk_size: int
+    recompute: bool
+    out_dim: int
+
+    def __init__(
+        self,
+        feature_irreps_in,
+        irreps_edge_attr,
+        irreps_mid,
+        instructions,
+        chunk_size: int,
+        recompute: bool = True,
+    ) -> None:
+        super().__init__(
+            feature_irreps_in=feature_irreps_in,
+            irreps_edge_attr=irreps_edge_attr,
+            irreps_mid=irreps_mid,
+            instructions=instructions,
+        )
+        assert chunk_size > 0
+        self.chunk_size = chunk_size
+        self.recompute = recompute
+        self.out_dim = irreps_mid.dim
+
+    def _tp_chunk(
+        self,
+        x: torch.Tensor,
+        edge_attr: torch.Tensor,
+        edge_weight: torch.Tensor,
+        edge_src: torch.Tensor,
+    ) -> torch.Tensor:
+        return self.tp(x[edge_src], edge_attr, edge_weight)
+
+    @torch.jit.unused
+    def _tp_chunk_recompute(
+        self,
+        x: torch.Tensor,
+        edge_attr: torch.Tensor,
+        edge_weight: torch.Tensor,
+        edge_src: torch.Tensor,
+    ) -> torch.Tensor:
+        return _RecomputeTensorProduct.apply(self, x, edge_attr, edge_weight, edge_src)
+
+    def forward(
+        self,
+        x,
+        edge_attr,
+        edge_weight,
+        edge_dst,
+        edge_src,
+        edge_dst_ptr: Optional[torch.Tensor] = None,
+    ):
+        num_edges = edge_src.size(0)
+        if num_edges <= self.chunk_size:
+            edge_features = self._tp_chunk(x, edge_attr, edge_weight, edge_src)
+            return scatter(edge_features, edge_dst, dim=0, dim_size=x.size(0))
+
+        recompute = (
+            self.recompute and torch.is_grad_enabled() and not torch.jit.is_scripting()
+        )
+        out = torch.zeros((x.size(0), self.out_dim), dtype=x.dtype, device=x.device)
+        for start in range(0, num_edges, self.chunk_size):
+            end = min(start + self.chunk_size, num_edges)
+            if recompute:
+                edge_features = self._tp_chunk_recompute(
+                    x, edge_attr[start:end], edge_weight[start:end], edge_src[start:end]
+                )
+            else:
+                edge_features = self._tp_chunk(
+                    x, edge_attr[start:end], edge_weight[start:end], edge_src[start:end]
+                )
+            # `index_add_` does not save `out` for the backward, so accumulating in-place keeps a single output buffer
+            out = out.index_add_(0, edge_dst[start:end], edge_features.to(out.dtype))
+        return out
+
+
+class _RecomputeTensorProduct(torch.autograd.Function):
+    """Computes the tensor product of a chunk without keeping its intermediates and recomputes it in the backward pass.
+
+    Unlike ``torch.utils.checkpoint``, this is compatible with ``torch.autograd.grad``, double backward (e.g. for force training) and the TorchScript-compiled tensor products of ``e3nn``.
+    """
+
+    @staticmethod
+    def forward(ctx, module, x, edge_attr, edge_weight, edge_src):
+        ctx.module = module
+        ctx.save_for_backward(x, edge_attr, edge_weight, edge_src)
+        with torch.no_grad():
+            return module._tp_chunk(x, edge_attr, edge_weight, edge_src)
+
+    @staticmethod
+    def backward(ctx, grad_out):
+        x, edge_attr, edge_weight, edge_src = ctx.saved_tensors
+        # if the backward is differentiated itself (`create_graph=True`), the recomputation must be connected to the original inputs
+        create_graph = torch.is_grad_enabled()
+        inputs = [x, edge_attr, edge_weight]
+        if not create_graph:
+            inputs = [
+                t.detach().requires_grad_(needs_grad)
+                for t, needs_grad in zip(inputs, ctx.needs_input_grad[1:4])
+            ]
+        with torch.enable_grad():
+            out = ctx.module._tp_chunk(*inputs, edge_src)
+        wrt = [
+            t for t, needs_grad in zip(inputs, ctx.needs_input_grad[1:4]) if needs_grad
+        ]
+        grads = iter(torch.autograd.grad(out, wrt, grad_out, create_graph=create_graph))
+        return (
+            (None,)
+            + tuple(
+                next(grads) if needs_grad else None
+                for needs_grad in ctx.needs_input_grad[1:4]
+            )
+            + (None,)
+        )
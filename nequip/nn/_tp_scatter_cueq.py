@@ -1,7 +1,10 @@
 # This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
 
+import torch
 from ._tp_scatter_base import TensorProductScatter
 
+from typing import Optional
+
 
 def nequip_tp_desc(
     irreps1,
@@ -109,7 +112,15 @@ class CuEquivarianceTensorProductScatter(TensorProductScatter):
             irreps_mid, source=cue.ir_mul, target=cue.mul_ir
         )
 
-    def forward(self, x, edge_attr, edge_weight, edge_dst, edge_src):
+    def forward(
+        self,
+        x,
+        edge_attr,
+        edge_weight,
+        edge_dst,
+        edge_src,
+        edge_dst_ptr: Optional[torch.Tensor] = None,
+    ):
         return self.transpose_out(
             self.tp_conv(
                 [edge_weight, self.transpose_feat(x), edge_attr],
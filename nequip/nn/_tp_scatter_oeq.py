@@ -1,5 +1,8 @@
+import torch
 from ._tp_scatter_base import TensorProductScatter
 
+from typing import Optional
+
 
 class OpenEquivarianceTensorProductScatter(TensorProductScatter):
     def __init__(
@@ -44,7 +47,15 @@ class OpenEquivarianceTensorProductScatter(TensorProductScatter):
             tpp, torch_op=True, deterministic=False, use_opaque=use_opaque
         )
 
-    def forward(self, x, edge_attr, edge_weight, edge_dst, edge_src):
+    def forward(
+        self,
+        x,
+        edge_attr,
+        edge_weight,
+        edge_dst,
+        edge_src,
+        edge_dst_ptr: Optional[torch.Tensor] = None,
+    ):
         # explicit cast to account for AMP
         return self.tp_conv(
             x.to(self.model_dtype),
@@ -2,8 +2,10 @@
 import torch
 
 from nequip.data import AtomicDataDict
-from .graph_model import GraphModel
+from .graph_model import GraphModel, R_MAX_KEY
 from ._graph_mixin import GraphModuleMixin
+from .model_modifier_utils import model_modifier
+from ._shape_padding import pad_to_buckets, strip_padding
 from nequip.utils.dtype import (
     test_model_output_similarity_by_dtype,
     _pt2_compile_error_message,
@@ -114,8 +116,50 @@ class CompileGraphModel(GraphModel):
         # such that parameters and buffers may change between class instantiation and the lazy compilation in the `forward`
         self.weight_names = None
         self.buffer_names = None
+        # fraction of activations the compiled backward may save (`None` uses the `torch.compile` default), set by `enable_activation_checkpointing`
+        self.activation_memory_budget = None
+        # growth factor of the shape buckets that inputs are padded to (`None` disables padding), set by `enable_shape_padding`
+        self.shape_bucket_growth = None
+        self.shape_padding_r_max = None
+        # number of graphs compiled by `torch.compile`, i.e. the initial compilation and any recompilations
+        self.num_compiles = 0
+
+    @model_modifier(persistent=False, private=False)
+    @classmethod
+    def enable_shape_padding(cls, model, bucket_growth: float = 1.25):
+        """Pad the frames, atoms and edges of every input to geometric shape buckets for train-time compiled models.
+
+        Without padding, inputs with fewer than two frames, atoms or edges are evaluated with the uncompiled model, and new shape regimes may trigger recompilations.
+        With padding, every input is padded with dummy frames, atoms and edges up to the next entry of a geometric sequence of bucket sizes (growing by ``bucket_growth``), such that all inputs are evaluated with the compiled model and only a few distinct shapes are ever seen.
+        The dummy atoms are only connected to each other by edges of length ``2 * r_max`` (beyond the cutoff) and belong to dummy frames, such that the outputs for the real frames, atoms and edges are unchanged.
+        This is the same padding as for the shape buckets of AOTInductor models (see ``nequip-compile --shape-bucket-padding``).
+        The padding is stripped from the outputs before they are returned, so it never enters losses or metrics.
+
+        Larger ``bucket_growth`` leads to fewer distinct shapes at the cost of more padding (at most a fraction ``bucket_growth - 1`` of each batch dimension).
+        The number of compilations is available as ``num_compiles`` of the model, and is logged whenever the model is (re)compiled.
+
+        Args:
+            bucket_growth (float): growth factor between consecutive shape buckets, must be larger than ``1``
+        """
+        if bucket_growth <= 1.0:
+            raise ValueError(
+                f"`bucket_growth` must be larger than 1, but found {bucket_growth}"
+            )
+        model.shape_bucket_growth = bucket_growth
+        model.shape_padding_r_max = float(model.metadata[R_MAX_KEY])
+        return model
 
     def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
+        # === pad to shape buckets ===
+        sizes = None
+        model_data = data
+        if self.shape_bucket_growth is not None:
+            model_data, sizes = pad_to_buckets(
+                {k: data[k] for k in self.model_input_fields if k in data},
+                self.shape_bucket_growth,
+                self.shape_padding_r_max,
+            )
+
         # short-circuit if one of the batch dims is 1 (0 would be an error)
         # this is related to the 0/1 specialization problem
         # see https://docs.google.com/document/d/16VPOa3d-Liikf48teAOmxLc92rgvJdfosIy-yoT38Io/edit?fbclid=IwAR3HNwmmexcitV0pbZm_x1a4ykdXZ9th_eJWK-3hBtVgKnrkmemz6Pm5jRQ&tab=t.0#heading=h.ez923tomjvyk
@@ -123,7 +167,8 @@ class CompileGraphModel(GraphModel):
         # the models compiled for more batch_size > 1 data cannot be used for batch_size=1 data
         # (under specific cases related to the `PerTypeScaleShift` module)
         # for now we just make sure to always use the eager model when the data has any batch dims of 1
-        if (
+        # padded inputs always have batch dims of at least 2
+        if sizes is None and (
             AtomicDataDict.num_nodes(data) < 2
             or AtomicDataDict.num_frames(data) < 2
             or AtomicDataDict.num_edges(data) < 2
@@ -142,7 +187,9 @@ class CompileGraphModel(GraphModel):
             # use intersection of data keys and GraphModel input/outputs, which assumes
             # - correctness of irreps registration system
             # - all input `data` batches have the same keys, and contain all necessary inputs and reference labels (outputs)
-            self.input_fields = sorted(list(data.keys() & self.model_input_fields))
+            self.input_fields = sorted(
+                list(model_data.keys() & self.model_input_fields)
+            )
             # `output_fields` relies on the fact that `data` contains the necessary output keys
             # e.g. `total_energy`, `forces`, `stress`
             self.output_fields = sorted(
@@ -160,7 +207,7 @@ class CompileGraphModel(GraphModel):
             weights, buffers = self._get_weights_buffers()
             fx_model = nequip_make_fx(
                 model=model_to_trace,
-                data=data,
+                data=model_data,
                 fields=self.input_fields,
                 extra_inputs=weights + buffers,
             )
@@ -183,23 +230,46 @@ class CompileGraphModel(GraphModel):
             test_model_output_similarity_by_dtype(
                 self._compiled_forward,
                 self.model,
-                {k: data[k] for k in self.input_fields},
+                {k: model_data[k] for k in self.input_fields},
                 dtype_to_name(self.model_dtype),
                 fields=self.output_fields,
                 error_message=_pt2_compile_error_message,
             )
 
         # === run compiled model ===
-        out_dict = self._compiled_forward(data)
+        out_dict = self._compiled_forward(model_data)
+        if sizes is not None:
+            out_dict = strip_padding(out_dict, *sizes, batched=True)
         to_return = data.copy()
         to_return.update(out_dict)
         return to_return
 
     def _compiled_forward(self, data):
         # run compiled model with data
+        from torch._dynamo.utils import counters
+
         weights, buffers = self._get_weights_buffers()
         data_list = _list_from_dict(self.input_fields, data)
-        out_list = self._compiled_model[0](*(data_list + weights + buffers))
+        num_graphs = counters["stats"]["unique_graphs"]
+        if self.activation_memory_budget is None:
+            out_list = self._compiled_model[0](*(data_list + weights + buffers))
+        else:
+            from torch._functorch import config as functorch_config
+
+            # the partitioner reads the budget when the model is (re)compiled, which happens within the call
+            with functorch_config.patch(
+                activation_memory_budget=self.activation_memory_budget
+            ):
+                out_list = self._compiled_model[0](*(data_list + weights + buffers))
+        # dynamo counts every graph it compiles, so new graphs during this call are (re)compilations of this model
+        num_new_graphs = counters["stats"]["unique_graphs"] - num_graphs
+        if num_new_graphs > 0:
+            from nequip.utils.logger import RankedLogger
+
+            self.num_compiles += num_new_graphs
+            RankedLogger(__name__, rank_zero_only=True).info(
+                f"`CompileGraphModel` compiled for {AtomicDataDict.num_frames(data)} frames, {AtomicDataDict.num_nodes(data)} atoms and {AtomicDataDict.num_edges(data)} edges ({self.num_compiles} compilations so far)"
+            )
         out_dict = _list_to_dict(self.output_fields, out_list)
         return out_dict
 
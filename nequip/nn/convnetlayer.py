@@ -8,11 +8,12 @@ from e3nn.nn._normact import NormActivation
 from nequip.data import AtomicDataDict
 from ._graph_mixin import GraphModuleMixin
 from .interaction_block import InteractionBlock
+from .model_modifier_utils import model_modifier
 from .nonlinearities import shifted_softplus
 from .utils import tp_path_exists
 
 
-from typing import Dict, Callable
+from typing import Dict, Callable, List, Optional
 
 
 acts = {
@@ -30,6 +31,7 @@ class ConvNetLayer(GraphModuleMixin, torch.nn.Module):
     """
 
     resnet: bool
+    checkpoint: bool
 
     def __init__(
         self,
@@ -149,7 +151,61 @@ class ConvNetLayer(GraphModuleMixin, torch.nn.Module):
             self.equivariant_nonlin.irreps_out
         )
 
+        # whether to recompute the layer in the backward pass, which is set by `enable_activation_checkpointing`
+        self.checkpoint = False
+
+    @model_modifier(persistent=False, private=False)
+    @classmethod
+    def enable_activation_checkpointing(
+        cls,
+        model,
+        layers: Optional[List[int]] = None,
+        activation_memory_budget: float = 0.5,
+    ):
+        """Recompute the intermediates of ``ConvNetLayer`` s in the backward pass instead of keeping them alive, trading compute for training memory.
+
+        Only the inputs of each checkpointed layer are kept after the forward pass, and the layer is recomputed when its gradients are needed (including the double backward of force training).
+        Checkpointing all layers typically costs one extra forward pass of the convnet layers per training step.
+
+        With train-time compilation, the per-layer policy is not used, and ``activation_memory_budget`` is instead passed to the partitioner of ``torch.compile``, which chooses what to recompute for the whole model.
+
+        Args:
+            layers (List[int]): indices of the ``ConvNetLayer`` s to checkpoint, in the order in which they appear in the model and with negative indices counting from the end (defaults to all layers)
+            activation_memory_budget (float): fraction of the saved activations that compiled models may keep, between ``0`` (recompute as much as possible) and ``1`` (no recomputation)
+        """
+        if model.is_compile_graph_model:
+            if not 0.0 <= activation_memory_budget <= 1.0:
+                raise ValueError(
+                    f"`activation_memory_budget` must be between 0 and 1, but found {activation_memory_budget}"
+                )
+            model.activation_memory_budget = activation_memory_budget
+            return model
+
+        conv_layers = [m for m in model.modules() if isinstance(m, cls)]
+        if layers is None:
+            layers = list(range(len(conv_layers)))
+        for idx in layers:
+            if not -len(conv_layers) <= idx < len(conv_layers):
+                raise ValueError(
+                    f"`enable_activation_checkpointing` got layer index {idx}, but the model only has {len(conv_layers)} `ConvNetLayer`s"
+                )
+        layers = [idx % len(conv_layers) for idx in layers]
+        for idx, layer in enumerate(conv_layers):
+            layer.checkpoint = idx in layers
+        return model
+
+    @torch.jit.unused
+    def _checkpoint_forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
+        from ._checkpoint import checkpoint_graph_module
+
+        return checkpoint_graph_module(self, data)
+
     def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
+        if self.checkpoint and torch.is_grad_enabled() and not torch.jit.is_scripting():
+            return self._checkpoint_forward(data)
+        return self._forward(data)
+
+    def _forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
         # save old features for resnet
         old_x = data[AtomicDataDict.NODE_FEATURES_KEY]
         # run convolution
@@ -0,0 +1,173 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import torch
+
+from e3nn.util.jit import compile_mode
+
+from nequip.data import AtomicDataDict
+from ._graph_mixin import GraphModuleMixin, SequentialGraphNetwork
+from .graph_model import (
+    GraphModel,
+    R_MAX_KEY,
+    PER_EDGE_TYPE_CUTOFF_KEY,
+    TYPE_NAMES_KEY,
+    MODEL_DTYPE_KEY,
+)
+from .grad_output import ForceStressOutput
+from .embedding import SphericalHarmonicEdgeAttrs
+from .utils import with_edge_vectors_
+
+from typing import Dict, List
+
+
+# metadata that must agree between the members of an ensemble, since they share their inputs
+_ENSEMBLE_METADATA_KEYS = [
+    R_MAX_KEY,
+    PER_EDGE_TYPE_CUTOFF_KEY,
+    TYPE_NAMES_KEY,
+    MODEL_DTYPE_KEY,
+]
+
+
+class _SharedEdgeAttrs(GraphModuleMixin, torch.nn.Module):
+    """Placeholder for a ``SphericalHarmonicEdgeAttrs`` of an ensemble member, whose output is computed once for all members by the ``EnsembleGraphModel``."""
+
+    def __init__(self, module: SphericalHarmonicEdgeAttrs) -> None:
+        super().__init__()
+        self._init_irreps(irreps_in=module.irreps_in, irreps_out=module.irreps_out)
+
+    def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
+        return data
+
+
+def _edge_attrs_config(module: SphericalHarmonicEdgeAttrs):
+    return (
+        module.out_field,
+        str(module.irreps_edge_sh),
+        module.sh.normalize,
+        module.sh.normalization,
+    )
+
+
+@compile_mode("unsupported")
+class EnsembleGraphModel(GraphModuleMixin, torch.nn.Module):
+    """Evaluate an ensemble of compatible energy models on shared inputs, e.g. for uncertainty quantification in active learning.
+
+    Instead of calling each model separately, the neighborlist, the edge vectors and lengths, and (if all members use the same ones) the spherical harmonic edge attributes are computed once and shared by all members.
+    The energy models (i.e. the models wrapped by the ``ForceStressOutput`` of each member) are then evaluated one after the other on the shared inputs, and the forces of each member are computed from its energy with a backward pass through the shared edge vectors.
+
+    The outputs are the ensemble means of the per-atom energies (``AtomicDataDict.PER_ATOM_ENERGY_KEY``), total energies (``AtomicDataDict.TOTAL_ENERGY_KEY``) and forces (``AtomicDataDict.FORCE_KEY``), together with the ensemble variances of the total energies (``AtomicDataDict.TOTAL_ENERGY_VARIANCE_KEY``) and of the force components (``AtomicDataDict.FORCE_VARIANCE_KEY``).
+    Stresses are not computed.
+
+    The members must be uncompiled ``GraphModel`` s (e.g. loaded from checkpoint or package files) with a ``ForceStressOutput``, and must agree in ``r_max``, per-edge-type cutoffs, type names and model dtype.
+    Their ``SphericalHarmonicEdgeAttrs`` are replaced in-place by placeholders if they are shared.
+    This model is only meant for inference.
+
+    Args:
+        models (List[GraphModel]): ensemble members
+    """
+
+    def __init__(self, models: List[GraphModel]) -> None:
+        super().__init__()
+        if len(models) == 0:
+            raise ValueError("`EnsembleGraphModel` requires at least one model")
+
+        # === check compatibility ===
+        metadata = models[0].metadata
+        for idx, model in enumerate(models):
+            if not isinstance(model, GraphModel) or model.is_compile_graph_model:
+                raise TypeError(
+                    f"ensemble member {idx} must be an uncompiled `GraphModel`, but found `{type(model).__name__}`"
+                )
+            if not isinstance(model.model, ForceStressOutput):
+                raise TypeError(
+                    f"ensemble member {idx} must wrap its energy model in a `ForceStressOutput`"
+                )
+            for key in _ENSEMBLE_METADATA_KEYS:
+                if model.metadata.get(key, None) != metadata.get(key, None):
+                    raise ValueError(
+                        f"ensemble member {idx} has a different `{key}` ({model.metadata.get(key, None)}) than member 0 ({metadata.get(key, None)})"
+                    )
+        self._metadata = metadata
+        self.type_names = models[0].type_names
+        self.model_dtype = models[0].model_dtype
+        self.model_input_fields = models[0].model_input_fields
+
+        # === share spherical harmonic edge attributes if they are the same for all members ===
+        edge_attrs = [
+            [
+                (seq, name, module)
+                for seq in model.modules()
+                if isinstance(seq, SequentialGraphNetwork)
+                for name, module in seq.named_children()
+                if isinstance(module, SphericalHarmonicEdgeAttrs)
+            ]
+            for model in models
+        ]
+        self.edge_attrs = None
+        if all(len(found) == 1 for found in edge_attrs) and (
+            len({_edge_attrs_config(found[0][2]) for found in edge_attrs}) == 1
+        ):
+            self.edge_attrs = edge_attrs[0][0][2]
+            for [(seq, name, module)] in edge_attrs:
+                seq._modules[name] = _SharedEdgeAttrs(module)
+
+        self.energy_models = torch.nn.ModuleList([model.model.func for model in models])
+        self._init_irreps(
+            irreps_in=models[0].irreps_in,
+            irreps_out={
+                AtomicDataDict.PER_ATOM_ENERGY_KEY: "0e",
+                AtomicDataDict.TOTAL_ENERGY_KEY: "0e",
+                AtomicDataDict.FORCE_KEY: "1o",
+                AtomicDataDict.TOTAL_ENERGY_VARIANCE_KEY: "0e",
+                AtomicDataDict.FORCE_VARIANCE_KEY: None,
+            },
+        )
+
+    @property
+    def num_models(self) -> int:
+        return len(self.energy_models)
+
+    @property
+    def metadata(self) -> Dict[str, str]:
+        """Metadata shared by the ensemble members, see ``GraphModel.metadata``."""
+        return self._metadata.copy()
+
+    def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
+        # as in `GraphModel`, restrict the input data to the allowed keys
+        data = {k: data[k] for k in self.model_input_fields if k in data}
+
+        # === shared inputs ===
+        pos = data[AtomicDataDict.POSITIONS_KEY]
+        did_pos_req_grad = pos.requires_grad
+        pos.requires_grad_(True)
+        data = with_edge_vectors_(data, with_lengths=True)
+        if self.edge_attrs is not None:
+            data = self.edge_attrs(data)
+
+        # === evaluate members ===
+        # the outputs of the members are kept in the same order as `self.energy_models`
+        per_atom_energies, energies = [], []
+        for energy_model in self.energy_models:
+            out = energy_model(data.copy())
+            per_atom_energies.append(out[AtomicDataDict.PER_ATOM_ENERGY_KEY])
+            energies.append(out[AtomicDataDict.TOTAL_ENERGY_KEY])
+        forces = []
+        for idx, energy in enumerate(energies):
+            (grad,) = torch.autograd.grad(
+                [energy.sum()], [pos], retain_graph=idx < len(energies) - 1
+            )
+            forces.append(torch.neg(grad))
+        if not did_pos_req_grad:
+            pos.requires_grad_(False)
+
+        # === ensemble statistics ===
+        per_atom_energies = torch.stack(per_atom_energies).detach()
+        energies = torch.stack(energies).detach()
+        forces = torch.stack(forces)
+        out = data
+        out[AtomicDataDict.PER_ATOM_ENERGY_KEY] = per_atom_energies.mean(0)
+        out[AtomicDataDict.TOTAL_ENERGY_KEY] = energies.mean(0)
+        out[AtomicDataDict.FORCE_KEY] = forces.mean(0)
+        out[AtomicDataDict.TOTAL_ENERGY_VARIANCE_KEY] = energies.var(0, correction=0)
+        out[AtomicDataDict.FORCE_VARIANCE_KEY] = forces.var(0, correction=0)
+        return out
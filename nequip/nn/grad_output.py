@@ -8,6 +8,9 @@ from e3nn.util.jit import compile_mode
 from nequip.data import AtomicDataDict
 from ._graph_mixin import GraphModuleMixin
 from .model_modifier_utils import model_modifier, replace_submodules
+from .utils import scatter, with_edge_vectors_, without_segment_reduce
+
+from typing import Optional
 
 
 @compile_mode("unsupported")
@@ -72,6 +75,202 @@ class PartialForceOutput(GraphModuleMixin, torch.nn.Module):
         return out_data
 
 
+@compile_mode("script")
+class EdgePartialForceOutput(GraphModuleMixin, torch.nn.Module):
+    r"""Generate sparse per-edge partial forces and total forces from an energy model with a single backward pass.
+
+    The energy is differentiated w.r.t. the edge vectors :math:`\vec{r}_{ij} = \vec{r}_j - \vec{r}_i` (with ``i = edge_index[0]`` and ``j = edge_index[1]``), and the edge partial forces :math:`-\partial E / \partial \vec{r}_{ij}` are stored under ``AtomicDataDict.EDGE_PARTIAL_FORCE_KEY`` with shape ``[n_edges, 3]``, i.e. in COO format with indices ``edge_index``.
+    Unlike :class:`PartialForceOutput`, this takes ``O(n_edges)`` memory and a single backward pass.
+
+    If the per-atom energy :math:`E_i` only depends on the edges centered at atom ``i`` (e.g. for strictly local models or message passing models with a single layer), the edge partial forces are exactly the partial forces :math:`-\partial E_i / \partial \vec{r}_j` of :class:`PartialForceOutput`, which can be reconstructed with :func:`edge_partial_forces_to_dense`.
+    For message passing models with several layers, they are a partition of the total energy gradient over edges instead, and the total forces remain exact.
+
+    Args:
+        func: the energy model to wrap
+    """
+
+    def __init__(self, func: GraphModuleMixin):
+        super().__init__()
+        self.func = func
+
+        # check and init irreps
+        self._init_irreps(
+            irreps_in=self.func.irreps_in.copy(),
+            irreps_out=self.func.irreps_out.copy(),
+        )
+        self.irreps_out[AtomicDataDict.EDGE_PARTIAL_FORCE_KEY] = "1o"
+        self.irreps_out[AtomicDataDict.FORCE_KEY] = "1o"
+
+    def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
+        # the edge vectors are the leaves of the differentiation, so the energy model must not recompute them from the positions
+        data = with_edge_vectors_(data, with_lengths=False)
+        edge_vectors = data[AtomicDataDict.EDGE_VECTORS_KEY].detach()
+        edge_vectors.requires_grad_(True)
+        data[AtomicDataDict.EDGE_VECTORS_KEY] = edge_vectors
+
+        data = self.func(data)
+        grad = torch.autograd.grad(
+            [data[AtomicDataDict.TOTAL_ENERGY_KEY].sum()],
+            [edge_vectors],
+            create_graph=self.training,  # needed to allow gradients of this output during training
+        )[0]
+        # assert needed for TorchScript
+        assert grad is not None
+        edge_partial_forces = torch.neg(grad)
+        data[AtomicDataDict.EDGE_PARTIAL_FORCE_KEY] = edge_partial_forces
+
+        # F_k = sum_{edges (i, k)} f_ik - sum_{edges (k, j)} f_kj
+        edge_index = data[AtomicDataDict.EDGE_INDEX_KEY]
+        num_nodes = AtomicDataDict.num_nodes(data)
+        data[AtomicDataDict.FORCE_KEY] = scatter(
+            edge_partial_forces, edge_index[1], dim=0, dim_size=num_nodes
+        ) - scatter(edge_partial_forces, edge_index[0], dim=0, dim_size=num_nodes)
+        return data
+
+
+@compile_mode("unsupported")
+class HessianOutput(GraphModuleMixin, torch.nn.Module):
+    r"""Compute the Hessian of the energy w.r.t. the positions (i.e. force constants) and forces from an energy model.
+
+    The Hessian is computed row by row as Hessian-vector products with unit vectors, i.e. backward passes through the force computation, after a single forward pass.
+    If ``vectorize`` is ``True``, ``chunk_size`` rows are computed at once with a single batched backward pass (``torch.autograd.grad`` with ``is_grads_batched=True``, which uses ``torch.vmap``), such that ``chunk_size`` trades memory for speed.
+    By default, batching is used on GPUs, while rows are computed one at a time on CPUs, where the ``vmap`` fallbacks of indexing operations make batching slower.
+    The Hessian is stored under ``AtomicDataDict.HESSIAN_KEY`` with shape ``[n_atoms, 3, n_atoms, 3]`` in units of energy / length^2.
+    This module is intended for inference, and its outputs are not differentiable.
+    Since the Hessian needs the double backward of the energy model, segment reductions enabled by ``enable_segment_reduce`` are replaced by ``scatter_add_`` in its forward.
+
+    If ``acoustic_sum_rule`` is ``True``, the translational invariance sum rule :math:`\sum_j H_{ij} = 0` is imposed by setting the diagonal blocks to :math:`H_{ii} = -\sum_{j \neq i} H_{ij}`, which removes the numerical error of the acoustic modes at the Gamma point.
+
+    Args:
+        func: the energy model
+        chunk_size (int): number of Hessian rows per batched backward pass (default ``64``)
+        vectorize (bool): whether to batch the backward passes of each chunk with ``torch.vmap`` (default: ``True`` on GPUs, ``False`` otherwise)
+        acoustic_sum_rule (bool): whether to impose the translational invariance sum rule (default ``False``)
+    """
+
+    def __init__(
+        self,
+        func: GraphModuleMixin,
+        chunk_size: int = 64,
+        vectorize: Optional[bool] = None,
+        acoustic_sum_rule: bool = False,
+    ):
+        super().__init__()
+        assert chunk_size > 0
+        self.func = func
+        self.chunk_size = chunk_size
+        self.vectorize = vectorize
+        self.acoustic_sum_rule = acoustic_sum_rule
+
+        # check and init irreps
+        self._init_irreps(
+            irreps_in=self.func.irreps_in.copy(),
+            irreps_out=self.func.irreps_out.copy(),
+        )
+        self.irreps_out[AtomicDataDict.FORCE_KEY] = "1o"
+        self.irreps_out[AtomicDataDict.HESSIAN_KEY] = None
+
+    def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
+        data = data.copy()
+        pos = data[AtomicDataDict.POSITIONS_KEY].detach().requires_grad_(True)
+        data[AtomicDataDict.POSITIONS_KEY] = pos
+        with without_segment_reduce(self.func):
+            data = self.func(data)
+
+        # the Hessian rows are derivatives of the energy gradient, so its graph is always needed
+        (energy_grad,) = torch.autograd.grad(
+            [data[AtomicDataDict.TOTAL_ENERGY_KEY].sum()], [pos], create_graph=True
+        )
+        data[AtomicDataDict.HESSIAN_KEY] = _compute_hessian(
+            energy_grad,
+            pos,
+            chunk_size=self.chunk_size,
+            vectorize=self.vectorize,
+            acoustic_sum_rule=self.acoustic_sum_rule,
+        )
+        data[AtomicDataDict.FORCE_KEY] = torch.neg(energy_grad.detach())
+        return data
+
+
+def _compute_hessian(
+    energy_grad: torch.Tensor,
+    pos: torch.Tensor,
+    chunk_size: int,
+    vectorize: Optional[bool] = None,
+    acoustic_sum_rule: bool = False,
+    atom_indices: Optional[torch.Tensor] = None,
+) -> torch.Tensor:
+    """Compute the Hessian from the energy gradient ``energy_grad`` (computed with ``create_graph=True``) w.r.t. ``pos``, see :class:`HessianOutput`.
+
+    If ``atom_indices`` is provided, only the ``[len(atom_indices), 3, n_atoms, 3]`` rows of these atoms are computed, otherwise the full ``[n_atoms, 3, n_atoms, 3]`` Hessian.
+    """
+    if vectorize is None:
+        vectorize = pos.device.type == "cuda"
+    num_atoms = pos.size(0)
+    num_dof = pos.numel()
+    if atom_indices is None:
+        atom_indices = torch.arange(num_atoms, device=pos.device)
+    row_dofs = (3 * atom_indices.view(-1, 1) + torch.arange(3, device=pos.device)).view(
+        -1
+    )
+    flat_grad = energy_grad.view(-1)
+    hessian = pos.new_empty((row_dofs.numel(), num_dof))
+    for start in range(0, row_dofs.numel(), chunk_size):
+        end = min(start + chunk_size, row_dofs.numel())
+        if vectorize:
+            # unit vectors selecting the rows of the chunk
+            vectors = pos.new_zeros((end - start, num_dof))
+            vectors[
+                torch.arange(end - start, device=pos.device), row_dofs[start:end]
+            ] = 1.0
+            (rows,) = torch.autograd.grad(
+                [energy_grad],
+                [pos],
+                grad_outputs=[vectors.view((end - start,) + pos.shape)],
+                retain_graph=True,
+                is_grads_batched=True,
+            )
+            hessian[start:end] = rows.view(end - start, num_dof)
+        else:
+            for row in range(start, end):
+                hessian[row] = torch.autograd.grad(
+                    [flat_grad[row_dofs[row]]],
+                    [pos],
+                    retain_graph=True,
+                )[0].view(-1)
+    hessian = hessian.view(-1, 3, num_atoms, 3)
+
+    if acoustic_sum_rule:
+        # H_ii = -sum_{j != i} H_ij = H_ii - sum_j H_ij
+        rows = torch.arange(atom_indices.numel(), device=pos.device)
+        hessian[rows, :, atom_indices, :] -= hessian.sum(dim=2)
+    return hessian
+
+
+def edge_partial_forces_to_dense(
+    edge_partial_forces: torch.Tensor, edge_index: torch.Tensor, num_nodes: int
+) -> torch.Tensor:
+    """Reconstruct dense ``[num_nodes, num_nodes, 3]`` partial forces from the edge partial forces of :class:`EdgePartialForceOutput`.
+
+    The result follows the convention of :class:`PartialForceOutput`, where entry ``[i, j]`` is the force on atom ``j`` due to the per-atom energy of atom ``i``.
+    Since this takes ``O(num_nodes^2)`` memory, it is intended for validation on small systems.
+
+    Args:
+        edge_partial_forces (torch.Tensor): ``[n_edges, 3]`` edge partial forces
+        edge_index (torch.Tensor): ``[2, n_edges]`` edge index
+        num_nodes (int): number of atoms
+
+    Returns:
+        torch.Tensor: ``[num_nodes, num_nodes, 3]`` dense partial forces
+    """
+    center, neighbor = edge_index[0], edge_index[1]
+    dense = edge_partial_forces.new_zeros((num_nodes * num_nodes, 3))
+    # the edge vector r_ij = r_j - r_i enters with a positive sign for the neighbor and a negative sign for the center
+    dense.index_add_(0, center * num_nodes + neighbor, edge_partial_forces)
+    dense.index_add_(0, center * num_nodes + center, -edge_partial_forces)
+    return dense.view(num_nodes, num_nodes, 3)
+
+
 @compile_mode("script")
 class ForceStressOutput(GraphModuleMixin, torch.nn.Module):
     r"""Compute forces (and stress if cell is provided) using autograd of an energy model.
@@ -80,16 +279,25 @@ class ForceStressOutput(GraphModuleMixin, torch.nn.Module):
         Knuth et. al. Comput. Phys. Commun 190, 33-50, 2015
         https://pure.mpg.de/rest/items/item_2085135_9/component/file_2156800/content
 
+    The set of computed outputs can be selected at runtime (also for TorchScript models) by setting ``compute_forces`` and ``compute_stress``, see :func:`set_force_stress_outputs`.
+    If ``compute_stress`` is ``False``, only the forces are computed and the strain derivative graph is not built.
+    If ``compute_forces`` is ``False``, only the energy is computed, as with ``do_derivatives=False``.
+
     Args:
         func: the energy model to wrap
     """
 
     do_derivatives: bool
+    compute_forces: bool
+    compute_stress: bool
 
     def __init__(self, func: GraphModuleMixin, do_derivatives: bool = True):
         super().__init__()
         self.func = func
         self.do_derivatives = do_derivatives
+        # runtime output selection, not part of the model's saved state
+        self.compute_forces = True
+        self.compute_stress = True
 
         # check and init irreps
         self._init_irreps(
@@ -106,7 +314,7 @@ class ForceStressOutput(GraphModuleMixin, torch.nn.Module):
 
     def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
         # short-circuit
-        if not self.do_derivatives:
+        if not (self.do_derivatives and self.compute_forces):
             return self.func(data)
 
         # === LOGIC BRANCHING NOTES ===
@@ -116,7 +324,25 @@ class ForceStressOutput(GraphModuleMixin, torch.nn.Module):
 
         # NOTE: if edge vectors are not present, we assume that it is for non-batched inference with no cell
         # at the point of making this change, it is specifically for LAMMPS-MLIAP compatibility
-        if AtomicDataDict.EDGE_VECTORS_KEY not in data:
+        if AtomicDataDict.EDGE_VECTORS_KEY not in data and not self.compute_stress:
+            # forces-only fast path: no displacement, so no strain derivatives are built
+            pos = data[AtomicDataDict.POSITIONS_KEY]
+            did_pos_req_grad: bool = pos.requires_grad
+            pos.requires_grad_(True)
+            data = self.func(data)
+            forces = torch.autograd.grad(
+                [data[AtomicDataDict.TOTAL_ENERGY_KEY].sum()],
+                [pos],
+                create_graph=self.training,  # needed to allow gradients of this output during training
+            )[0]
+            # assert needed for TorchScript
+            assert forces is not None
+            data[AtomicDataDict.FORCE_KEY] = torch.neg(forces)
+            if not did_pos_req_grad:
+                # don't give later modules one that does
+                pos.requires_grad_(False)
+
+        elif AtomicDataDict.EDGE_VECTORS_KEY not in data:
             if AtomicDataDict.BATCH_KEY in data:
                 batch = data[AtomicDataDict.BATCH_KEY]
                 num_batch: int = AtomicDataDict.num_frames(data)
@@ -318,3 +544,76 @@ class ForceStressOutput(GraphModuleMixin, torch.nn.Module):
             return new
 
         return replace_submodules(model, cls, factory)
+
+    @model_modifier(persistent=False, private=False)
+    @classmethod
+    def enable_EdgePartialForceOutput(cls, model):
+        """Replace force and stress computation with sparse edge partial forces (see :class:`EdgePartialForceOutput`), e.g. for heat flux calculations."""
+
+        def factory(old):
+            return EdgePartialForceOutput(func=old.func)
+
+        return replace_submodules(model, cls, factory)
+
+    @model_modifier(persistent=False, private=False)
+    @classmethod
+    def enable_HessianOutput(
+        cls, model, chunk_size: int = 64, acoustic_sum_rule: bool = False
+    ):
+        """Replace force and stress computation with Hessian and force computation (see :class:`HessianOutput`), e.g. for phonon calculations.
+
+        Args:
+            chunk_size (int): number of Hessian rows per batched backward pass (default ``64``)
+            acoustic_sum_rule (bool): whether to impose the translational invariance sum rule (default ``False``)
+        """
+
+        def factory(old):
+            return HessianOutput(
+                func=old.func,
+                chunk_size=chunk_size,
+                acoustic_sum_rule=acoustic_sum_rule,
+            )
+
+        return replace_submodules(model, cls, factory)
+
+    @model_modifier(persistent=False, private=False)
+    @classmethod
+    def select_ForceStressOutput(cls, model, forces: bool = True, stress: bool = True):
+        """Select whether forces and stress are computed, e.g. to skip the stress derivatives when training without stress labels.
+
+        Unlike :meth:`disable_ForceStressOutput`, this is a runtime setting that is not saved with the model, and can be changed later with :func:`set_force_stress_outputs`.
+
+        Args:
+            forces (bool): whether to compute forces (default ``True``)
+            stress (bool): whether to compute stress and virial, requires ``forces=True`` (default ``True``)
+        """
+        set_force_stress_outputs(model, forces=forces, stress=stress)
+        return model
+
+
+def set_force_stress_outputs(
+    model: torch.nn.Module, forces: bool = True, stress: bool = True
+) -> int:
+    """Select at runtime which derivatives the ``ForceStressOutput`` modules of ``model`` compute.
+
+    This works for eager and TorchScript models, and is cheap enough to be called before every model call.
+    It has no effect on AOTInductor models, whose outputs are fixed at compile time (see the ``ase_forces`` compile target).
+
+    Args:
+        model (torch.nn.Module): model containing ``ForceStressOutput`` modules
+        forces (bool): whether to compute forces (default ``True``)
+        stress (bool): whether to compute stress and virial, requires ``forces=True`` (default ``True``)
+
+    Returns:
+        int: number of ``ForceStressOutput`` modules configured
+    """
+    if stress and not forces:
+        raise ValueError("computing stress requires computing forces")
+    count = 0
+    for module in model.modules():
+        # duck-typed such that TorchScript modules are also covered
+        if hasattr(module, "compute_forces") and hasattr(module, "compute_stress"):
+            module.compute_forces = forces
+            module.compute_stress = stress
+            count += 1
+    return count
@@ -3,6 +3,7 @@ import torch
 
 from nequip.data import AtomicDataDict
 from ._graph_mixin import GraphModuleMixin
+from .model_modifier_utils import model_modifier
 
 from typing import List, Dict, Any, Optional, Final
 
@@ -142,3 +143,172 @@ class GraphModel(GraphModuleMixin, torch.nn.Module):
             if k in data:
                 new_data[k] = data[k]
         return self.model(new_data)
+
+    @model_modifier(persistent=False, private=False)
+    @classmethod
+    def enable_mixed_precision(
+        cls,
+        model,
+        compute_dtype: str = "bfloat16",
+        modules: List[str] = [
+            "BesselEdgeLengthEncoding",
+            "ScalarMLPFunction",
+            "TensorProductScatter",
+        ],
+    ):
+        """Run selected modules of the model in a reduced precision ``compute_dtype`` for faster inference.
+
+        ``modules`` are the class names of the modules to run in ``compute_dtype``, which by default are the edge length embeddings, the MLPs (e.g. the radial MLPs) and the tensor products.
+        Their parameters and buffers are cast to ``compute_dtype``, their floating point inputs are cast to ``compute_dtype`` (except for geometric fields such as positions and edge vectors), and their outputs are cast back to the ``model_dtype``.
+        The per-edge tensor products of ``TensorProductScatter`` s are computed in ``compute_dtype``, but their accumulation onto the nodes, the per-atom and total energies, and the forces and stresses stay in the ``model_dtype``.
+        Modules that accumulate into nodes or frames (e.g. ``ConvNetLayer``, ``AtomwiseReduce`` or ``PerTypeScaleShift``) or compute derivatives (e.g. ``ForceStressOutput``) cannot be selected.
+
+        Every selected module is checked against the original module on random inputs, with the ``floating_point_tolerance`` of ``compute_dtype`` (which can be set with the ``NEQUIP_BFLOAT16_MODEL_TOL`` and ``NEQUIP_FLOAT16_MODEL_TOL`` environment variables) relative to the magnitude of the outputs.
+        The modules that can be checked, and thus selected, are ``BesselEdgeLengthEncoding``, ``ScalarMLPFunction``, ``TensorProductScatter`` and ``e3nn`` ``Linear``.
+
+        This modifier is only meant for inference, since the parameters of the selected modules are cast to ``compute_dtype``.
+        The speedup depends on hardware support for ``compute_dtype`` (e.g. AVX512-BF16 or AMX on CPUs).
+
+        Args:
+            compute_dtype (str): ``bfloat16`` (default) or ``float16``
+            modules (List[str]): class names of the modules to run in ``compute_dtype``
+        """
+        import copy
+        import itertools
+        from e3nn.o3._linear import Linear
+        from ._mixed_precision import (
+            MixedPrecisionGraphModule,
+            MixedPrecisionModule,
+            MixedPrecisionTensorProductScatter,
+            _COMPUTE_DTYPES,
+        )
+        from ._graph_mixin import SequentialGraphNetwork
+        from ._tp_scatter_base import TensorProductScatter
+        from .atomwise import AtomwiseReduce, PerTypeScaleShift
+        from .mlp import ScalarMLPFunction
+        from .embedding import BesselEdgeLengthEncoding
+        from .grad_output import (
+            ForceStressOutput,
+            PartialForceOutput,
+            EdgePartialForceOutput,
+            HessianOutput,
+        )
+        from nequip.utils.dtype import floating_point_tolerance, torch_default_dtype
+
+        if compute_dtype not in _COMPUTE_DTYPES:
+            raise ValueError(
+                f"Unknown compute_dtype '{compute_dtype}'. Available options: {list(_COMPUTE_DTYPES.keys())}"
+            )
+        tol = floating_point_tolerance(compute_dtype)
+        compute_dtype = _COMPUTE_DTYPES[compute_dtype]
+        model_dtype = model.model_dtype
+        # modules that must stay in the model dtype, i.e. accumulations into nodes or frames and derivatives
+        model_dtype_modules = (
+            SequentialGraphNetwork,
+            AtomwiseReduce,
+            PerTypeScaleShift,
+            ForceStressOutput,
+            PartialForceOutput,
+            EdgePartialForceOutput,
+            HessianOutput,
+        )
+
+        def check(name: str, out: torch.Tensor, ref: torch.Tensor) -> None:
+            err = (out - ref).abs().max().item()
+            scale = max(ref.abs().max().item(), 1.0)
+            if err > tol * scale:
+                raise RuntimeError(
+                    f"`{name}` in {compute_dtype} differs from the original by {err:.6g} (tolerance: {tol * scale:.6g})"
+                )
+
+        def wrap(module: torch.nn.Module) -> torch.nn.Module:
+            name = type(module).__name__
+            if isinstance(module, TensorProductScatter):
+                if type(module) is not TensorProductScatter:
+                    raise RuntimeError(
+                        f"`enable_mixed_precision` cannot be combined with `{name}`"
+                    )
+                with torch_default_dtype(module.model_dtype):
+                    new = MixedPrecisionTensorProductScatter(
+                        feature_irreps_in=module.feature_irreps_in,
+                        irreps_edge_attr=module.irreps_edge_attr,
+                        irreps_mid=module.irreps_mid,
+                        instructions=module.instructions,
+                        compute_dtype=compute_dtype,
+                    )
+                new.use_segment_reduce = module.use_segment_reduce
+                device = module.tp.weight.device
+                new.to(device)
+                with torch.no_grad():
+                    num_nodes, num_edges = 16, 64
+                    x = torch.randn(num_nodes, module.feature_irreps_in.dim)
+                    edge_attr = torch.randn(num_edges, module.irreps_edge_attr.dim)
+                    edge_weight = torch.randn(num_edges, module.tp.weight_numel)
+                    x, edge_attr, edge_weight = (
+                        t.to(dtype=module.model_dtype, device=device)
+                        for t in (x, edge_attr, edge_weight)
+                    )
+                    edge_dst, edge_src = torch.randint(
+                        0, num_nodes, (2, num_edges), device=device
+                    )
+                    inputs = (x, edge_attr, edge_weight, edge_dst, edge_src)
+                    check(name, new(*inputs), module(*inputs))
+                return new
+            if any(
+                isinstance(m, model_dtype_modules + (TensorProductScatter,))
+                for m in module.modules()
+            ):
+                raise ValueError(
+                    f"`{name}` accumulates into nodes or frames or computes derivatives, and must stay in the model dtype"
+                )
+            device = next(
+                itertools.chain(module.parameters(), module.buffers()), torch.empty(0)
+            ).device
+            if isinstance(module, BesselEdgeLengthEncoding):
+                new = MixedPrecisionGraphModule(
+                    copy.deepcopy(module), compute_dtype, model_dtype
+                )
+                with torch.no_grad():
+                    # normalized edge lengths
+                    x = torch.rand((64, 1), dtype=model_dtype, device=device)
+                    out = new({module.norm_length_field: x})
+                    ref = module({module.norm_length_field: x})
+                for field in [
+                    module.edge_invariant_field,
+                    AtomicDataDict.EDGE_CUTOFF_KEY,
+                ]:
+                    check(name, out[field], ref[field])
+                return new
+            if isinstance(module, ScalarMLPFunction):
+                in_dim = module.dims[0]
+            elif isinstance(module, Linear):
+                in_dim = module.irreps_in.dim
+            else:
+                raise ValueError(
+                    f"`{name}` cannot be checked against the original module in reduced precision, and cannot be selected"
+                )
+            new = MixedPrecisionModule(copy.deepcopy(module), compute_dtype)
+            with torch.no_grad():
+                x = torch.randn((64, in_dim), dtype=model_dtype, device=device)
+                check(name, new(x), module(x))
+            return new
+
+        def apply(module: torch.nn.Module) -> None:
+            for child_name, child in list(module.named_children()):
+                if isinstance(
+                    child,
+                    (
+                        MixedPrecisionGraphModule,
+                        MixedPrecisionModule,
+                        MixedPrecisionTensorProductScatter,
+                    ),
+                ):
+                    # already in `compute_dtype`
+                    continue
+                if type(child).__name__ in modules:
+                    module._modules[child_name] = wrap(child)
+                else:
+                    apply(child)
+
+        apply(model)
+        return model
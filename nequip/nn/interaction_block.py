@@ -11,15 +11,18 @@ from nequip.data import AtomicDataDict
 
 from ._graph_mixin import GraphModuleMixin
 from .mlp import ScalarMLPFunction
+from .model_modifier_utils import model_modifier, replace_submodules
 from ._ghost_exchange_base import NoOpGhostExchangeModule
 from ._tp_scatter_base import TensorProductScatter
 from .norm import AvgNumNeighborsNorm
+from .utils import with_edge_center_ptr_
 
-from typing import Sequence, Union, Dict
+from typing import Sequence, Union, Dict, Optional
 
 
 class InteractionBlock(GraphModuleMixin, torch.nn.Module):
     use_sc: bool
+    radial_input_field: str
 
     def __init__(
         self,
@@ -151,6 +154,173 @@ class InteractionBlock(GraphModuleMixin, torch.nn.Module):
 
         self.is_first_layer = is_first_layer
 
+        # field used as input to `edge_mlp`, which is changed by `tabulate_radial_mlp`
+        self.radial_input_field = AtomicDataDict.EDGE_EMBEDDING_KEY
+
+    @model_modifier(persistent=False, private=False)
+    @classmethod
+    def tabulate_radial_mlp(
+        cls, model, num_points: int = 2048, tolerance: Optional[float] = None
+    ):
+        """Replace the radial MLPs of ``InteractionBlock`` s with cubic spline lookup tables for faster inference.
+
+        The radial MLP output only depends on the normalized edge length (also when per-edge-type cutoffs are used), so the edge length encoding (``BesselEdgeLengthEncoding``, its cutoff, and any subsequent ``ApplyFactor``) composed with each block's radial MLP is tabulated.
+        The lookup tables are checked against the original radial functions, and an error is raised if the maximum interpolation error (relative to the maximum magnitude of the radial function, or absolute if it is smaller than one) exceeds ``tolerance``.
+
+        This modifier is only meant for inference, since the lookup tables do not propagate gradients to the model weights.
+        The speedup grows with the size of the radial MLPs (``radial_mlp_depth`` and ``radial_mlp_width``), while models with very small radial MLPs may not benefit.
+
+        Args:
+            num_points (int): number of grid points for the lookup tables
+            tolerance (float): tolerance for the interpolation error (defaults to the ``model_dtype`` floating point tolerance, but at least ``1e-8``)
+        """
+        from ._tabulated_radial import TabulatedRadialMLP
+        from .embedding import BesselEdgeLengthEncoding
+        from .misc import ApplyFactor
+        from nequip.utils.dtype import floating_point_tolerance
+        from nequip.utils.global_dtype import _GLOBAL_DTYPE
+
+        # === find the edge length encoding ===
+        # i.e. the modules between the normalized edge lengths and the first `InteractionBlock`
+        encoding = []
+        for module in model.modules():
+            if isinstance(module, InteractionBlock):
+                break
+            if (
+                isinstance(module, BesselEdgeLengthEncoding)
+                and module.edge_invariant_field == AtomicDataDict.EDGE_EMBEDDING_KEY
+                and module.norm_length_field == AtomicDataDict.NORM_LENGTH_KEY
+            ) or (
+                isinstance(module, ApplyFactor)
+                and module.in_field == AtomicDataDict.EDGE_EMBEDDING_KEY
+                and module.out_field == AtomicDataDict.EDGE_EMBEDDING_KEY
+            ):
+                encoding.append(module)
+        if len(encoding) == 0 or not isinstance(encoding[0], BesselEdgeLengthEncoding):
+            raise RuntimeError(
+                "`tabulate_radial_mlp` requires the edge embedding to be a `BesselEdgeLengthEncoding` of the normalized edge lengths"
+            )
+
+        def encode(x: torch.Tensor) -> torch.Tensor:
+            data = {AtomicDataDict.NORM_LENGTH_KEY: x}
+            for module in encoding:
+                data = module(data)
+            return data[AtomicDataDict.EDGE_EMBEDDING_KEY]
+
+        def modify_block(block):
+            if block.radial_input_field != AtomicDataDict.EDGE_EMBEDDING_KEY:
+                # already tabulated
+                return block
+            mlp = block.edge_mlp
+            table = TabulatedRadialMLP(
+                mlp=mlp,
+                radial_fn=lambda x: mlp(encode(x)),
+                num_points=num_points,
+            )
+
+            # === check against the original radial function ===
+            # on a grid that is finer than the table to also probe between its grid points
+            with torch.no_grad():
+                x = torch.linspace(
+                    0.0,
+                    1.0,
+                    4 * num_points + 1,
+                    dtype=_GLOBAL_DTYPE,
+                    device=table.coeffs.device,
+                ).unsqueeze(-1)
+                ref = mlp(encode(x))
+                err = (table(x) - ref).abs().max().item()
+                scale = max(ref.abs().max().item(), 1.0)
+            tol = (
+                max(floating_point_tolerance(table.coeffs.dtype), 1e-8)
+                if tolerance is None
+                else tolerance
+            )
+            if err > tol * scale:
+                raise RuntimeError(
+                    f"Tabulated radial MLP differs from the original by {err:.6g} (tolerance: {tol * scale:.6g}) -- consider increasing `num_points` (currently {num_points})"
+                )
+
+            block.edge_mlp = table
+            block.radial_input_field = AtomicDataDict.NORM_LENGTH_KEY
+            return block
+
+        return replace_submodules(model, cls, modify_block)
+
+    @model_modifier(persistent=False, private=False)
+    @classmethod
+    def fuse_radial_mlps(cls, model):
+        """Evaluate the radial MLPs of all ``InteractionBlock`` s in one batched pass over the shared edge embedding.
+
+        Instead of each block running its own radial MLP on the edge embedding, the first layers of all radial MLPs are concatenated into a single matrix multiplication, and the remaining layers are evaluated as batched matrix multiplications over the blocks.
+        This reduces the number of kernel launches and intermediate ``(num_edges, width)`` tensors, which matters most for small models (e.g. ``l_max=1``) where the per-edge cost dominates.
+        The fused radial MLPs are checked against the original ones, and the state dict is unchanged.
+
+        This modifier is only meant for inference, since the fused weights are copied from the model weights when the modifier is applied and do not propagate gradients to them.
+        """
+        from ._fused_radial import (
+            FusedRadialMLPs,
+            FusedRadialMLPSlice,
+            _FUSED_RADIAL_MLP_KEY,
+        )
+        from ._graph_mixin import SequentialGraphNetwork
+        from .mlp import ScalarMLPFunction
+        from nequip.utils.dtype import floating_point_tolerance
+
+        blocks = [
+            module
+            for module in model.modules()
+            if isinstance(module, InteractionBlock)
+            and module.radial_input_field == AtomicDataDict.EDGE_EMBEDDING_KEY
+            and isinstance(module.edge_mlp, ScalarMLPFunction)
+        ]
+        if len(blocks) == 0:
+            # already fused or tabulated
+            return model
+
+        # === find where to insert the fused MLPs ===
+        # i.e. right before the module of a `SequentialGraphNetwork` that contains the first block
+        location = None
+        for module in model.modules():
+            if not isinstance(module, SequentialGraphNetwork):
+                continue
+            for name, child in module.named_children():
+                if not isinstance(child, SequentialGraphNetwork) and any(
+                    m is blocks[0] for m in child.modules()
+                ):
+                    location = (module, name, child)
+        if location is None:
+            raise RuntimeError(
+                "`fuse_radial_mlps` requires the `InteractionBlock`s to be part of a `SequentialGraphNetwork`"
+            )
+        seq, name, child = location
+
+        mlps = [block.edge_mlp for block in blocks]
+        fused = FusedRadialMLPs(mlps=mlps, irreps_in=child.irreps_in)
+
+        # === check against the original radial MLPs ===
+        weight = next(mlps[0].parameters())
+        with torch.no_grad():
+            x = torch.randn(
+                (64, mlps[0].dims[0]), dtype=weight.dtype, device=weight.device
+            )
+            out = fused({AtomicDataDict.EDGE_EMBEDDING_KEY: x})[_FUSED_RADIAL_MLP_KEY]
+            for block_idx, mlp in enumerate(mlps):
+                ref = mlp(x)
+                err = (out[block_idx, :, : ref.size(-1)] - ref).abs().max().item()
+                scale = max(ref.abs().max().item(), 1.0)
+                tol = floating_point_tolerance(weight.dtype)
+                if err > tol * scale:
+                    raise RuntimeError(
+                        f"Fused radial MLP of block {block_idx} differs from the original by {err:.6g} (tolerance: {tol * scale:.6g})"
+                    )
+
+        seq.insert(name="fused_radial_mlps", module=fused, before=name)
+        for block_idx, block in enumerate(blocks):
+            block.edge_mlp = FusedRadialMLPSlice(block.edge_mlp, block_idx)
+            block.radial_input_field = _FUSED_RADIAL_MLP_KEY
+        return model
+
     @torch.jit.unused
     def _get_mliap_num_local(self, data: AtomicDataDict.Type) -> int:
         return data[AtomicDataDict.LMP_MLIAP_DATA_KEY].nlocal
@@ -190,12 +360,18 @@ class InteractionBlock(GraphModuleMixin, torch.nn.Module):
             x = data[AtomicDataDict.NODE_FEATURES_KEY]
 
         # === TP and scatter ===
+        # the CSR row pointers of sorted edges are computed once and shared by all blocks (see `enable_segment_reduce`)
+        edge_dst_ptr: Optional[torch.Tensor] = None
+        if self.tp_scatter.use_segment_reduce and not self.training:
+            data = with_edge_center_ptr_(data)
+            edge_dst_ptr = data[AtomicDataDict.EDGE_CENTER_PTR_KEY]
         x = self.tp_scatter(
             x=x,
             edge_attr=data[AtomicDataDict.EDGE_ATTRS_KEY],
-            edge_weight=self.edge_mlp(data[AtomicDataDict.EDGE_EMBEDDING_KEY]),
+            edge_weight=self.edge_mlp(data[self.radial_input_field]),
             edge_dst=data[AtomicDataDict.EDGE_INDEX_KEY][0],
             edge_src=data[AtomicDataDict.EDGE_INDEX_KEY][1],
+            edge_dst_ptr=edge_dst_ptr,
         )[:num_local_nodes]
 
         x = self.linear_2(x)
@@ -7,6 +7,7 @@ from e3nn.util.jit import compile_mode
 
 from nequip.data import AtomicDataDict
 from ._graph_mixin import GraphModuleMixin
+from .model_modifier_utils import model_modifier
 from .nonlinearities import ShiftedSoftplus
 
 from typing import Optional, Final, Dict
@@ -194,6 +195,99 @@ class ScalarMLPFunction(torch.nn.Module):
     def forward(self, x):
         return self.mlp(x)
 
+    @model_modifier(persistent=False, private=False)
+    @classmethod
+    def quantize_linear_layers(
+        cls,
+        model,
+        weight_dtype: str = "bfloat16",
+        include_e3nn_linears: bool = True,
+        validation_data: Optional[str] = None,
+        energy_tolerance: Optional[float] = None,
+        force_tolerance: Optional[float] = None,
+    ):
+        """Store the weights of the linear layers of the model in a lower precision ``weight_dtype`` for CPU inference.
+
+        The linear layers of all ``ScalarMLPFunction`` s (e.g. the radial MLPs) and, if ``include_e3nn_linears`` is ``True``, the ``e3nn`` ``Linear`` s without biases (e.g. the node feature linears of ``InteractionBlock`` s and ``AtomwiseLinear`` s) are replaced.
+        With ``bfloat16`` or ``float16``, the matrix multiplications of the replaced layers run in that precision (with ``float32`` accumulation), which is faster on CPUs with native support for it (e.g. AVX512-BF16 or AMX).
+        With ``int8``, the weights are quantized symmetrically (per output channel for ``ScalarMLPFunction`` s and per path for ``e3nn`` ``Linear`` s) and dequantized to the model dtype for the matrix multiplications, which reduces the model size but not the compute.
+        Activations are not quantized, since the forces require gradients with respect to the inputs of the linear layers, which the dynamically quantized ``int8`` kernels of PyTorch do not support.
+
+        If ``validation_data`` is provided, the energies and forces of the quantized model are compared against the original model on the structures in that file (in any format readable by ``ase.io.read``), and an error is raised if the maximum absolute per-atom energy error or force component error exceeds ``energy_tolerance`` or ``force_tolerance``, respectively.
+
+        This modifier is only meant for inference, since the quantized weights are copied from the model weights when the modifier is applied and do not propagate gradients to them.
+
+        Args:
+            weight_dtype (str): ``bfloat16`` (default), ``float16``, or ``int8``
+            include_e3nn_linears (bool): whether to also replace ``e3nn`` ``Linear`` s (default ``True``)
+            validation_data (str): optional path to structures to compare the quantized model against the original model on
+            energy_tolerance (float): tolerance for the maximum absolute per-atom energy error on ``validation_data``
+            force_tolerance (float): tolerance for the maximum absolute force component error on ``validation_data``
+        """
+        import copy
+        from e3nn.o3._linear import Linear
+        from ._quantized_linear import (
+            QuantizedScalarLinear,
+            QuantizedE3nnLinear,
+            _WEIGHT_DTYPES,
+        )
+
+        if weight_dtype not in _WEIGHT_DTYPES:
+            raise ValueError(
+                f"Unknown weight_dtype '{weight_dtype}'. Available options: {list(_WEIGHT_DTYPES.keys())}"
+            )
+        reference = copy.deepcopy(model) if validation_data is not None else None
+
+        def quantize_mlp(mlp: ScalarMLPFunction) -> None:
+            if isinstance(mlp.mlp, DeepLinearMLP):
+                # a deep linear MLP is a single linear layer
+                with torch.no_grad():
+                    weight = (
+                        torch.linalg.multi_dot(list(mlp.mlp.weights)) * mlp.mlp.alpha
+                    )
+                mlp.mlp = QuantizedScalarLinear(weight, weight_dtype=weight_dtype)
+                return
+            if not isinstance(mlp.mlp, torch.nn.Sequential):
+                # already quantized
+                return
+            for idx, layer in enumerate(mlp.mlp):
+                if isinstance(layer, ScalarLinearLayer):
+                    with torch.no_grad():
+                        # `layer.weight` includes any parametrization
+                        weight = layer.weight * layer.alpha
+                    mlp.mlp[idx] = QuantizedScalarLinear(
+                        weight, layer.bias, weight_dtype=weight_dtype
+                    )
+
+        def quantize(module: torch.nn.Module) -> None:
+            for name, child in list(module.named_children()):
+                if isinstance(child, ScalarMLPFunction):
+                    quantize_mlp(child)
+                elif (
+                    include_e3nn_linears
+                    and isinstance(child, Linear)
+                    and child.internal_weights
+                    and child.weight_numel > 0
+                    and child.bias_numel == 0
+                ):
+                    module._modules[name] = QuantizedE3nnLinear(
+                        child, weight_dtype=weight_dtype
+                    )
+                elif not isinstance(child, QuantizedE3nnLinear):
+                    quantize(child)
+
+        quantize(model)
+
+        if reference is not None:
+            _validate_quantized_model(
+                model,
+                reference,
+                validation_data,
+                energy_tolerance=energy_tolerance,
+                force_tolerance=force_tolerance,
+            )
+        return model
+
 
 class DeepLinearMLP(torch.nn.Module):
     def __init__(self, mlp) -> None:
@@ -269,3 +363,73 @@ class ScalarLinearLayer(torch.nn.Module):
 
     def extra_repr(self) -> str:
         return f"in_features={self.in_features}, out_features={self.out_features}, bias={self.bias is not None}, alpha={self.alpha:.6f}"
+
+
+def _validate_quantized_model(
+    model: torch.nn.Module,
+    reference: torch.nn.Module,
+    validation_data: str,
+    energy_tolerance: Optional[float] = None,
+    force_tolerance: Optional[float] = None,
+) -> None:
+    """Compare the energies and forces of a quantized ``model`` against the original ``reference`` model on the structures in ``validation_data``."""
+    import ase.io
+    from nequip.data import from_ase
+    from nequip.data.transforms import ChemicalSpeciesToAtomTypeMapper
+    from nequip.ase.nequip_calculator import _create_neighbor_transform
+    from nequip.utils.logger import RankedLogger
+    from . import graph_model
+
+    logger = RankedLogger(__name__, rank_zero_only=True)
+    if not hasattr(model, "metadata"):
+        raise RuntimeError(
+            "`validation_data` requires the modified model to be a `GraphModel` with metadata"
+        )
+    metadata = model.metadata
+    type_names = metadata[graph_model.TYPE_NAMES_KEY].split(" ")
+    type_mapper = ChemicalSpeciesToAtomTypeMapper(
+        model_type_names=type_names,
+        chemical_species_to_atom_type_map={t: t for t in type_names},
+    )
+    neighbor_transform = _create_neighbor_transform(
+        metadata, float(metadata[graph_model.R_MAX_KEY]), type_names
+    )
+    device = next(reference.parameters()).device
+
+    energy_errs, force_errs = [], []
+    for atoms in ase.io.read(validation_data, index=":"):
+        data = neighbor_transform(type_mapper(from_ase(atoms)))
+        data = AtomicDataDict.to_(data, device)
+        out = model(data.copy())
+        ref = reference(data.copy())
+        energy_errs.append(
+            (
+                (
+                    out[AtomicDataDict.TOTAL_ENERGY_KEY]
+                    - ref[AtomicDataDict.TOTAL_ENERGY_KEY]
+                ).abs()
+                / len(atoms)
+            )
+            .max()
+            .item()
+        )
+        force_errs.append(
+            (out[AtomicDataDict.FORCE_KEY] - ref[AtomicDataDict.FORCE_KEY])
+            .abs()
+            .max()
+            .item()
+        )
+
+    max_energy_err, max_force_err = max(energy_errs), max(force_errs)
+    logger.info(
+        f"Quantized model errors on {len(energy_errs)} validation structure(s): "
+        f"per-atom energy max {max_energy_err:.6g}, force component max {max_force_err:.6g}"
+    )
+    if energy_tolerance is not None and max_energy_err > energy_tolerance:
+        raise RuntimeError(
+            f"Quantized model per-atom energy error {max_energy_err:.6g} exceeds `energy_tolerance` ({energy_tolerance:.6g})"
+        )
+    if force_tolerance is not None and max_force_err > force_tolerance:
+        raise RuntimeError(
+            f"Quantized model force error {max_force_err:.6g} exceeds `force_tolerance` ({force_tolerance:.6g})"
+        )
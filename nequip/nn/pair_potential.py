@@ -8,7 +8,7 @@ from e3nn.util.jit import compile_mode
 from nequip.data import AtomicDataDict
 from nequip.data.misc import chemical_symbols_to_atomic_numbers_dict
 from ._graph_mixin import GraphModuleMixin
-from .utils import scatter, with_edge_vectors_
+from .utils import scatter, with_edge_vectors_, with_edge_center_ptr_
 from nequip.utils.compile import conditional_torchscript_jit
 
 
@@ -35,6 +35,7 @@ class LennardJones(GraphModuleMixin, torch.nn.Module):
 
     lj_style: str
     exponent: float
+    use_segment_reduce: bool
 
     def __init__(
         self,
@@ -91,6 +92,8 @@ class LennardJones(GraphModuleMixin, torch.nn.Module):
         self.exponent = lj_exponent
 
         self._param = conditional_torchscript_jit(_LJParam())
+        # set by `enable_segment_reduce`
+        self.use_segment_reduce = False
 
     def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
         data = with_edge_vectors_(data, with_lengths=True)
@@ -131,11 +134,17 @@ class LennardJones(GraphModuleMixin, torch.nn.Module):
         lj_eng = lj_eng * data[AtomicDataDict.EDGE_CUTOFF_KEY]
 
         # sum edge LJ energies onto atoms
+        edge_center_ptr: Optional[torch.Tensor] = None
+        if self.use_segment_reduce and not self.training:
+            data = with_edge_center_ptr_(data)
+            edge_center_ptr = data[AtomicDataDict.EDGE_CENTER_PTR_KEY]
         atomic_eng = scatter(
             lj_eng,
             edge_center,
             dim=0,
             dim_size=AtomicDataDict.num_nodes(data),
+            sorted_index=edge_center_ptr is not None,
+            ptr=edge_center_ptr,
         )
         if AtomicDataDict.PER_ATOM_ENERGY_KEY in data:
             atomic_eng = atomic_eng + data[AtomicDataDict.PER_ATOM_ENERGY_KEY]
@@ -160,6 +169,7 @@ class SimpleLennardJones(GraphModuleMixin, torch.nn.Module):
     lj_sigma: float
     lj_epsilon: float
     lj_use_cutoff: bool
+    use_segment_reduce: bool
 
     def __init__(
         self,
@@ -177,6 +187,8 @@ class SimpleLennardJones(GraphModuleMixin, torch.nn.Module):
             lj_epsilon,
             lj_use_cutoff,
         )
+        # set by `enable_segment_reduce`
+        self.use_segment_reduce = False
 
     def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
         data = with_edge_vectors_(data, with_lengths=True)
@@ -192,11 +204,17 @@ class SimpleLennardJones(GraphModuleMixin, torch.nn.Module):
             lj_eng = lj_eng * data[AtomicDataDict.EDGE_CUTOFF_KEY]
 
         # sum edge LJ energies onto atoms
+        edge_center_ptr: Optional[torch.Tensor] = None
+        if self.use_segment_reduce and not self.training:
+            data = with_edge_center_ptr_(data)
+            edge_center_ptr = data[AtomicDataDict.EDGE_CENTER_PTR_KEY]
         atomic_eng = scatter(
             lj_eng,
             edge_center,
             dim=0,
             dim_size=AtomicDataDict.num_nodes(data),
+            sorted_index=edge_center_ptr is not None,
+            ptr=edge_center_ptr,
         )
         if AtomicDataDict.PER_ATOM_ENERGY_KEY in data:
             atomic_eng = atomic_eng + data[AtomicDataDict.PER_ATOM_ENERGY_KEY]
@@ -259,6 +277,8 @@ class ZBL(GraphModuleMixin, torch.nn.Module):
         units (str): `LAMMPS units <https://docs.lammps.org/units.html>`_ that the data is in; ``metal`` and ``real`` are presently supported -- raise a GitHub issue if more is desired
     """
 
+    use_segment_reduce: bool
+
     def __init__(
         self,
         type_names: List[str],
@@ -310,6 +330,8 @@ class ZBL(GraphModuleMixin, torch.nn.Module):
             * 0.5,  # Put half the energy on each of ij, ji
         )
         self._zbl = conditional_torchscript_jit(_ZBL())
+        # set by `enable_segment_reduce`
+        self.use_segment_reduce = False
 
     def forward(self, data: AtomicDataDict.Type) -> AtomicDataDict.Type:
         """"""
@@ -331,11 +353,17 @@ class ZBL(GraphModuleMixin, torch.nn.Module):
         ).unsqueeze(-1)
         # apply cutoff
         zbl_edge_eng = zbl_edge_eng * data[AtomicDataDict.EDGE_CUTOFF_KEY]
+        edge_center_ptr: Optional[torch.Tensor] = None
+        if self.use_segment_reduce and not self.training:
+            data = with_edge_center_ptr_(data)
+            edge_center_ptr = data[AtomicDataDict.EDGE_CENTER_PTR_KEY]
         atomic_eng = scatter(
             zbl_edge_eng,
             edge_center,
             dim=0,
             dim_size=num_nodes,
+            sorted_index=edge_center_ptr is not None,
+            ptr=edge_center_ptr,
         )
         if AtomicDataDict.PER_ATOM_ENERGY_KEY in data:
             atomic_eng = atomic_eng + data[AtomicDataDict.PER_ATOM_ENERGY_KEY]
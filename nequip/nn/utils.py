@@ -1,5 +1,6 @@
 # This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
 import torch
+import contextlib
 from e3nn.o3._irreps import Irrep, Irreps
 from nequip.data import AtomicDataDict
 from typing import Optional
@@ -21,6 +22,16 @@ def _broadcast(src: torch.Tensor, other: torch.Tensor, dim: int):
     return src
 
 
+def sorted_index_to_ptr(index: torch.Tensor, dim_size: int) -> torch.Tensor:
+    """Compute the CSR row pointers of a sorted ``index``, such that the entries with index ``i`` are ``ptr[i]:ptr[i + 1]``."""
+    # ensure that `index` is sorted without a host-device sync
+    torch._assert_async(torch.all(index[1:] >= index[:-1]))
+    return torch.searchsorted(
+        index,
+        torch.arange(dim_size + 1, dtype=index.dtype, device=index.device),
+    )
+
+
 def scatter(
     src: torch.Tensor,
     index: torch.Tensor,
@@ -28,8 +39,32 @@ def scatter(
     out: Optional[torch.Tensor] = None,
     dim_size: Optional[int] = None,
     reduce: str = "sum",
+    sorted_index: bool = False,
+    ptr: Optional[torch.Tensor] = None,
 ) -> torch.Tensor:
+    """Sum the entries of ``src`` along ``dim`` into the positions given by ``index``.
+
+    If ``sorted_index`` is ``True``, ``index`` must be sorted (e.g. the centers of edges from :class:`~nequip.data.transforms.SortedNeighborListTransform`), and a deterministic segment reduction over its CSR row pointers is used instead of atomic ``scatter_add_``.
+    The row pointers are computed with :func:`sorted_index_to_ptr`, unless precomputed row pointers ``ptr`` of ``index`` are given (e.g. from :func:`with_edge_center_ptr_`), in which case only the first ``dim_size`` segments are summed.
+    The segment reduction only supports ``dim=0`` and does not support double backward (e.g. force training or Hessians, see :func:`without_segment_reduce`).
+    In both cases, ``src`` of dtypes other than ``float32`` and ``float64`` is summed in ``float32``.
+    """
     assert reduce == "sum"  # for now, TODO
+    out_dtype = (
+        torch.float32 if src.dtype not in (torch.float32, torch.float64) else src.dtype
+    )
+    if sorted_index and out is None:
+        assert dim == 0 or dim == -src.dim()
+        if ptr is None:
+            if dim_size is None:
+                dim_size = 0 if index.numel() == 0 else int(index.max()) + 1
+            offsets = sorted_index_to_ptr(index, dim_size)
+        elif dim_size is None:
+            offsets = ptr
+        else:
+            # e.g. only the local atoms, whose edges precede those of the ghost atoms
+            offsets = ptr[: dim_size + 1]
+        return torch.segment_reduce(src.to(out_dtype), "sum", offsets=offsets, axis=0)
     index = _broadcast(index, src, dim)
     if out is None:
         size = list(src.size())
@@ -39,20 +74,29 @@ def scatter(
             size[dim] = 0
         else:
             size[dim] = int(index.max()) + 1
-        out = torch.zeros(
-            size,
-            dtype=(
-                torch.float32
-                if src.dtype not in (torch.float32, torch.float64)
-                else src.dtype
-            ),
-            device=src.device,
-        )
+        out = torch.zeros(size, dtype=out_dtype, device=src.device)
         return out.scatter_add_(dim, index, src.to(out.dtype))
     else:
         return out.scatter_add_(dim, index, src)
 
 
+@contextlib.contextmanager
+def without_segment_reduce(model: torch.nn.Module):
+    """Temporarily sum with ``scatter_add_`` instead of segment reductions (see ``enable_segment_reduce``) in ``model``, e.g. for Hessians, which need the double backward that segment reductions do not support.
+
+    This works for eager and TorchScript models.
+    """
+    # duck-typed such that TorchScript modules are also covered
+    modules = [m for m in model.modules() if getattr(m, "use_segment_reduce", False)]
+    for module in modules:
+        module.use_segment_reduce = False
+    try:
+        yield
+    finally:
+        for module in modules:
+            module.use_segment_reduce = True
+
+
 def tp_path_exists(irreps_in1, irreps_in2, ir_out):
     irreps_in1 = Irreps(irreps_in1).simplify()
     irreps_in2 = Irreps(irreps_in2).simplify()
@@ -131,3 +175,16 @@ def with_edge_type_(
         ).view(2, -1)
         data[edge_type_field] = edge_type
     return data
+
+
+def with_edge_center_ptr_(data: AtomicDataDict.Type) -> AtomicDataDict.Type:
+    """Add the CSR row pointers of the edge centers (see :func:`sorted_index_to_ptr`) to data if not already present.
+
+    The edges must be sorted by their centers, e.g. with :class:`~nequip.data.transforms.SortedNeighborListTransform`.
+    Caching the row pointers in ``data`` computes (and checks) them once per graph for all segment reductions of a model (see ``enable_segment_reduce``).
+    """
+    if AtomicDataDict.EDGE_CENTER_PTR_KEY not in data:
+        data[AtomicDataDict.EDGE_CENTER_PTR_KEY] = sorted_index_to_ptr(
+            data[AtomicDataDict.EDGE_INDEX_KEY][0], AtomicDataDict.num_nodes(data)
+        )
+    return data
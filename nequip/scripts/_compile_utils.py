@@ -1,7 +1,9 @@
 # This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import re
 import torch
+import yaml
 from nequip.data import AtomicDataDict
-from typing import Dict, List, Callable, Union
+from typing import Any, Dict, List, Callable, Union
 
 # === Inputs and Outputs for AOT Compile ===
 # standard sets of input and output fields for specific integrations
@@ -32,6 +34,39 @@ ASE_OUTPUTS = [
     AtomicDataDict.STRESS_KEY,
 ]
 
+# forces-only outputs skip the stress derivatives, e.g. for MD without a barostat
+ASE_FORCES_OUTPUTS = [
+    AtomicDataDict.PER_ATOM_ENERGY_KEY,
+    AtomicDataDict.TOTAL_ENERGY_KEY,
+    AtomicDataDict.FORCE_KEY,
+]
+
+# AOT metadata key under which the exported output fields are recorded
+OUTPUT_FIELDS_METADATA_KEY = "output_fields"
+
+# AOT metadata keys under which the shape buckets of multi-variant packages are recorded
+SHAPE_BUCKETS_METADATA_KEY = "shape_buckets"
+SHAPE_BUCKET_PADDING_METADATA_KEY = "shape_bucket_padding"
+
+
+# === modifier parsing ===
+def _parse_modifier(modifier: str) -> Dict[str, Any]:
+    """Parse ``name`` or ``name:key=value,key=value`` into a modifier configuration for ``modify``.
+
+    Values are parsed as YAML, and may contain commas (e.g. lists such as ``key=[a,b]``).
+    """
+    name, _, kwargs = modifier.partition(":")
+    cfg = {"modifier": name}
+    # only split at commas that start a new `key=`
+    for kwarg in filter(None, re.split(r",(?=\s*\w+\s*=)", kwargs)):
+        key, sep, value = kwarg.partition("=")
+        if sep == "":
+            raise ValueError(
+                f"Invalid modifier argument `{kwarg}` in `{modifier}`, expected `key=value`"
+            )
+        cfg[key.strip()] = yaml.safe_load(value)
+    return cfg
+
 
 # === batch map rules ===
 def single_frame_batch_map_settings(batch_map):
@@ -79,14 +114,35 @@ BATCH_TARGET = {
     "batch_map_settings": lambda batch_map: batch_map,  # no static shapes
     "data_settings": batched_data_settings,
 }
+ASE_FORCES_TARGET = {**ASE_TARGET, "output": ASE_FORCES_OUTPUTS}
+BATCH_FORCES_TARGET = {**BATCH_TARGET, "output": ASE_FORCES_OUTPUTS}
 
 COMPILE_TARGET_DICT = {
     "pair_nequip": PAIR_NEQUIP_TARGET,
     "ase": ASE_TARGET,
+    "ase_forces": ASE_FORCES_TARGET,
     "batch": BATCH_TARGET,
+    "batch_forces": BATCH_FORCES_TARGET,
 }
 
 
+def output_fields_to_derivatives(output_fields: List[str]) -> Dict[str, bool]:
+    """Determine which derivatives of the energy are required for ``output_fields``.
+
+    Returns:
+        dict with keys ``forces`` and ``stress`` for :func:`~nequip.nn.set_force_stress_outputs`
+    """
+    stress = any(
+        k in output_fields
+        for k in (AtomicDataDict.STRESS_KEY, AtomicDataDict.VIRIAL_KEY)
+    )
+    forces = stress or any(
+        k in output_fields
+        for k in (AtomicDataDict.FORCE_KEY, AtomicDataDict.EDGE_FORCE_KEY)
+    )
+    return {"forces": forces, "stress": stress}
+
+
 def register_compile_targets(
     target_dict: Dict[str, Union[List[str], Callable]],
 ) -> None:
@@ -0,0 +1,520 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import torch
+import numpy as np
+
+from nequip.model.utils import _EAGER_MODEL_KEY, _SOLE_MODEL_KEY
+from nequip.model.saved_models.load_utils import load_saved_model
+from nequip.model.modify_utils import modify
+from nequip.nn import graph_model, ForceStressOutput
+from nequip.data import AtomicDataDict, from_ase
+from nequip.data.transforms import ChemicalSpeciesToAtomTypeMapper
+from nequip.ase.nequip_calculator import NequIPCalculator, _create_neighbor_transform
+from nequip.utils.logger import RankedLogger
+from nequip.utils.global_state import set_global_state
+from nequip.utils.versions import get_current_code_versions
+from nequip.utils.profiler import ModelProfiler
+from nequip.scripts._compile_utils import _parse_modifier
+from nequip.scripts._workflow_utils import set_workflow_state
+
+import ase
+import ase.io
+import json
+import time
+import tempfile
+import resource
+import argparse
+import pathlib
+from typing import Any, Dict, List, Optional
+
+
+# === setup logging ===
+logger = RankedLogger(__name__, rank_zero_only=True)
+
+# timed stages of every step
+_STAGES = [
+    "transforms",
+    "neighborlist",
+    "model",
+    "forward",
+    "backward",
+    "host_copy",
+    "step",
+]
+
+
+def _load_model(
+    model_path: str,
+    device: torch.device,
+    model_name: str,
+    modifiers: List[Dict[str, Any]],
+):
+    """Load a model for benchmarking and return ``(model, metadata, format)``."""
+    fname = pathlib.Path(model_path).name
+    if fname.endswith(".nequip.pth") or fname.endswith(".nequip.pt2"):
+        if len(modifiers) > 0:
+            raise ValueError(
+                "`--modifiers` can only be applied to checkpoint and package files, compiled models must be compiled with the modifiers instead"
+            )
+        from nequip.model.inference_models import load_compiled_model
+        from nequip.scripts._compile_utils import PAIR_NEQUIP_INPUTS, ASE_OUTPUTS
+
+        model, metadata = load_compiled_model(
+            model_path, device, PAIR_NEQUIP_INPUTS, ASE_OUTPUTS
+        )
+        model_format = "torchscript" if fname.endswith(".nequip.pth") else "aotinductor"
+        return model, metadata, model_format
+
+    model = load_saved_model(model_path, _EAGER_MODEL_KEY, model_name)
+    model = modify(model, modifiers)
+    model.eval()
+    model.to(device)
+    metadata = model.metadata.copy()
+    metadata[graph_model.R_MAX_KEY] = float(metadata[graph_model.R_MAX_KEY])
+    metadata[graph_model.TYPE_NAMES_KEY] = metadata[graph_model.TYPE_NAMES_KEY].split(
+        " "
+    )
+    return model, metadata, "eager"
+
+
+def _make_bulk(
+    num_atoms: int, density: float, species: List[str], seed: int
+) -> ase.Atoms:
+    """Build a rattled simple cubic supercell with roughly ``num_atoms`` atoms at a number ``density`` (atoms/length^3) with random ``species``."""
+    rng = np.random.default_rng(seed)
+    n = max(2, int(round(num_atoms ** (1.0 / 3.0))))
+    spacing = (1.0 / density) ** (1.0 / 3.0)
+    grid = np.stack(np.meshgrid(*([np.arange(n)] * 3), indexing="ij"), -1)
+    positions = spacing * grid.reshape(-1, 3).astype(np.float64)
+    positions += rng.normal(scale=0.05 * spacing, size=positions.shape)
+    return ase.Atoms(
+        symbols=rng.choice(species, size=len(positions)).tolist(),
+        positions=positions,
+        cell=np.eye(3) * spacing * n,
+        pbc=True,
+    )
+
+
+def _find_energy_model_name(model: torch.nn.Module) -> Optional[str]:
+    """Name of the energy model wrapped by ``ForceStressOutput`` for splitting forward and backward time of eager models."""
+    for name, module in model.named_modules():
+        if isinstance(module, ForceStressOutput):
+            return f"{name}.func" if name != "" else "func"
+    return None
+
+
+def _benchmark_structure(
+    model,
+    atoms: ase.Atoms,
+    type_mapper,
+    neighbor_transform,
+    device: torch.device,
+    energy_model_name: Optional[str],
+    warmup: int,
+    steps: int,
+    timestep: float,
+) -> Dict:
+    def now():
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        return time.perf_counter()
+
+    def step():
+        """Run one step and return the number of edges and the times at the stage boundaries."""
+        t0 = now()
+        data = type_mapper(from_ase(atoms))
+        t1 = now()
+        data = neighbor_transform(data)
+        t2 = now()
+        data = AtomicDataDict.to_(data, device)
+        t3 = now()
+        out = model(data)
+        t4 = now()
+        # ensure results are materialized on the host, as a calculator would do
+        _ = out[AtomicDataDict.FORCE_KEY].detach().cpu()
+        t5 = now()
+        return AtomicDataDict.num_edges(data), (t0, t1, t2, t3, t4, t5)
+
+    if device.type == "cuda":
+        torch.cuda.reset_peak_memory_stats(device)
+
+    timings = {stage: [] for stage in _STAGES}
+    num_edges = 0
+    for step_idx in range(warmup + steps):
+        num_edges, (t0, t1, t2, t3, t4, t5) = step()
+        if step_idx < warmup:
+            continue
+        timings["transforms"].append((t1 - t0) + (t3 - t2))
+        timings["neighborlist"].append(t2 - t1)
+        timings["model"].append(t4 - t3)
+        timings["host_copy"].append(t5 - t4)
+        timings["step"].append(t5 - t0)
+
+    if energy_model_name is not None:
+        # the forward is timed in separate steps, such that the profiling hooks (and their device synchronization)
+        # do not slow down the timed steps above, and the hooks are attached once for all of these steps
+        with ModelProfiler(
+            model, mode="fine", include=[energy_model_name], record_backward=False
+        ) as profiler:
+            for _ in range(steps):
+                profiler.reset()
+                _, (_, _, _, t3, t4, _) = step()
+                (entry,) = profiler.summary()
+                timings["forward"].append(entry["forward_total"])
+                timings["backward"].append((t4 - t3) - entry["forward_total"])
+
+    results = {
+        "num_atoms": len(atoms),
+        "num_edges": num_edges,
+    }
+    for stage, values in timings.items():
+        if len(values) == 0:
+            # forward and backward can only be separated for eager models
+            results[f"{stage}_ms"] = None
+            results[f"{stage}_std_ms"] = None
+            continue
+        results[f"{stage}_ms"] = 1e3 * float(np.mean(values))
+        results[f"{stage}_std_ms"] = 1e3 * float(np.std(values))
+
+    steps_per_s = 1.0 / float(np.mean(timings["step"]))
+    results["steps_per_s"] = steps_per_s
+    results["atom_steps_per_s"] = len(atoms) * steps_per_s
+    # with `timestep` in fs
+    results["ns_per_day"] = steps_per_s * timestep * 1e-6 * 86400
+    # peak device memory of the steps of this structure, which is only tracked for CUDA devices
+    results["peak_memory_mb"] = (
+        torch.cuda.max_memory_allocated(device) / 1e6 if device.type == "cuda" else None
+    )
+    # high-water mark of the resident memory of the whole process so far (in kB on Linux),
+    # which never decreases, i.e. it bounds the memory of this structure and all structures benchmarked before it
+    results["process_peak_memory_mb"] = (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+    )
+    return results
+
+
+def _compile_model(
+    model_path: str, mode: str, device: torch.device, args, output_dir: str
+) -> str:
+    """Compile a checkpoint or package file with ``nequip-compile`` for ASE inference and return the path of the compiled model."""
+    # `nequip-compile` is only imported when needed to keep `--help` fast
+    from nequip.scripts.compile import main as compile_main
+
+    extension = ".nequip.pth" if mode == "torchscript" else ".nequip.pt2"
+    output_path = str(
+        pathlib.Path(tempfile.mkdtemp(dir=output_dir)) / f"model{extension}"
+    )
+    compile_args = [
+        model_path,
+        output_path,
+        "--mode",
+        mode,
+        "--device",
+        str(device),
+        "--model",
+        args.model,
+        "--tf32" if args.tf32 else "--no-tf32",
+    ]
+    if mode == "aotinductor":
+        compile_args += ["--target", "ase"]
+    if len(args.modifiers) > 0:
+        compile_args += ["--modifiers"] + args.modifiers
+    logger.info(f"Compiling `{model_path}` with {mode} for benchmarking")
+    compile_main(args=compile_args)
+    set_workflow_state(None)
+    return output_path
+
+
+def _benchmark_batched(
+    calc: NequIPCalculator,
+    structures: List[ase.Atoms],
+    max_atoms_per_batch: int,
+    device: torch.device,
+    warmup: int,
+    steps: int,
+) -> Dict:
+    """Compare the throughput of ``NequIPCalculator.calculate_batch`` against calling ``NequIPCalculator.calculate`` per structure."""
+
+    def now():
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        return time.perf_counter()
+
+    def loop():
+        for atoms in structures:
+            calc.calculate(atoms, ["energy", "forces"])
+
+    def batched():
+        calc.calculate_batch(structures, ["energy", "forces"], max_atoms_per_batch)
+
+    results = {
+        "num_structures": len(structures),
+        "num_atoms": sum(len(atoms) for atoms in structures),
+        "max_atoms_per_batch": max_atoms_per_batch,
+    }
+    for name, fn in [("loop", loop), ("batched", batched)]:
+        timings = []
+        for step in range(warmup + steps):
+            t0 = now()
+            fn()
+            t1 = now()
+            if step >= warmup:
+                timings.append(t1 - t0)
+        results[f"{name}_ms"] = 1e3 * float(np.mean(timings))
+        results[f"{name}_std_ms"] = 1e3 * float(np.std(timings))
+        results[f"{name}_structures_per_s"] = len(structures) / float(np.mean(timings))
+    results["speedup"] = results["loop_ms"] / results["batched_ms"]
+    return results
+
+
+def _iter_models(args, device: torch.device, compile_dir: str):
+    """Yield ``(model_path, compiled_from)`` for all models to benchmark, compiling checkpoint and package files for ``--compile-modes`` right before they are benchmarked."""
+    for model_path in args.model_paths:
+        yield model_path, None
+        if pathlib.Path(model_path).name.endswith((".nequip.pth", ".nequip.pt2")):
+            if len(args.compile_modes) > 0:
+                logger.warning(
+                    f"`{model_path}` is already compiled and is not compiled again for `--compile-modes`"
+                )
+            continue
+        for mode in args.compile_modes:
+            compiled_path = _compile_model(model_path, mode, device, args, compile_dir)
+            yield compiled_path, model_path
+
+
+def main(args=None):
+    # === parse inputs ===
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the inference speed of NequIP framework models across system sizes."
+    )
+
+    # positional arguments:
+    parser.add_argument(
+        "model_paths",
+        help="paths to checkpoint files, packaged models (`.nequip.zip`), nequip.net models, or compiled models (`.nequip.pth` or `.nequip.pt2`, the latter compiled with `--target ase`) to benchmark",
+        nargs="+",
+        type=str,
+    )
+
+    # optional named arguments:
+    parser.add_argument(
+        "--device",
+        help="device to run the model on (default: cuda if available, else cpu)",
+        type=str,
+        default="cuda" if torch.cuda.is_available() else "cpu",
+    )
+    parser.add_argument(
+        "--model",
+        help=f"name of model to benchmark for checkpoint and package files -- this option is only relevant when using multiple models (default: {_SOLE_MODEL_KEY}, meant to work for the conventional single model case)",
+        type=str,
+        default=_SOLE_MODEL_KEY,
+    )
+    parser.add_argument(
+        "--modifiers",
+        help="modifiers to apply to checkpoint and package models, either as `name` or as `name:key=value,key=value` to pass arguments (e.g. `enable_edge_chunking:memory_budget_mb=512`)",
+        nargs="+",
+        type=str,
+        default=[],
+    )
+    parser.add_argument(
+        "--tf32",
+        help="whether to use TF32 or not (default: False)",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+    )
+    parser.add_argument(
+        "--structures",
+        help="path to an ASE-readable file of structures to benchmark (if unspecified, bulk supercells of `--sizes` are generated)",
+        type=pathlib.Path,
+        default=None,
+    )
+    parser.add_argument(
+        "--sizes",
+        help="approximate number of atoms of the generated bulk supercells (default: 64 216 512 1000)",
+        nargs="+",
+        type=int,
+        default=[64, 216, 512, 1000],
+    )
+    parser.add_argument(
+        "--density",
+        help="number density (atoms per cubic length unit) of the generated bulk supercells (default: 0.05)",
+        type=float,
+        default=0.05,
+    )
+    parser.add_argument(
+        "--chemical-species",
+        help="chemical species to randomly populate the generated bulk supercells with (default: the model's type names)",
+        nargs="+",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--warmup",
+        help="number of untimed warmup steps for each structure (default: 5)",
+        type=int,
+        default=5,
+    )
+    parser.add_argument(
+        "--steps",
+        help="number of timed steps for each structure (default: 20)",
+        type=int,
+        default=20,
+    )
+    parser.add_argument(
+        "--timestep",
+        help="MD timestep in fs used to compute ns/day (default: 1.0)",
+        type=float,
+        default=1.0,
+    )
+    parser.add_argument(
+        "--seed",
+        help="seed for generating structures (default: 0)",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--batch-atoms",
+        help="if specified, additionally compare the throughput of evaluating all structures with `NequIPCalculator.calculate_batch` in batches of at most this many atoms against evaluating them one by one (only for checkpoint, package and TorchScript models)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--compile-modes",
+        help="additionally compile every checkpoint and package file with these `nequip-compile` modes (for `--target ase`) and benchmark the compiled models on the same structures, to compare eager, TorchScript and AOTInductor models side by side in one run",
+        nargs="+",
+        choices=["torchscript", "aotinductor"],
+        type=str,
+        default=[],
+    )
+    parser.add_argument(
+        "--output",
+        help="path to write the JSON results to (if unspecified, results are printed)",
+        type=pathlib.Path,
+        default=None,
+    )
+    args = parser.parse_args(args=args)
+
+    # `hydra` is only imported after parsing arguments to keep `--help` fast
+    from hydra.core.utils import configure_log
+
+    configure_log(None)
+    assert args.steps >= 1 and args.warmup >= 0
+
+    # === initialize global state ===
+    set_global_state(allow_tf32=args.tf32)
+
+    device = torch.device(args.device)
+    logger.info(f"Benchmarking on device: {device}")
+
+    results = {
+        "device": str(device),
+        "device_name": (
+            torch.cuda.get_device_name(device) if device.type == "cuda" else "cpu"
+        ),
+        "versions": get_current_code_versions(verbose=False),
+        "settings": {
+            k: str(v) if isinstance(v, pathlib.Path) else v
+            for k, v in vars(args).items()
+            if k not in ("model_paths", "output")
+        },
+        "models": [],
+    }
+
+    modifiers = [_parse_modifier(modifier) for modifier in args.modifiers]
+    # models compiled for `--compile-modes` are removed after benchmarking
+    with tempfile.TemporaryDirectory() as compile_dir:
+        for model_path, compiled_from in _iter_models(args, device, compile_dir):
+            model, metadata, model_format = _load_model(
+                model_path,
+                device,
+                args.model,
+                modifiers if compiled_from is None else [],
+            )
+            logger.info(
+                f"Benchmarking {model_format} model `{compiled_from or model_path}`"
+            )
+            type_names = metadata[graph_model.TYPE_NAMES_KEY]
+            type_mapper = ChemicalSpeciesToAtomTypeMapper(
+                model_type_names=type_names,
+                chemical_species_to_atom_type_map={t: t for t in type_names},
+            )
+            neighbor_transform = _create_neighbor_transform(
+                metadata, metadata[graph_model.R_MAX_KEY], type_names
+            )
+            energy_model_name = (
+                _find_energy_model_name(model) if model_format == "eager" else None
+            )
+
+            # === get structures ===
+            if args.structures is not None:
+                structures = ase.io.read(args.structures, index=":")
+            else:
+                species = (
+                    args.chemical_species
+                    if args.chemical_species is not None
+                    else type_names
+                )
+                structures = [
+                    _make_bulk(size, args.density, species, args.seed)
+                    for size in args.sizes
+                ]
+
+            model_results = []
+            for atoms in structures:
+                res = _benchmark_structure(
+                    model,
+                    atoms,
+                    type_mapper,
+                    neighbor_transform,
+                    device,
+                    energy_model_name,
+                    args.warmup,
+                    args.steps,
+                    args.timestep,
+                )
+                logger.info(
+                    f"{res['num_atoms']:>8} atoms {res['num_edges']:>10} edges: {res['step_ms']:.3f} ms/step, {res['atom_steps_per_s']:.4g} atom-steps/s, {res['ns_per_day']:.4g} ns/day"
+                )
+                model_results.append(res)
+
+            model_entry = {
+                "model_path": compiled_from or model_path,
+                "format": model_format,
+                "model_dtype": metadata.get(graph_model.MODEL_DTYPE_KEY, None),
+                "results": model_results,
+            }
+            if args.batch_atoms is not None:
+                if model_format == "aotinductor":
+                    logger.warning(
+                        f"Skipping batched benchmark of `{compiled_from or model_path}`, since AOTInductor models must be compiled with `--target batch` for batches"
+                    )
+                else:
+                    calc = NequIPCalculator(
+                        model,
+                        device=device,
+                        transforms=[type_mapper, neighbor_transform],
+                    )
+                    res = _benchmark_batched(
+                        calc,
+                        structures,
+                        args.batch_atoms,
+                        device,
+                        args.warmup,
+                        args.steps,
+                    )
+                    logger.info(
+                        f"{res['num_structures']} structures: {res['loop_structures_per_s']:.4g} structures/s one by one, {res['batched_structures_per_s']:.4g} structures/s batched ({res['speedup']:.3g}x)"
+                    )
+                    model_entry["batched"] = res
+            results["models"].append(model_entry)
+            del model
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Benchmark results saved to {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+from nequip.utils import model_cache, compile_cache
+
+import sys
+import argparse
+from datetime import datetime
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Manage the NequIP model cache of downloaded and unpacked package files (in `~/.nequip/model_cache`, configurable via `NEQUIP_CACHE_DIR`), or the compile cache of AOTInductor models (in `~/.nequip/compile_cache`, configurable via `NEQUIP_COMPILE_CACHE_DIR`)."
+    )
+    parser.add_argument(
+        "--compile-cache",
+        help="manage the compile cache instead of the model cache",
+        action="store_true",
+    )
+
+    subparsers = parser.add_subparsers(dest="command", title="commands")
+
+    subparsers.add_parser("list", help="list cache entries, most recently used first")
+
+    prune_parser = subparsers.add_parser(
+        "prune",
+        help="evict least recently used cache entries until the cache is below its size limit",
+    )
+    prune_parser.add_argument(
+        "--max-size-gb",
+        help="size limit in GB (default: `NEQUIP_CACHE_MAX_SIZE_GB`, or 20 GB if unset, and `NEQUIP_COMPILE_CACHE_MAX_SIZE_GB`, or 10 GB if unset, for the compile cache)",
+        type=float,
+        default=None,
+    )
+    prune_parser.add_argument(
+        "--all",
+        help="remove all cache entries",
+        action="store_true",
+    )
+
+    verify_parser = subparsers.add_parser(
+        "verify",
+        help="check cache entries against their recorded SHA256 hashes (exits with an error if any entry fails)",
+    )
+    verify_parser.add_argument(
+        "--remove",
+        help="remove cache entries that fail verification",
+        action="store_true",
+    )
+
+    args = parser.parse_args(args=args)
+
+    if args.compile_cache:
+        cache_name = "Compile cache"
+        get_cache_dir = compile_cache.get_compile_cache_dir
+        get_cache_max_size = compile_cache.get_compile_cache_max_size
+        list_cache_entries = compile_cache.list_compile_cache_entries
+        verify_cache_entry = compile_cache.verify_compile_cache_entry
+        remove_cache_entry = compile_cache.remove_compile_cache_entry
+        prune_cache = compile_cache.prune_compile_cache
+    else:
+        cache_name = "Model cache"
+        get_cache_dir = model_cache.get_cache_dir
+        get_cache_max_size = model_cache.get_cache_max_size
+        list_cache_entries = model_cache.list_cache_entries
+        verify_cache_entry = model_cache.verify_cache_entry
+        remove_cache_entry = model_cache.remove_cache_entry
+        prune_cache = model_cache.prune_model_cache
+
+    if args.command == "list":
+        entries = list_cache_entries()
+        print(f"{cache_name}: {get_cache_dir()}")
+        for entry in reversed(entries):
+            last_used = datetime.fromtimestamp(entry.last_used).isoformat(
+                sep=" ", timespec="seconds"
+            )
+            print(
+                f"{last_used}  {entry.size / 1e6:10.1f} MB  {entry.kind:8s}  {entry.source}  ({entry.name})"
+            )
+        total_size = sum(entry.size for entry in entries)
+        print(
+            f"{len(entries)} entries, {total_size / 1e9:.2f} GB (limit: {get_cache_max_size() / 1e9:.2f} GB)"
+        )
+
+    elif args.command == "prune":
+        if args.all:
+            max_size = 0
+        elif args.max_size_gb is not None:
+            max_size = int(args.max_size_gb * 1e9)
+        else:
+            max_size = None
+        evicted = prune_cache(max_size=max_size)
+        print(f"Evicted {len(evicted)} cache entries")
+
+    elif args.command == "verify":
+        num_failed = 0
+        for entry in list_cache_entries():
+            if verify_cache_entry(entry):
+                continue
+            print(f"FAILED  {entry.source}  ({entry.name})")
+            if args.remove:
+                remove_cache_entry(entry)
+                print("  removed")
+            else:
+                num_failed += 1
+        if num_failed > 0:
+            print(f"{num_failed} cache entries failed verification")
+            sys.exit(1)
+        print("All cache entries are valid")
+
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
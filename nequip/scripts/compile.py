@@ -2,25 +2,39 @@
 import torch
 
 from ._workflow_utils import set_workflow_state
-from ._compile_utils import COMPILE_TARGET_DICT
-from nequip.model.utils import _EAGER_MODEL_KEY
+from ._compile_utils import (
+    COMPILE_TARGET_DICT,
+    OUTPUT_FIELDS_METADATA_KEY,
+    SHAPE_BUCKETS_METADATA_KEY,
+    SHAPE_BUCKET_PADDING_METADATA_KEY,
+    _parse_modifier,
+    output_fields_to_derivatives,
+)
+from nequip.model.utils import _EAGER_MODEL_KEY, _SOLE_MODEL_KEY
 from nequip.model.saved_models.load_utils import load_saved_model
 from nequip.model.modify_utils import modify
-from nequip.train.lightning import _SOLE_MODEL_KEY
+from nequip.model.inference_models.shape_buckets import (
+    bucket_model_name,
+    pad_data,
+    parse_shape_buckets,
+    shape_buckets_to_str,
+    trim_data,
+)
 from nequip.data import AtomicDataDict
+from nequip.nn import set_force_stress_outputs
+from nequip.nn.graph_model import R_MAX_KEY
 from nequip.utils.logger import RankedLogger
 from nequip.utils.global_state import set_global_state, get_latest_global_state
-from omegaconf import OmegaConf
-import hydra
 
 import yaml
 import argparse
+import os
 import pathlib
+import shutil
 from typing import Final
 
 
 # === setup logging ===
-hydra.core.utils.configure_log(None)
 logger = RankedLogger(__name__, rank_zero_only=True)
 
 # hardcode a global seed for `nequip-compile`
@@ -30,6 +44,9 @@ _COMPILE_SEED: Final[int] = 1
 _AOT_METADATA_KEY = "aot_inductor.metadata"
 _AOT_OUTPUT_PATH_KEY = "aot_inductor.output_path"
 
+# file name of compiled models in the compile cache
+_COMPILE_CACHE_FNAME: Final[str] = "model.nequip.pt2"
+
 
 def _parse_bounds_to_Dim(name: str, bounds_str: str):
     if bounds_str == "static":
@@ -43,6 +60,98 @@ def _parse_bounds_to_Dim(name: str, bounds_str: str):
         )
 
 
+def _batch_map_to_str(batch_map):
+    return {
+        k: "static" if dim == torch.export.Dim.STATIC else f"{dim.min},{dim.max}"
+        for k, dim in batch_map.items()
+    }
+
+
+def _use_cached_model(
+    cache_key, model, device, output_path, input_fields, output_fields, data
+) -> bool:
+    """Copy the cached compiled model to ``output_path`` if there is a valid one, and return whether this was the case."""
+    from nequip.utils.compile_cache import get_cached_artifact
+    from nequip.utils.aot import check_aot_model
+    from nequip.utils.compile import prepare_model_for_compile
+
+    cached_path = get_cached_artifact(cache_key, _COMPILE_CACHE_FNAME)
+    if cached_path is None:
+        return False
+    shutil.copyfile(cached_path, output_path)
+
+    # the cache key doesn't capture changes of the model code that leave its architecture and the package versions unchanged (e.g. for editable installs)
+    # so we check the cached model against the model as after a fresh compilation
+    if os.environ.get("NEQUIP_SKIP_AOTI_MODEL_CHECK", "0") != "1":
+        prepare_model_for_compile(model, device)
+        try:
+            check_aot_model(model, output_path, input_fields, output_fields, data)
+        except AssertionError:
+            logger.warning(
+                f"Cached compiled model {cached_path} does not reproduce the outputs of the model, recompiling"
+            )
+            return False
+    return True
+
+
+def _shape_bucket_variants(
+    buckets,
+    padding,
+    raw_data,
+    data_settings,
+    num_frames,
+    batch_map,
+    input_fields,
+    output_fields,
+    r_max,
+    metadata,
+):
+    """Build the example data and dynamic shapes of each shape bucket variant, and record the buckets in ``metadata``."""
+    if padding and AtomicDataDict.BATCH_KEY not in input_fields:
+        # the padding nodes' energies are subtracted from the total energy of the single frame
+        if (
+            AtomicDataDict.TOTAL_ENERGY_KEY in output_fields
+            and AtomicDataDict.PER_ATOM_ENERGY_KEY not in output_fields
+        ):
+            raise ValueError(
+                f"`--shape-bucket-padding` for single-frame models with `{AtomicDataDict.TOTAL_ENERGY_KEY}` outputs requires `{AtomicDataDict.PER_ATOM_ENERGY_KEY}` outputs"
+            )
+    metadata[SHAPE_BUCKETS_METADATA_KEY] = shape_buckets_to_str(buckets)
+    metadata[SHAPE_BUCKET_PADDING_METADATA_KEY] = str(int(padding))
+
+    variants = {}
+    for idx, (max_nodes, max_edges) in enumerate(buckets):
+        # cut the example data down to fit the bucket (`num_frames` copies of it for batched targets)
+        # leaving room for at least two padding nodes
+        num_reserved_nodes = 2 if padding else 0
+        variant_data = data_settings(
+            trim_data(
+                raw_data.copy(),
+                (max_nodes - num_reserved_nodes) // num_frames,
+                max_edges // num_frames,
+            )
+        )
+        if padding:
+            variant_data = pad_data(variant_data, max_nodes, max_edges, r_max)
+            node_dim = edge_dim = torch.export.Dim.STATIC
+        else:
+            node_dim = torch.export.dynamic_shapes.Dim(
+                "num_nodes", min=2, max=max_nodes
+            )
+            edge_dim = torch.export.dynamic_shapes.Dim(
+                "num_edges", min=2, max=max_edges
+            )
+        variants[bucket_model_name(idx)] = (
+            variant_data,
+            {**batch_map, "node": node_dim, "edge": edge_dim},
+        )
+        logger.info(
+            f"Exporting shape bucket {idx} for up to {max_nodes} nodes and {max_edges} edges"
+            + (" (padded)" if padding else "")
+        )
+    return variants
+
+
 def main(args=None):
     # === parse inputs ===
     parser = argparse.ArgumentParser(
@@ -96,7 +205,7 @@ def main(args=None):
 
     parser.add_argument(
         "--modifiers",
-        help="modifiers to apply to the model before compiling",
+        help="modifiers to apply to the model before compiling, as `name` or `name:key=value,key=value` for modifiers with arguments",
         nargs="+",
         type=str,
         default=[],
@@ -150,6 +259,25 @@ def main(args=None):
         default="2,inf",
         help="bounds for num-nodes in format `min,max` or `static` (default: 2,inf)",
     )
+    parser.add_argument(
+        "--shape-buckets",
+        help="additionally export variants specialized to inputs of up to `max_nodes,max_edges` (e.g. `--shape-buckets 64,4096 512,32768`), which are packaged with the generic model and dispatched to by input size when loading the model in Python (default: none)",
+        nargs="+",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--shape-bucket-padding",
+        help="export the `--shape-buckets` variants with static shapes and pad inputs to the bucket bounds at runtime (default: False)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--compile-cache",
+        help="whether to reuse AOTInductor models from the compile cache (in `~/.nequip/compile_cache`, configurable via `NEQUIP_COMPILE_CACHE_DIR`) if the model, compile options and data are identical to a previous compilation, and to add newly compiled models to it (default: True)",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+    )
     parser.add_argument(
         "--inductor-configs",
         help="options for AOTInductor (default: {})",
@@ -165,6 +293,11 @@ def main(args=None):
     )
     args = parser.parse_args(args=args)
 
+    # `hydra` is only imported after parsing arguments to keep `--help` fast
+    from hydra.core.utils import configure_log
+
+    configure_log(None)
+
     set_workflow_state("compile")
 
     # === initialize global state ===
@@ -185,6 +318,9 @@ def main(args=None):
             "`output-path` must end with the `.nequip.pt2` extension for `aotinductor` compile mode"
         )
 
+    if args.shape_buckets is not None and args.mode != "aotinductor":
+        raise ValueError("`--shape-buckets` is only supported for `aotinductor` mode")
+
     # === load model ===
     # For aotinductor mode, we also need the data dict (unless data_path is provided)
     need_data_from_model = args.mode == "aotinductor" and args.data_path is None
@@ -199,8 +335,8 @@ def main(args=None):
         model, data_from_loaded_model = model
 
     # === modify model ===
-    # for now, we restrict modifiers to those without arguments, i.e. accelerations
-    model = modify(model, [{"modifier": modifier} for modifier in args.modifiers])
+    # modifiers with arguments are given as `name:key=value,key=value`
+    model = modify(model, [_parse_modifier(modifier) for modifier in args.modifiers])
 
     # === combine model and global options metadata ===
     # note that model.metadata can be dynamic and so can account for things that change as a result of modifiers
@@ -235,6 +371,11 @@ def main(args=None):
 
         check_pt2_compile_compatibility()
         from nequip.utils.aot import aot_export_model
+        from nequip.utils.compile_cache import (
+            compile_cache_enabled,
+            compute_compile_cache_key,
+            cache_artifact,
+        )
 
         # === get data for compilation ===
         if args.data_path is not None:
@@ -245,6 +386,9 @@ def main(args=None):
         else:
             data = data_from_loaded_model
         data = AtomicDataDict.to_(data, device)
+        # data settings may modify `data` in-place, so we keep the original for the shape bucket variants
+        raw_data = data.copy()
+        data_settings = lambda data: data  # noqa: E731
 
         # === parse batch dims range ===
         batch_map = {
@@ -266,7 +410,33 @@ def main(args=None):
             input_fields = tdict["input"]
             output_fields = tdict["output"]
             batch_map = tdict["batch_map_settings"](batch_map)
-            data = tdict["data_settings"](data)
+            data_settings = tdict["data_settings"]
+            data = data_settings(data)
+
+        # === only build the derivatives required by the output fields ===
+        # e.g. forces-only targets skip the strain derivatives for stress and virial
+        set_force_stress_outputs(model, **output_fields_to_derivatives(output_fields))
+        # record the output fields for `load_aotinductor_model`
+        assert OUTPUT_FIELDS_METADATA_KEY not in metadata
+        metadata[OUTPUT_FIELDS_METADATA_KEY] = " ".join(output_fields)
+
+        # === shape bucket variants ===
+        variants = None
+        if args.shape_buckets is not None:
+            variants = _shape_bucket_variants(
+                buckets=parse_shape_buckets(" ".join(args.shape_buckets)),
+                padding=args.shape_bucket_padding,
+                raw_data=raw_data,
+                data_settings=data_settings,
+                num_frames=AtomicDataDict.num_frames(data),
+                batch_map=batch_map,
+                input_fields=input_fields,
+                output_fields=output_fields,
+                r_max=float(metadata[R_MAX_KEY]),
+                metadata=metadata,
+            )
+        elif args.shape_bucket_padding:
+            raise ValueError("`--shape-bucket-padding` requires `--shape-buckets`")
 
         logger.debug(
             "Dynamic shapes:\n"
@@ -290,6 +460,8 @@ def main(args=None):
         metadata = {k: str(v) for k, v in metadata.items()}
         inductor_configs[_AOT_METADATA_KEY] = metadata
 
+        from omegaconf import OmegaConf
+
         logger.debug(
             "Inductor Configs:\n"
             + yaml.dump(
@@ -298,6 +470,43 @@ def main(args=None):
                 default_style="|",
             )
         )
+        # === compile cache ===
+        # identical compilations (same model, compile options, data and package versions) reuse the cached compiled model
+        cache_key = None
+        if args.compile_cache and compile_cache_enabled():
+            cache_key = compute_compile_cache_key(
+                model=model,
+                modifiers=args.modifiers,
+                device=str(device),
+                input_fields=input_fields,
+                output_fields=output_fields,
+                data={k: data[k] for k in input_fields},
+                batch_map=_batch_map_to_str(batch_map),
+                variants=None
+                if variants is None
+                else {
+                    name: (
+                        {k: variant_data[k] for k in input_fields},
+                        _batch_map_to_str(variant_batch_map),
+                    )
+                    for name, (variant_data, variant_batch_map) in variants.items()
+                },
+                inductor_configs=inductor_configs,
+                constant_fold=args.constant_fold,
+            )
+            if _use_cached_model(
+                cache_key,
+                model,
+                device,
+                str(args.output_path),
+                input_fields,
+                output_fields,
+                data,
+            ):
+                logger.info(f"Cached compiled model copied to {args.output_path}")
+                set_workflow_state(None)
+                return
+
         # === export model ===
         _ = aot_export_model(
             model=model,
@@ -310,8 +519,17 @@ def main(args=None):
             inductor_configs=inductor_configs,
             constant_fold=args.constant_fold,
             seed=_COMPILE_SEED,
+            variants=variants,
         )
         logger.info(f"Exported model saved to {args.output_path}")
+
+        if cache_key is not None:
+            cache_artifact(
+                cache_key,
+                _COMPILE_CACHE_FNAME,
+                lambda path: shutil.copyfile(args.output_path, path),
+                info={"input_path": str(args.input_path), "device": str(device)},
+            )
         set_workflow_state(None)
         return
 
@@ -29,15 +29,12 @@ from ._package_utils import (
     _INTERNAL_MODULES,
 )
 
-from omegaconf import OmegaConf
-import hydra
 import argparse
 import pathlib
 import yaml
 
 
 # === setup logging ===
-hydra.core.utils.configure_log(None)
 logger = RankedLogger(__name__, rank_zero_only=True)
 
 
@@ -95,6 +92,11 @@ def main(args=None):
 
     args = parser.parse_args(args=args)
 
+    # `hydra` is only imported after parsing arguments to keep `--help` fast
+    from hydra.core.utils import configure_log
+
+    configure_log(None)
+
     if args.command == "info":
         assert str(args.pkg_path).endswith(".nequip.zip"), (
             "packed model file to inspect must end with the `.nequip.zip` extension"
@@ -181,6 +183,8 @@ def main(args=None):
         orig_config = checkpoint["hyper_parameters"]["info_dict"].copy()
         # remove version info
         orig_config.pop("versions")
+        from omegaconf import OmegaConf
+
         orig_config = OmegaConf.to_yaml(orig_config)
         code_versions = get_current_code_versions()
 
@@ -7,6 +7,7 @@ import warnings
 from ._workflow_utils import set_workflow_state
 from nequip.utils import get_current_code_versions, RankedLogger
 from nequip.utils.global_state import set_global_state, get_latest_global_state
+from nequip.utils.compile_cache import compile_cache_enabled
 from nequip.data.datamodule import NequIPDataModule
 from nequip.train import NequIPLightningModule
 
@@ -80,9 +81,19 @@ def main(config: DictConfig) -> None:
     versions = get_current_code_versions()
 
     logger.info(f"This `nequip-train` run will perform the following tasks: {runs}")
-    logger.info(
-        f"and use the output directory provided by Hydra: {hydra.core.hydra_config.HydraConfig.get().runtime.output_dir}"
-    )
+    output_dir = hydra.core.hydra_config.HydraConfig.get().runtime.output_dir
+    logger.info(f"and use the output directory provided by Hydra: {output_dir}")
+
+    # === compile cache ===
+    # keep the Inductor (FX graph and AOTAutograd) caches of train-time compilation in the run directory, or in `NEQUIP_COMPILE_CACHE_DIR` if set,
+    # such that restarts (and other runs sharing `NEQUIP_COMPILE_CACHE_DIR`) reuse the compiled kernels instead of the node-local default location
+    if compile_cache_enabled():
+        compile_cache_dir = os.environ.get(
+            "NEQUIP_COMPILE_CACHE_DIR", os.path.join(output_dir, "compile_cache")
+        )
+        os.environ.setdefault(
+            "TORCHINDUCTOR_CACHE_DIR", os.path.join(compile_cache_dir, "inductor")
+        )
 
     logger.debug("Setting global options ...")
 
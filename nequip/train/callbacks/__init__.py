@@ -9,6 +9,7 @@ from .write_xyz import TestTimeXYZFileWriter
 from .wandb_watch import WandbWatch
 from .tf32_scheduler import TF32Scheduler
 from .training_stats import TrainingStatsMonitor
+from .throughput import TrainingThroughputMonitor
 
 __all__ = [
     SoftAdapt,
@@ -19,4 +20,5 @@ __all__ = [
     TestTimeXYZFileWriter,
     WandbWatch,
     TrainingStatsMonitor,
+    TrainingThroughputMonitor,
 ]
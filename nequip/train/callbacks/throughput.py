@@ -0,0 +1,240 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import time
+import torch
+import lightning
+from lightning.pytorch.callbacks import Callback
+from nequip.data import AtomicDataDict
+from nequip.train import NequIPLightningModule
+
+from collections import deque
+from typing import Dict, List, Sequence
+
+
+# phases of a training step that are timed, in the order they happen
+_PHASES: List[str] = ["data_wait", "forward", "backward", "optimizer", "step"]
+# throughput quantities computed from each batch
+_COUNTS: List[str] = ["atoms", "edges", "frames"]
+
+
+class TrainingThroughputMonitor(Callback):
+    """Monitor and log training throughput and per-step timing breakdowns.
+
+    Each training step is split into the following phases, measured with wall-clock timers around Lightning's hooks:
+
+    - ``data_wait``: time between the end of the previous training step (or of validation) and the start of the current one, i.e. time spent waiting on the ``DataLoader`` (and host-to-device transfers)
+    - ``forward``: model forward pass and loss computation, until the first backward pass of the step
+    - ``backward``: backward pass (including gradient syncs for multi-rank training), from the start of the first to the end of the last backward pass of the step
+    - ``optimizer``: optimizer step, gradient zeroing and other work until the end of the step
+    - ``step``: total time of the step, i.e. the sum of the above
+
+    Throughput in ``atoms``, ``edges`` and ``frames`` per second is computed with respect to the total ``step`` time.
+
+    Training modules that call backward several times per step, such as :class:`~nequip.train.ConFIGLightningModule` (once per loss component), thus report the combined time of all backward passes and of the work between them (e.g. collecting the gradients of each loss component) as ``backward``.
+
+    Rolling percentiles over the last ``window`` steps are logged every ``log_freq`` steps for every rank.
+    The cross-rank straggler spread (the difference between the slowest and fastest rank's mean ``step`` time over the window) and the corresponding ratio are also logged, which helps diagnose sync-bound multi-rank runs.
+
+    Example usage in config:
+
+    .. code-block:: yaml
+
+        callbacks:
+          - _target_: nequip.train.callbacks.TrainingThroughputMonitor
+            log_freq: 50
+            window: 200
+            percentiles: [50, 90, 99]
+
+    .. note::
+        GPU kernels are launched asynchronously, so accurate per-phase timings on GPUs require synchronizing the device at each phase boundary (``cuda_sync: true``, the default). Synchronization slightly reduces throughput; set ``cuda_sync: false`` to only measure the end-to-end ``step`` time faithfully.
+
+    Args:
+        log_freq (int): frequency (in training steps) at which statistics are logged
+        window (int): number of most recent steps used to compute rolling statistics
+        percentiles (Sequence[float]): percentiles (between ``0`` and ``100``) of the per-phase timings to log
+        cuda_sync (bool): whether to synchronize CUDA devices at phase boundaries for accurate timings
+    """
+
+    def __init__(
+        self,
+        log_freq: int = 100,
+        window: int = 100,
+        percentiles: Sequence[float] = (50, 90),
+        cuda_sync: bool = True,
+    ):
+        assert log_freq >= 1
+        assert window >= 1
+        assert all(0 <= p <= 100 for p in percentiles)
+        self.log_freq = log_freq
+        self.window = window
+        self.percentiles = [float(p) for p in percentiles]
+        self.cuda_sync = cuda_sync
+        self._prefix = "throughput"
+
+        # rolling buffers of per-step timings (seconds) and per-step counts
+        self._timings: Dict[str, deque] = {
+            phase: deque(maxlen=window) for phase in _PHASES
+        }
+        self._counts: Dict[str, deque] = {
+            count: deque(maxlen=window) for count in _COUNTS
+        }
+
+        # timestamps of phase boundaries within the current step
+        self._last_step_end = None
+        self._step_start = None
+        self._forward_end = None
+        self._backward_end = None
+        self.step_count = 0
+
+    def _now(self, pl_module: NequIPLightningModule) -> float:
+        if self.cuda_sync and pl_module.device.type == "cuda":
+            torch.cuda.synchronize(pl_module.device)
+        return time.perf_counter()
+
+    def on_train_epoch_start(
+        self,
+        trainer: lightning.Trainer,
+        pl_module: NequIPLightningModule,
+    ) -> None:
+        """"""
+        # the first batch of each epoch waits on the dataloader from here
+        self._last_step_end = self._now(pl_module)
+
+    def on_train_batch_start(
+        self,
+        trainer: lightning.Trainer,
+        pl_module: NequIPLightningModule,
+        batch: AtomicDataDict.Type,
+        batch_idx: int,
+    ) -> None:
+        """"""
+        self._step_start = self._now(pl_module)
+        self._forward_end = None
+        self._backward_end = None
+
+    def on_before_backward(
+        self,
+        trainer: lightning.Trainer,
+        pl_module: NequIPLightningModule,
+        loss: torch.Tensor,
+    ) -> None:
+        """"""
+        # only the first backward pass of the step ends the forward phase
+        if self._forward_end is None:
+            self._forward_end = self._now(pl_module)
+
+    def on_after_backward(
+        self,
+        trainer: lightning.Trainer,
+        pl_module: NequIPLightningModule,
+    ) -> None:
+        """"""
+        self._backward_end = self._now(pl_module)
+
+    def on_validation_end(
+        self,
+        trainer: lightning.Trainer,
+        pl_module: NequIPLightningModule,
+    ) -> None:
+        """"""
+        # exclude (e.g. mid-epoch) validation from the `data_wait` of the next training step
+        self._last_step_end = self._now(pl_module)
+
+    def on_train_batch_end(
+        self,
+        trainer: lightning.Trainer,
+        pl_module: NequIPLightningModule,
+        outputs: torch.Tensor,
+        batch: AtomicDataDict.Type,
+        batch_idx: int,
+    ) -> None:
+        """"""
+        step_end = self._now(pl_module)
+
+        # skip incomplete measurements, e.g. steps skipped by Lightning
+        if (
+            self._last_step_end is not None
+            and self._step_start is not None
+            and self._forward_end is not None
+            and self._backward_end is not None
+        ):
+            data_wait = self._step_start - self._last_step_end
+            forward = self._forward_end - self._step_start
+            backward = self._backward_end - self._forward_end
+            optimizer = step_end - self._backward_end
+            for phase, value in zip(
+                _PHASES,
+                [
+                    data_wait,
+                    forward,
+                    backward,
+                    optimizer,
+                    data_wait + forward + backward + optimizer,
+                ],
+            ):
+                self._timings[phase].append(value)
+
+            self._counts["atoms"].append(AtomicDataDict.num_nodes(batch))
+            self._counts["edges"].append(
+                AtomicDataDict.num_edges(batch)
+                if AtomicDataDict.EDGE_INDEX_KEY in batch
+                else 0
+            )
+            self._counts["frames"].append(AtomicDataDict.num_frames(batch))
+
+            # the step counter must advance identically on all ranks for the collective in `_log_stats`
+            if self.step_count % self.log_freq == 0:
+                self._log_stats(pl_module)
+            self.step_count += 1
+
+        # reset timestamp as late as possible to exclude this callback's logging from `data_wait`
+        self._last_step_end = self._now(pl_module)
+
+    def _local_stats(self) -> Dict[str, float]:
+        """Compute the rolling statistics of this rank."""
+        stats = {}
+        q = torch.tensor([p / 100.0 for p in self.percentiles], dtype=torch.float64)
+        for phase in _PHASES:
+            timings = torch.tensor(list(self._timings[phase]), dtype=torch.float64)
+            stats[f"{phase}_mean"] = timings.mean().item()
+            for p, val in zip(self.percentiles, torch.quantile(timings, q).tolist()):
+                stats[f"{phase}_p{p:g}"] = val
+        total_time = sum(self._timings["step"])
+        for count in _COUNTS:
+            stats[f"{count}_per_s"] = sum(self._counts[count]) / total_time
+        # fraction of time spent waiting for data, to directly diagnose data-bound runs
+        stats["data_wait_fraction"] = sum(self._timings["data_wait"]) / total_time
+        return stats
+
+    def _log_stats(self, pl_module: NequIPLightningModule) -> None:
+        """"""
+        local_stats = self._local_stats()
+        names = list(local_stats.keys())
+        local_tensor = torch.tensor(
+            [local_stats[name] for name in names],
+            dtype=torch.float64,
+            device=pl_module.device,
+        )
+        # (num_ranks, num_stats), where the leading dim is absent for single-rank training
+        all_stats = pl_module.all_gather(local_tensor).view(-1, len(names)).cpu()
+
+        log_dict = {}
+        for rank, rank_stats in enumerate(all_stats):
+            for name, val in zip(names, rank_stats.tolist()):
+                log_dict[f"{self._prefix}.rank{rank}/{name}"] = val
+
+        # aggregate throughput over ranks
+        for count in _COUNTS:
+            idx = names.index(f"{count}_per_s")
+            log_dict[f"{self._prefix}/{count}_per_s"] = all_stats[:, idx].sum().item()
+
+        # straggler spread based on the mean step time of each rank
+        step_means = all_stats[:, names.index("step_mean")]
+        log_dict[f"{self._prefix}/straggler_spread"] = (
+            step_means.max() - step_means.min()
+        ).item()
+        log_dict[f"{self._prefix}/straggler_ratio"] = (
+            step_means.max() / step_means.min()
+        ).item()
+
+        # stats are already gathered, so only rank zero needs to log
+        pl_module.log_dict(log_dict, on_step=True, on_epoch=False, rank_zero_only=True)
@@ -5,6 +5,7 @@ from lightning.pytorch.utilities.warnings import PossibleUserWarning
 from hydra.utils import instantiate
 from hydra.utils import get_method, get_class
 from nequip.data import AtomicDataDict
+from nequip.model.utils import _SOLE_MODEL_KEY
 from nequip.utils import RankedLogger
 
 import warnings
@@ -22,9 +23,6 @@ warnings.filterwarnings(
 )
 
 
-_SOLE_MODEL_KEY = "sole_model"
-
-
 class NequIPLightningModule(lightning.LightningModule):
     """:class:`~lightning.pytorch.core.LightningModule` for training, validating, testing and predicting with models constructed in the NequIP ecosystem.
 
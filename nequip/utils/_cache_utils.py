@@ -0,0 +1,175 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+"""Building blocks shared by the model cache (:mod:`nequip.utils.model_cache`) and the compile cache (:mod:`nequip.utils.compile_cache`).
+
+Entries of both caches are populated in unique partial files or directories that are renamed into place on success, under an inter-process lock such that only one process populates a given entry at a time.
+The last use of an entry is recorded in the modification time of its metadata file, such that the least recently used entries are evicted once a cache exceeds its size limit.
+"""
+
+import os
+import time
+import hashlib
+import pathlib
+import shutil
+import uuid
+import contextlib
+from typing import Callable, Dict, Final, Iterable, List, NamedTuple
+
+from nequip.utils.logger import RankedLogger
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows, where populating a cache is only protected by atomic renames
+    fcntl = None
+
+logger = RankedLogger(__name__, rank_zero_only=True)
+
+_LOCK_DIRNAME: Final[str] = ".locks"
+# partial files and directories older than this are left over from crashed processes
+_STALE_PARTIAL_AGE: Final[float] = 24 * 3600.0
+
+
+class CacheEntry(NamedTuple):
+    """Entry of a cache, e.g. a downloaded package file, an unpacked package or a compiled model."""
+
+    # path of the entry relative to the cache directory
+    name: str
+    # `download` or `unpacked` for the model cache, `compiled` for the compile cache
+    kind: str
+    # model ID or URL of downloaded package files, path of the package file of unpacked packages, and file name of compiled models
+    source: str
+    # in bytes
+    size: int
+    # time of the last use in seconds since the epoch
+    last_used: float
+
+
+def compute_file_hash(file_path: pathlib.Path) -> str:
+    """Compute SHA256 hash of file content."""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def file_stat(file_path: pathlib.Path) -> Dict[str, int]:
+    """Size and modification time of a file, which are compared on every cache hit instead of hashing the file."""
+    stat = file_path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def path_size(path: pathlib.Path) -> int:
+    """Size of a file, or of all files in a directory, in bytes."""
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    return path.stat().st_size if path.exists() else 0
+
+
+# === inter-process locking ===
+
+
+@contextlib.contextmanager
+def file_lock(cache_dir: pathlib.Path, name: str, blocking: bool = True):
+    """Hold an exclusive inter-process lock on ``name`` (e.g. a cache entry) of the cache in ``cache_dir`` for the duration of the context.
+
+    Yields whether the lock was acquired, which is always the case if ``blocking``.
+    Lock files are never removed, since removing a lock file that another process is about to lock would break mutual exclusion.
+    """
+    if fcntl is None:
+        yield True
+        return
+
+    lock_dir = cache_dir / _LOCK_DIRNAME
+    lock_dir.mkdir(exist_ok=True)
+    with open(lock_dir / f"{name.replace('/', '-')}.lock", "a") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if not blocking:
+                yield False
+                return
+            logger.info(f"Waiting for another process to populate `{name}` ...")
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def mark_used(metadata_path: pathlib.Path) -> None:
+    """Record the access of a cache entry in the modification time of its metadata file for LRU eviction."""
+    # the entry may be evicted by another process in the meantime
+    with contextlib.suppress(OSError):
+        os.utime(metadata_path)
+
+
+# === populating entries ===
+
+
+def partial_path(path: pathlib.Path) -> pathlib.Path:
+    """Unique partial path next to ``path``, to be renamed to ``path`` once it is fully written."""
+    return path.parent / f"{path.name}.partial-{uuid.uuid4().hex}"
+
+
+@contextlib.contextmanager
+def populate_dir(entry: pathlib.Path):
+    """Yield a new partial directory, which replaces the directory ``entry`` if the context exits without errors.
+
+    This avoids leaving corrupted entries if populating an entry fails mid-way.
+    Processes that still use files of a replaced entry (e.g. memory maps) keep them until they close them.
+    """
+    partial = partial_path(entry)
+    partial.mkdir()
+    try:
+        yield partial
+        shutil.rmtree(entry, ignore_errors=True)
+        os.rename(partial, entry)
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+
+
+def remove_stale_partials(paths: Iterable[pathlib.Path]) -> None:
+    """Remove the partial files and directories among ``paths`` that were left over from crashed processes."""
+    now = time.time()
+    for path in paths:
+        with contextlib.suppress(OSError):
+            if now - path.stat().st_mtime > _STALE_PARTIAL_AGE:
+                if path.is_dir():
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    path.unlink()
+
+
+# === eviction ===
+
+
+def prune_entries(
+    entries: List[CacheEntry],
+    max_size: int,
+    keep: List[str],
+    remove_fn: Callable[[CacheEntry], bool],
+) -> List[str]:
+    """Evict the least recently used of ``entries`` with ``remove_fn`` until their total size is at most ``max_size`` bytes.
+
+    Args:
+        entries: entries of a cache, least recently used first
+        max_size: size limit in bytes
+        keep: names of entries that are never evicted (e.g. entries that were just added)
+        remove_fn: function that removes an entry and returns whether it was removed (entries that are being populated by other processes are skipped)
+
+    Returns:
+        list of evicted entry names
+    """
+    total_size = sum(entry.size for entry in entries)
+    evicted = []
+    for entry in entries:
+        if total_size <= max_size:
+            break
+        if entry.name in keep:
+            continue
+        if remove_fn(entry):
+            total_size -= entry.size
+            evicted.append(entry.name)
+    return evicted
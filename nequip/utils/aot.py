@@ -14,7 +14,7 @@ from .dtype import (
     _pt2_compile_error_message,
 )
 
-from typing import List, Dict, Union, Any
+from typing import List, Dict, Union, Any, Optional, Tuple
 
 
 def aot_export_model(
@@ -28,7 +28,18 @@ def aot_export_model(
     inductor_configs: Dict[str, Any] = {},
     constant_fold: bool = False,
     seed: int = 1,
+    variants: Optional[
+        Dict[
+            str, Tuple[AtomicDataDict.Type, Dict[str, torch.export.dynamic_shapes.Dim]]
+        ]
+    ] = None,
 ) -> str:
+    """Export ``model`` with AOTInductor into a ``.pt2`` package at ``output_path``.
+
+    ``variants`` optionally maps names to additional ``(data, batch_map)`` pairs, each of which is exported as a separately compiled model in the same package
+    (e.g. with tighter or static shapes), loadable with ``torch._inductor.package.load_package(output_path, name)``.
+    The main model is always packaged under the default name ``model``.
+    """
     # === torch version check ===
     check_pt2_compile_compatibility()
 
@@ -56,50 +67,88 @@ def aot_export_model(
         # set the config
         inductor_configs["aot_inductor.use_runtime_constant_folding"] = True
 
-    # === preprocess model and make_fx ===
+    # === preprocess model ===
     model_to_trace = ListInputOutputWrapper(model, input_fields, output_fields)
     model_to_trace = prepare_model_for_compile(model_to_trace, device)
 
-    fx_model = nequip_make_fx(
-        model=model_to_trace,
-        data={k: data[k] for k in input_fields},
-        fields=input_fields,
-        seed=seed,
-    )
+    all_variants = {"model": (data, batch_map)}
+    if variants is not None:
+        assert "model" not in variants
+        all_variants.update(variants)
 
-    # === perform export ===
-    # == define dynamics dims ==
-    dynamic_shapes = get_dynamic_shapes(input_fields, batch_map)
+    # === make_fx and export each variant ===
+    exported = {}
+    for name, (variant_data, variant_batch_map) in all_variants.items():
+        fx_model = nequip_make_fx(
+            model=model_to_trace,
+            data={k: variant_data[k] for k in input_fields},
+            fields=input_fields,
+            seed=seed,
+        )
+        # == define dynamics dims ==
+        dynamic_shapes = get_dynamic_shapes(input_fields, variant_batch_map)
+        exported[name] = torch.export.export(
+            fx_model,
+            (*[variant_data[k] for k in input_fields],),
+            dynamic_shapes=dynamic_shapes,
+        )
 
-    # == export ==
-    exported = torch.export.export(
-        fx_model,
-        (*[data[k] for k in input_fields],),
-        dynamic_shapes=dynamic_shapes,
-    )
+    # === compile and package ===
     # NOTE: the following requires PyTorch 2.6
-    out_path = torch._inductor.aoti_compile_and_package(
-        exported,
-        package_path=output_path,
-        inductor_configs=inductor_configs,
-    )
+    if variants is None:
+        out_path = torch._inductor.aoti_compile_and_package(
+            exported["model"],
+            package_path=output_path,
+            inductor_configs=inductor_configs,
+        )
+    else:
+        from torch._inductor.package import package_aoti
+
+        # each variant is compiled separately and packaged under its own name
+        options = {**inductor_configs, "aot_inductor.package": True}
+        aoti_files = {
+            name: torch._inductor.aot_compile(
+                exported_program.module(),
+                exported_program.example_inputs[0],
+                options=options,
+            )
+            for name, exported_program in exported.items()
+        }
+        out_path = package_aoti(output_path, aoti_files)
     assert out_path == output_path
 
     # === sanity check ===
     if os.environ.get("NEQUIP_SKIP_AOTI_MODEL_CHECK", "0") != "1":
-        aot_model = DictInputOutputWrapper(
-            torch._inductor.aoti_load_package(out_path),
-            input_fields,
-            output_fields,
-        )
-        test_model_output_similarity_by_dtype(
-            aot_model,
-            model,
-            {k: data[k] for k in input_fields},
-            model.model_dtype,
-            fields=output_fields,
-            error_message=_pt2_compile_error_message,
-        )
-        del aot_model
+        for name, (variant_data, _) in all_variants.items():
+            check_aot_model(
+                model, out_path, input_fields, output_fields, variant_data, name
+            )
 
     return out_path
+
+
+def check_aot_model(
+    model: torch.nn.Module,
+    package_path: str,
+    input_fields: List[str],
+    output_fields: List[str],
+    data: AtomicDataDict.Type,
+    name: str = "model",
+) -> None:
+    """Check that the model ``name`` in the AOTInductor package at ``package_path`` reproduces the outputs of ``model`` on ``data``."""
+    from torch._inductor.package import load_package
+
+    aot_model = DictInputOutputWrapper(
+        load_package(package_path, name),
+        input_fields,
+        output_fields,
+    )
+    test_model_output_similarity_by_dtype(
+        aot_model,
+        model,
+        {k: data[k] for k in input_fields},
+        model.model_dtype,
+        fields=output_fields,
+        error_message=_pt2_compile_error_message,
+    )
+    del aot_model
@@ -0,0 +1,280 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+"""Content-addressed cache of compilation artifacts (e.g. AOTInductor packages from ``nequip-compile``).
+
+Each entry is a directory named after the SHA256 key of everything that determines the artifact
+(model architecture and weights, compile options, device, dtype, code versions, etc.), containing the artifact and a ``metadata.json``.
+The modification time of ``metadata.json`` records the last use of the entry, such that the least recently used entries are evicted once the cache exceeds its size limit.
+Cache hits are validated by the size and modification time of the artifact, while ``nequip-cache --compile-cache verify`` checks the SHA256 hashes.
+"""
+
+import os
+import json
+import hashlib
+import pathlib
+import shutil
+from datetime import datetime
+from typing import Any, Callable, Dict, Final, List, Optional
+
+import torch
+
+from nequip.utils.logger import RankedLogger
+from nequip.utils.versions import get_current_code_versions
+from nequip.utils._cache_utils import (
+    CacheEntry,
+    compute_file_hash,
+    file_stat,
+    path_size,
+    file_lock,
+    mark_used,
+    populate_dir,
+    remove_stale_partials,
+    prune_entries,
+)
+
+logger = RankedLogger(__name__, rank_zero_only=True)
+
+_NEQUIP_NO_COMPILE_CACHE: Final[bool] = os.environ.get(
+    "NEQUIP_NO_COMPILE_CACHE", ""
+).lower() in ("1", "true", "yes", "y")
+
+_METADATA_FNAME: Final[str] = "metadata.json"
+_DEFAULT_MAX_SIZE_GB: Final[float] = 10.0
+
+
+def compile_cache_enabled() -> bool:
+    """Whether the compile cache is enabled (it is disabled by setting ``NEQUIP_NO_COMPILE_CACHE``)."""
+    return not _NEQUIP_NO_COMPILE_CACHE
+
+
+def get_compile_cache_dir() -> pathlib.Path:
+    """Get the compile cache directory from ``NEQUIP_COMPILE_CACHE_DIR`` or the default location ``~/.nequip/compile_cache``."""
+    cache_dir = os.environ.get("NEQUIP_COMPILE_CACHE_DIR")
+    if cache_dir:
+        path = pathlib.Path(cache_dir).expanduser().resolve()
+    else:
+        path = pathlib.Path.home() / ".nequip" / "compile_cache"
+
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def get_compile_cache_max_size() -> int:
+    """Get the size limit of the compile cache in bytes from ``NEQUIP_COMPILE_CACHE_MAX_SIZE_GB`` (default: 10 GB)."""
+    max_size_gb = float(
+        os.environ.get("NEQUIP_COMPILE_CACHE_MAX_SIZE_GB", _DEFAULT_MAX_SIZE_GB)
+    )
+    return int(max_size_gb * 1e9)
+
+
+def _update_hash(sha256, obj: Any) -> None:
+    """Update ``sha256`` with a deterministic serialization of ``obj``."""
+    if isinstance(obj, torch.Tensor):
+        tensor = obj.detach().cpu().contiguous()
+        sha256.update(f"tensor|{tensor.dtype}|{tuple(tensor.shape)}|".encode())
+        sha256.update(tensor.view(-1).view(torch.uint8).numpy().tobytes())
+    elif isinstance(obj, torch.nn.Module):
+        # architecture and weights
+        sha256.update(f"module|{obj!r}|".encode())
+        for name, tensor in obj.state_dict().items():
+            sha256.update(f"{name}|".encode())
+            _update_hash(sha256, tensor)
+    elif isinstance(obj, dict):
+        sha256.update(b"dict|")
+        for k in sorted(obj.keys(), key=str):
+            _update_hash(sha256, k)
+            _update_hash(sha256, obj[k])
+    elif isinstance(obj, (list, tuple)):
+        sha256.update(f"list|{len(obj)}|".encode())
+        for v in obj:
+            _update_hash(sha256, v)
+    else:
+        sha256.update(f"{type(obj).__name__}|{obj!r}|".encode())
+
+
+def compute_compile_cache_key(**parts) -> str:
+    """Compute the cache key of a compilation from all of its inputs.
+
+    ``parts`` may contain modules (hashed by architecture and weights), tensors (hashed by content), and nested dicts, lists and plain values.
+    The versions of the relevant packages (e.g. ``torch`` and ``nequip``) are always included.
+    """
+    sha256 = hashlib.sha256()
+    _update_hash(sha256, get_current_code_versions(verbose=False))
+    _update_hash(sha256, parts)
+    return sha256.hexdigest()
+
+
+def _get_valid_artifact(
+    entry: pathlib.Path, fname: str, log: bool = True
+) -> Optional[pathlib.Path]:
+    """Validate the artifact ``fname`` of the cache entry ``entry`` by its size and modification time, and return its path if valid (marking the entry as recently used)."""
+    artifact_path = entry / fname
+    metadata_path = entry / _METADATA_FNAME
+    if not artifact_path.exists() or not metadata_path.exists():
+        return None
+
+    # the full hash is only checked by `verify_compile_cache_entry`, since artifacts can be large
+    try:
+        with open(metadata_path, "r") as f:
+            metadata = json.load(f)
+        if file_stat(artifact_path) != metadata.get("file_stat"):
+            if log:
+                logger.warning(
+                    f"Compile cache validation failed: {artifact_path} changed since it was cached, recompiling"
+                )
+            return None
+    except (json.JSONDecodeError, OSError) as e:
+        if log:
+            logger.warning(
+                f"Failed to read compile cache entry {entry}: {e}, recompiling"
+            )
+        return None
+
+    mark_used(metadata_path)
+    return artifact_path
+
+
+def get_cached_artifact(cache_key: str, fname: str) -> Optional[pathlib.Path]:
+    """Check if an artifact is cached and validate it.
+
+    Returns the cached file path if valid (marking the entry as recently used), None otherwise.
+    """
+    if not compile_cache_enabled():
+        return None
+
+    artifact_path = _get_valid_artifact(get_compile_cache_dir() / cache_key, fname)
+    if artifact_path is not None:
+        logger.info(f"Using cached compilation artifact from {artifact_path}")
+    return artifact_path
+
+
+def cache_artifact(
+    cache_key: str,
+    fname: str,
+    write_fn: Callable[[pathlib.Path], None],
+    info: Dict[str, Any] = {},
+) -> pathlib.Path:
+    """Write an artifact into the cache and evict the least recently used entries beyond the size limit.
+
+    If another process cached a valid artifact under the same key in the meantime, that one is kept.
+
+    Args:
+        cache_key: key from :func:`compute_compile_cache_key`
+        fname: file name of the artifact
+        write_fn: function that writes the artifact to the provided path
+        info: additional JSON-serializable information to keep in the entry's metadata
+
+    Returns:
+        Path to the cached artifact
+    """
+    cache_dir = get_compile_cache_dir()
+    entry = cache_dir / cache_key
+
+    with file_lock(cache_dir, cache_key):
+        artifact_path = _get_valid_artifact(entry, fname, log=False)
+        if artifact_path is not None:
+            return artifact_path
+
+        with populate_dir(entry) as partial:
+            write_fn(partial / fname)
+            metadata = {
+                "artifact": fname,
+                "file_stat": file_stat(partial / fname),
+                "file_sha256": compute_file_hash(partial / fname),
+                "cached_at": datetime.utcnow().isoformat(),
+                **info,
+            }
+            with open(partial / _METADATA_FNAME, "w") as f:
+                json.dump(metadata, f, indent=2)
+
+    logger.info(f"Compilation artifact cached to {entry / fname}")
+    prune_compile_cache(keep=[cache_key])
+    return entry / fname
+
+
+# === cache management ===
+
+
+def list_compile_cache_entries() -> List[CacheEntry]:
+    """List the entries of the compile cache, least recently used first."""
+    cache_dir = get_compile_cache_dir()
+    entries = []
+    # partial entries and anything else that isn't ours (e.g. the Inductor cache) have no metadata
+    for metadata_path in cache_dir.glob(f"*/{_METADATA_FNAME}"):
+        try:
+            with open(metadata_path, "r") as f:
+                metadata = json.load(f)
+            entry = CacheEntry(
+                name=metadata_path.parent.name,
+                kind="compiled",
+                source=str(metadata.get("artifact")),
+                size=path_size(metadata_path.parent),
+                last_used=metadata_path.stat().st_mtime,
+            )
+        except (json.JSONDecodeError, OSError):
+            # entry is being removed or replaced by another process
+            continue
+        entries.append(entry)
+    return sorted(entries, key=lambda entry: entry.last_used)
+
+
+def verify_compile_cache_entry(entry: CacheEntry) -> bool:
+    """Check the artifact of a compile cache entry against the SHA256 hash recorded in its metadata."""
+    entry_path = get_compile_cache_dir() / entry.name
+    try:
+        with open(entry_path / _METADATA_FNAME, "r") as f:
+            metadata = json.load(f)
+        artifact_path = entry_path / metadata["artifact"]
+        return compute_file_hash(artifact_path) == metadata.get("file_sha256")
+    except (json.JSONDecodeError, OSError, KeyError):
+        return False
+
+
+def remove_compile_cache_entry(entry: CacheEntry, blocking: bool = True) -> bool:
+    """Remove a compile cache entry.
+
+    Args:
+        entry: entry from :func:`list_compile_cache_entries`
+        blocking: whether to wait for processes populating the entry, otherwise the entry is skipped if it is being populated
+
+    Returns:
+        whether the entry was removed
+    """
+    cache_dir = get_compile_cache_dir()
+    with file_lock(cache_dir, entry.name, blocking=blocking) as acquired:
+        if not acquired:
+            return False
+        # the metadata is removed first, such that other processes consider the entry missing
+        (cache_dir / entry.name / _METADATA_FNAME).unlink(missing_ok=True)
+        shutil.rmtree(cache_dir / entry.name, ignore_errors=True)
+    return True
+
+
+def prune_compile_cache(
+    max_size: Optional[int] = None, keep: List[str] = []
+) -> List[str]:
+    """Evict the least recently used entries of the compile cache until it is smaller than ``max_size`` bytes.
+
+    Entries that are being populated by other processes are skipped.
+
+    Args:
+        max_size: size limit in bytes (default: from :func:`get_compile_cache_max_size`)
+        keep: cache keys that are never evicted (e.g. entries that were just added)
+
+    Returns:
+        list of evicted cache keys
+    """
+    if max_size is None:
+        max_size = get_compile_cache_max_size()
+    remove_stale_partials(get_compile_cache_dir().glob("*.partial-*"))
+
+    evicted = prune_entries(
+        list_compile_cache_entries(),
+        max_size,
+        keep,
+        lambda entry: remove_compile_cache_entry(entry, blocking=False),
+    )
+    if evicted:
+        logger.info(
+            f"Evicted {len(evicted)} least recently used compile cache entries to stay below {max_size / 1e9:.2f} GB"
+        )
+    return evicted
@@ -40,6 +40,13 @@ _FLOAT32_MODEL_TOL: Final[float] = float(
     os.environ.get("NEQUIP_FLOAT32_MODEL_TOL", 5e-5)
 )
 _TF32_MODEL_TOL: Final[float] = float(os.environ.get("NEQUIP_TF32_MODEL_TOL", 2e-3))
+# tolerances of the reduced precision compute dtypes of `enable_mixed_precision`
+_BFLOAT16_MODEL_TOL: Final[float] = float(
+    os.environ.get("NEQUIP_BFLOAT16_MODEL_TOL", 5e-2)
+)
+_FLOAT16_MODEL_TOL: Final[float] = float(
+    os.environ.get("NEQUIP_FLOAT16_MODEL_TOL", 1e-2)
+)
 
 
 def floating_point_tolerance(model_dtype: Union[str, torch.dtype]):
@@ -47,6 +54,7 @@ def floating_point_tolerance(model_dtype: Union[str, torch.dtype]):
     Consistent set of floating point tolerances for sanity checking based on ``model_dtype``, that also accounts for TF32 state.
 
     Assumes global dtype if ``float64``, and that TF32 will only ever be used if ``model_dtype`` is ``float32``.
+    ``bfloat16`` and ``float16`` are the reduced precision compute dtypes of the ``enable_mixed_precision`` modifier.
     """
     from .versions.torch_versions import _TORCH_GE_2_9
 
@@ -67,6 +75,10 @@ def floating_point_tolerance(model_dtype: Union[str, torch.dtype]):
         "float32": _TF32_MODEL_TOL if using_tf32 else _FLOAT32_MODEL_TOL,
         torch.float64: _FLOAT64_MODEL_TOL,
         "float64": _FLOAT64_MODEL_TOL,
+        torch.bfloat16: _BFLOAT16_MODEL_TOL,
+        "bfloat16": _BFLOAT16_MODEL_TOL,
+        torch.float16: _FLOAT16_MODEL_TOL,
+        "float16": _FLOAT16_MODEL_TOL,
     }[model_dtype]
 
 
@@ -1,8 +1,6 @@
 # This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
 import torch
 
-from lightning.pytorch import seed_everything
-
 import e3nn
 
 from .global_dtype import _GLOBAL_DTYPE
@@ -76,6 +74,8 @@ def set_global_state(
     global _GLOBAL_STATE_INITIALIZED
     if not _GLOBAL_STATE_INITIALIZED:
         # === set global seed ===
+        from lightning.pytorch import seed_everything
+
         seed_everything(123, workers=True, verbose=False)
 
         # === set global dtype ===
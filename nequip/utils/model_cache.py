@@ -5,9 +5,22 @@ import json
 import hashlib
 import pathlib
 import shutil
+import zipfile
 from datetime import datetime
-from typing import Optional, Callable, Final
+from typing import Optional, Callable, Dict, Final, List
 from nequip.utils.logger import RankedLogger
+from nequip.utils._cache_utils import (
+    CacheEntry,
+    compute_file_hash,
+    file_stat,
+    path_size,
+    file_lock,
+    mark_used,
+    partial_path,
+    populate_dir,
+    remove_stale_partials,
+    prune_entries,
+)
 
 logger = RankedLogger(__name__, rank_zero_only=True)
 
@@ -18,6 +31,12 @@ _NEQUIP_NO_CACHE: Final[bool] = os.environ.get("NEQUIP_NO_CACHE", "").lower() in
     "y",
 )
 
+# bump whenever the layout of unpacked package entries changes, such that old entries are not reused
+_UNPACKED_CACHE_VERSION: Final[int] = 1
+_UNPACKED_METADATA_FNAME: Final[str] = "metadata.json"
+
+_DEFAULT_MAX_SIZE_GB: Final[float] = 20.0
+
 
 def get_cache_dir() -> pathlib.Path:
     """Get the model cache directory from environment or default location."""
@@ -31,6 +50,17 @@ def get_cache_dir() -> pathlib.Path:
     return path
 
 
+def get_cache_max_size() -> int:
+    """Get the size limit of the model cache in bytes from ``NEQUIP_CACHE_MAX_SIZE_GB`` (default: 20 GB)."""
+    max_size_gb = float(
+        os.environ.get("NEQUIP_CACHE_MAX_SIZE_GB", _DEFAULT_MAX_SIZE_GB)
+    )
+    return int(max_size_gb * 1e9)
+
+
+# === downloaded package files ===
+
+
 def _compute_cache_key(model_id: Optional[str], download_url: str) -> str:
     """Compute cache key from model_id and download URL.
 
@@ -45,15 +75,6 @@ def _compute_cache_key(model_id: Optional[str], download_url: str) -> str:
     return hashlib.sha256(cache_input.encode()).hexdigest()
 
 
-def _compute_file_hash(file_path: pathlib.Path) -> str:
-    """Compute SHA256 hash of file content."""
-    sha256 = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(65536), b""):
-            sha256.update(chunk)
-    return sha256.hexdigest()
-
-
 def _get_metadata_path(cache_dir: pathlib.Path, cache_key: str) -> pathlib.Path:
     """Get path to metadata JSON file."""
     return cache_dir / f"{cache_key}.metadata.json"
@@ -69,7 +90,7 @@ def get_cached_model(
 ) -> Optional[pathlib.Path]:
     """Check if model is cached and validate it.
 
-    Returns cached file path if valid, None otherwise.
+    Returns cached file path if valid (marking the entry as recently used), None otherwise.
     """
     if _NEQUIP_NO_CACHE:
         return None
@@ -93,7 +114,7 @@ def get_cached_model(
 
     # validate file hash
     try:
-        actual_hash = _compute_file_hash(model_path)
+        actual_hash = compute_file_hash(model_path)
         expected_hash = metadata.get("file_sha256")
 
         if actual_hash != expected_hash:
@@ -105,6 +126,7 @@ def get_cached_model(
         logger.warning(f"Failed to validate cached file: {e}, redownloading")
         return None
 
+    mark_used(metadata_path)
     logger.info(f"Using cached model from {model_path}")
     return model_path
 
@@ -116,6 +138,9 @@ def cache_model(
 ) -> pathlib.Path:
     """Download model and save to cache.
 
+    Only one process downloads a given model at a time: other processes wait for it and then use its download.
+    Least recently used entries are evicted afterwards if the cache exceeds its size limit (see :func:`prune_model_cache`).
+
     Args:
         model_id: nequip.net model ID (or None for arbitrary URLs)
         download_url: URL to download from
@@ -144,36 +169,333 @@ def cache_model(
     model_path = _get_model_path(cache_dir, cache_key)
     metadata_path = _get_metadata_path(cache_dir, cache_key)
 
-    # download to .partial file first, then rename on success
-    # (avoids leaving corrupted files if download fails mid-way)
-    partial_path = cache_dir / f"{cache_key}.nequip.zip.partial"
+    with file_lock(cache_dir, model_path.name):
+        # another process may have cached the model while we were waiting for the lock
+        cached_path = get_cached_model(model_id, download_url)
+        if cached_path is not None:
+            return cached_path
+
+        # download to unique partial files first, then rename on success
+        # (avoids leaving corrupted files if download fails mid-way)
+        partial_model_path = partial_path(model_path)
+        partial_metadata_path = partial_path(metadata_path)
+
+        try:
+            # download
+            download_fn(partial_model_path)
+
+            # compute file hash
+            file_hash = compute_file_hash(partial_model_path)
+
+            # save metadata
+            metadata = {
+                "model_id": model_id,
+                "download_url": download_url,
+                "file_sha256": file_hash,
+                "cached_at": datetime.utcnow().isoformat(),
+            }
+
+            with open(partial_metadata_path, "w") as f:
+                json.dump(metadata, f, indent=2)
+
+            # atomically rename to final location, the metadata last since entries without metadata are ignored
+            os.replace(partial_model_path, model_path)
+            os.replace(partial_metadata_path, metadata_path)
+
+        except Exception:
+            # clean up partial files on failure
+            partial_model_path.unlink(missing_ok=True)
+            partial_metadata_path.unlink(missing_ok=True)
+            raise
+
+    logger.info(f"Model cached to {model_path}")
+    prune_model_cache(keep=[model_path.name])
+    return model_path
+
+
+# === unpacked packages ===
+
+
+def _get_unpacked_cache_dir() -> pathlib.Path:
+    """Get the directory of unpacked package files, versioned by the layout of its entries."""
+    path = get_cache_dir() / f"unpacked_v{_UNPACKED_CACHE_VERSION}"
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def _compute_dir_hash(dir_path: pathlib.Path) -> str:
+    """Compute SHA256 hash of the relative paths and contents of all files in a directory."""
+    sha256 = hashlib.sha256()
+    for file_path in sorted(p for p in dir_path.rglob("*") if p.is_file()):
+        sha256.update(f"{file_path.relative_to(dir_path).as_posix()}|".encode())
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _file_manifest(dir_path: pathlib.Path) -> Dict[str, Dict[str, int]]:
+    """Size and modification time of all files in a directory by relative path, which are compared on every load of a verified entry instead of hashing the unpacked files."""
+    return {
+        file_path.relative_to(dir_path).as_posix(): file_stat(file_path)
+        for file_path in dir_path.rglob("*")
+        if file_path.is_file()
+    }
+
+
+def _package_file_stat(package_path: pathlib.Path) -> Dict[str, int]:
+    stat = package_path.stat()
+    return {"package_size": stat.st_size, "package_mtime_ns": stat.st_mtime_ns}
+
+
+def get_unpacked_package(package_path) -> Optional[pathlib.Path]:
+    """Get the unpacked directory of a package file from the model cache, unpacking it on first use.
+
+    The returned directory can be passed to ``torch.package.PackageImporter`` in place of the package file.
+    The importer then reads the packaged code from plain files and memory-maps the weights from the unpacked storage files (copy-on-write, as ``torch.load(mmap=True)``) instead of copying them out of the zip archive, such that repeated loads are fast and processes on the same node share the memory of the weights.
+
+    Entries are keyed by the resolved path of the package file.
+    On the first use of an entry after unpacking, the package file and the unpacked files are checked against the SHA256 hashes recorded when unpacking.
+    Later loads match the sizes and modification times of the package file and the unpacked files as a fast path, and only hash the package file again if its size or modification time changed.
+    Entries are unpacked again if the contents of the package file changed, or if any unpacked file was added, removed or changed.
+    Only one process unpacks a given package at a time: other processes wait for it and then use its entry.
+
+    Returns:
+        Path to the unpacked package, or None if caching is disabled or the file is not a ``torch.package`` archive
+    """
+    if _NEQUIP_NO_CACHE:
+        return None
+
+    package_path = pathlib.Path(package_path).expanduser().resolve()
+    cache_key = hashlib.sha256(str(package_path).encode()).hexdigest()
+    entry = _get_unpacked_cache_dir() / cache_key
+
+    unpacked_path = _get_valid_unpacked_package(package_path, entry)
+    if unpacked_path is not None:
+        return unpacked_path
+
+    entry_name = entry.relative_to(get_cache_dir()).as_posix()
+    with file_lock(get_cache_dir(), entry_name):
+        # another process may have unpacked the package while we were waiting for the lock
+        unpacked_path = _get_valid_unpacked_package(package_path, entry, log=False)
+        if unpacked_path is not None:
+            return unpacked_path
+        unpacked_path = _unpack_package(package_path, entry)
+
+    if unpacked_path is not None:
+        prune_model_cache(keep=[entry_name])
+    return unpacked_path
+
+
+def _get_valid_unpacked_package(
+    package_path: pathlib.Path, entry: pathlib.Path, log: bool = True
+) -> Optional[pathlib.Path]:
+    """Validate the cache entry ``entry`` of a package file, and return its unpacked package if valid (marking it as recently used).
+
+    Entries that were verified before and whose package file kept its size and modification time are matched by file metadata only, otherwise the package file (and on first use, the unpacked files) are hashed.
+    """
+    metadata_path = entry / _UNPACKED_METADATA_FNAME
+    if not metadata_path.exists():
+        return None
 
     try:
-        # download
-        download_fn(partial_path)
+        with open(metadata_path, "r") as f:
+            metadata = json.load(f)
+        first_use = not metadata.get("verified", False)
+        package_stat = _package_file_stat(package_path)
+        stat_changed = any(metadata.get(k) != v for k, v in package_stat.items())
+        if (first_use or stat_changed) and compute_file_hash(
+            package_path
+        ) != metadata.get("package_sha256"):
+            if log:
+                logger.info(
+                    f"Package file {package_path} changed since it was unpacked, unpacking again"
+                )
+            return None
+        if _file_manifest(entry / "package") != metadata.get("unpacked_files") or (
+            first_use
+            and _compute_dir_hash(entry / "package") != metadata.get("unpacked_sha256")
+        ):
+            if log:
+                logger.warning(
+                    f"Unpacked package validation failed: unpacked files of {package_path} changed, unpacking again"
+                )
+            return None
+        unpacked_path = entry / "package" / metadata["archive_root"]
+        if first_use or stat_changed:
+            # record the verification, and the new size and modification time of an unchanged package file
+            _write_unpacked_metadata(
+                metadata_path, {**metadata, **package_stat, "verified": True}
+            )
+    except (json.JSONDecodeError, IOError, KeyError) as e:
+        if log:
+            logger.warning(
+                f"Failed to read unpacked package {entry}: {e}, unpacking again"
+            )
+        return None
 
-        # compute file hash
-        file_hash = _compute_file_hash(partial_path)
+    mark_used(metadata_path)
+    logger.info(f"Using unpacked package from {entry}")
+    return unpacked_path
 
-        # save metadata
-        metadata = {
-            "model_id": model_id,
-            "download_url": download_url,
-            "file_sha256": file_hash,
-            "cached_at": datetime.utcnow().isoformat(),
-        }
 
-        with open(metadata_path, "w") as f:
+def _write_unpacked_metadata(metadata_path: pathlib.Path, metadata: Dict) -> None:
+    """Atomically replace the metadata file of an unpacked package entry."""
+    partial_metadata_path = partial_path(metadata_path)
+    try:
+        with open(partial_metadata_path, "w") as f:
             json.dump(metadata, f, indent=2)
+        os.replace(partial_metadata_path, metadata_path)
+    finally:
+        partial_metadata_path.unlink(missing_ok=True)
+
+
+def _unpack_package(
+    package_path: pathlib.Path, entry: pathlib.Path
+) -> Optional[pathlib.Path]:
+    """Unpack a package file into the cache entry ``entry``, replacing any previous (invalid) entry."""
+    package_stat = _package_file_stat(package_path)
+    with zipfile.ZipFile(package_path) as zf:
+        # `torch.package` archives keep all records under a single root directory
+        archive_roots = {name.split("/")[0] for name in zf.namelist()}
+        if len(archive_roots) != 1:
+            logger.warning(
+                f"{package_path} is not a `torch.package` archive with a single root directory, loading it without unpacking"
+            )
+            return None
+        archive_root = archive_roots.pop()
+
+        # processes that still use the previous entry keep their memory maps of the removed files
+        with populate_dir(entry) as partial:
+            zf.extractall(partial / "package")
+            metadata = {
+                "package_path": str(package_path),
+                **package_stat,
+                "package_sha256": compute_file_hash(package_path),
+                "archive_root": archive_root,
+                "unpacked_sha256": _compute_dir_hash(partial / "package"),
+                "unpacked_files": _file_manifest(partial / "package"),
+                # set once the entry is checked against the hashes on first use
+                "verified": False,
+                "cached_at": datetime.utcnow().isoformat(),
+            }
+            with open(partial / _UNPACKED_METADATA_FNAME, "w") as f:
+                json.dump(metadata, f, indent=2)
+
+    logger.info(f"Package file {package_path} unpacked to {entry}")
+    return entry / "package" / archive_root
+
+
+# === cache management ===
+
+
+def _entry_paths(cache_dir: pathlib.Path, entry: CacheEntry) -> List[pathlib.Path]:
+    """Paths of a cache entry, the metadata file first."""
+    if entry.kind == "download":
+        cache_key = entry.name[: -len(".nequip.zip")]
+        return [
+            _get_metadata_path(cache_dir, cache_key),
+            _get_model_path(cache_dir, cache_key),
+        ]
+    return [cache_dir / entry.name / _UNPACKED_METADATA_FNAME, cache_dir / entry.name]
+
+
+def list_cache_entries() -> List[CacheEntry]:
+    """List the entries of the model cache, least recently used first."""
+    cache_dir = get_cache_dir()
+    entries = []
+    candidates = [("download", p) for p in cache_dir.glob("*.metadata.json")] + [
+        ("unpacked", p)
+        for p in cache_dir.glob(f"unpacked_v*/*/{_UNPACKED_METADATA_FNAME}")
+    ]
+    for kind, metadata_path in candidates:
+        try:
+            with open(metadata_path, "r") as f:
+                metadata = json.load(f)
+            if kind == "download":
+                name = metadata_path.name[: -len(".metadata.json")] + ".nequip.zip"
+                source = metadata.get("model_id") or metadata.get("download_url")
+                size = metadata_path.stat().st_size + path_size(cache_dir / name)
+            else:
+                name = metadata_path.parent.relative_to(cache_dir).as_posix()
+                source = metadata.get("package_path")
+                size = path_size(metadata_path.parent)
+            last_used = metadata_path.stat().st_mtime
+        except (json.JSONDecodeError, OSError):
+            # entry is being removed or replaced by another process
+            continue
+        entries.append(CacheEntry(name, kind, str(source), size, last_used))
+    return sorted(entries, key=lambda entry: entry.last_used)
+
+
+def verify_cache_entry(entry: CacheEntry) -> bool:
+    """Check the files of a cache entry against the SHA256 hashes recorded in its metadata."""
+    cache_dir = get_cache_dir()
+    metadata_path, path = _entry_paths(cache_dir, entry)
+    try:
+        with open(metadata_path, "r") as f:
+            metadata = json.load(f)
+        if entry.kind == "download":
+            return compute_file_hash(path) == metadata.get("file_sha256")
+        return _compute_dir_hash(path / "package") == metadata.get("unpacked_sha256")
+    except (json.JSONDecodeError, OSError):
+        return False
 
-        # rename to final location
-        shutil.move(str(partial_path), str(model_path))
 
-        logger.info(f"Model cached to {model_path}")
-        return model_path
+def remove_cache_entry(entry: CacheEntry, blocking: bool = True) -> bool:
+    """Remove a cache entry.
 
-    except Exception:
-        # clean up partial file on failure
-        if partial_path.exists():
-            partial_path.unlink()
-        raise
+    Args:
+        entry: entry from :func:`list_cache_entries`
+        blocking: whether to wait for processes populating the entry, otherwise the entry is skipped if it is being populated
+
+    Returns:
+        whether the entry was removed
+    """
+    cache_dir = get_cache_dir()
+    with file_lock(cache_dir, entry.name, blocking=blocking) as acquired:
+        if not acquired:
+            return False
+        # the metadata is removed first, such that other processes consider the entry missing
+        for path in _entry_paths(cache_dir, entry):
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+    return True
+
+
+def prune_model_cache(
+    max_size: Optional[int] = None, keep: List[str] = []
+) -> List[str]:
+    """Evict the least recently used entries of the model cache until it is smaller than ``max_size`` bytes.
+
+    Entries that are being populated by other processes are skipped.
+    Processes that still use an evicted entry (e.g. memory-mapped weights of an unpacked package) are unaffected, but later loads repopulate it.
+
+    Args:
+        max_size: size limit in bytes (default: from :func:`get_cache_max_size`)
+        keep: names of entries that are never evicted (e.g. entries that were just added)
+
+    Returns:
+        list of evicted entry names
+    """
+    if max_size is None:
+        max_size = get_cache_max_size()
+    cache_dir = get_cache_dir()
+    remove_stale_partials(
+        list(cache_dir.glob("*.partial-*"))
+        + list(cache_dir.glob("unpacked_v*/*.partial-*"))
+    )
+
+    evicted = prune_entries(
+        list_cache_entries(),
+        max_size,
+        keep,
+        lambda entry: remove_cache_entry(entry, blocking=False),
+    )
+    if evicted:
+        logger.info(
+            f"Evicted {len(evicted)} least recently used model cache entries to stay below {max_size / 1e9:.2f} GB"
+        )
+    return evicted
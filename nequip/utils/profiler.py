@@ -0,0 +1,472 @@
+# This file is a part of the `nequip` package. Please see LICENSE and README at the root for information on using it.
+import time
+import json
+import fnmatch
+import torch
+
+from nequip.data import AtomicDataDict
+from nequip.nn import GraphModuleMixin
+from nequip.nn.mlp import ScalarMLPFunction
+from nequip.nn._tp_scatter_base import TensorProductScatter
+
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+
+
+# submodule types profiled by default in "fine" mode
+_DEFAULT_PROFILED_TYPES = (GraphModuleMixin, TensorProductScatter, ScalarMLPFunction)
+_TOTAL_NAME = "total"
+_PROFILER_MODES = ("auto", "fine", "coarse")
+
+
+def _next_sequence_nr() -> int:
+    """Peek at the (thread-local) autograd sequence number counter.
+
+    Every autograd node is tagged with a monotonically increasing sequence number at creation, so the nodes created by a module's forward are exactly those with sequence numbers between the values peeked before and after it.
+    """
+    return torch.empty(0, requires_grad=True).clone().grad_fn._sequence_nr()
+
+
+def _collect_tensors(obj: Any) -> List[torch.Tensor]:
+    if isinstance(obj, torch.Tensor):
+        return [obj]
+    elif isinstance(obj, dict):
+        return [v for v in obj.values() if isinstance(v, torch.Tensor)]
+    elif isinstance(obj, (list, tuple)):
+        return [t for o in obj for t in _collect_tensors(o)]
+    return []
+
+
+def _collect_nodes(outputs: Any, seq_start: int, seq_end: int) -> list:
+    """Find the autograd nodes created between ``seq_start`` and ``seq_end`` that are reachable from ``outputs``."""
+    stack = [
+        t.grad_fn
+        for t in _collect_tensors(outputs)
+        if t.grad_fn is not None and seq_start <= t.grad_fn._sequence_nr() <= seq_end
+    ]
+    seen = set()
+    nodes = []
+    while len(stack) > 0:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        nodes.append(node)
+        for next_node, _ in node.next_functions:
+            # nodes outside the range were created before this module's forward (i.e. its inputs)
+            if (
+                next_node is not None
+                and next_node not in seen
+                and seq_start <= next_node._sequence_nr() <= seq_end
+            ):
+                stack.append(next_node)
+    return nodes
+
+
+class ModelProfiler:
+    """Per-module forward and backward profiler for ``nequip`` models.
+
+    Hooks are attached to the submodules of the model (e.g. ``model.func.layer0_convnet.conv.tp_scatter``) to record the wall time, CUDA memory allocated, and the number of nodes and edges of every forward call.
+    The backward time of each module is the summed execution time of the autograd nodes created by the module's forward, so it is also recorded when the backward pass happens inside the model (e.g. the force computation in ``ForceStressOutput``).
+    Timings of a module include those of its submodules, except that a backward pass run within a module's own forward (as in ``ForceStressOutput``) only counts towards that module's forward time.
+
+    Results can be printed as a table with :meth:`table`, obtained as a list of dicts with :meth:`summary`, or saved as a Chrome trace (viewable in ``chrome://tracing`` or `Perfetto <https://ui.perfetto.dev>`_) with :meth:`export_chrome_trace`.
+
+    There are two modes:
+
+    - ``fine``: per-submodule profiling of eager models, e.g. models from checkpoints or packages
+    - ``coarse``: only the full model call is profiled, for models whose submodules cannot be hooked (``CompileGraphModel``, TorchScript and AOTInductor models)
+
+    The default ``auto`` picks ``fine`` whenever possible.
+
+    Example usage:
+
+    .. code-block:: python
+
+        profiler = ModelProfiler(model)
+        with profiler:
+            for _ in range(10):
+                out = profiler(data)
+        print(profiler.table())
+        profiler.export_chrome_trace("trace.json")
+
+    .. note::
+        GPU kernels are launched asynchronously, so accurate per-module timings on GPUs require synchronizing the device at every module boundary (``cuda_sync=True``, the default), which slows down the model.
+
+    Args:
+        model (torch.nn.Module): the model to profile
+        mode (str): ``auto``, ``fine``, or ``coarse``
+        include (Sequence[str]): ``fnmatch``-style patterns of submodule names to profile in ``fine`` mode (defaults to all ``GraphModuleMixin``, ``TensorProductScatter`` and ``ScalarMLPFunction`` submodules)
+        cuda_sync (bool): whether to synchronize CUDA devices at module boundaries
+        record_backward (bool): whether to record the backward time of modules
+    """
+
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        mode: str = "auto",
+        include: Optional[Sequence[str]] = None,
+        cuda_sync: bool = True,
+        record_backward: bool = True,
+    ):
+        assert mode in _PROFILER_MODES, (
+            f"`mode` must be one of {_PROFILER_MODES}, but found `{mode}`"
+        )
+        self.model = model
+        self.include = None if include is None else list(include)
+        self.cuda_sync = cuda_sync
+        self.record_backward = record_backward
+
+        hookable = not isinstance(model, torch.jit.ScriptModule) and not any(
+            getattr(m, "is_compile_graph_model", False) for m in model.modules()
+        )
+        if mode == "auto":
+            mode = "fine" if hookable and len(self._select_modules()) > 0 else "coarse"
+        elif mode == "fine" and not hookable:
+            raise RuntimeError(
+                "`fine` profiling mode is not supported for compiled (`CompileGraphModel`, TorchScript, or AOTInductor) models -- use `coarse` mode instead"
+            )
+        self.mode = mode
+
+        self._handles = []
+        self._stack: List[dict] = []
+        self._order: Dict[str, int] = {_TOTAL_NAME: -1}
+        self.reset()
+
+    def _select_modules(self) -> List[Tuple[str, torch.nn.Module]]:
+        selected = []
+        for name, module in self.model.named_modules():
+            # the full model is profiled separately as the "total"
+            if name == "":
+                continue
+            if self.include is None:
+                if isinstance(module, _DEFAULT_PROFILED_TYPES):
+                    selected.append((name, module))
+            elif any(fnmatch.fnmatch(name, pattern) for pattern in self.include):
+                selected.append((name, module))
+        return selected
+
+    def reset(self) -> None:
+        """Clear all recorded events, e.g. between steps while the hooks stay attached."""
+        self._events: List[dict] = []
+        self._t0 = time.perf_counter()
+
+    # === hooks ===
+
+    def attach(self) -> None:
+        """Attach the profiling hooks to the model."""
+        assert len(self._handles) == 0, "profiler hooks already attached"
+        if self.mode != "fine":
+            return
+        for idx, (name, module) in enumerate(self._select_modules()):
+            self._order[name] = idx
+            self._handles.append(
+                module.register_forward_pre_hook(self._make_pre_hook(name))
+            )
+            self._handles.append(module.register_forward_hook(self._make_hook(name)))
+
+    def detach(self) -> None:
+        """Remove the profiling hooks from the model."""
+        for handle in self._handles:
+            handle.remove()
+        self._handles = []
+        self._stack = []
+
+    def __enter__(self):
+        self.attach()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.detach()
+
+    def _sync(self, tensors: List[torch.Tensor]) -> None:
+        if self.cuda_sync:
+            for device in set(t.device for t in tensors):
+                if device.type == "cuda":
+                    torch.cuda.synchronize(device)
+
+    def _start(self, name: str, inputs: Any) -> None:
+        tensors = _collect_tensors(inputs)
+        self._sync(tensors)
+        num_nodes, num_edges = None, None
+        if isinstance(inputs, dict):
+            if AtomicDataDict.POSITIONS_KEY in inputs:
+                num_nodes = AtomicDataDict.num_nodes(inputs)
+            if AtomicDataDict.EDGE_INDEX_KEY in inputs:
+                num_edges = AtomicDataDict.num_edges(inputs)
+        elif len(self._stack) > 0:
+            # modules with tensor inputs inherit sizes from the enclosing `AtomicDataDict` module
+            num_nodes = self._stack[-1]["num_nodes"]
+            num_edges = self._stack[-1]["num_edges"]
+        devices = [t.device for t in tensors if t.device.type == "cuda"]
+        frame = {
+            "name": name,
+            "num_nodes": num_nodes,
+            "num_edges": num_edges,
+            "cuda_device": devices[0] if len(devices) > 0 else None,
+            "seq_start": (
+                _next_sequence_nr()
+                if self.record_backward and torch.is_grad_enabled()
+                else None
+            ),
+        }
+        if frame["cuda_device"] is not None:
+            frame["mem_start"] = torch.cuda.memory_allocated(frame["cuda_device"])
+        self._stack.append(frame)
+        # start the timer as late as possible
+        frame["start"] = time.perf_counter()
+
+    def _end(self, outputs: Any) -> None:
+        tensors = _collect_tensors(outputs)
+        self._sync(tensors)
+        end = time.perf_counter()
+        frame = self._stack.pop()
+        mem = None
+        if frame["cuda_device"] is not None:
+            mem = torch.cuda.memory_allocated(frame["cuda_device"]) - frame["mem_start"]
+        self._events.append(
+            {
+                "name": frame["name"],
+                "phase": "forward",
+                "start": frame["start"],
+                "end": end,
+                "time": end - frame["start"],
+                "num_nodes": frame["num_nodes"],
+                "num_edges": frame["num_edges"],
+                "memory": mem,
+                "depth": len(self._stack),
+            }
+        )
+        if frame["seq_start"] is not None:
+            nodes = _collect_nodes(outputs, frame["seq_start"], _next_sequence_nr())
+            if len(nodes) > 0:
+                self._register_backward_hooks(frame, nodes, tensors)
+
+    def _register_backward_hooks(
+        self, frame: dict, nodes: list, tensors: List[torch.Tensor]
+    ) -> None:
+        event = {
+            "name": frame["name"],
+            "phase": "backward",
+            "start": None,
+            "end": None,
+            "time": 0.0,
+            "num_nodes": frame["num_nodes"],
+            "num_edges": frame["num_edges"],
+            "memory": None,
+            "depth": len(self._stack),
+        }
+        # the event is only reported once at least one of its nodes has run
+        self._events.append(event)
+        node_starts = {}
+        sync_tensors = [t for t in tensors if t.device.type == "cuda"][:1]
+
+        def pre_hook(node):
+            def hook(grad_outputs):
+                self._sync(sync_tensors)
+                node_starts[node] = time.perf_counter()
+
+            return hook
+
+        def post_hook(node):
+            def hook(grad_inputs, grad_outputs):
+                self._sync(sync_tensors)
+                end = time.perf_counter()
+                start = node_starts.pop(node, end)
+                event["time"] += end - start
+                event["start"] = start if event["start"] is None else event["start"]
+                event["end"] = end
+
+            return hook
+
+        for node in nodes:
+            node.register_prehook(pre_hook(node))
+            node.register_hook(post_hook(node))
+
+    def _make_pre_hook(self, name: str):
+        def hook(module, args):
+            self._start(name, args[0] if len(args) == 1 else args)
+
+        return hook
+
+    def _make_hook(self, name: str):
+        def hook(module, args, output):
+            self._end(output)
+
+        return hook
+
+    def __call__(self, *args, **kwargs):
+        """Call the model, profiling the full call as the ``total``."""
+        self._start(_TOTAL_NAME, args[0] if len(args) == 1 else args)
+        try:
+            out = self.model(*args, **kwargs)
+        except Exception:
+            self._stack.pop()
+            raise
+        self._end(out)
+        return out
+
+    # === results ===
+
+    def summary(self, sort_by: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Aggregate recorded events per module.
+
+        Args:
+            sort_by (str): ``None`` to keep the model's module order, or one of ``forward``, ``backward``, ``total`` to sort by decreasing time
+
+        Returns:
+            list of dicts with the keys ``name``, ``calls``, ``forward_total``, ``forward_mean``, ``backward_total``, ``backward_mean``, ``total``, ``memory_mean``, ``num_nodes``, ``num_edges`` (times in seconds, memory in bytes)
+        """
+        assert sort_by in (None, "forward", "backward", "total")
+        stats = {}
+        for event in self._events:
+            if event["phase"] == "backward" and event["start"] is None:
+                continue
+            entry = stats.setdefault(
+                event["name"],
+                {
+                    "name": event["name"],
+                    "calls": 0,
+                    "forward_total": 0.0,
+                    "backward_calls": 0,
+                    "backward_total": 0.0,
+                    "memory": [],
+                    "num_nodes": None,
+                    "num_edges": None,
+                },
+            )
+            if event["phase"] == "forward":
+                entry["calls"] += 1
+                entry["forward_total"] += event["time"]
+                if event["memory"] is not None:
+                    entry["memory"].append(event["memory"])
+                # report the sizes of the latest call
+                entry["num_nodes"] = event["num_nodes"]
+                entry["num_edges"] = event["num_edges"]
+            else:
+                entry["backward_calls"] += 1
+                entry["backward_total"] += event["time"]
+
+        results = []
+        for entry in stats.values():
+            memory = entry.pop("memory")
+            backward_calls = entry.pop("backward_calls")
+            entry["forward_mean"] = entry["forward_total"] / max(entry["calls"], 1)
+            entry["backward_mean"] = entry["backward_total"] / max(backward_calls, 1)
+            entry["total"] = entry["forward_total"] + entry["backward_total"]
+            entry["memory_mean"] = (
+                sum(memory) / len(memory) if len(memory) > 0 else None
+            )
+            results.append(entry)
+
+        if sort_by is None:
+            results.sort(key=lambda e: self._order.get(e["name"], len(self._order)))
+        else:
+            key = "total" if sort_by == "total" else f"{sort_by}_total"
+            results.sort(key=lambda e: e[key], reverse=True)
+        return results
+
+    def table(self, sort_by: Optional[str] = None) -> str:
+        """Format the per-module summary as a table.
+
+        Times are in milliseconds and memory in MB. ``%`` is the fraction of the ``total`` time, if available.
+
+        Args:
+            sort_by (str): see :meth:`summary`
+        """
+        results = self.summary(sort_by=sort_by)
+        reference = [e["total"] for e in results if e["name"] == _TOTAL_NAME]
+        reference = reference[0] if len(reference) > 0 else None
+
+        def fmt(val, scale=1.0, spec=".3f"):
+            return "-" if val is None else format(val * scale, spec)
+
+        header = [
+            "module",
+            "calls",
+            "fwd total",
+            "fwd mean",
+            "bwd total",
+            "bwd mean",
+            "%",
+            "mem (MB)",
+            "nodes",
+            "edges",
+        ]
+        rows = []
+        for e in results:
+            rows.append(
+                [
+                    e["name"],
+                    str(e["calls"]),
+                    fmt(e["forward_total"], 1e3),
+                    fmt(e["forward_mean"], 1e3),
+                    fmt(e["backward_total"], 1e3),
+                    fmt(e["backward_mean"], 1e3),
+                    fmt(
+                        None if not reference else e["total"] / reference,
+                        100.0,
+                        ".1f",
+                    ),
+                    fmt(e["memory_mean"], 1e-6, ".2f"),
+                    fmt(e["num_nodes"], 1, "d"),
+                    fmt(e["num_edges"], 1, "d"),
+                ]
+            )
+        widths = [
+            max(len(row[i]) for row in [header] + rows) for i in range(len(header))
+        ]
+        lines = [
+            "  ".join(
+                h.ljust(w) if i == 0 else h.rjust(w)
+                for i, (h, w) in enumerate(zip(header, widths))
+            )
+        ]
+        lines.append("-" * len(lines[0]))
+        for row in rows:
+            lines.append(
+                "  ".join(
+                    c.ljust(w) if i == 0 else c.rjust(w)
+                    for i, (c, w) in enumerate(zip(row, widths))
+                )
+            )
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Build a Chrome trace (``chrome://tracing`` JSON format) of the recorded events.
+
+        Forward and backward events are placed on separate threads. Backward events span from the first to the last autograd node of the module call, with the summed node execution time in ``args``.
+        """
+        trace_events = []
+        for event in self._events:
+            if event["start"] is None:
+                continue
+            args = {
+                "num_nodes": event["num_nodes"],
+                "num_edges": event["num_edges"],
+            }
+            if event["memory"] is not None:
+                args["memory_bytes"] = event["memory"]
+            if event["phase"] == "backward":
+                args["busy_ms"] = event["time"] * 1e3
+            trace_events.append(
+                {
+                    "name": event["name"],
+                    "cat": event["phase"],
+                    "ph": "X",
+                    "ts": (event["start"] - self._t0) * 1e6,
+                    "dur": (event["end"] - event["start"]) * 1e6,
+                    "pid": 0,
+                    "tid": 0 if event["phase"] == "forward" else 1,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str) -> None:
+        """Save the Chrome trace of the recorded events to ``path``.
+
+        Args:
+            path (str): path to the output ``.json`` file
+        """
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
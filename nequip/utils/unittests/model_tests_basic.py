@@ -27,7 +27,9 @@ from nequip.nn import (
     GraphModuleMixin,
     ForceStressOutput,
     PartialForceOutput,
+    EdgePartialForceOutput,
     PerTypeScaleShift,
+    edge_partial_forces_to_dense,
 )
 from nequip.utils import dtype_to_name, find_first_of_type
 from nequip.utils.test import (
@@ -581,6 +583,37 @@ class EnergyModelTestsMixin(BasicModelTestsMixin):
         # for non-adjacent atoms, all partial forces must be zero
         assert torch.all(partial_forces[~adjacency] == 0)
 
+    def test_edge_partial_forces(
+        self, model, partial_model, atomic_batch, device, strict_locality
+    ):
+        model, _, _ = model
+        partial_model, _ = partial_model
+        module = find_first_of_type(model, ForceStressOutput)
+        edge_model = copy.deepcopy(partial_model)
+        edge_model.model = EdgePartialForceOutput(copy.deepcopy(module.func))
+
+        data = AtomicDataDict.to_(atomic_batch, device)
+        output = model(data.copy())
+        output_edge = edge_model(data.copy())
+        tol = {torch.float32: 1e-5, torch.float64: 1e-8}[model.model_dtype]
+        # total forces are exact regardless of locality
+        assert torch.allclose(
+            output[AtomicDataDict.FORCE_KEY],
+            output_edge[AtomicDataDict.FORCE_KEY],
+            atol=tol,
+        )
+        if strict_locality:
+            # edge partial forces are exactly the partial forces for strictly local models
+            partial_forces = partial_model(from_dict(data))[
+                AtomicDataDict.PARTIAL_FORCE_KEY
+            ]
+            dense = edge_partial_forces_to_dense(
+                output_edge[AtomicDataDict.EDGE_PARTIAL_FORCE_KEY],
+                data[AtomicDataDict.EDGE_INDEX_KEY],
+                AtomicDataDict.num_nodes(data),
+            )
+            assert torch.allclose(dense, partial_forces, atol=tol)
+
     def test_numeric_gradient_partial(self, partial_model, atomic_batch, device):
         """
         Tests the PartialForceOutput model by comparing numerical gradients of the partial forces to the analytical gradients.
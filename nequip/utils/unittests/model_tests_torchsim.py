@@ -458,3 +458,62 @@ class TorchSimIntegrationMixin(CompilationTestsMixin):
                 atol=torchsim_tol,
                 err_msg="Batched stresses don't match individual evaluations",
             )
+
+    @pytest.mark.skipif(not _TORCHSIM_INSTALLED, reason="torch-sim not installed")
+    def test_torchsim_static_cache(
+        self,
+        torchsim_compiled_model,
+        fake_model_training_session,
+        device,
+        torchsim_tol,
+    ):
+        """Test that cached static inputs are reused across position updates and recomputed when the systems change."""
+        compiled_path, _ = torchsim_compiled_model
+        _, _, _, _, _, structures = fake_model_training_session
+        if len(structures) < 2:
+            pytest.skip("Not enough structures")
+
+        torchsim_calc = NequIPTorchSimCalc.from_compiled_model(
+            compiled_path,
+            device=device,
+            chemical_species_to_atom_type_map=True,
+            profile=True,
+        )
+
+        def assert_matches_fresh_calc(sim_state):
+            results = torchsim_calc(sim_state)
+            ref_calc = NequIPTorchSimCalc.from_compiled_model(
+                compiled_path, device=device, chemical_species_to_atom_type_map=True
+            )
+            ref_results = ref_calc(sim_state)
+            for key, value in ref_results.items():
+                np.testing.assert_allclose(
+                    results[key].cpu().numpy(),
+                    value.cpu().numpy(),
+                    rtol=torchsim_tol,
+                    atol=torchsim_tol,
+                    err_msg=key,
+                )
+
+        sim_state = ts.io.atoms_to_state(
+            structures[:2], device=device, dtype=torch.float64
+        )
+        assert_matches_fresh_calc(sim_state)
+        static_data = torchsim_calc._static_cache["data"]
+
+        # position updates reuse the static inputs
+        sim_state.positions = sim_state.positions + 0.01
+        assert_matches_fresh_calc(sim_state)
+        assert torchsim_calc._static_cache["data"] is static_data
+
+        # in-place changes of the atomic numbers and new systems invalidate them
+        sim_state.atomic_numbers[0] = sim_state.atomic_numbers[-1]
+        assert_matches_fresh_calc(sim_state)
+        assert torchsim_calc._static_cache["data"] is not static_data
+        assert_matches_fresh_calc(
+            ts.io.atoms_to_state(structures[1::-1], device=device, dtype=torch.float64)
+        )
+
+        summary = torchsim_calc.profile_summary()
+        assert summary["num_steps"] == 4
+        assert all(summary[f"{stage}_ms"] > 0 for stage in ["transforms", "model"])
@@ -1,5 +1,6 @@
 import pytest
 import tempfile
+import json
 import torch
 from omegaconf import OmegaConf
 from conftest import _check_and_print
@@ -35,6 +36,68 @@ def test_dimer_plot_example(fake_model_training_session, device):
     _check_and_print(retcode)
 
 
+def test_benchmark(fake_model_training_session):
+    """
+    Tests that `nequip-benchmark` runs and writes results for every structure size.
+    """
+    _, tmpdir, env, _ = fake_model_training_session
+    ckpt_path = pathlib.Path(f"{tmpdir}/last.ckpt")
+    output_path = pathlib.Path(f"{tmpdir}/benchmark.json")
+    retcode = subprocess.run(
+        [
+            "nequip-benchmark",
+            f"{str(ckpt_path)}",
+            "--device",
+            "cpu",
+            "--sizes",
+            "8",
+            "27",
+            "--warmup",
+            "1",
+            "--steps",
+            "2",
+            "--batch-atoms",
+            "64",
+            "--compile-modes",
+            "torchscript",
+            "--output",
+            f"{str(output_path)}",
+        ],
+        cwd=tmpdir,
+        env=env,
+    )
+    _check_and_print(retcode)
+
+    with open(output_path) as f:
+        results = json.load(f)
+    model_results, compiled_results = results["models"]
+    assert model_results["format"] == "eager"
+    # the compiled model is benchmarked on the same structures
+    assert compiled_results["format"] == "torchscript"
+    assert compiled_results["model_path"] == str(ckpt_path)
+    assert [res["num_atoms"] for res in compiled_results["results"]] == [8, 27]
+    assert all(res["forward_ms"] is None for res in compiled_results["results"])
+    assert [res["num_atoms"] for res in model_results["results"]] == [8, 27]
+    for res in model_results["results"]:
+        for key in [
+            "neighborlist_ms",
+            "forward_ms",
+            "backward_ms",
+            "host_copy_ms",
+            "step_ms",
+        ]:
+            assert res[key] > 0
+        # the model runs on the CPU
+        assert res["peak_memory_mb"] is None
+        assert res["process_peak_memory_mb"] > 0
+        assert res["atom_steps_per_s"] > 0
+        assert res["ns_per_day"] > 0
+    batched = model_results["batched"]
+    assert batched["num_structures"] == 2
+    assert batched["loop_structures_per_s"] > 0
+    assert batched["batched_structures_per_s"] > 0
+
+
 def test_parity_plot_example(fake_model_training_session):
     """
     Tests that the `parity_plot` example runs.
@@ -0,0 +1,268 @@
+import pytest
+import copy
+import numpy as np
+from e3nn.util.jit import script
+
+from nequip.ase import NequIPCalculator, NequIPEnsembleCalculator
+from nequip.data import AtomicDataDict
+from nequip.data.transforms import (
+    ChemicalSpeciesToAtomTypeMapper,
+    NeighborListTransform,
+)
+from nequip.nn import EnsembleGraphModel
+from nequip.utils.unittests.model_tests_basic import BasicModelTestsMixin
+
+from ase.build import bulk, molecule
+from ase.calculators.calculator import all_changes
+from ase.calculators.singlepoint import SinglePointCalculator
+
+
+MODEL_CONFIG = {
+    "_target_": "nequip.model.NequIPGNNModel",
+    "seed": 123,
+    "model_dtype": "float64",
+    "type_names": ["H", "O"],
+    "r_max": 3.0,
+    "num_layers": 2,
+    "l_max": 1,
+    "num_features": 4,
+    "avg_num_neighbors": 4.0,
+    "per_type_energy_shifts": {"H": 1.0, "O": 2.0},
+}
+
+
+@pytest.fixture(scope="module")
+def model():
+    return BasicModelTestsMixin.make_model(MODEL_CONFIG, device="cpu").eval()
+
+
+@pytest.fixture(scope="module")
+def structures():
+    structures = []
+    for seed, (a, rep) in enumerate([(2.8, 1), (3.0, 2), (2.9, 1), (3.1, 2)]):
+        atoms = bulk("O", "fcc", a=a, cubic=True) * (rep, rep, rep)
+        atoms.numbers[::3] = 1
+        atoms.rattle(0.1, seed=seed)
+        structures.append(atoms)
+    # non-periodic structure with labels from an attached calculator
+    atoms = molecule("H2O")
+    atoms.calc = SinglePointCalculator(atoms, energy=1.0, forces=np.ones((3, 3)))
+    structures.insert(2, atoms)
+    return structures
+
+
+def _calculator(model, cls=NequIPCalculator):
+    return cls(
+        model,
+        device="cpu",
+        transforms=[
+            ChemicalSpeciesToAtomTypeMapper(["H", "O"]),
+            NeighborListTransform(r_max=3.0),
+        ],
+    )
+
+
+@pytest.mark.parametrize("scripted", [False, True])
+@pytest.mark.parametrize("max_atoms_per_batch", [1, 40, 4096])
+def test_calculate_batch(model, structures, scripted, max_atoms_per_batch):
+    if scripted:
+        model = script(copy.deepcopy(model))
+    calc = _calculator(model)
+    properties = ["energy", "forces", "stress"]
+    results = calc.calculate_batch(
+        structures, properties, max_atoms_per_batch=max_atoms_per_batch
+    )
+    assert len(results) == len(structures)
+    for atoms, batch_results in zip(structures, results):
+        calc.calculate(atoms.copy(), properties)
+        assert batch_results.keys() == calc.results.keys()
+        for key, value in calc.results.items():
+            assert np.shape(batch_results[key]) == np.shape(value), key
+            np.testing.assert_allclose(batch_results[key], value, atol=1e-10)
+
+
+def test_calculate_batch_forces_only(model, structures):
+    calc = _calculator(model)
+    results = calc.calculate_batch(structures)
+    assert all("stress" not in res for res in results)
+    assert all(
+        res["forces"].shape == (len(atoms), 3)
+        for atoms, res in zip(structures, results)
+    )
+
+
+def test_calculate_batch_extra_fields(model, structures):
+    """Fields that are not model inputs may differ between structures."""
+    calc = _calculator(model)
+    structures = [atoms.copy() for atoms in structures]
+    structures[0].set_array("charges", np.zeros(len(structures[0])))
+    structures[1].info["dipole"] = np.zeros(3)
+    results = calc.calculate_batch(structures)
+    for atoms, batch_results in zip(structures, results):
+        calc.calculate(atoms.copy(), ["energy", "forces"])
+        np.testing.assert_allclose(
+            batch_results["forces"], calc.results["forces"], atol=1e-10
+        )
+
+
+def test_calculate_batch_keeps_state(model, structures):
+    calc = _calculator(copy.deepcopy(model))
+    atoms = structures[0].copy()
+    calc.calculate(atoms, ["energy", "forces"])
+    ref = calc.results
+
+    # the stress is only computed for the batch, and later calculations are unaffected
+    results = calc.calculate_batch(structures, ["energy", "forces", "stress"])
+    assert all("stress" in res for res in results)
+    calc.calculate(atoms, ["energy", "forces"])
+    assert calc.results.keys() == ref.keys()
+    assert "stress" not in calc.results
+    assert not any(
+        m.compute_stress for m in calc.model.modules() if hasattr(m, "compute_stress")
+    )
+
+
+@pytest.mark.parametrize("scripted", [False, True])
+def test_input_cache(model, structures, scripted):
+    """Static inputs are reused across position and cell changes and rebuilt for other changes."""
+    if scripted:
+        model = script(copy.deepcopy(model))
+    calc = _calculator(model)
+    ref_calc = _calculator(model)
+    atoms = structures[1].copy()
+    atoms.calc = calc
+    rng = np.random.default_rng(0)
+    buffers = None
+    for step in range(6):
+        if step == 3:
+            # species change rebuilds the cache
+            atoms.numbers[0] = 1 if atoms.numbers[0] == 8 else 8
+        elif step == 4:
+            atoms.set_cell(atoms.cell * 1.02, scale_atoms=True)
+        else:
+            atoms.positions += rng.normal(scale=0.05, size=atoms.positions.shape)
+        forces = atoms.get_forces()
+        stress = atoms.get_stress()
+
+        ref_calc.calculate(atoms.copy(), ["energy", "forces", "stress"])
+        np.testing.assert_allclose(forces, ref_calc.results["forces"], atol=1e-10)
+        np.testing.assert_allclose(stress, ref_calc.results["stress"], atol=1e-10)
+        np.testing.assert_allclose(
+            atoms.get_potential_energy(), ref_calc.results["energy"], atol=1e-10
+        )
+
+        cached = calc._input_cache["buffers"]
+        if buffers is not None:
+            assert all((cached[k] is v) == (step != 3) for k, v in buffers.items())
+        buffers = dict(cached)
+
+
+def test_input_cache_extra_fields(model, structures):
+    """Only the static inputs are cached, other fields from ``from_ase`` are extracted for every calculation."""
+    calc = _calculator(model)
+    atoms = structures[0].copy()
+    atoms.set_array("charges", np.zeros(len(atoms)))
+    atoms.info["config_type"] = "bulk"
+    data = calc._prepare_cached_data(atoms, all_changes)
+    assert set(calc._input_cache["static"].keys()) == {
+        AtomicDataDict.ATOMIC_NUMBERS_KEY,
+        AtomicDataDict.ATOM_TYPE_KEY,
+        AtomicDataDict.PBC_KEY,
+    }
+    assert data[AtomicDataDict.CHARGE_KEY].view(-1).tolist() == [0.0] * len(atoms)
+
+    # changes that ASE does not report in `system_changes` are picked up
+    atoms.arrays["charges"] += 1.0
+    atoms.positions += 0.01
+    data = calc._prepare_cached_data(atoms, ["positions"])
+    assert data[AtomicDataDict.CHARGE_KEY].view(-1).tolist() == [1.0] * len(atoms)
+    del atoms.arrays["charges"]
+    data = calc._prepare_cached_data(atoms, ["positions"])
+    assert AtomicDataDict.CHARGE_KEY not in data
+
+
+def test_replica_nosehoover(model):
+    """Replicas follow the same trajectories as `NoseHoover`, and exchanges between equal temperatures are always accepted."""
+    from ase import units
+    from ase.md.velocitydistribution import MaxwellBoltzmannDistribution
+    from nequip.ase import NoseHoover, ReplicaNoseHoover
+
+    calc = _calculator(model)
+    replicas = []
+    for seed, temperature in enumerate([300.0, 600.0]):
+        atoms = bulk("O", "fcc", a=3.0, cubic=True)
+        atoms.numbers[::3] = 1
+        atoms.rattle(0.05, seed=seed)
+        MaxwellBoltzmannDistribution(
+            atoms, temperature_K=temperature, rng=np.random.default_rng(seed)
+        )
+        replicas.append(atoms)
+
+    references = []
+    for atoms, temperature in zip(replicas, [300.0, 600.0]):
+        atoms = atoms.copy()
+        atoms.calc = calc
+        NoseHoover(atoms, 0.5 * units.fs, temperature, nvt_q=20.0).run(5)
+        references.append(atoms)
+
+    dyn = ReplicaNoseHoover(
+        [atoms.copy() for atoms in replicas],
+        calc,
+        timestep=0.5 * units.fs,
+        temperatures=[300.0, 600.0],
+        nvt_q=20.0,
+    )
+    dyn.run(5)
+    for atoms, ref in zip(dyn.atoms_list, references):
+        np.testing.assert_allclose(atoms.positions, ref.positions, atol=1e-10)
+        np.testing.assert_allclose(
+            atoms.get_velocities(), ref.get_velocities(), atol=1e-10
+        )
+
+    dyn = ReplicaNoseHoover(
+        [atoms.copy() for atoms in replicas],
+        calc,
+        timestep=0.5 * units.fs,
+        temperatures=300.0,
+        nvt_q=20.0,
+        exchange_interval=2,
+        seed=0,
+    )
+    positions = dyn.positions.copy()
+    assert list(dyn.attempt_exchanges()) == [0]
+    np.testing.assert_allclose(dyn.positions, positions[::-1])
+    np.testing.assert_allclose(dyn.atoms_list[0].positions, positions[1])
+    dyn.run(4)
+    # only the pair (0, 1) exists, which is attempted in every other exchange round
+    assert dyn.num_exchange_attempts.tolist() == [2]
+    assert dyn.num_exchange_accepted.tolist() == [2]
+
+
+def test_ensemble_calculator(structures):
+    models = [
+        BasicModelTestsMixin.make_model(
+            {**MODEL_CONFIG, "seed": seed}, device="cpu"
+        ).eval()
+        for seed in range(3)
+    ]
+    member_calcs = [_calculator(copy.deepcopy(model)) for model in models]
+    calc = _calculator(EnsembleGraphModel(models).eval(), NequIPEnsembleCalculator)
+
+    properties = ["energy", "forces"]
+    results = calc.calculate_batch(structures, properties, max_atoms_per_batch=40)
+    for atoms, batch_results in zip(structures, results):
+        member_results = []
+        for member_calc in member_calcs:
+            member_calc.calculate(atoms.copy(), properties)
+            member_results.append(member_calc.results)
+        calc.calculate(atoms.copy(), properties)
+        assert batch_results.keys() == calc.results.keys()
+        for key in ["energy", "forces"]:
+            stacked = np.stack([res[key] for res in member_results])
+            np.testing.assert_allclose(calc.results[key], stacked.mean(0), atol=1e-10)
+            np.testing.assert_allclose(
+                calc.results[f"{key}_variance"], stacked.var(0), atol=1e-10
+            )
+            np.testing.assert_allclose(
+                batch_results[key], calc.results[key], atol=1e-10
+            )
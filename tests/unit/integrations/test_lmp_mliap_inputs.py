@@ -0,0 +1,63 @@
+import numpy as np
+import torch
+
+from nequip.data import AtomicDataDict
+from nequip.integrations.lammps_mliap.lmp_mliap_inputs import LAMMPSMLIAPInputs
+
+
+class MockLMPData:
+    """Mimics the arrays of LAMMPS ML-IAP data for one timestep."""
+
+    def __init__(self, nlocal: int, nghost: int, npairs: int, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.nlocal = nlocal
+        self.ntotal = nlocal + nghost
+        self.npairs = npairs
+        self.rij = rng.normal(size=(npairs, 3))
+        self.pair_i = rng.integers(0, nlocal, size=npairs, dtype=np.int32)
+        self.pair_j = rng.integers(0, self.ntotal, size=npairs, dtype=np.int32)
+        self.elems = rng.integers(0, 3, size=self.ntotal, dtype=np.int32)
+
+
+def _reference_inputs(lmp_data):
+    return {
+        AtomicDataDict.EDGE_VECTORS_KEY: torch.as_tensor(
+            lmp_data.rij, dtype=torch.float64
+        ),
+        AtomicDataDict.EDGE_INDEX_KEY: torch.vstack(
+            [
+                torch.as_tensor(lmp_data.pair_i, dtype=torch.int64),
+                torch.as_tensor(lmp_data.pair_j, dtype=torch.int64),
+            ]
+        ),
+        AtomicDataDict.ATOM_TYPE_KEY: torch.as_tensor(
+            lmp_data.elems, dtype=torch.int64
+        ),
+        AtomicDataDict.NUM_LOCAL_GHOST_NODES_KEY: torch.tensor(
+            [lmp_data.nlocal, lmp_data.ntotal - lmp_data.nlocal]
+        ),
+    }
+
+
+def test_lmp_mliap_inputs():
+    inputs = LAMMPSMLIAPInputs("cpu")
+    num_allocations = []
+    for step, (nlocal, nghost, npairs) in enumerate(
+        [(10, 5, 100), (10, 5, 90), (11, 6, 120), (8, 4, 60), (20, 10, 300)]
+    ):
+        lmp_data = MockLMPData(nlocal, nghost, npairs, seed=step)
+        data = inputs(lmp_data)
+        for key, ref in _reference_inputs(lmp_data).items():
+            assert data[key].dtype == ref.dtype, key
+            assert torch.equal(data[key], ref), key
+        assert data[AtomicDataDict.EDGE_INDEX_KEY].is_contiguous()
+        assert data[AtomicDataDict.LMP_MLIAP_DATA_KEY] is lmp_data
+        # float64 edge vectors are shared with LAMMPS
+        assert np.shares_memory(
+            data[AtomicDataDict.EDGE_VECTORS_KEY].numpy(), lmp_data.rij
+        )
+        num_allocations.append(inputs.num_allocations)
+
+    # `edge_index` and `atom_types` buffers are allocated once, not reallocated when shrinking, and doubled when exceeded
+    # (for 120 edges and 17 atoms, after which 300 edges exceed the capacity of 2 * 200 edge indices, but 30 atoms fit)
+    assert num_allocations == [2, 2, 4, 4, 5]
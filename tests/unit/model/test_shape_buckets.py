@@ -0,0 +1,130 @@
+import pytest
+import torch
+
+from nequip.data import AtomicDataDict, from_ase, compute_neighborlist_
+from nequip.model.inference_models.shape_buckets import (
+    ShapeBucketDispatcher,
+    bucket_fits,
+    trim_data,
+)
+from nequip.nn import set_force_stress_outputs
+from nequip.scripts._compile_utils import PAIR_NEQUIP_INPUTS, BATCH_INPUTS, ASE_OUTPUTS
+from nequip.utils.unittests.model_tests_basic import BasicModelTestsMixin
+
+from ase.build import bulk
+
+R_MAX = 3.0
+
+MODEL_CONFIG = {
+    "_target_": "nequip.model.NequIPGNNModel",
+    "seed": 123,
+    "model_dtype": "float64",
+    "type_names": ["H", "O"],
+    "r_max": R_MAX,
+    "num_layers": 2,
+    "l_max": 1,
+    "num_features": 4,
+    "avg_num_neighbors": 4.0,
+    "per_type_energy_shifts": {"H": 1.0, "O": 2.0},
+}
+
+
+@pytest.fixture(scope="module")
+def model():
+    model = BasicModelTestsMixin.make_model(MODEL_CONFIG, device="cpu").eval()
+    set_force_stress_outputs(model, forces=True, stress=True)
+    return model
+
+
+def _data(a, rep, seed):
+    atoms = bulk("O", "fcc", a=a, cubic=True) * (rep, rep, rep)
+    atoms.numbers[::3] = 1
+    atoms.rattle(0.1, seed=seed)
+    data = from_ase(atoms)
+    # H -> 0, O -> 1
+    data[AtomicDataDict.ATOM_TYPE_KEY] = torch.as_tensor(
+        atoms.numbers == 8, dtype=torch.int64
+    )
+    return compute_neighborlist_(data, r_max=R_MAX)
+
+
+@pytest.fixture(scope="module")
+def single_frame():
+    data = _data(2.9, 2, seed=0)
+    for k in (AtomicDataDict.BATCH_KEY, AtomicDataDict.NUM_NODES_KEY):
+        data.pop(k, None)
+    return {k: data[k] for k in PAIR_NEQUIP_INPUTS}
+
+
+@pytest.fixture(scope="module")
+def batched():
+    data = AtomicDataDict.batched_from_list(
+        [_data(2.9, 1, seed=1), _data(3.0, 2, seed=2)]
+    )
+    return {k: data[k] for k in BATCH_INPUTS}
+
+
+class _Variant(torch.nn.Module):
+    """Eager stand-in for an AOTInductor variant, optionally requiring static shapes."""
+
+    def __init__(self, model, input_keys, shape=None):
+        super().__init__()
+        self.model = model
+        self.input_keys = input_keys
+        self.output_keys = ASE_OUTPUTS
+        self.shape = shape
+
+    def forward(self, data):
+        if self.shape is not None:
+            assert self.shape == (
+                AtomicDataDict.num_nodes(data),
+                AtomicDataDict.num_edges(data),
+            )
+        out = self.model({k: data[k].clone() for k in self.input_keys})
+        return {k: out[k] for k in self.output_keys}
+
+
+def _assert_outputs_close(out, ref):
+    for k in ASE_OUTPUTS:
+        assert out[k].shape == ref[k].shape, k
+        torch.testing.assert_close(out[k], ref[k], atol=1e-10, rtol=1e-10)
+
+
+def test_trim_data(single_frame):
+    trimmed = trim_data(single_frame, 10, 40)
+    num_edges = AtomicDataDict.num_edges(trimmed)
+    assert AtomicDataDict.num_nodes(trimmed) == 10
+    assert num_edges <= 40
+    assert trimmed[AtomicDataDict.EDGE_INDEX_KEY].max() < 10
+    assert trimmed[AtomicDataDict.EDGE_CELL_SHIFT_KEY].size(0) == num_edges
+    # data that already fits is unchanged
+    assert trim_data(single_frame, 1000, 100000) is single_frame
+
+
+@pytest.mark.parametrize("padding", [False, True])
+@pytest.mark.parametrize("data_name", ["single_frame", "batched"])
+def test_shape_bucket_dispatcher(model, data_name, padding, request):
+    data = request.getfixturevalue(data_name)
+    input_keys = list(data.keys())
+    num_nodes = AtomicDataDict.num_nodes(data)
+    num_edges = AtomicDataDict.num_edges(data)
+
+    # the first bucket is too small and the second one fits
+    buckets = [(num_nodes - 1, num_edges + 10), (num_nodes + 4, num_edges + 10)]
+    assert not bucket_fits(num_nodes, num_edges, *buckets[0], padding)
+    assert bucket_fits(num_nodes, num_edges, *buckets[1], padding)
+    bucket_models = [
+        _Variant(model, input_keys, shape=bucket if padding else None)
+        for bucket in buckets
+    ]
+    generic = _Variant(model, input_keys)
+    dispatcher = ShapeBucketDispatcher(generic, bucket_models, buckets, padding, R_MAX)
+    assert dispatcher.input_keys == input_keys
+
+    _assert_outputs_close(dispatcher(data), generic(data))
+    assert dispatcher.num_calls == [0, 1, 0]
+
+    # inputs that fit no bucket fall back to the generic model
+    dispatcher.buckets = [(num_nodes - 1, num_edges), (num_nodes + 4, num_edges - 1)]
+    _assert_outputs_close(dispatcher(data), generic(data))
+    assert dispatcher.num_calls == [0, 1, 1]
@@ -0,0 +1,55 @@
+import pytest
+
+from nequip.data import from_ase, compute_neighborlist_
+from nequip.data.transforms import ChemicalSpeciesToAtomTypeMapper
+from nequip.utils.unittests.model_tests_basic import BasicModelTestsMixin
+
+from ase.build import bulk
+
+
+@pytest.fixture(scope="module")
+def model_config():
+    """Config of a small ``NequIPGNNModel`` for testing modules and model modifiers.
+
+    Test modules that need other hyperparameters override this fixture by updating the config it returns.
+    """
+    return {
+        "_target_": "nequip.model.NequIPGNNModel",
+        "seed": 123,
+        "model_dtype": "float64",
+        "type_names": ["C", "O"],
+        "r_max": 4.0,
+        "num_layers": 2,
+        "l_max": 1,
+        "num_features": 8,
+        "radial_mlp_depth": 2,
+        "radial_mlp_width": 16,
+        "avg_num_neighbors": 10.0,
+        "per_type_energy_shifts": {"C": 1.0, "O": 2.0},
+        "per_type_energy_scales": {"C": 1.0, "O": 1.0},
+    }
+
+
+@pytest.fixture(scope="module")
+def model(model_config):
+    return BasicModelTestsMixin.make_model(model_config, device="cpu")
+
+
+def _CO_diamond(repeat):
+    atoms = bulk("C", "diamond", a=3.6, cubic=True) * repeat
+    atoms.rattle(0.1, seed=0)
+    atoms.numbers[::3] = 8
+    data = compute_neighborlist_(from_ase(atoms), r_max=4.0)
+    return ChemicalSpeciesToAtomTypeMapper(["C", "O"])(data)
+
+
+@pytest.fixture(scope="module")
+def CO_diamond():
+    """Rattled diamond unit cell with every third atom replaced by oxygen, with the atom types of ``model_config``."""
+    return _CO_diamond((1, 1, 1))
+
+
+@pytest.fixture(scope="module")
+def CO_diamond_supercell():
+    """``2x2x2`` supercell of ``CO_diamond``."""
+    return _CO_diamond((2, 2, 2))
@@ -0,0 +1,79 @@
+import pytest
+import copy
+import torch
+from e3nn.util.jit import script
+
+from nequip.data import AtomicDataDict
+from nequip.model.modify_utils import modify
+from nequip.nn import ConvNetLayer
+from nequip.utils import floating_point_tolerance
+
+
+_KEYS = [
+    AtomicDataDict.TOTAL_ENERGY_KEY,
+    AtomicDataDict.FORCE_KEY,
+    AtomicDataDict.STRESS_KEY,
+]
+
+
+@pytest.fixture(scope="module")
+def model_config(model_config):
+    return {
+        **model_config,
+        "num_layers": 3,
+        "l_max": 2,
+        "radial_mlp_depth": 1,
+        "radial_mlp_width": 8,
+    }
+
+
+@pytest.fixture(scope="module")
+def data(CO_diamond):
+    return CO_diamond
+
+
+@pytest.mark.parametrize("layers", [None, [-1], [0, 2]])
+def test_activation_checkpointing(model, data, layers):
+    """Energy and force training give the same outputs and gradients with checkpointed layers."""
+    checkpointed = modify(
+        copy.deepcopy(model),
+        [{"modifier": "enable_activation_checkpointing", "layers": layers}],
+    )
+    conv_layers = [m for m in checkpointed.modules() if isinstance(m, ConvNetLayer)]
+    assert len(conv_layers) == 3
+    expected = [0, 1, 2] if layers is None else [idx % 3 for idx in layers]
+    assert [idx for idx, m in enumerate(conv_layers) if m.checkpoint] == expected
+    assert checkpointed.state_dict().keys() == model.state_dict().keys()
+
+    tol = floating_point_tolerance("float64")
+    outs, grads = [], []
+    for m in [copy.deepcopy(model), checkpointed]:
+        m.train()
+        out = m(data.copy())
+        loss = (
+            out[AtomicDataDict.TOTAL_ENERGY_KEY].square().sum()
+            + out[AtomicDataDict.FORCE_KEY].square().sum()
+            + out[AtomicDataDict.STRESS_KEY].square().sum()
+        )
+        loss.backward()
+        outs.append(out)
+        grads.append({k: p.grad for k, p in m.named_parameters()})
+    for key in _KEYS:
+        assert torch.allclose(outs[1][key], outs[0][key], rtol=tol, atol=tol), key
+    for k, grad in grads[0].items():
+        assert grads[1][k] is not None, k
+        assert torch.allclose(grads[1][k], grad, rtol=tol, atol=tol), k
+
+    # TorchScript skips recomputation
+    checkpointed.eval()
+    scripted = script(checkpointed)(data.copy())
+    for key in _KEYS:
+        assert torch.allclose(scripted[key], outs[0][key], rtol=tol, atol=tol), key
+
+
+def test_activation_checkpointing_layer_index(model):
+    with pytest.raises(ValueError, match="layer index"):
+        modify(
+            copy.deepcopy(model),
+            [{"modifier": "enable_activation_checkpointing", "layers": [3]}],
+        )
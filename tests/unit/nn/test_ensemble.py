@@ -0,0 +1,68 @@
+import pytest
+import copy
+import torch
+
+from nequip.data import AtomicDataDict
+from nequip.nn import EnsembleGraphModel
+from nequip.nn.ensemble import _SharedEdgeAttrs
+from nequip.utils import floating_point_tolerance
+from nequip.utils.unittests.model_tests_basic import BasicModelTestsMixin
+
+
+@pytest.fixture(scope="module")
+def data(CO_diamond_supercell):
+    return CO_diamond_supercell
+
+
+def test_ensemble(model_dtype, data, model_config):
+    models = [
+        BasicModelTestsMixin.make_model(
+            {**model_config, "model_dtype": model_dtype, "seed": seed}, device="cpu"
+        ).eval()
+        for seed in range(3)
+    ]
+    refs = [copy.deepcopy(model)(data.copy()) for model in models]
+    ensemble = EnsembleGraphModel(models)
+    assert ensemble.num_models == 3
+    # spherical harmonics are computed once for all members
+    assert ensemble.edge_attrs is not None
+    assert len([m for m in ensemble.modules() if isinstance(m, _SharedEdgeAttrs)]) == 3
+
+    out = ensemble(data.copy())
+    tol = floating_point_tolerance(model_dtype)
+    for key, var_key in [
+        (AtomicDataDict.PER_ATOM_ENERGY_KEY, None),
+        (AtomicDataDict.TOTAL_ENERGY_KEY, AtomicDataDict.TOTAL_ENERGY_VARIANCE_KEY),
+        (AtomicDataDict.FORCE_KEY, AtomicDataDict.FORCE_VARIANCE_KEY),
+    ]:
+        stacked = torch.stack([ref[key] for ref in refs])
+        assert torch.allclose(out[key], stacked.mean(0), atol=tol, rtol=tol), key
+        if var_key is not None:
+            var = stacked.var(0, correction=0)
+            assert torch.allclose(out[var_key], var, atol=tol, rtol=tol), var_key
+    assert not data[AtomicDataDict.POSITIONS_KEY].requires_grad
+
+
+def test_ensemble_identical_members(data, model_config):
+    model = BasicModelTestsMixin.make_model(model_config, device="cpu").eval()
+    ref = copy.deepcopy(model)(data.copy())
+    out = EnsembleGraphModel([copy.deepcopy(model) for _ in range(2)])(data.copy())
+    for key in [AtomicDataDict.TOTAL_ENERGY_KEY, AtomicDataDict.FORCE_KEY]:
+        assert torch.allclose(out[key], ref[key])
+    assert torch.all(out[AtomicDataDict.TOTAL_ENERGY_VARIANCE_KEY] == 0)
+    assert torch.all(out[AtomicDataDict.FORCE_VARIANCE_KEY] == 0)
+
+
+def test_ensemble_incompatible_members(model_config):
+    with pytest.raises(ValueError, match="r_max"):
+        EnsembleGraphModel(
+            [
+                BasicModelTestsMixin.make_model(
+                    {**model_config, "model_dtype": "float32", "seed": 0}, device="cpu"
+                ),
+                BasicModelTestsMixin.make_model(
+                    {**model_config, "model_dtype": "float32", "seed": 1, "r_max": 5.0},
+                    device="cpu",
+                ),
+            ]
+        )
@@ -0,0 +1,91 @@
+import pytest
+import copy
+import torch
+from e3nn.util.jit import script
+
+from nequip.data import AtomicDataDict
+from nequip.model.modify_utils import modify
+from nequip.nn import InteractionBlock
+from nequip.nn._fused_radial import (
+    FusedRadialMLPs,
+    FusedRadialMLPSlice,
+    _FUSED_RADIAL_MLP_KEY,
+)
+from nequip.utils import floating_point_tolerance
+from nequip.utils.unittests.model_tests_basic import BasicModelTestsMixin
+
+
+@pytest.fixture(scope="module", params=[0, 1, 2])
+def radial_mlp_depth(request):
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def model_config(model_config):
+    return {**model_config, "num_layers": 3}
+
+
+@pytest.fixture(scope="module")
+def data(CO_diamond_supercell):
+    return CO_diamond_supercell
+
+
+def test_fuse_radial_mlps(model_dtype, radial_mlp_depth, data, model_config):
+    model = BasicModelTestsMixin.make_model(
+        {
+            **model_config,
+            "model_dtype": model_dtype,
+            "radial_mlp_depth": radial_mlp_depth,
+        },
+        device="cpu",
+    )
+    ref = model(data.copy())
+
+    fused_model = modify(copy.deepcopy(model), [{"modifier": "fuse_radial_mlps"}])
+    fused = [m for m in fused_model.modules() if isinstance(m, FusedRadialMLPs)]
+    assert len(fused) == 1
+    assert fused[0].num_blocks == 3
+    blocks = [m for m in fused_model.modules() if isinstance(m, InteractionBlock)]
+    assert len(blocks) == 3
+    for block_idx, block in enumerate(blocks):
+        assert isinstance(block.edge_mlp, FusedRadialMLPSlice)
+        assert block.edge_mlp.block_idx == block_idx
+        assert block.radial_input_field == _FUSED_RADIAL_MLP_KEY
+    # fusion must not change the state dict
+    assert fused_model.state_dict().keys() == model.state_dict().keys()
+
+    out = fused_model(data.copy())
+    tol = floating_point_tolerance(model_dtype)
+    for key in [
+        AtomicDataDict.TOTAL_ENERGY_KEY,
+        AtomicDataDict.FORCE_KEY,
+        AtomicDataDict.STRESS_KEY,
+    ]:
+        assert torch.allclose(out[key], ref[key], rtol=tol, atol=tol), (
+            key,
+            (out[key] - ref[key]).abs().max(),
+        )
+
+    # applying the modifier twice is a no-op
+    fused_model_again = modify(fused_model, [{"modifier": "fuse_radial_mlps"}])
+    assert (
+        len([m for m in fused_model_again.modules() if isinstance(m, FusedRadialMLPs)])
+        == 1
+    )
+    out_again = fused_model_again(data.copy())
+    assert torch.equal(
+        out_again[AtomicDataDict.TOTAL_ENERGY_KEY],
+        out[AtomicDataDict.TOTAL_ENERGY_KEY],
+    )
+
+
+def test_fuse_radial_mlps_script(data, model_config):
+    model = modify(
+        BasicModelTestsMixin.make_model({**model_config, "l_max": 2}, device="cpu"),
+        [{"modifier": "fuse_radial_mlps"}],
+    )
+    ref = model(data.copy())
+    out = script(model)(data.copy())
+    assert torch.allclose(
+        out[AtomicDataDict.TOTAL_ENERGY_KEY], ref[AtomicDataDict.TOTAL_ENERGY_KEY]
+    )
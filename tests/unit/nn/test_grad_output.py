@@ -1,4 +1,5 @@
 import pytest
+import copy
 import torch
 
 from nequip.data import AtomicDataDict
@@ -6,6 +7,7 @@ from nequip.nn.grad_output import ForceStressOutput
 from nequip.nn._graph_mixin import GraphModuleMixin
 from nequip.nn import GraphModel
 from nequip.model.modify_utils import modify
+from nequip.utils.unittests.model_tests_basic import BasicModelTestsMixin
 
 
 class SimpleEnergyModel(GraphModuleMixin, torch.nn.Module):
@@ -67,3 +69,228 @@ def test_force_stress_modifiers(energy_model, dummy_batch):
     # test enabled state - forces should be present again
     result_forces_restored = enabled_model(dummy_batch.copy())
     assert AtomicDataDict.FORCE_KEY in result_forces_restored
+
+
+def test_select_force_stress_outputs(model_config, CO_diamond):
+    """Test runtime selection of forces and stress, also for TorchScript models."""
+    from e3nn.util.jit import script
+    from nequip.nn import set_force_stress_outputs
+    from nequip.utils import floating_point_tolerance
+
+    model = BasicModelTestsMixin.make_model(
+        {**model_config, "num_features": 4}, device="cpu"
+    )
+    data = CO_diamond
+    tol = floating_point_tolerance("float64")
+
+    ref = model(data.copy())
+    assert AtomicDataDict.STRESS_KEY in ref
+
+    # scripting modifies the model in-place, so we script a copy
+    for m in [model, script(copy.deepcopy(model))]:
+        assert set_force_stress_outputs(m, forces=True, stress=False) == 1
+        out = m(data.copy())
+        assert AtomicDataDict.STRESS_KEY not in out
+        assert AtomicDataDict.VIRIAL_KEY not in out
+        assert not out[AtomicDataDict.POSITIONS_KEY].requires_grad
+        for key in [AtomicDataDict.TOTAL_ENERGY_KEY, AtomicDataDict.FORCE_KEY]:
+            assert torch.allclose(out[key], ref[key], rtol=tol, atol=tol), key
+
+        set_force_stress_outputs(m, forces=False, stress=False)
+        out = m(data.copy())
+        assert AtomicDataDict.FORCE_KEY not in out
+        assert torch.allclose(
+            out[AtomicDataDict.TOTAL_ENERGY_KEY],
+            ref[AtomicDataDict.TOTAL_ENERGY_KEY],
+            rtol=tol,
+            atol=tol,
+        )
+
+        set_force_stress_outputs(m)
+        out = m(data.copy())
+        assert torch.allclose(
+            out[AtomicDataDict.STRESS_KEY],
+            ref[AtomicDataDict.STRESS_KEY],
+            rtol=tol,
+            atol=tol,
+        )
+
+    with pytest.raises(ValueError, match="requires computing forces"):
+        set_force_stress_outputs(model, forces=False, stress=True)
+
+    # the modifier allows force training without the stress derivatives
+    model = modify(model, [{"modifier": "select_ForceStressOutput", "stress": False}])
+    model.train()
+    out = model(data.copy())
+    assert AtomicDataDict.STRESS_KEY not in out
+    out[AtomicDataDict.FORCE_KEY].square().sum().backward()
+    assert all(p.grad is not None for p in model.parameters() if p.requires_grad)
+
+
+@pytest.mark.parametrize("num_layers", [1, 2])
+def test_edge_partial_forces(num_layers, model_config, CO_diamond):
+    """Test sparse edge partial forces against the dense Jacobian of `PartialForceOutput`."""
+    from e3nn.util.jit import script
+    from nequip.nn import (
+        PartialForceOutput,
+        EdgePartialForceOutput,
+        edge_partial_forces_to_dense,
+    )
+    from nequip.data import compute_neighborlist_
+    from nequip.utils import floating_point_tolerance
+
+    model = BasicModelTestsMixin.make_model(
+        {**model_config, "r_max": 3.0, "num_layers": num_layers, "num_features": 4},
+        device="cpu",
+    )
+    data = compute_neighborlist_(CO_diamond.copy(), r_max=3.0)
+    tol = floating_point_tolerance("float64")
+    num_nodes = AtomicDataDict.num_nodes(data)
+
+    ref = model(data.copy())
+    partial_model = copy.deepcopy(model)
+    partial_model.model = PartialForceOutput(model.model.func)
+    ref_partial = partial_model(data.copy())[AtomicDataDict.PARTIAL_FORCE_KEY]
+
+    edge_model = modify(
+        copy.deepcopy(model), [{"modifier": "enable_EdgePartialForceOutput"}]
+    )
+    assert isinstance(edge_model.model, EdgePartialForceOutput)
+    for m in [edge_model, script(copy.deepcopy(edge_model))]:
+        out = m(data.copy())
+        edge_partial_forces = out[AtomicDataDict.EDGE_PARTIAL_FORCE_KEY]
+        assert edge_partial_forces.shape == (
+            AtomicDataDict.num_edges(data),
+            3,
+        )
+        assert torch.allclose(
+            out[AtomicDataDict.FORCE_KEY],
+            ref[AtomicDataDict.FORCE_KEY],
+            rtol=tol,
+            atol=tol,
+        )
+        dense = edge_partial_forces_to_dense(
+            edge_partial_forces, data[AtomicDataDict.EDGE_INDEX_KEY], num_nodes
+        )
+        assert torch.allclose(dense.sum(0), ref[AtomicDataDict.FORCE_KEY], atol=tol)
+        if num_layers == 1:
+            # per-atom energies only depend on the edges centered at each atom
+            assert torch.allclose(dense, ref_partial, rtol=tol, atol=tol)
+
+
+def test_hessian(model_config):
+    """Test the Hessian against finite differences of the forces."""
+    from ase.build import bulk
+    from nequip.data import from_ase, compute_neighborlist_
+    from nequip.data.transforms import ChemicalSpeciesToAtomTypeMapper
+    from nequip.nn import HessianOutput
+
+    model = BasicModelTestsMixin.make_model(
+        {**model_config, "r_max": 3.0, "num_features": 4}, device="cpu"
+    )
+    atoms = bulk("C", "diamond", a=3.6)
+    atoms.rattle(0.1, seed=0)
+    atoms.numbers[1] = 8
+
+    def get_data(atoms):
+        data = compute_neighborlist_(from_ase(atoms), r_max=3.0)
+        return ChemicalSpeciesToAtomTypeMapper(["C", "O"])(data)
+
+    num_dof = 3 * len(atoms)
+    hessian_model = modify(
+        copy.deepcopy(model), [{"modifier": "enable_HessianOutput", "chunk_size": 4}]
+    )
+    assert isinstance(hessian_model.model, HessianOutput)
+    out = hessian_model(get_data(atoms))
+    hessian = out[AtomicDataDict.HESSIAN_KEY].view(num_dof, num_dof)
+    assert torch.allclose(
+        out[AtomicDataDict.FORCE_KEY], model(get_data(atoms))[AtomicDataDict.FORCE_KEY]
+    )
+    assert torch.allclose(hessian, hessian.T, atol=1e-10)
+
+    # batched backward passes give the same Hessian
+    hessian_model.model.vectorize = True
+    assert torch.allclose(
+        hessian_model(get_data(atoms))[AtomicDataDict.HESSIAN_KEY].view(
+            num_dof, num_dof
+        ),
+        hessian,
+        atol=1e-10,
+    )
+
+    # central finite differences of the forces
+    epsilon = 1e-4
+    fd_hessian = torch.zeros_like(hessian)
+    for idof in range(num_dof):
+        forces = []
+        for sign in [1, -1]:
+            displaced = atoms.copy()
+            displaced.positions.reshape(-1)[idof] += sign * epsilon
+            forces.append(model(get_data(displaced))[AtomicDataDict.FORCE_KEY])
+        fd_hessian[:, idof] = -(forces[0] - forces[1]).view(-1) / (2 * epsilon)
+    assert torch.allclose(hessian, fd_hessian, atol=1e-6)
+
+    # translational invariance sum rule
+    hessian_model.model.acoustic_sum_rule = True
+    asr_hessian = hessian_model(get_data(atoms))[AtomicDataDict.HESSIAN_KEY]
+    assert torch.allclose(
+        asr_hessian.sum(dim=2), torch.zeros_like(asr_hessian.sum(dim=2)), atol=1e-12
+    )
+    assert torch.allclose(asr_hessian.view(num_dof, num_dof), hessian, atol=1e-8)
+
+
+def test_hessian_ase(model_config):
+    """Test the ASE Hessian helper for eager and TorchScript models."""
+    import numpy as np
+    from e3nn.util.jit import script
+    from ase.build import molecule
+    from nequip.ase import NequIPCalculator
+    from nequip.data.transforms import (
+        ChemicalSpeciesToAtomTypeMapper,
+        NeighborListTransform,
+    )
+
+    config = {
+        **model_config,
+        "type_names": ["H", "O"],
+        "r_max": 3.0,
+        "num_features": 4,
+        "avg_num_neighbors": 2.0,
+        "per_type_energy_shifts": {"H": 1.0, "O": 2.0},
+        "per_type_energy_scales": {"H": 1.0, "O": 1.0},
+    }
+    model = BasicModelTestsMixin.make_model(config, device="cpu").eval()
+    atoms = molecule("H2O")
+    hessians = []
+    for m in [model, script(copy.deepcopy(model))]:
+        calc = NequIPCalculator(
+            m,
+            device="cpu",
+            transforms=[
+                ChemicalSpeciesToAtomTypeMapper(["H", "O"]),
+                NeighborListTransform(r_max=3.0),
+            ],
+        )
+        hessians.append(calc.get_hessian(atoms, chunk_size=2))
+    assert hessians[0].shape == (9, 9)
+    np.testing.assert_allclose(hessians[0], hessians[1], atol=1e-10)
+
+    # selected rows, with the sum rule imposed on their diagonal blocks
+    rows = calc.get_hessian(atoms, atom_indices=[1], acoustic_sum_rule=True)
+    assert rows.shape == (3, 9)
+    np.testing.assert_allclose(rows[:, :3], hessians[0][3:6, :3], atol=1e-10)
+    np.testing.assert_allclose(rows.reshape(3, 3, 3).sum(1), 0.0, atol=1e-10)
+
+    # consistent with finite differences of the calculator forces
+    epsilon = 1e-4
+    atoms.calc = calc
+    for idof in [0, 4, 8]:
+        forces = []
+        for sign in [1, -1]:
+            displaced = atoms.copy()
+            displaced.calc = calc
+            displaced.positions.reshape(-1)[idof] += sign * epsilon
+            forces.append(displaced.get_forces().reshape(-1))
+        np.testing.assert_allclose(
+            hessians[0][:, idof], -(forces[0] - forces[1]) / (2 * epsilon), atol=1e-6
+        )
@@ -0,0 +1,149 @@
+import pytest
+import copy
+import torch
+from e3nn.util.jit import script
+
+from nequip.data import AtomicDataDict
+from nequip.model.modify_utils import modify
+from nequip.nn import ScalarMLPFunction
+from nequip.nn._mixed_precision import (
+    MixedPrecisionGraphModule,
+    MixedPrecisionModule,
+    MixedPrecisionTensorProductScatter,
+)
+from nequip.utils import floating_point_tolerance
+from nequip.utils.unittests.model_tests_basic import BasicModelTestsMixin
+
+
+@pytest.fixture(scope="module", params=["bfloat16", "float16"])
+def compute_dtype(request):
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def data(CO_diamond_supercell):
+    return CO_diamond_supercell
+
+
+def test_mixed_precision(model_dtype, compute_dtype, data, model_config):
+    model = BasicModelTestsMixin.make_model(
+        {**model_config, "model_dtype": model_dtype}, device="cpu"
+    )
+    ref = model(data.copy())
+
+    mixed_model = modify(
+        copy.deepcopy(model),
+        [{"modifier": "enable_mixed_precision", "compute_dtype": compute_dtype}],
+    )
+    modules = list(mixed_model.modules())
+    assert any(isinstance(m, MixedPrecisionGraphModule) for m in modules)
+    assert any(isinstance(m, MixedPrecisionModule) for m in modules)
+    assert (
+        len([m for m in modules if isinstance(m, MixedPrecisionTensorProductScatter)])
+        == 2
+    )
+    for m in modules:
+        if isinstance(m, MixedPrecisionModule):
+            assert isinstance(m.module, ScalarMLPFunction)
+            assert all(
+                p.dtype == getattr(torch, compute_dtype) for p in m.module.parameters()
+            )
+
+    out = mixed_model(data.copy())
+    tol = floating_point_tolerance(compute_dtype)
+    for key in [
+        AtomicDataDict.PER_ATOM_ENERGY_KEY,
+        AtomicDataDict.TOTAL_ENERGY_KEY,
+        AtomicDataDict.FORCE_KEY,
+        AtomicDataDict.STRESS_KEY,
+    ]:
+        # energies, forces and stresses are accumulated in the model dtype
+        assert out[key].dtype == ref[key].dtype
+        scale = ref[key].abs().max().clamp_min(1.0)
+        err = (out[key] - ref[key]).abs().max()
+        assert err <= tol * scale, (key, err)
+
+    # applying the modifier twice is a no-op
+    num_modules = len(modules)
+    mixed_model = modify(
+        mixed_model,
+        [{"modifier": "enable_mixed_precision", "compute_dtype": compute_dtype}],
+    )
+    assert len(list(mixed_model.modules())) == num_modules
+
+
+def test_mixed_precision_per_module_class(data, model_config):
+    model = modify(
+        BasicModelTestsMixin.make_model(model_config, device="cpu"),
+        [{"modifier": "enable_mixed_precision", "modules": ["ScalarMLPFunction"]}],
+    )
+    modules = list(model.modules())
+    assert any(isinstance(m, MixedPrecisionModule) for m in modules)
+    assert not any(
+        isinstance(m, (MixedPrecisionGraphModule, MixedPrecisionTensorProductScatter))
+        for m in modules
+    )
+    model(data.copy())
+
+
+@pytest.mark.parametrize("module", ["ConvNetLayer", "AtomwiseReduce"])
+def test_mixed_precision_model_dtype_modules(module, model_config):
+    with pytest.raises(ValueError, match="must stay in the model dtype"):
+        modify(
+            BasicModelTestsMixin.make_model(
+                {**model_config, "model_dtype": "float32"}, device="cpu"
+            ),
+            [{"modifier": "enable_mixed_precision", "modules": [module]}],
+        )
+
+
+@pytest.mark.parametrize(
+    "module", ["BesselEdgeLengthEncoding", "ScalarMLPFunction", "TensorProductScatter"]
+)
+def test_mixed_precision_check(module, model_config, monkeypatch):
+    """Every selected module is checked against the original module."""
+    import nequip.utils.dtype
+
+    monkeypatch.setattr(nequip.utils.dtype, "_BFLOAT16_MODEL_TOL", 0.0)
+    with pytest.raises(RuntimeError, match=f"`{module}` in torch.bfloat16 differs"):
+        modify(
+            BasicModelTestsMixin.make_model(model_config, device="cpu"),
+            [{"modifier": "enable_mixed_precision", "modules": [module]}],
+        )
+
+
+def test_mixed_precision_unchecked_modules(model_config):
+    with pytest.raises(ValueError, match="cannot be checked"):
+        modify(
+            BasicModelTestsMixin.make_model(model_config, device="cpu"),
+            [
+                {
+                    "modifier": "enable_mixed_precision",
+                    "modules": ["SphericalHarmonicEdgeAttrs"],
+                }
+            ],
+        )
+
+
+def test_mixed_precision_unknown_dtype(model_config):
+    with pytest.raises(ValueError, match="compute_dtype"):
+        modify(
+            BasicModelTestsMixin.make_model(
+                {**model_config, "model_dtype": "float32"}, device="cpu"
+            ),
+            [{"modifier": "enable_mixed_precision", "compute_dtype": "float8"}],
+        )
+
+
+def test_mixed_precision_script(data, model_config):
+    model = modify(
+        BasicModelTestsMixin.make_model(
+            {**model_config, "model_dtype": "float32"}, device="cpu"
+        ),
+        [{"modifier": "enable_mixed_precision"}],
+    )
+    ref = model(data.copy())
+    out = script(model)(data.copy())
+    assert torch.allclose(
+        out[AtomicDataDict.TOTAL_ENERGY_KEY], ref[AtomicDataDict.TOTAL_ENERGY_KEY]
+    )
@@ -0,0 +1,142 @@
+import pytest
+import copy
+import torch
+from e3nn.o3._linear import Linear
+from e3nn.util.jit import script
+
+from nequip.data import AtomicDataDict
+from nequip.model.modify_utils import modify
+from nequip.nn.mlp import ScalarLinearLayer, DeepLinearMLP
+from nequip.nn._quantized_linear import QuantizedScalarLinear, QuantizedE3nnLinear
+from nequip.utils.unittests.model_tests_basic import BasicModelTestsMixin
+
+import ase.io
+from ase.build import bulk
+
+
+@pytest.fixture(scope="module", params=["bfloat16", "float16", "int8"])
+def weight_dtype(request):
+    return request.param
+
+
+def _atoms(seed):
+    atoms = bulk("C", "diamond", a=3.6, cubic=True) * (2, 2, 2)
+    atoms.rattle(0.1, seed=seed)
+    atoms.numbers[::3] = 8
+    return atoms
+
+
+@pytest.fixture(scope="module")
+def data(CO_diamond_supercell):
+    return CO_diamond_supercell
+
+
+@pytest.mark.parametrize("bias", [False, True])
+def test_quantized_scalar_linear(weight_dtype, bias):
+    layer = ScalarLinearLayer(16, 8, alpha=0.25, bias=bias)
+    if bias:
+        torch.nn.init.normal_(layer.bias)
+    quantized = QuantizedScalarLinear(
+        layer.weight * layer.alpha, layer.bias, weight_dtype
+    )
+    assert quantized.weight.dtype == getattr(torch, weight_dtype)
+
+    x = torch.randn(32, 16, requires_grad=True)
+    ref = layer(x)
+    out = quantized(x)
+    assert out.dtype == x.dtype
+    assert torch.allclose(out, ref, rtol=5e-2, atol=5e-2)
+    # gradients with respect to the inputs are required for forces
+    (grad,) = torch.autograd.grad(out.sum(), x)
+    (ref_grad,) = torch.autograd.grad(ref.sum(), x)
+    assert torch.allclose(grad, ref_grad, rtol=5e-2, atol=5e-2)
+
+
+def test_quantize_linear_layers(model_dtype, weight_dtype, data, model_config):
+    model = BasicModelTestsMixin.make_model(
+        {**model_config, "model_dtype": model_dtype}, device="cpu"
+    )
+    ref = model(data.copy())
+
+    quantized_model = modify(
+        copy.deepcopy(model),
+        [{"modifier": "quantize_linear_layers", "weight_dtype": weight_dtype}],
+    )
+    modules = list(quantized_model.modules())
+    assert not any(isinstance(m, (ScalarLinearLayer, DeepLinearMLP)) for m in modules)
+    assert any(isinstance(m, QuantizedScalarLinear) for m in modules)
+    assert any(isinstance(m, QuantizedE3nnLinear) for m in modules)
+    # all `e3nn` `Linear`s without biases are wrapped
+    for m in modules:
+        if isinstance(m, Linear):
+            assert m.weight.numel() == 0 or m.bias_numel > 0
+
+    out = quantized_model(data.copy())
+    for key in [AtomicDataDict.TOTAL_ENERGY_KEY, AtomicDataDict.FORCE_KEY]:
+        scale = ref[key].abs().max().clamp_min(1.0)
+        err = (out[key] - ref[key]).abs().max()
+        assert err <= 5e-2 * scale, (key, err)
+
+    # applying the modifier twice is a no-op
+    num_modules = len(modules)
+    quantized_model = modify(
+        quantized_model,
+        [{"modifier": "quantize_linear_layers", "weight_dtype": weight_dtype}],
+    )
+    assert len(list(quantized_model.modules())) == num_modules
+
+
+def test_quantize_linear_layers_validation(tmp_path, model):
+    validation_data = str(tmp_path / "validation.xyz")
+    ase.io.write(validation_data, [_atoms(seed) for seed in range(2)])
+
+    # generous tolerances pass
+    modify(
+        copy.deepcopy(model),
+        [
+            {
+                "modifier": "quantize_linear_layers",
+                "weight_dtype": "int8",
+                "validation_data": validation_data,
+                "energy_tolerance": 1.0,
+                "force_tolerance": 10.0,
+            }
+        ],
+    )
+    # but weight quantization is never exact
+    with pytest.raises(RuntimeError, match="force error"):
+        modify(
+            copy.deepcopy(model),
+            [
+                {
+                    "modifier": "quantize_linear_layers",
+                    "weight_dtype": "int8",
+                    "validation_data": validation_data,
+                    "force_tolerance": 0.0,
+                }
+            ],
+        )
+
+
+def test_quantize_linear_layers_unknown_dtype(model_config):
+    with pytest.raises(ValueError, match="weight_dtype"):
+        modify(
+            BasicModelTestsMixin.make_model(
+                {**model_config, "model_dtype": "float32"}, device="cpu"
+            ),
+            [{"modifier": "quantize_linear_layers", "weight_dtype": "int4"}],
+        )
+
+
+def test_quantize_linear_layers_script(weight_dtype, data, model_config):
+    model = modify(
+        BasicModelTestsMixin.make_model(
+            {**model_config, "model_dtype": "float32"}, device="cpu"
+        ),
+        [{"modifier": "quantize_linear_layers", "weight_dtype": weight_dtype}],
+    )
+    ref = model(data.copy())
+    out = script(model)(data.copy())
+    assert torch.allclose(
+        out[AtomicDataDict.TOTAL_ENERGY_KEY], ref[AtomicDataDict.TOTAL_ENERGY_KEY]
+    )
@@ -0,0 +1,203 @@
+import pytest
+import copy
+import torch
+from e3nn.util.jit import script
+
+from nequip.data import AtomicDataDict, from_ase
+from nequip.data.transforms import (
+    ChemicalSpeciesToAtomTypeMapper,
+    SortedNeighborListTransform,
+)
+from nequip.model.modify_utils import modify
+from nequip.nn._tp_scatter_base import TensorProductScatter
+from nequip.nn.pair_potential import ZBL
+from nequip.nn.utils import scatter, sorted_index_to_ptr, without_segment_reduce
+from nequip.utils import floating_point_tolerance
+
+from ase.build import bulk
+
+
+_KEYS = [
+    AtomicDataDict.TOTAL_ENERGY_KEY,
+    AtomicDataDict.FORCE_KEY,
+    AtomicDataDict.STRESS_KEY,
+]
+
+
+@pytest.mark.parametrize("dim_size", [None, 20])
+def test_scatter_sorted_index(dim_size):
+    generator = torch.Generator().manual_seed(0)
+    # leave some segments empty
+    index, _ = torch.sort(torch.randint(0, 10, (100,), generator=generator) * 2)
+    src = torch.randn((100, 4), generator=generator, dtype=torch.float64)
+    src.requires_grad_(True)
+    ref = scatter(src, index, dim=0, dim_size=dim_size)
+    out = scatter(src, index, dim=0, dim_size=dim_size, sorted_index=True)
+    assert out.shape == ref.shape
+    assert torch.allclose(out, ref)
+    weight = torch.randn_like(ref)
+    (ref_grad,) = torch.autograd.grad((ref * weight).sum(), src)
+    (grad,) = torch.autograd.grad((out * weight).sum(), src)
+    assert torch.allclose(grad, ref_grad)
+
+
+def test_scatter_sorted_index_dtype():
+    index = torch.tensor([0, 0, 1, 3, 3, 3])
+    src = torch.ones((6, 2), dtype=torch.bfloat16)
+    ref = scatter(src, index, dim=0)
+    out = scatter(src, index, dim=0, sorted_index=True)
+    # both paths sum in float32
+    assert ref.dtype == out.dtype == torch.float32
+    assert torch.equal(out, ref)
+
+
+def test_scatter_sorted_index_ptr():
+    index = torch.tensor([0, 0, 1, 3, 3, 3])
+    src = torch.randn((6, 2), dtype=torch.float64)
+    ptr = sorted_index_to_ptr(index, 6)
+    assert ptr.tolist() == [0, 2, 3, 3, 6, 6, 6]
+    ref = scatter(src, index, dim=0, dim_size=6)
+    out = scatter(src, index, dim=0, sorted_index=True, ptr=ptr)
+    assert torch.allclose(out, ref)
+    # only the first `dim_size` segments of the precomputed row pointers
+    out = scatter(src, index, dim=0, dim_size=4, sorted_index=True, ptr=ptr)
+    assert torch.allclose(out, ref[:4])
+
+
+@pytest.fixture(scope="module")
+def model_config(model_config):
+    return {
+        **model_config,
+        "l_max": 2,
+        "radial_mlp_depth": 1,
+        "radial_mlp_width": 8,
+        "pair_potential": {
+            "_target_": "nequip.nn.pair_potential.ZBL",
+            "chemical_species": ["C", "O"],
+            "units": "metal",
+        },
+    }
+
+
+@pytest.fixture(scope="module")
+def atoms():
+    atoms = bulk("C", "diamond", a=3.6, cubic=True) * (2, 1, 1)
+    atoms.rattle(0.1, seed=0)
+    atoms.numbers[::3] = 8
+    return atoms
+
+
+@pytest.fixture(scope="module")
+def frame(atoms):
+    data = SortedNeighborListTransform(r_max=4.0)(from_ase(atoms))
+    data = ChemicalSpeciesToAtomTypeMapper(["C", "O"])(data)
+    # the transpose permutation is not needed and cannot be batched
+    data.pop(AtomicDataDict.EDGE_TRANSPOSE_PERM_KEY)
+    return data
+
+
+@pytest.fixture(scope="module")
+def data(frame):
+    return AtomicDataDict.batched_from_list([frame, frame])
+
+
+def test_enable_segment_reduce(model, data):
+    model = copy.deepcopy(model).eval()
+    ref = model(data.copy())
+
+    segment = modify(copy.deepcopy(model), [{"modifier": "enable_segment_reduce"}])
+    modules = [
+        m for m in segment.modules() if isinstance(m, (TensorProductScatter, ZBL))
+    ]
+    assert len(modules) == 3
+    assert all(m.use_segment_reduce for m in modules)
+
+    tol = floating_point_tolerance("float64")
+    outs = [segment(data.copy()), script(segment)(data.copy())]
+    for out in outs:
+        for key in _KEYS:
+            assert torch.allclose(out[key], ref[key], rtol=tol, atol=tol), key
+    # segment reductions are reproducible
+    again = segment(data.copy())
+    for key in _KEYS:
+        assert torch.equal(again[key], outs[0][key]), key
+
+
+def test_segment_reduce_ptr_once(model, data, monkeypatch):
+    """The CSR row pointers are computed once per graph and shared by all segment reductions."""
+    import nequip.nn.utils
+
+    calls = []
+
+    def _sorted_index_to_ptr(index, dim_size):
+        calls.append(dim_size)
+        return sorted_index_to_ptr(index, dim_size)
+
+    monkeypatch.setattr(nequip.nn.utils, "sorted_index_to_ptr", _sorted_index_to_ptr)
+    segment = modify(
+        copy.deepcopy(model).eval(), [{"modifier": "enable_segment_reduce"}]
+    )
+    out = segment(data.copy())
+    num_nodes = AtomicDataDict.num_nodes(data)
+    # two interaction blocks and the ZBL pair potential share a single computation
+    assert calls == [num_nodes]
+    assert torch.equal(
+        out[AtomicDataDict.EDGE_CENTER_PTR_KEY],
+        sorted_index_to_ptr(data[AtomicDataDict.EDGE_INDEX_KEY][0], num_nodes),
+    )
+
+
+@pytest.mark.parametrize("hessian_first", [False, True])
+def test_segment_reduce_hessian(model, frame, hessian_first):
+    """Hessians need double backward, so segment reductions fall back to ``scatter_add_``."""
+    hessian = {"modifier": "enable_HessianOutput", "chunk_size": 8}
+    segment = {"modifier": "enable_segment_reduce"}
+    model = copy.deepcopy(model).eval()
+    ref = modify(copy.deepcopy(model), [hessian])(frame.copy())
+    modifiers = [hessian, segment] if hessian_first else [segment, hessian]
+    segment_model = modify(copy.deepcopy(model), modifiers)
+
+    # `HessianOutput` cannot be compiled, TorchScript models are covered by `test_segment_reduce_hessian_ase`
+    out = segment_model(frame.copy())
+    tol = floating_point_tolerance("float64")
+    for key in [AtomicDataDict.HESSIAN_KEY] + _KEYS[:2]:
+        assert torch.allclose(out[key], ref[key], rtol=tol, atol=tol), key
+    # the segment reductions are enabled again afterwards
+    modules = [m for m in segment_model.modules() if hasattr(m, "use_segment_reduce")]
+    assert len(modules) == 3
+    assert all(m.use_segment_reduce for m in modules)
+
+
+def test_segment_reduce_hessian_ase(model, atoms):
+    from nequip.ase import NequIPCalculator
+
+    model = copy.deepcopy(model).eval()
+    segment_model = modify(
+        copy.deepcopy(model), [{"modifier": "enable_segment_reduce"}]
+    )
+    hessians = []
+    for m in [model, segment_model, script(segment_model)]:
+        calc = NequIPCalculator(
+            m,
+            device="cpu",
+            transforms=[
+                SortedNeighborListTransform(r_max=4.0),
+                ChemicalSpeciesToAtomTypeMapper(["C", "O"]),
+            ],
+        )
+        hessians.append(torch.as_tensor(calc.get_hessian(atoms, chunk_size=8)))
+    tol = floating_point_tolerance("float64")
+    for hessian in hessians[1:]:
+        assert torch.allclose(hessian, hessians[0], rtol=tol, atol=tol)
+
+
+def test_without_segment_reduce(model):
+    segment_model = modify(
+        copy.deepcopy(model), [{"modifier": "enable_segment_reduce"}]
+    )
+    modules = [m for m in segment_model.modules() if hasattr(m, "use_segment_reduce")]
+    with pytest.raises(RuntimeError):
+        with without_segment_reduce(segment_model):
+            assert not any(m.use_segment_reduce for m in modules)
+            raise RuntimeError
+    assert all(m.use_segment_reduce for m in modules)
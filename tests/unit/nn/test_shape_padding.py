@@ -0,0 +1,159 @@
+import pytest
+import torch
+
+from nequip.data import AtomicDataDict, from_ase, compute_neighborlist_
+from nequip.data.transforms import ChemicalSpeciesToAtomTypeMapper
+from nequip.model.modify_utils import modify
+from nequip.nn._shape_padding import (
+    bucket_size,
+    pad_data,
+    pad_to_buckets,
+    strip_padding,
+)
+from nequip.utils import floating_point_tolerance
+from nequip.utils.versions import _TORCH_GE_2_6
+from nequip.utils.unittests.model_tests_basic import BasicModelTestsMixin
+
+import numpy as np
+from ase.build import bulk
+from ase.calculators.singlepoint import SinglePointCalculator
+
+
+def _data(seed, repeat=1):
+    atoms = bulk("C", "diamond", a=3.6, cubic=True) * (repeat, 1, 1)
+    atoms.rattle(0.1, seed=seed)
+    atoms.numbers[::3] = 8
+    # labels determine the outputs of train-time compiled models
+    atoms.calc = SinglePointCalculator(
+        atoms, energy=0.0, forces=np.zeros((len(atoms), 3)), stress=np.zeros(6)
+    )
+    data = compute_neighborlist_(from_ase(atoms), r_max=4.0)
+    return ChemicalSpeciesToAtomTypeMapper(["C", "O"])(data)
+
+
+_OUTPUT_KEYS = [
+    AtomicDataDict.PER_ATOM_ENERGY_KEY,
+    AtomicDataDict.TOTAL_ENERGY_KEY,
+    AtomicDataDict.FORCE_KEY,
+    AtomicDataDict.STRESS_KEY,
+]
+
+
+@pytest.mark.parametrize("batched,num_pad_frames", [(False, 0), (True, 1), (True, 3)])
+def test_pad_strip(batched, num_pad_frames, model):
+    if batched:
+        data = AtomicDataDict.batched_from_list([_data(0), _data(1, repeat=2)])
+    else:
+        data = _data(0, repeat=2)
+        for k in (AtomicDataDict.BATCH_KEY, AtomicDataDict.NUM_NODES_KEY):
+            data.pop(k, None)
+    data = {k: data[k] for k in model.model_input_fields if k in data}
+    ref = model(data.copy())
+    num_frames = AtomicDataDict.num_frames(data)
+    num_nodes = AtomicDataDict.num_nodes(data)
+    num_edges = AtomicDataDict.num_edges(data)
+
+    padded = pad_data(
+        data,
+        num_nodes + 5,
+        num_edges + 17,
+        r_max=4.0,
+        max_frames=num_frames + num_pad_frames if batched else None,
+    )
+    assert AtomicDataDict.num_nodes(padded) == num_nodes + 5
+    assert AtomicDataDict.num_edges(padded) == num_edges + 17
+    assert AtomicDataDict.num_frames(padded) == num_frames + num_pad_frames
+    # padding edges are centered on the first padding node, which keeps sorted edges sorted
+    edge_index = padded[AtomicDataDict.EDGE_INDEX_KEY]
+    assert torch.all(edge_index[0, num_edges:] == num_nodes)
+    assert torch.all(edge_index[1, num_edges:] == num_nodes + 1)
+    if batched:
+        assert padded[AtomicDataDict.NUM_NODES_KEY].sum() == num_nodes + 5
+
+    out = model(padded)
+    assert all(torch.isfinite(v).all() for v in out.values() if v.is_floating_point())
+    out = strip_padding(out, num_nodes, num_edges, num_frames, batched)
+    for key in _OUTPUT_KEYS:
+        assert out[key].shape == ref[key].shape
+        assert torch.allclose(out[key], ref[key], atol=1e-10), key
+
+    # data that already has the requested shape is not padded
+    unpadded = pad_data(data, num_nodes, num_edges, r_max=4.0, max_frames=num_frames)
+    assert unpadded is data
+
+
+def test_bucket_size():
+    buckets = [bucket_size(n, 1.25) for n in range(1, 10000)]
+    assert all(b >= n for n, b in zip(range(1, 10000), buckets))
+    assert all(b1 <= b2 for b1, b2 in zip(buckets[:-1], buckets[1:]))
+    assert buckets[0] == 2
+    # the number of distinct buckets grows logarithmically
+    assert len(set(buckets)) < 50
+
+
+@pytest.mark.parametrize("num_frames", [1, 3])
+def test_padding_preserves_outputs(num_frames, model):
+    data = [_data(seed, repeat=seed + 1) for seed in range(num_frames)]
+    data = AtomicDataDict.batched_from_list(data)
+    ref = model(data.copy())
+
+    padded, sizes = pad_to_buckets(
+        {k: data[k] for k in model.model_input_fields if k in data},
+        growth=1.25,
+        r_max=4.0,
+    )
+    assert sizes == (
+        AtomicDataDict.num_nodes(data),
+        AtomicDataDict.num_edges(data),
+        AtomicDataDict.num_frames(data),
+    )
+    assert AtomicDataDict.num_nodes(padded) == bucket_size(sizes[0] + 2, 1.25)
+    assert AtomicDataDict.num_edges(padded) == bucket_size(sizes[1] + 1, 1.25)
+    assert AtomicDataDict.num_frames(padded) == bucket_size(sizes[2] + 1, 1.25)
+    out = strip_padding(model(padded), *sizes, batched=True)
+    for key in _OUTPUT_KEYS:
+        assert out[key].shape == ref[key].shape
+        assert torch.allclose(out[key], ref[key], atol=1e-10), key
+
+
+@pytest.mark.skipif(not _TORCH_GE_2_6, reason="train-time compile requires torch>=2.6")
+def test_shape_padding_compile(model_config):
+    model = modify(
+        BasicModelTestsMixin.make_model(
+            {**model_config, "model_dtype": "float32", "compile_mode": "compile"},
+            device="cpu",
+        ),
+        [{"modifier": "enable_shape_padding", "bucket_growth": 1.5}],
+    )
+    eager_model = BasicModelTestsMixin.make_model(
+        {**model_config, "model_dtype": "float32"}, device="cpu"
+    )
+    tol = floating_point_tolerance("float32")
+
+    # single frames are evaluated with the compiled model instead of falling back to the eager model
+    warmup = _data(0)
+    model(warmup.copy())
+    assert model.num_compiles >= 1
+    num_compiles = model.num_compiles
+
+    # no recompilations after warmup, whether or not the batch dims change bucket
+    for num_frames in [1, 2, 5, 3]:
+        data = AtomicDataDict.batched_from_list(
+            [_data(seed, repeat=1 + seed % 2) for seed in range(num_frames)]
+        )
+        out = model(data.copy())
+        ref = eager_model(data.copy())
+        for key in _OUTPUT_KEYS[1:]:
+            assert out[key].shape == ref[key].shape
+            assert torch.allclose(out[key], ref[key], atol=tol, rtol=tol), key
+    assert model.num_compiles == num_compiles
+
+
+def test_shape_padding_requires_compile(model_config):
+    with pytest.raises(RuntimeError, match="not a registered model modifier"):
+        modify(
+            BasicModelTestsMixin.make_model(
+                {**model_config, "model_dtype": "float32"}, device="cpu"
+            ),
+            [{"modifier": "enable_shape_padding"}],
+        )
@@ -0,0 +1,76 @@
+import pytest
+import copy
+import torch
+
+from nequip.data import AtomicDataDict
+from nequip.model.modify_utils import modify
+from nequip.nn import InteractionBlock
+from nequip.nn._tabulated_radial import TabulatedRadialMLP
+from nequip.utils import dtype_from_name, floating_point_tolerance
+from nequip.utils.unittests.model_tests_basic import BasicModelTestsMixin
+
+
+@pytest.fixture(scope="module", params=[None, {"C": 3.5, "O": {"C": 3.0}}])
+def per_edge_type_cutoff(request):
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def model_config(model_config):
+    return {**model_config, "l_max": 2}
+
+
+@pytest.fixture(scope="module")
+def data(CO_diamond_supercell):
+    return CO_diamond_supercell
+
+
+def test_tabulate_radial_mlp(model_dtype, per_edge_type_cutoff, data, model_config):
+    model = BasicModelTestsMixin.make_model(
+        {
+            **model_config,
+            "model_dtype": model_dtype,
+            "per_edge_type_cutoff": per_edge_type_cutoff,
+        },
+        device="cpu",
+    )
+    ref = model(data.copy())
+
+    tab_model = modify(copy.deepcopy(model), [{"modifier": "tabulate_radial_mlp"}])
+    blocks = [m for m in tab_model.modules() if isinstance(m, InteractionBlock)]
+    assert len(blocks) == 2
+    for block in blocks:
+        assert isinstance(block.edge_mlp, TabulatedRadialMLP)
+        assert block.radial_input_field == AtomicDataDict.NORM_LENGTH_KEY
+        assert block.edge_mlp.coeffs.dtype == dtype_from_name(model_dtype)
+    # tabulation must not change the state dict
+    assert tab_model.state_dict().keys() == model.state_dict().keys()
+
+    out = tab_model(data.copy())
+    # the spline interpolation error dominates over floating point errors for `float64`
+    tol = max(floating_point_tolerance(model_dtype), 1e-7)
+    for key in [
+        AtomicDataDict.TOTAL_ENERGY_KEY,
+        AtomicDataDict.FORCE_KEY,
+        AtomicDataDict.STRESS_KEY,
+    ]:
+        assert torch.allclose(out[key], ref[key], rtol=tol, atol=tol), (
+            key,
+            (out[key] - ref[key]).abs().max(),
+        )
+
+    # applying the modifier twice is a no-op
+    tab_model_again = modify(tab_model, [{"modifier": "tabulate_radial_mlp"}])
+    out_again = tab_model_again(data.copy())
+    assert torch.equal(
+        out_again[AtomicDataDict.TOTAL_ENERGY_KEY],
+        out[AtomicDataDict.TOTAL_ENERGY_KEY],
+    )
+
+
+def test_tabulate_radial_mlp_tolerance(model):
+    with pytest.raises(RuntimeError, match="num_points"):
+        modify(
+            copy.deepcopy(model),
+            [{"modifier": "tabulate_radial_mlp", "num_points": 8, "tolerance": 1e-8}],
+        )
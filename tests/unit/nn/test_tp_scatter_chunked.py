@@ -0,0 +1,84 @@
+import pytest
+import copy
+import torch
+from e3nn.util.jit import script
+
+from nequip.data import AtomicDataDict
+from nequip.model.modify_utils import modify
+from nequip.nn._tp_scatter_chunked import ChunkedTensorProductScatter
+from nequip.utils import floating_point_tolerance
+
+
+_KEYS = [
+    AtomicDataDict.TOTAL_ENERGY_KEY,
+    AtomicDataDict.FORCE_KEY,
+    AtomicDataDict.STRESS_KEY,
+]
+
+
+@pytest.fixture(scope="module")
+def model_config(model_config):
+    return {**model_config, "l_max": 2, "radial_mlp_depth": 1, "radial_mlp_width": 8}
+
+
+@pytest.fixture(scope="module")
+def data(CO_diamond):
+    return CO_diamond
+
+
+def _assert_close(out, ref):
+    tol = floating_point_tolerance("float64")
+    for key in _KEYS:
+        assert torch.allclose(out[key], ref[key], rtol=tol, atol=tol), key
+
+
+@pytest.mark.parametrize("recompute", [True, False])
+def test_edge_chunking(model, data, recompute):
+    ref = model(data.copy())
+
+    chunked = modify(
+        copy.deepcopy(model),
+        [{"modifier": "enable_edge_chunking", "chunk_size": 7, "recompute": recompute}],
+    )
+    tp_scatters = [
+        m for m in chunked.modules() if isinstance(m, ChunkedTensorProductScatter)
+    ]
+    assert len(tp_scatters) == 2
+    assert all(m.chunk_size == 7 for m in tp_scatters)
+    assert AtomicDataDict.num_edges(data) > 7
+    assert chunked.state_dict().keys() == model.state_dict().keys()
+
+    _assert_close(chunked(data.copy()), ref)
+    # TorchScript skips recomputation
+    _assert_close(script(chunked)(data.copy()), ref)
+
+
+def test_edge_chunking_training(model, data):
+    """Force training differentiates through the (recomputed) backward of the chunks."""
+    chunked = modify(
+        copy.deepcopy(model),
+        [{"modifier": "enable_edge_chunking", "chunk_size": 7}],
+    )
+    grads = []
+    for m in [copy.deepcopy(model), chunked]:
+        m.train()
+        out = m(data.copy())
+        out[AtomicDataDict.FORCE_KEY].square().sum().backward()
+        grads.append({k: p.grad for k, p in m.named_parameters()})
+    tol = floating_point_tolerance("float64")
+    for k, grad in grads[0].items():
+        assert torch.allclose(grads[1][k], grad, rtol=tol, atol=tol), k
+
+
+def test_edge_chunking_memory_budget(model):
+    chunked = modify(
+        copy.deepcopy(model),
+        [{"modifier": "enable_edge_chunking", "memory_budget_mb": 0.01}],
+    )
+    chunk_sizes = [
+        m.chunk_size
+        for m in chunked.modules()
+        if isinstance(m, ChunkedTensorProductScatter)
+    ]
+    assert len(chunk_sizes) == 2
+    assert all(1 <= c < 1000 for c in chunk_sizes)
@@ -0,0 +1,100 @@
+import time
+import torch
+
+from nequip.data import AtomicDataDict
+from nequip.train.callbacks import TrainingThroughputMonitor
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Module:
+    """Stand-in for the parts of a ``NequIPLightningModule`` used by the callback."""
+
+    device = torch.device("cpu")
+
+    def __init__(self):
+        self.logged = {}
+
+    def all_gather(self, tensor):
+        return tensor
+
+    def log_dict(self, log_dict, **kwargs):
+        self.logged.update(log_dict)
+
+
+_BATCH = {
+    AtomicDataDict.POSITIONS_KEY: torch.zeros((5, 3)),
+    AtomicDataDict.EDGE_INDEX_KEY: torch.zeros((2, 7), dtype=torch.long),
+    AtomicDataDict.NUM_NODES_KEY: torch.tensor([2, 3]),
+}
+
+
+def _step(callback, module, clock, times, num_backward=1):
+    """Run the hooks of a training step with ``num_backward`` backward passes at the given ``times``."""
+    times = iter(times)
+    clock.now = next(times)
+    callback.on_train_batch_start(None, module, _BATCH, 0)
+    for _ in range(num_backward):
+        clock.now = next(times)
+        callback.on_before_backward(None, module, None)
+        clock.now = next(times)
+        callback.on_after_backward(None, module)
+    clock.now = next(times)
+    callback.on_train_batch_end(None, module, None, _BATCH, 0)
+
+
+def test_throughput_monitor(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(time, "perf_counter", clock)
+    callback = TrainingThroughputMonitor(log_freq=1, window=10, percentiles=[50])
+    module = _Module()
+
+    callback.on_train_epoch_start(None, module)
+    _step(callback, module, clock, [1.0, 3.0, 6.0, 10.0])
+
+    names = [
+        f"{phase}_{stat}"
+        for phase in ["data_wait", "forward", "backward", "optimizer", "step"]
+        for stat in ["mean", "p50"]
+    ]
+    names += ["atoms_per_s", "edges_per_s", "frames_per_s", "data_wait_fraction"]
+    expected_keys = {f"throughput.rank0/{name}" for name in names}
+    expected_keys |= {
+        f"throughput/{name}" for name in ["atoms_per_s", "edges_per_s", "frames_per_s"]
+    }
+    expected_keys |= {"throughput/straggler_spread", "throughput/straggler_ratio"}
+    assert set(module.logged.keys()) == expected_keys
+    assert module.logged["throughput.rank0/data_wait_mean"] == 1.0
+    assert module.logged["throughput.rank0/forward_mean"] == 2.0
+    assert module.logged["throughput.rank0/backward_mean"] == 3.0
+    assert module.logged["throughput.rank0/optimizer_mean"] == 4.0
+    assert module.logged["throughput.rank0/step_mean"] == 10.0
+    assert module.logged["throughput/atoms_per_s"] == 0.5
+    assert module.logged["throughput/edges_per_s"] == 0.7
+    assert module.logged["throughput/frames_per_s"] == 0.2
+    assert module.logged["throughput.rank0/data_wait_fraction"] == 0.1
+
+    # validation between steps is not counted as waiting for data
+    clock.now = 20.0
+    callback.on_validation_end(None, module)
+    # several backward passes per step (e.g. ConFIG) are combined
+    _step(callback, module, clock, [21.0, 23.0, 24.0, 25.0, 27.0, 30.0], 2)
+
+    timings = {phase: list(values) for phase, values in callback._timings.items()}
+    assert timings["data_wait"] == [1.0, 1.0]
+    assert timings["forward"] == [2.0, 2.0]
+    assert timings["backward"] == [3.0, 4.0]
+    assert timings["optimizer"] == [4.0, 3.0]
+    # the phases add up to the step time
+    for idx in range(2):
+        assert timings["step"][idx] == sum(
+            timings[phase][idx]
+            for phase in ["data_wait", "forward", "backward", "optimizer"]
+        )
+    assert timings["step"] == [10.0, 10.0]
@@ -0,0 +1,93 @@
+import os
+import pytest
+import torch
+
+from nequip.scripts.cache import main as cache_main
+from nequip.utils.compile_cache import (
+    compute_compile_cache_key,
+    get_cached_artifact,
+    cache_artifact,
+    list_compile_cache_entries,
+    prune_compile_cache,
+)
+
+
+def _write(content: bytes):
+    def write_fn(path):
+        with open(path, "wb") as f:
+            f.write(content)
+
+    return write_fn
+
+
+def test_compile_cache_key():
+    model = torch.nn.Linear(3, 2)
+    key = compute_compile_cache_key(model=model, device="cpu", fields=["pos"])
+    assert key == compute_compile_cache_key(model=model, device="cpu", fields=["pos"])
+    assert key != compute_compile_cache_key(model=model, device="cuda", fields=["pos"])
+    with torch.no_grad():
+        model.weight[0, 0] += 1.0
+    assert key != compute_compile_cache_key(model=model, device="cpu", fields=["pos"])
+
+
+def test_compile_cache_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEQUIP_COMPILE_CACHE_DIR", str(tmp_path))
+    assert get_cached_artifact("abc", "model.pt2") is None
+
+    path = cache_artifact("abc", "model.pt2", _write(b"compiled"), info={"a": 1})
+    assert path == tmp_path / "abc" / "model.pt2"
+    assert get_cached_artifact("abc", "model.pt2") == path
+    assert path.read_bytes() == b"compiled"
+    # no partial entries are left behind
+    assert [p.name for p in tmp_path.iterdir() if p.name != ".locks"] == ["abc"]
+
+    # caching an existing entry again keeps the first one
+    cache_artifact("abc", "model.pt2", _write(b"other"))
+    assert path.read_bytes() == b"compiled"
+
+    # modified entries are rejected and replaced
+    path.write_bytes(b"corrupted")
+    assert get_cached_artifact("abc", "model.pt2") is None
+    cache_artifact("abc", "model.pt2", _write(b"recompiled"))
+    assert get_cached_artifact("abc", "model.pt2").read_bytes() == b"recompiled"
+
+
+def test_compile_cache_cli(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("NEQUIP_COMPILE_CACHE_DIR", str(tmp_path))
+    path = cache_artifact("abc", "model.pt2", _write(b"compiled"))
+    cache_artifact("def", "model.pt2", _write(b"compiled"))
+
+    cache_main(["--compile-cache", "list"])
+    out = capsys.readouterr().out
+    assert "abc" in out and "2 entries" in out
+
+    # corruption that keeps the size and modification time is only detected by verifying the hashes
+    stat = path.stat()
+    path.write_bytes(b"Compiled")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert get_cached_artifact("abc", "model.pt2") == path
+    with pytest.raises(SystemExit):
+        cache_main(["--compile-cache", "verify"])
+    assert "1 cache entries failed verification" in capsys.readouterr().out
+    cache_main(["--compile-cache", "verify", "--remove"])
+    assert [entry.name for entry in list_compile_cache_entries()] == ["def"]
+
+    cache_main(["--compile-cache", "prune", "--all"])
+    assert list_compile_cache_entries() == []
+
+
+def test_compile_cache_lru(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEQUIP_COMPILE_CACHE_DIR", str(tmp_path))
+    keys = ["first", "second", "third"]
+    for i, key in enumerate(keys):
+        cache_artifact(key, "model.pt2", _write(bytes(1000)))
+        # make the order of use unambiguous
+        os.utime(tmp_path / key / "metadata.json", (i, i))
+    # using an entry marks it as most recently used
+    assert get_cached_artifact("first", "model.pt2") is not None
+    entry_size = sum(f.stat().st_size for f in (tmp_path / "first").iterdir())
+
+    assert prune_compile_cache(max_size=3 * entry_size) == []
+    assert prune_compile_cache(max_size=2 * entry_size) == ["second"]
+    assert prune_compile_cache(max_size=entry_size, keep=["third"]) == ["first"]
+    assert [p.name for p in tmp_path.iterdir() if p.name != ".locks"] == ["third"]
@@ -0,0 +1,75 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+# modules that are only needed for training (or for optional features), and must not be imported for inference
+_HEAVY_MODULES = ["lightning", "hydra", "torchmetrics", "matscipy", "lmdb", "wandb"]
+
+_INFERENCE_IMPORTS = "import nequip.ase, nequip.model, nequip.scripts.compile"
+
+
+def _import_time_budget() -> float:
+    # in seconds, on top of the time to import `torch`
+    return float(os.environ.get("NEQUIP_IMPORT_TIME_BUDGET", "1.5"))
+
+
+def _run(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+
+
+def _cumulative_import_time(stderr: str, module: str) -> float:
+    """Cumulative import time of ``module`` in seconds from the output of ``python -X importtime``."""
+    # lines are of the form `import time: self [us] | cumulative | imported package`
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header
+        # nested imports are indented, so only top-level entries of `module` and its submodules are counted,
+        # which already include the time of their own imports
+        name = name[1:].rstrip()
+        if name.split(".")[0] == module:
+            total += int(cumulative)
+    return total * 1e-6
+
+
+def test_inference_imports_are_light():
+    proc = _run(
+        f"import torch, sys; {_INFERENCE_IMPORTS}; "
+        f"print(','.join(m for m in {_HEAVY_MODULES} if m in sys.modules))"
+    )
+    assert proc.stdout.strip() == "", (
+        f"heavy modules imported by `{_INFERENCE_IMPORTS}`: {proc.stdout.strip()}"
+    )
+
+
+@pytest.mark.parametrize("code", ["import nequip", _INFERENCE_IMPORTS])
+def test_import_time(code):
+    # `torch` is imported first such that only the time spent in `nequip` (and its dependencies) is counted
+    proc = _run(f"import torch; {code}")
+    import_time = _cumulative_import_time(proc.stderr, "nequip")
+    assert import_time > 0
+    assert import_time < _import_time_budget(), (
+        f"`{code}` took {import_time:.2f}s (budget: {_import_time_budget():.2f}s, set with `NEQUIP_IMPORT_TIME_BUDGET`)"
+    )
+
+
+def test_cli_help_is_light():
+    proc = _run(
+        "import sys, contextlib, io\n"
+        "from nequip.scripts.compile import main\n"
+        "with contextlib.suppress(SystemExit), contextlib.redirect_stdout(io.StringIO()):\n"
+        "    main(args=['--help'])\n"
+        f"print(','.join(m for m in {_HEAVY_MODULES} if m in sys.modules))"
+    )
+    assert proc.stdout.strip() == ""
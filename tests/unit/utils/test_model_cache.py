@@ -0,0 +1,251 @@
+import os
+import json
+import threading
+import functools
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import torch
+
+from nequip.scripts.cache import main as cache_main
+from nequip.utils import model_cache
+from nequip.utils._cache_utils import compute_file_hash
+from nequip.utils.model_cache import (
+    get_cached_model,
+    cache_model,
+    get_unpacked_package,
+    list_cache_entries,
+    prune_model_cache,
+)
+
+
+def _write_package(path, weight: float):
+    model = torch.nn.Linear(3, 2)
+    with torch.no_grad():
+        model.weight.fill_(weight)
+    with torch.package.PackageExporter(str(path)) as exp:
+        exp.save_pickle("model", "eager_model.pkl", model)
+
+
+def _load(path):
+    imp = torch.package.PackageImporter(str(path))
+    return imp.load_pickle("model", "eager_model.pkl", map_location="cpu")
+
+
+def test_unpacked_package(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEQUIP_CACHE_DIR", str(tmp_path / "cache"))
+    package_path = tmp_path / "model.nequip.zip"
+    _write_package(package_path, 1.0)
+
+    unpacked = get_unpacked_package(package_path)
+    assert unpacked.is_dir()
+    entry = unpacked.parent.parent
+    assert entry.parent.name == f"unpacked_v{model_cache._UNPACKED_CACHE_VERSION}"
+    # no partial entries are left behind
+    assert [p.name for p in entry.parent.iterdir()] == [entry.name]
+    with open(entry / "metadata.json", "r") as f:
+        metadata = json.load(f)
+    assert metadata["package_sha256"] == compute_file_hash(package_path)
+    assert not metadata["verified"]
+
+    model = _load(unpacked)
+    assert torch.equal(model.weight, torch.ones(2, 3))
+    assert torch.equal(model.bias, _load(package_path).bias)
+
+    # subsequent loads reuse the entry without unpacking it again
+    package_inode = (entry / "package").stat().st_ino
+    os.utime(entry / "metadata.json", (1000, 1000))
+    assert get_unpacked_package(package_path) == unpacked
+    assert (entry / "package").stat().st_ino == package_inode
+    with open(entry / "metadata.json", "r") as f:
+        reused_metadata = json.load(f)
+    assert reused_metadata["cached_at"] == metadata["cached_at"]
+    assert reused_metadata["unpacked_sha256"] == metadata["unpacked_sha256"]
+    # after checking it against the hashes on first use
+    assert reused_metadata["verified"]
+    # and mark it as recently used
+    assert (entry / "metadata.json").stat().st_mtime > 1000
+
+
+def test_unpacked_package_invalidation(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEQUIP_CACHE_DIR", str(tmp_path / "cache"))
+    package_path = tmp_path / "model.nequip.zip"
+    _write_package(package_path, 1.0)
+    unpacked = get_unpacked_package(package_path)
+    # the first use hashes the package file and the unpacked files
+    assert get_unpacked_package(package_path) == unpacked
+
+    # later loads only compare the sizes and modification times of the files instead of hashing them
+    with monkeypatch.context() as m:
+        m.setattr(model_cache, "compute_file_hash", None)
+        m.setattr(model_cache, "_compute_dir_hash", None)
+        assert get_unpacked_package(package_path) == unpacked
+
+    # a package file that changed modification time but not contents is hashed and reused
+    stat = package_path.stat()
+    os.utime(package_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    package_inode = unpacked.parent.stat().st_ino
+    assert get_unpacked_package(package_path) == unpacked
+    assert unpacked.parent.stat().st_ino == package_inode
+    with monkeypatch.context() as m:
+        m.setattr(model_cache, "compute_file_hash", None)
+        assert get_unpacked_package(package_path) == unpacked
+
+    # corrupted weights are detected and unpacked again
+    storage = next((unpacked / ".data").glob("*.storage"))
+    stat = storage.stat()
+    storage.write_bytes(b"\0" * stat.st_size)
+    # independent of the timestamp resolution of the file system
+    os.utime(storage, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    unpacked = get_unpacked_package(package_path)
+    assert torch.equal(_load(unpacked).weight, torch.ones(2, 3))
+
+    # a changed package file is unpacked again
+    _write_package(package_path, 2.0)
+    stat = package_path.stat()
+    os.utime(package_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    unpacked = get_unpacked_package(package_path)
+    assert torch.equal(_load(unpacked).weight, 2 * torch.ones(2, 3))
+
+
+def test_unpacked_package_first_use(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEQUIP_CACHE_DIR", str(tmp_path / "cache"))
+    package_path = tmp_path / "model.nequip.zip"
+    _write_package(package_path, 1.0)
+    unpacked = get_unpacked_package(package_path)
+
+    # a package file replaced with the same size and modification time is detected on first use
+    stat = package_path.stat()
+    _write_package(package_path, 2.0)
+    assert package_path.stat().st_size == stat.st_size
+    os.utime(package_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    unpacked = get_unpacked_package(package_path)
+    assert torch.equal(_load(unpacked).weight, 2 * torch.ones(2, 3))
+
+
+def test_unpacked_package_no_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEQUIP_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(model_cache, "_NEQUIP_NO_CACHE", True)
+    package_path = tmp_path / "model.nequip.zip"
+    _write_package(package_path, 1.0)
+    assert get_unpacked_package(package_path) is None
+
+
+@pytest.fixture
+def file_server(tmp_path):
+    """Local HTTP file server standing in for nequip.net, serving ``tmp_path / "server"`` and counting requests."""
+    root = tmp_path / "server"
+    root.mkdir()
+    requests = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            super().do_GET()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(Handler, directory=str(root))
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield root, f"http://127.0.0.1:{server.server_address[1]}", requests
+    server.shutdown()
+    server.server_close()
+
+
+def _load_cached(model_id, download_url):
+    def download_fn(path):
+        with urllib.request.urlopen(download_url) as response:
+            path.write_bytes(response.read())
+
+    return get_cached_model(model_id, download_url) or cache_model(
+        model_id, download_url, download_fn
+    )
+
+
+def test_single_flight_download(tmp_path, monkeypatch, file_server):
+    monkeypatch.setenv("NEQUIP_CACHE_DIR", str(tmp_path / "cache"))
+    root, url, requests = file_server
+    _write_package(root / "model.nequip.zip", 1.0)
+    download_url = f"{url}/model.nequip.zip"
+
+    # concurrent loads of the same model only download it once
+    with ThreadPoolExecutor(8) as executor:
+        paths = list(
+            executor.map(lambda _: _load_cached("a/b:1", download_url), range(8))
+        )
+    assert len(requests) == 1
+    assert len(set(paths)) == 1
+    assert paths[0].read_bytes() == (root / "model.nequip.zip").read_bytes()
+    assert not list((tmp_path / "cache").glob("*.partial-*"))
+
+    # a corrupted entry is downloaded again
+    paths[0].write_bytes(b"corrupted")
+    assert _load_cached("a/b:1", download_url) == paths[0]
+    assert len(requests) == 2
+    assert _load_cached("a/b:1", download_url) == paths[0]
+    assert len(requests) == 2
+
+
+def test_prune_model_cache(tmp_path, monkeypatch, file_server):
+    monkeypatch.setenv("NEQUIP_CACHE_DIR", str(tmp_path / "cache"))
+    root, url, _ = file_server
+    for idx in range(3):
+        _write_package(root / f"model{idx}.nequip.zip", float(idx))
+        download_url = f"{url}/model{idx}.nequip.zip"
+        _load_cached(f"a/b:{idx}", download_url)
+        # the last use of an entry is tracked by the modification time of its metadata
+        metadata_path = model_cache._get_metadata_path(
+            model_cache.get_cache_dir(),
+            model_cache._compute_cache_key(f"a/b:{idx}", download_url),
+        )
+        os.utime(metadata_path, (1000 + idx, 1000 + idx))
+    entries = list_cache_entries()
+    assert [entry.source for entry in entries] == ["a/b:0", "a/b:1", "a/b:2"]
+
+    # using an entry makes it the most recently used one
+    _load_cached("a/b:0", f"{url}/model0.nequip.zip")
+    assert list_cache_entries()[-1].source == "a/b:0"
+
+    # the least recently used entries are evicted first
+    total_size = sum(entry.size for entry in entries)
+    evicted = prune_model_cache(max_size=total_size - 1)
+    assert evicted == [entries[1].name]
+    assert [entry.source for entry in list_cache_entries()] == ["a/b:2", "a/b:0"]
+
+    # the size limit also applies when caching
+    monkeypatch.setenv("NEQUIP_CACHE_MAX_SIZE_GB", "0")
+    _load_cached("a/b:1", f"{url}/model1.nequip.zip")
+    assert [entry.source for entry in list_cache_entries()] == ["a/b:1"]
+
+
+def test_cache_cli(tmp_path, monkeypatch, capsys, file_server):
+    monkeypatch.setenv("NEQUIP_CACHE_DIR", str(tmp_path / "cache"))
+    root, url, _ = file_server
+    _write_package(root / "model.nequip.zip", 1.0)
+    path = _load_cached("a/b:1", f"{url}/model.nequip.zip")
+    unpacked = get_unpacked_package(path)
+    assert len(list_cache_entries()) == 2
+
+    cache_main(["list"])
+    out = capsys.readouterr().out
+    assert "a/b:1" in out and str(path) in out and "2 entries" in out
+
+    cache_main(["verify"])
+    assert "All cache entries are valid" in capsys.readouterr().out
+
+    storage = next((unpacked / ".data").glob("*.storage"))
+    storage.write_bytes(b"\0" * storage.stat().st_size)
+    with pytest.raises(SystemExit):
+        cache_main(["verify"])
+    assert "1 cache entries failed verification" in capsys.readouterr().out
+    cache_main(["verify", "--remove"])
+    assert [entry.kind for entry in list_cache_entries()] == ["download"]
+
+    cache_main(["prune", "--all"])
+    assert list_cache_entries() == []
@@ -0,0 +1,102 @@
+import pytest
+import json
+import torch
+
+from nequip.data import AtomicDataDict
+from nequip.utils.profiler import ModelProfiler
+from nequip.utils.unittests.model_tests_basic import BasicModelTestsMixin
+
+MODEL_CONFIG = {
+    "_target_": "nequip.model.NequIPGNNModel",
+    "seed": 123,
+    "model_dtype": "float64",
+    "type_names": ["C", "O", "H"],
+    "r_max": 2.0,
+    "num_layers": 2,
+    "l_max": 1,
+    "num_features": 4,
+    "radial_mlp_depth": 1,
+    "radial_mlp_width": 8,
+    "avg_num_neighbors": 3.0,
+    "per_type_energy_shifts": {"C": 1.0, "O": 2.0, "H": 3.0},
+    "per_type_energy_scales": {"C": 1.0, "O": 1.0, "H": 1.0},
+}
+
+
+@pytest.fixture(scope="module")
+def model():
+    return BasicModelTestsMixin.make_model(MODEL_CONFIG, device="cpu")
+
+
+def _num_hooks(model):
+    return sum(
+        len(m._forward_hooks) + len(m._forward_pre_hooks) for m in model.modules()
+    )
+
+
+def test_fine_profiling(model, CH3CHO, tmp_path):
+    _, data = CH3CHO
+    profiler = ModelProfiler(model)
+    assert profiler.mode == "fine"
+
+    num_hooks = _num_hooks(model)
+    with profiler:
+        assert _num_hooks(model) > num_hooks
+        for _ in range(2):
+            out = profiler(data.copy())
+            out[AtomicDataDict.TOTAL_ENERGY_KEY].sum().backward()
+    assert _num_hooks(model) == num_hooks
+
+    # profiling must not change results
+    ref = model(data.copy())
+    for key in [AtomicDataDict.TOTAL_ENERGY_KEY, AtomicDataDict.FORCE_KEY]:
+        assert torch.allclose(out[key], ref[key])
+
+    summary = {entry["name"]: entry for entry in profiler.summary()}
+    assert list(summary.keys())[0] == "total"
+    tp_scatter = summary["model.func.layer0_convnet.conv.tp_scatter"]
+    assert tp_scatter["calls"] == 2
+    assert tp_scatter["forward_total"] > 0
+    # the backward of the force computation happens within `ForceStressOutput`
+    assert tp_scatter["backward_total"] > 0
+    assert tp_scatter["num_nodes"] == AtomicDataDict.num_nodes(data)
+    assert tp_scatter["num_edges"] == AtomicDataDict.num_edges(data)
+    assert summary["total"]["forward_total"] >= tp_scatter["forward_total"]
+
+    table = profiler.table(sort_by="total")
+    assert "model.func.layer1_convnet.conv.tp_scatter" in table
+
+    profiler.export_chrome_trace(str(tmp_path / "trace.json"))
+    with open(tmp_path / "trace.json") as f:
+        trace = json.load(f)
+    cats = set(event["cat"] for event in trace["traceEvents"])
+    assert cats == {"forward", "backward"}
+    assert all(event["dur"] >= 0 for event in trace["traceEvents"])
+
+    profiler.reset()
+    assert len(profiler.summary()) == 0
+
+
+def test_include_patterns(model, CH3CHO):
+    _, data = CH3CHO
+    profiler = ModelProfiler(model, include=["*.tp_scatter"])
+    with profiler:
+        profiler(data.copy())
+    names = [entry["name"] for entry in profiler.summary()]
+    assert names == [
+        "total",
+        "model.func.layer0_convnet.conv.tp_scatter",
+        "model.func.layer1_convnet.conv.tp_scatter",
+    ]
+
+
+def test_coarse_profiling(model, CH3CHO):
+    _, data = CH3CHO
+    profiler = ModelProfiler(model, mode="coarse")
+    num_hooks = _num_hooks(model)
+    with profiler:
+        assert _num_hooks(model) == num_hooks
+        profiler(data.copy())
+    summary = profiler.summary()
+    assert [entry["name"] for entry in summary] == ["total"]
+    assert summary[0]["calls"] == 1